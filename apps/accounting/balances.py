@@ -0,0 +1,265 @@
+"""
+Soldes mensuels des comptes (`AccountPeriodBalance`) et lecture des états.
+
+Les états financiers (balance, bilan, compte de résultat, SIG, dashboard)
+agrégeaient toutes les lignes d'écritures validées depuis l'origine à chaque
+requête. Ils lisent désormais :
+
+- les instantanés mensuels pour les mois entièrement couverts par la période ;
+- les lignes brutes uniquement pour les mois partiels aux bornes.
+
+Le coût d'un état est donc borné par l'activité d'un mois (deux au plus),
+plus une ligne par compte et par mois d'historique.
+
+Maintenance : les signaux sur JournalEntry / JournalEntryLine programment
+le recalcul du mois concerné après commit (`schedule_balance_refresh`) ;
+`rebuild_period_balances` reconstruit tout l'historique d'une organisation.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from django.db import transaction
+from django.db.models import DateField, Q, Sum
+from django.db.models.functions import Trunc
+
+from apps.core.transactions import on_commit_once
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_FIELDS = ('account__id', 'account__code', 'account__name', 'account__account_type')
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _is_month_end(day: date) -> bool:
+    return (day + timedelta(days=1)).day == 1
+
+
+def _posted_lines(organization_id):
+    from .models import JournalEntryLine
+
+    return JournalEntryLine.objects.filter(
+        entry__organization_id=organization_id,
+        entry__status='posted',
+    )
+
+
+# ─── Maintenance ──────────────────────────────────────────────────────────────
+
+def _lock_organization(organization_id):
+    """
+    Sérialise la maintenance des instantanés d'une organisation (verrou de
+    ligne sur l'organisation, jusqu'à la fin de la transaction) : deux
+    recalculs concurrents ne s'entrelacent plus.
+    """
+    from apps.accounts.models import Organization
+
+    list(Organization.objects.select_for_update().filter(pk=organization_id).values_list('pk', flat=True))
+
+
+def refresh_period_balances(organization_id, month: date) -> int:
+    """Recalcule les instantanés (organisation, mois) depuis les lignes validées."""
+    from .models import AccountPeriodBalance
+
+    if not organization_id or month is None:
+        return 0
+
+    month = month_start(month)
+    with transaction.atomic():
+        # Lecture après le verrou : le dernier recalcul voit les dernières écritures
+        _lock_organization(organization_id)
+        rows = (
+            _posted_lines(organization_id)
+            .filter(entry__date__gte=month, entry__date__lt=next_month(month))
+            .values('account_id')
+            .order_by()
+            .annotate(debit=Sum('debit'), credit=Sum('credit'))
+        )
+        balances = [
+            AccountPeriodBalance(
+                organization_id=organization_id,
+                account_id=row['account_id'],
+                period=month,
+                debit=row['debit'] or Decimal('0'),
+                credit=row['credit'] or Decimal('0'),
+            )
+            for row in rows
+        ]
+        # Upsert sur (compte, mois) : pas d'IntegrityError même sans verrou
+        # effectif (SQLite), puis suppression des comptes sans mouvement
+        AccountPeriodBalance.objects.bulk_create(
+            balances,
+            update_conflicts=True,
+            unique_fields=['account', 'period'],
+            update_fields=['organization', 'debit', 'credit', 'updated_at'],
+        )
+        AccountPeriodBalance.objects.filter(organization_id=organization_id, period=month).exclude(
+            account_id__in=[balance.account_id for balance in balances]
+        ).delete()
+    return len(balances)
+
+
+def schedule_balance_refresh(organization_id, day: Optional[date]):
+    """
+    Programme le recalcul du mois de `day` après le commit de la transaction
+    courante. Les demandes identiques d'une même transaction ne sont
+    exécutées qu'une fois.
+    """
+    if not organization_id or day is None:
+        return
+
+    month = month_start(day)
+    on_commit_once(('accounting.balances', str(organization_id), month), _safe_refresh, organization_id, month)
+
+
+def _safe_refresh(organization_id, month):
+    try:
+        refresh_period_balances(organization_id, month)
+    except Exception:
+        logger.exception("Échec du recalcul des soldes mensuels (%s, %s)", organization_id, month)
+
+
+@transaction.atomic
+def rebuild_period_balances(organization) -> int:
+    """
+    Reconstruit tous les instantanés d'une organisation en une requête
+    groupée (indépendant du nombre de mois).
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    from .models import AccountPeriodBalance
+
+    _lock_organization(organization.pk)
+    rows = (
+        _posted_lines(organization.pk)
+        .annotate(period=Trunc('entry__date', 'month', output_field=DateField()))
+        .values('account_id', 'period')
+        .order_by()
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+    )
+    balances = [
+        AccountPeriodBalance(
+            organization_id=organization.pk,
+            account_id=row['account_id'],
+            period=row['period'],
+            debit=row['debit'] or Decimal('0'),
+            credit=row['credit'] or Decimal('0'),
+        )
+        for row in rows
+    ]
+    AccountPeriodBalance.objects.filter(organization=organization).delete()
+    AccountPeriodBalance.objects.bulk_create(balances, batch_size=500)
+    return len(balances)
+
+
+# ─── Lecture ──────────────────────────────────────────────────────────────────
+
+def _split_range(start: Optional[date], end: date) -> Tuple[Optional[date], date, Q]:
+    """
+    Découpe [start, end] en mois complets [first_full, full_end[ (lus dans
+    les instantanés) et en bornes partielles (filtre sur les lignes brutes).
+    """
+    first_full = None if start is None else (start if start.day == 1 else next_month(start))
+    full_end = next_month(end) if _is_month_end(end) else month_start(end)
+
+    if first_full is not None and first_full >= full_end:
+        # Aucun mois complet : toute la période est lue dans les lignes
+        return first_full, first_full, Q(entry__date__gte=start, entry__date__lte=end)
+
+    partial_lines = Q(pk__in=[])
+    if start is not None and start < first_full:
+        partial_lines |= Q(entry__date__gte=start, entry__date__lt=first_full)
+    if full_end <= end:
+        partial_lines |= Q(entry__date__gte=full_end, entry__date__lte=end)
+    return first_full, full_end, partial_lines
+
+
+def account_totals(organization, end: date, start: Optional[date] = None,
+                   account_filter: Optional[Q] = None) -> List[Dict]:
+    """
+    Total débit / crédit par compte sur [start, end] (depuis l'origine si
+    `start` est None), écritures validées uniquement.
+
+    Args:
+        account_filter: filtre sur `account__...` (type, préfixe de code...)
+
+    Returns:
+        Lignes triées par code : account__id, account__code, account__name,
+        account__account_type, total_debit, total_credit
+    """
+    from .models import AccountPeriodBalance
+
+    account_filter = account_filter if account_filter is not None else Q()
+    first_full, full_end, partial_lines = _split_range(start, end)
+
+    querysets = []
+    if first_full is None or first_full < full_end:
+        snapshots = AccountPeriodBalance.objects.filter(
+            account_filter, organization=organization, period__lt=full_end
+        )
+        if first_full is not None:
+            snapshots = snapshots.filter(period__gte=first_full)
+        querysets.append(snapshots)
+    querysets.append(_posted_lines(organization.pk).filter(account_filter).filter(partial_lines))
+
+    totals = {}
+    for queryset in querysets:
+        rows = queryset.values(*ACCOUNT_FIELDS).order_by().annotate(
+            total_debit=Sum('debit'), total_credit=Sum('credit')
+        )
+        for row in rows:
+            current = totals.setdefault(row['account__id'], {
+                **{field: row[field] for field in ACCOUNT_FIELDS},
+                'total_debit': Decimal('0'),
+                'total_credit': Decimal('0'),
+            })
+            current['total_debit'] += row['total_debit'] or Decimal('0')
+            current['total_credit'] += row['total_credit'] or Decimal('0')
+
+    return sorted(totals.values(), key=lambda row: row['account__code'])
+
+
+def type_totals_by_month(organization, first_month: date, end: date) -> Dict[Tuple[date, str], Tuple[Decimal, Decimal]]:
+    """
+    (débit, crédit) par (mois, type de compte) de `first_month` à `end`
+    inclus, en deux requêtes (instantanés + lignes du mois partiel).
+    """
+    first_month = month_start(first_month)
+    _first_full, full_end, partial_lines = _split_range(first_month, end)
+
+    totals = {}
+
+    def _add(rows):
+        for row in rows:
+            key = (row['period'], row['account__account_type'])
+            debit, credit = totals.get(key, (Decimal('0'), Decimal('0')))
+            totals[key] = (debit + (row['d'] or Decimal('0')), credit + (row['c'] or Decimal('0')))
+
+    from .models import AccountPeriodBalance
+
+    if first_month < full_end:
+        _add(
+            AccountPeriodBalance.objects
+            .filter(organization=organization, period__gte=first_month, period__lt=full_end)
+            .values('period', 'account__account_type')
+            .order_by()
+            .annotate(d=Sum('debit'), c=Sum('credit'))
+        )
+    _add(
+        _posted_lines(organization.pk)
+        .filter(partial_lines)
+        .annotate(period=Trunc('entry__date', 'month', output_field=DateField()))
+        .values('period', 'account__account_type')
+        .order_by()
+        .annotate(d=Sum('debit'), c=Sum('credit'))
+    )
+    return totals
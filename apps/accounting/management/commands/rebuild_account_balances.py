@@ -0,0 +1,41 @@
+"""
+Commande Django : rebuild_account_balances
+Reconstruit les soldes mensuels des comptes (AccountPeriodBalance) depuis les
+écritures validées.
+
+Usage:
+    python manage.py rebuild_account_balances
+    python manage.py rebuild_account_balances --org-id <uuid>
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import Organization
+from apps.accounting.balances import rebuild_period_balances
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les soldes mensuels des comptes utilisés par les états financiers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org-id',
+            type=str,
+            help='UUID de l\'organisation (optionnel — si omis, toutes les organisations)',
+        )
+
+    def handle(self, *args, **options):
+        org_id = options.get('org_id')
+        if org_id:
+            orgs = Organization.objects.filter(pk=org_id)
+            if not orgs.exists():
+                raise CommandError(f'Organisation {org_id} introuvable')
+        else:
+            orgs = Organization.objects.all()
+
+        total = 0
+        for org in orgs.iterator():
+            rows = rebuild_period_balances(org)
+            total += rows
+            self.stdout.write(f'  {org.name}: {rows} solde(s) mensuel(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Soldes reconstruits : {total} ligne(s).'))
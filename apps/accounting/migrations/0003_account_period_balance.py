@@ -0,0 +1,65 @@
+# Generated by Django 4.2.11 on 2026-10-18 01:21
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def build_period_balances(apps, schema_editor):
+    """Instantanés mensuels initiaux depuis les écritures validées existantes"""
+    from django.db.models import DateField, Sum
+    from django.db.models.functions import Trunc
+
+    JournalEntryLine = apps.get_model('accounting', 'JournalEntryLine')
+    AccountPeriodBalance = apps.get_model('accounting', 'AccountPeriodBalance')
+
+    rows = (
+        JournalEntryLine.objects
+        .filter(entry__status='posted')
+        .annotate(period=Trunc('entry__date', 'month', output_field=DateField()))
+        .values('entry__organization_id', 'account_id', 'period')
+        .order_by()
+        .annotate(debit=Sum('debit'), credit=Sum('credit'))
+    )
+    AccountPeriodBalance.objects.bulk_create([
+        AccountPeriodBalance(
+            organization_id=row['entry__organization_id'],
+            account_id=row['account_id'],
+            period=row['period'],
+            debit=row['debit'] or Decimal('0'),
+            credit=row['credit'] or Decimal('0'),
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_change_payment_terms_default_to_cash'),
+        ('accounting', '0002_alter_journalentry_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period', models.DateField(help_text='Premier jour du mois', verbose_name='Mois')),
+                ('debit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=16)),
+                ('credit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='accounting.account', verbose_name='Compte')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_period_balances', to='accounts.organization')),
+            ],
+            options={
+                'verbose_name': 'Solde mensuel de compte',
+                'verbose_name_plural': 'Soldes mensuels de comptes',
+                'ordering': ['period', 'account__code'],
+                'indexes': [models.Index(fields=['organization', 'period'], name='accounting__organiz_a10dcf_idx')],
+                'unique_together': {('account', 'period')},
+            },
+        ),
+        migrations.RunPython(build_period_balances, migrations.RunPython.noop),
+    ]
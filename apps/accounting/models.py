@@ -184,20 +184,17 @@ class JournalEntry(models.Model):
     @classmethod
     def generate_entry_number(cls, organization, journal):
         from django.utils import timezone
+        from apps.core.sequences import last_number_with_prefix, next_number
+
         year = timezone.now().year
         prefix = f"{journal.code}-{year}"
-        last = cls.objects.filter(
-            organization=organization,
-            journal=journal,
-            entry_number__startswith=prefix,
-        ).order_by('-entry_number').first()
-        if last:
-            try:
-                seq = int(last.entry_number.split('-')[-1]) + 1
-            except (ValueError, IndexError):
-                seq = 1
-        else:
-            seq = 1
+        seq = next_number(
+            f"journal_entry:{journal.code}", str(year), organization=organization,
+            seed=lambda: last_number_with_prefix(
+                cls.objects.filter(organization=organization, journal=journal),
+                'entry_number', prefix
+            )
+        )
         return f"{prefix}-{seq:05d}"
 
 
@@ -241,3 +238,38 @@ class JournalEntryLine(models.Model):
             raise ValidationError(_("Une ligne ne peut pas avoir à la fois un débit et un crédit."))
         if d < 0 or c < 0:
             raise ValidationError(_("Les montants ne peuvent pas être négatifs."))
+
+
+class AccountPeriodBalance(models.Model):
+    """
+    Instantané mensuel d'un compte : total des débits / crédits des écritures
+    validées du mois. Maintenu par les signaux (apps.accounting.balances) ;
+    les états financiers lisent ces lignes + le delta des mois partiels.
+    """
+
+    id           = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        'accounts.Organization',
+        on_delete=models.CASCADE,
+        related_name='account_period_balances',
+    )
+    account      = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='period_balances',
+        verbose_name=_("Compte"),
+    )
+    period       = models.DateField(verbose_name=_("Mois"), help_text=_("Premier jour du mois"))
+    debit        = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0'))
+    credit       = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0'))
+    updated_at   = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['period', 'account__code']
+        unique_together = [('account', 'period')]
+        indexes = [models.Index(fields=['organization', 'period'])]
+        verbose_name = _("Solde mensuel de compte")
+        verbose_name_plural = _("Soldes mensuels de comptes")
+
+    def __str__(self):
+        return f"{self.account.code} {self.period:%Y-%m} D {self.debit} / C {self.credit}"
@@ -12,7 +12,7 @@ import logging
 from decimal import Decimal
 from datetime import date as date_type
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -347,6 +347,17 @@ def on_payment_save(sender, instance, created, **kwargs):
         logger.exception("Échec création écriture de paiement %s", getattr(instance, 'pk', None))
 
 
+@receiver([post_save, post_delete], sender=Payment)
+def refresh_daily_metrics_on_payment(sender, instance, **kwargs):
+    """Met à jour le montant encaissé du rollup journalier à la date du paiement"""
+    try:
+        from apps.analytics.rollups import schedule_metrics_refresh
+        org_id = getattr(instance.invoice.created_by, 'organization_id', None)
+        schedule_metrics_refresh(org_id, instance.payment_date)
+    except Exception:
+        logger.exception("Échec mise à jour des métriques pour le paiement %s", getattr(instance, 'pk', None))
+
+
 @receiver(post_save, sender=PurchaseOrder)
 def on_purchase_order_received(sender, instance, **kwargs):
     """Génère l'écriture de charge quand un BC passe au statut 'received'"""
@@ -371,3 +382,47 @@ def on_organization_created(sender, instance, created, **kwargs):
         setup_accounting_for_org(instance)
     except Exception:
         pass
+
+
+# ─── Soldes mensuels des comptes ──────────────────────────────────────────────
+
+from .models import JournalEntry, JournalEntryLine  # noqa: E402
+
+
+@receiver(pre_save, sender=JournalEntry)
+def _cache_entry_period(sender, instance, **kwargs):
+    """Mémorise la date précédente : une écriture re-datée touche deux mois"""
+    instance._previous_date = None
+    if instance.pk:
+        instance._previous_date = JournalEntry.objects.filter(
+            pk=instance.pk
+        ).values_list('date', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=JournalEntry)
+def refresh_balances_on_entry_change(sender, instance, **kwargs):
+    """Validation, annulation, suppression ou re-datation d'une écriture"""
+    try:
+        from .balances import schedule_balance_refresh
+        schedule_balance_refresh(instance.organization_id, instance.date)
+        previous = getattr(instance, '_previous_date', None)
+        if previous and previous != instance.date:
+            schedule_balance_refresh(instance.organization_id, previous)
+    except Exception:
+        logger.exception("Échec mise à jour des soldes pour l'écriture %s", getattr(instance, 'pk', None))
+
+
+@receiver([post_save, post_delete], sender=JournalEntryLine)
+def refresh_balances_on_line_change(sender, instance, **kwargs):
+    """Ligne ajoutée / modifiée / supprimée (écritures validées uniquement)"""
+    try:
+        from .balances import schedule_balance_refresh
+        if JournalEntryLine.entry.is_cached(instance):
+            entry = instance.entry
+        else:
+            # Suppression en cascade : l'écriture peut déjà avoir disparu
+            entry = JournalEntry.objects.filter(pk=instance.entry_id).first()
+        if entry is not None and entry.status == 'posted':
+            schedule_balance_refresh(entry.organization_id, entry.date)
+    except Exception:
+        logger.exception("Échec mise à jour des soldes pour la ligne %s", getattr(instance, 'pk', None))
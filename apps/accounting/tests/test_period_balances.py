@@ -0,0 +1,242 @@
+"""
+Tests des soldes mensuels de comptes (AccountPeriodBalance) :
+- maintenance après commit (validation, annulation, brouillons ignorés)
+- account_totals = agrégat brut des lignes, quelles que soient les bornes
+- bilan / balance / dashboard calculés à partir des instantanés
+"""
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Organization, User
+from apps.accounting.balances import (
+    account_totals,
+    month_start,
+    rebuild_period_balances,
+    refresh_period_balances,
+)
+from apps.accounting.models import (
+    Account,
+    AccountingJournal,
+    AccountPeriodBalance,
+    JournalEntry,
+    JournalEntryLine,
+)
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Compta Soldes Org")
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="balances_user",
+        email="balances@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+@pytest.fixture
+def accounts(organization):
+    specs = {
+        'bank': ('5290', 'asset'),
+        'supplier': ('4090', 'liability'),
+        'capital': ('1090', 'equity'),
+        'sales': ('7090', 'revenue'),
+        'purchases': ('6090', 'expense'),
+    }
+    return {
+        key: Account.objects.update_or_create(
+            organization=organization, code=code,
+            defaults={'name': f"Compte {code}", 'account_type': account_type}
+        )[0]
+        for key, (code, account_type) in specs.items()
+    }
+
+
+def make_entry(organization, day, debit_account, credit_account, amount, status='posted'):
+    journal, _ = AccountingJournal.objects.get_or_create(
+        organization=organization, code="ODT", defaults={'name': "OD test", 'journal_type': 'misc'}
+    )
+    entry = JournalEntry.objects.create(
+        organization=organization,
+        journal=journal,
+        entry_number=JournalEntry.generate_entry_number(organization, journal),
+        date=day,
+        description="Test",
+        status=status,
+    )
+    JournalEntryLine.objects.create(entry=entry, account=debit_account, debit=amount)
+    JournalEntryLine.objects.create(entry=entry, account=credit_account, credit=amount)
+    return entry
+
+
+@pytest.fixture
+def ledger(organization, accounts, django_capture_on_commit_callbacks):
+    """Écritures réparties sur trois mois (+ brouillon et écriture annulée)"""
+    today = timezone.localdate()
+    this_month = month_start(today)
+    last_month = month_start(this_month - timedelta(days=1))
+    three_months_ago = month_start(month_start(last_month - timedelta(days=1)) - timedelta(days=1))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        make_entry(organization, three_months_ago + timedelta(days=4), accounts['bank'], accounts['capital'], Decimal('1000'))
+        make_entry(organization, last_month + timedelta(days=9), accounts['bank'], accounts['sales'], Decimal('500'))
+        make_entry(organization, this_month, accounts['purchases'], accounts['supplier'], Decimal('200'))
+        make_entry(organization, this_month, accounts['bank'], accounts['sales'], Decimal('999'), status='draft')
+        cancelled = make_entry(organization, last_month, accounts['bank'], accounts['sales'], Decimal('77'))
+        cancelled.status = 'cancelled'
+        cancelled.save(update_fields=['status'])
+
+    return {'today': today, 'this_month': this_month, 'last_month': last_month,
+            'three_months_ago': three_months_ago}
+
+
+def raw_totals(organization, end, start=None):
+    """Référence : agrégat direct de toutes les lignes validées"""
+    lines = JournalEntryLine.objects.filter(
+        entry__organization=organization, entry__status='posted', entry__date__lte=end
+    )
+    if start:
+        lines = lines.filter(entry__date__gte=start)
+    return {
+        row['account__code']: (row['d'], row['c'])
+        for row in lines.values('account__code').annotate(d=Sum('debit'), c=Sum('credit'))
+    }
+
+
+def as_dict(rows):
+    return {row['account__code']: (row['total_debit'], row['total_credit']) for row in rows}
+
+
+@pytest.mark.django_db
+class TestPeriodBalanceMaintenance:
+
+    def test_snapshots_follow_posted_entries(self, organization, accounts, ledger):
+        snapshots = {
+            (b.account.code, b.period): (b.debit, b.credit)
+            for b in AccountPeriodBalance.objects.filter(organization=organization)
+        }
+        assert snapshots == {
+            ('5290', ledger['three_months_ago']): (Decimal('1000'), Decimal('0')),
+            ('1090', ledger['three_months_ago']): (Decimal('0'), Decimal('1000')),
+            ('5290', ledger['last_month']): (Decimal('500'), Decimal('0')),
+            ('7090', ledger['last_month']): (Decimal('0'), Decimal('500')),
+            ('6090', ledger['this_month']): (Decimal('200'), Decimal('0')),
+            ('4090', ledger['this_month']): (Decimal('0'), Decimal('200')),
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_and_cancel_update_month(self, organization, accounts, ledger):
+        # Hors transaction de test : chaque save est commité, le recalcul
+        # s'exécute immédiatement
+        month = month_start(ledger['last_month'] - timedelta(days=1))
+        draft = make_entry(organization, month + timedelta(days=2), accounts['bank'], accounts['sales'],
+                           Decimal('999'), status='draft')
+        assert not AccountPeriodBalance.objects.filter(period=month).exists()
+
+        draft.status = 'posted'
+        draft.save(update_fields=['status'])
+        bank = AccountPeriodBalance.objects.get(account=accounts['bank'], period=month)
+        assert bank.debit == Decimal('999')
+
+        draft.status = 'cancelled'
+        draft.save(update_fields=['status'])
+        assert not AccountPeriodBalance.objects.filter(period=month).exists()
+
+    def test_refresh_upserts_existing_snapshots(self, organization, accounts, ledger):
+        # Instantanés périmés (écrits par un recalcul concurrent) : mis à jour
+        # sur place, sans conflit sur (compte, mois)
+        month = ledger['last_month']
+        AccountPeriodBalance.objects.filter(period=month).update(debit=Decimal('1'), credit=Decimal('1'))
+        AccountPeriodBalance.objects.create(
+            organization=organization, account=accounts['purchases'], period=month, debit=Decimal('7'),
+        )
+
+        assert refresh_period_balances(organization.pk, month) == 2
+
+        assert set(AccountPeriodBalance.objects.filter(period=month).values_list(
+            'account__code', 'debit', 'credit'
+        )) == {('5290', Decimal('500'), Decimal('0')), ('7090', Decimal('0'), Decimal('500'))}
+
+    def test_rebuild_matches_incremental(self, organization, ledger):
+        incremental = set(AccountPeriodBalance.objects.values_list('account_id', 'period', 'debit', 'credit'))
+        assert rebuild_period_balances(organization) == len(incremental)
+        assert set(AccountPeriodBalance.objects.values_list('account_id', 'period', 'debit', 'credit')) == incremental
+
+
+@pytest.mark.django_db
+class TestAccountTotals:
+
+    def test_matches_raw_lines_for_any_range(self, organization, ledger):
+        today = ledger['today']
+        ranges = [
+            (None, today),
+            (ledger['three_months_ago'], today),
+            (ledger['three_months_ago'] + timedelta(days=10), today),
+            (ledger['last_month'], ledger['last_month'] + timedelta(days=20)),
+            (ledger['last_month'] + timedelta(days=3), today),
+            (None, ledger['this_month'] - timedelta(days=1)),
+            (ledger['this_month'], today),
+        ]
+        for start, end in ranges:
+            assert as_dict(account_totals(organization, end, start=start)) == raw_totals(organization, end, start), (start, end)
+
+    def test_reads_snapshots_for_full_months(self, organization, ledger):
+        # Les mois complets viennent des instantanés, pas des lignes
+        AccountPeriodBalance.objects.filter(period=ledger['three_months_ago']).update(debit=Decimal('1'))
+        totals = as_dict(account_totals(organization, ledger['today']))
+        assert totals['5290'][0] == Decimal('501')
+
+
+@pytest.mark.django_db
+class TestStatementViews:
+
+    @pytest.fixture
+    def api_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with mock.patch('apps.core.modules.organization_has_feature', return_value=True):
+            yield client
+
+    def test_balance_sheet(self, api_client, ledger):
+        response = api_client.get('/api/v1/accounting/reports/balance-sheet/')
+        assert response.status_code == 200
+        data = response.json()
+        assert Decimal(data['assets']['total']) == Decimal('1500')
+        assert Decimal(data['liabilities']['total']) == Decimal('200')
+        assert Decimal(data['equity']['total']) == Decimal('1000')
+        assert Decimal(data['net_result']) == Decimal('300')
+        assert data['is_balanced'] is True
+
+    def test_trial_balance_and_income_statement(self, api_client, ledger):
+        start = ledger['three_months_ago'].isoformat()
+        trial = api_client.get(f'/api/v1/accounting/reports/trial-balance/?start_date={start}').json()
+        assert trial['is_balanced'] is True
+        assert Decimal(trial['total_debit']) == Decimal('1700')
+        assert [row['code'] for row in trial['rows']] == sorted(row['code'] for row in trial['rows'])
+
+        income = api_client.get(f'/api/v1/accounting/reports/income-statement/?start_date={start}').json()
+        assert Decimal(income['revenue']['total']) == Decimal('500')
+        assert Decimal(income['expenses']['total']) == Decimal('200')
+
+    def test_dashboard_and_sig(self, api_client, ledger):
+        data = api_client.get('/api/v1/accounting/dashboard/').json()
+        assert Decimal(data['current_month']['expenses']) == Decimal('200')
+        chart = {row['month']: row for row in data['monthly_chart']}
+        assert len(chart) == 12
+        assert Decimal(chart[ledger['last_month'].strftime('%Y-%m')]['revenue']) == Decimal('500')
+        assert Decimal(chart[ledger['this_month'].strftime('%Y-%m')]['result']) == Decimal('-200')
+
+        start = ledger['three_months_ago'].isoformat()
+        sig = api_client.get(f'/api/v1/accounting/reports/sig/?start_date={start}').json()
+        soldes = {row['label']: row for row in sig['soldes']}
+        assert Decimal(soldes["Chiffre d'affaires"]['montant']) == Decimal('500')
+        assert Decimal(soldes['Marge brute']['montant']) == Decimal('300')
@@ -5,7 +5,7 @@ from decimal import Decimal
 from datetime import date, timedelta
 
 from django.db import transaction
-from django.db.models import Sum, Q
+from django.db.models import Q
 from django.utils import timezone
 
 from rest_framework.views import APIView
@@ -13,6 +13,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
+from .balances import account_totals, month_start, next_month, type_totals_by_month
 from .models import Account, AccountingJournal, JournalEntry, JournalEntryLine
 from .serializers import (
     AccountSerializer, AccountingJournalSerializer,
@@ -306,19 +307,8 @@ class TrialBalanceView(APIView):
         org = request.user.organization
         start, end = _parse_date_range(request, default_days=365)
 
-        # Agréger les mouvements des écritures validées
-        lines = (
-            JournalEntryLine.objects
-            .filter(
-                entry__organization=org,
-                entry__status='posted',
-                entry__date__gte=start,
-                entry__date__lte=end,
-            )
-            .values('account__id', 'account__code', 'account__name', 'account__account_type')
-            .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
-            .order_by('account__code')
-        )
+        # Agréger les mouvements des écritures validées (soldes mensuels + mois partiels)
+        lines = account_totals(org, end, start=start)
 
         rows = []
         total_d = Decimal('0')
@@ -425,20 +415,13 @@ class IncomeStatementView(APIView):
             return Response({'error': 'Comptabilité avancée réservée au plan Business.', 'feature': 'accounting_statements'}, status=403)
         start, end = _parse_date_range(request)
 
+        totals = account_totals(
+            org, end, start=start,
+            account_filter=Q(account__account_type__in=['revenue', 'expense'])
+        )
+
         def get_totals(account_type):
-            return (
-                JournalEntryLine.objects
-                .filter(
-                    entry__organization=org,
-                    entry__status='posted',
-                    entry__date__gte=start,
-                    entry__date__lte=end,
-                    account__account_type=account_type,
-                )
-                .values('account__code', 'account__name')
-                .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
-                .order_by('account__code')
-            )
+            return [row for row in totals if row['account__account_type'] == account_type]
 
         revenue_lines = []
         total_revenue = Decimal('0')
@@ -495,41 +478,36 @@ class AccountingDashboardView(APIView):
         # 12 derniers mois pour le graphe
         start_year = today.replace(month=1, day=1)
 
-        def period_totals(account_type, start, end):
-            result = JournalEntryLine.objects.filter(
-                entry__organization=org,
-                entry__status='posted',
-                entry__date__gte=start,
-                entry__date__lte=end,
-                account__account_type=account_type,
-            ).aggregate(d=Sum('debit'), c=Sum('credit'))
-            d = result['d'] or Decimal('0')
-            c = result['c'] or Decimal('0')
+        def net(account_type, totals, month):
+            d, c = totals.get((month, account_type), (Decimal('0'), Decimal('0')))
             if account_type == 'revenue':
                 return c - d
             return d - c
 
-        revenue_month = period_totals('revenue', start_month, today)
-        expenses_month = period_totals('expense', start_month, today)
-        revenue_year = period_totals('revenue', start_year, today)
-        expenses_year = period_totals('expense', start_year, today)
+        # 12 derniers mois (mois complets) : soldes mensuels, deux requêtes
+        months = [month_start(today)]
+        for _ in range(11):
+            months.insert(0, month_start(months[0] - timedelta(days=1)))
+        by_month = type_totals_by_month(org, months[0], next_month(today) - timedelta(days=1))
+        # Mois en cours jusqu'à aujourd'hui
+        month_to_date = type_totals_by_month(org, start_month, today)
+
+        revenue_month = net('revenue', month_to_date, start_month)
+        expenses_month = net('expense', month_to_date, start_month)
+        revenue_year = revenue_month + sum(
+            (net('revenue', by_month, m) for m in months if start_year <= m < start_month), Decimal('0')
+        )
+        expenses_year = expenses_month + sum(
+            (net('expense', by_month, m) for m in months if start_year <= m < start_month), Decimal('0')
+        )
 
         # Graphe mensuel (12 derniers mois)
         monthly = []
-        for i in range(11, -1, -1):
-            m = today.month - i
-            y = today.year
-            while m <= 0:
-                m += 12
-                y -= 1
-            from calendar import monthrange
-            last_day = monthrange(y, m)[1]
-            ms = date(y, m, 1)
-            me = date(y, m, last_day)
-            rev = period_totals('revenue', ms, me)
-            exp = period_totals('expense', ms, me)
+        for m in months:
+            rev = net('revenue', by_month, m)
+            exp = net('expense', by_month, m)
             monthly.append({
-                'month': f"{y}-{m:02d}",
+                'month': f"{m.year}-{m.month:02d}",
                 'revenue': str(rev),
                 'expenses': str(exp),
                 'result': str(rev - exp),
@@ -566,6 +544,12 @@ class SIGView(APIView):
             return Response({'error': 'Comptabilité avancée réservée au plan Business.', 'feature': 'accounting_statements'}, status=403)
         start, end = _parse_date_range(request, default_days=365)
 
+        # Une seule lecture (soldes mensuels + mois partiels), ventilée ensuite par préfixe
+        totals = account_totals(
+            org, end, start=start,
+            account_filter=Q(account__account_type__in=['revenue', 'expense'])
+        )
+
         def net_by_codes(prefixes_revenue=None, prefixes_expense=None):
             """Calcule (crédit - débit) pour les produits et (débit - crédit) pour les charges
             sur les comptes dont le code commence par un des préfixes donnés."""
@@ -573,38 +557,18 @@ class SIGView(APIView):
             lines = []
 
             if prefixes_revenue:
-                q = Q()
-                for p in prefixes_revenue:
-                    q |= Q(account__code__startswith=p)
-                qs = (
-                    JournalEntryLine.objects
-                    .filter(q, entry__organization=org, entry__status='posted',
-                            entry__date__gte=start, entry__date__lte=end,
-                            account__account_type='revenue')
-                    .values('account__code', 'account__name')
-                    .annotate(d=Sum('debit'), c=Sum('credit'))
-                    .order_by('account__code')
-                )
-                for r in qs:
-                    amt = (r['c'] or Decimal('0')) - (r['d'] or Decimal('0'))
+                for r in totals:
+                    if r['account__account_type'] != 'revenue' or not r['account__code'].startswith(tuple(prefixes_revenue)):
+                        continue
+                    amt = r['total_credit'] - r['total_debit']
                     lines.append({'code': r['account__code'], 'name': r['account__name'], 'amount': str(amt)})
                     total += amt
 
             if prefixes_expense:
-                q = Q()
-                for p in prefixes_expense:
-                    q |= Q(account__code__startswith=p)
-                qs = (
-                    JournalEntryLine.objects
-                    .filter(q, entry__organization=org, entry__status='posted',
-                            entry__date__gte=start, entry__date__lte=end,
-                            account__account_type='expense')
-                    .values('account__code', 'account__name')
-                    .annotate(d=Sum('debit'), c=Sum('credit'))
-                    .order_by('account__code')
-                )
-                for r in qs:
-                    amt = (r['d'] or Decimal('0')) - (r['c'] or Decimal('0'))
+                for r in totals:
+                    if r['account__account_type'] != 'expense' or not r['account__code'].startswith(tuple(prefixes_expense)):
+                        continue
+                    amt = r['total_debit'] - r['total_credit']
                     lines.append({'code': r['account__code'], 'name': r['account__name'], 'amount': str(-amt)})
                     total -= amt
 
@@ -731,25 +695,20 @@ class BalanceSheetView(APIView):
         except ValueError:
             as_of = today
 
+        # Soldes cumulés depuis l'origine jusqu'à as_of : dernier solde mensuel
+        # complet + delta du mois en cours, tous types de comptes en une lecture
+        totals = account_totals(org, as_of)
+
+        def type_rows(account_type):
+            return [r for r in totals if r['account__account_type'] == account_type]
+
         def get_account_balance(account_type):
             """Retourne le solde cumulé depuis l'origine jusqu'à as_of"""
-            rows = (
-                JournalEntryLine.objects
-                .filter(
-                    entry__organization=org,
-                    entry__status='posted',
-                    entry__date__lte=as_of,
-                    account__account_type=account_type,
-                )
-                .values('account__id', 'account__code', 'account__name')
-                .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
-                .order_by('account__code')
-            )
             lines = []
             total = Decimal('0')
-            for r in rows:
-                d = r['total_debit'] or Decimal('0')
-                c = r['total_credit'] or Decimal('0')
+            for r in type_rows(account_type):
+                d = r['total_debit']
+                c = r['total_credit']
                 # Actif : solde débiteur (débit - crédit)
                 # Passif/Capitaux : solde créditeur (crédit - débit)
                 if account_type == 'asset':
@@ -770,20 +729,8 @@ class BalanceSheetView(APIView):
         equity_lines, total_equity = get_account_balance('equity')
 
         # Résultat net de l'exercice (produits - charges) intégré dans les capitaux
-        revenue_total = (
-            JournalEntryLine.objects
-            .filter(entry__organization=org, entry__status='posted',
-                    entry__date__lte=as_of, account__account_type='revenue')
-            .aggregate(d=Sum('debit'), c=Sum('credit'))
-        )
-        expense_total = (
-            JournalEntryLine.objects
-            .filter(entry__organization=org, entry__status='posted',
-                    entry__date__lte=as_of, account__account_type='expense')
-            .aggregate(d=Sum('debit'), c=Sum('credit'))
-        )
-        rev = (revenue_total['c'] or Decimal('0')) - (revenue_total['d'] or Decimal('0'))
-        exp = (expense_total['d'] or Decimal('0')) - (expense_total['c'] or Decimal('0'))
+        rev = sum((r['total_credit'] - r['total_debit'] for r in type_rows('revenue')), Decimal('0'))
+        exp = sum((r['total_debit'] - r['total_credit'] for r in type_rows('expense')), Decimal('0'))
         net_result = rev - exp
 
         total_passif = total_liabilities + total_equity + net_result
@@ -2,11 +2,13 @@
 Signals pour le module accounts
 Les signaux de création UserPreferences et UserPermissions sont définis dans models.py
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 import logging
 
+from .models import Organization, UserPermissions
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
@@ -21,4 +23,30 @@ def create_user_profile(sender, instance, created, **kwargs):
         logger.info(f"  - Rôle: {instance.role}")
         
         # Les UserPreferences et UserPermissions sont créées automatiquement
-        # par le signal dans models.py (create_user_preferences_and_permissions)
\ No newline at end of file
+        # par le signal dans models.py (create_user_preferences_and_permissions)
+
+
+# ─── Cache des modules accessibles (apps.core.modules) ───────────────────────
+
+def _invalidate_module_access(user=None):
+    from apps.core.modules import invalidate_module_access_cache
+    invalidate_module_access_cache(user)
+
+
+@receiver(post_save, sender=User)
+def invalidate_module_access_on_user_save(sender, instance, **kwargs):
+    """Rôle / organisation modifiés : les modules accessibles sont à recalculer"""
+    _invalidate_module_access(instance)
+
+
+@receiver([post_save, post_delete], sender=UserPermissions)
+def invalidate_module_access_on_permissions_change(sender, instance, **kwargs):
+    """Restrictions individuelles (module_access) modifiées"""
+    _invalidate_module_access(getattr(instance, 'user', None))
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_module_access_on_organization_save(sender, instance, update_fields=None, **kwargs):
+    """Modules activés de l'organisation modifiés"""
+    if update_fields is None or 'enabled_modules' in update_fields:
+        _invalidate_module_access()
@@ -65,4 +65,5 @@ urlpatterns = [
     path('usage/budget-status/', views.AIUsageViewSet.as_view({'get': 'budget_status'}), name='ai-usage-budget'),
     path('usage/my-usage/', views.AIUsageViewSet.as_view({'get': 'my_usage'}), name='ai-usage-my-usage'),
     path('usage/summary/', views.AIUsageViewSet.as_view({'get': 'summary'}), name='ai-usage-summary'),
+    path('usage/tool-cache/', views.AIUsageViewSet.as_view({'get': 'tool_cache'}), name='ai-usage-tool-cache'),
 ]
@@ -5,4 +5,7 @@ from django.utils.translation import gettext_lazy as _
 class AiAssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.ai_assistant'
-    verbose_name = _('Assistant IA')
\ No newline at end of file
+    verbose_name = _('Assistant IA')
+
+    def ready(self):
+        import apps.ai_assistant.signals  # noqa
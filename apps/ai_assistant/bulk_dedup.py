@@ -0,0 +1,329 @@
+"""
+Détection de doublons en masse (imports Excel/CSV, documents scannés par l'IA).
+
+`EnhancedEntityMatcher` compare un enregistrement entrant à la base ; appelé
+ligne par ligne sur un import de 5 000 fournisseurs, cela fait 5 000 passes
+de scoring en Python. Ici tout le lot est traité d'un coup :
+
+- correspondances exactes (email, téléphone, référence, code-barres, nom
+  normalisé) par dictionnaires ;
+- similarité des noms en matrices N×M avec `rapidfuzz.process.cdist`
+  (C++, multi-thread), combinées avec les poids `ALGORITHM_WEIGHTS` du
+  matcher (le token set ratio, plus coûteux, seulement pour les paires qui
+  peuvent encore atteindre le seuil) ;
+- regroupement des lignes du lot qui se ressemblent entre elles (union-find).
+
+Les matrices sont calculées par blocs de lignes (`MAX_MATRIX_CELLS`) pour
+borner la mémoire quel que soit le nombre d'entités existantes.
+
+Usage:
+    result = BulkDeduplicator('supplier', organization).run([
+        {'name': "ACME SARL", 'email': "contact@acme.cm"},
+        ...
+    ])
+    result.existing[3]      # -> DuplicateMatch (entité existante)
+    result.duplicate_of(7)  # -> 2 (ligne 7 doublon de la ligne 2 du lot)
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+from rapidfuzz.distance import JaroWinkler
+
+from .candidate_index import _entity_model
+from .entity_matcher import EnhancedEntityMatcher, entity_matcher
+
+logger = logging.getLogger(__name__)
+
+try:
+    import jellyfish
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    jellyfish = None
+
+# Seuils par défaut : sans clé phonétique, le score pondéré d'un nom plafonne
+# à 0.85 (poids 'phonetic' exclu), d'où des seuils plus bas que pour un
+# matching à 100 %
+DEFAULT_THRESHOLDS = {
+    'supplier': 0.80,
+    'client': 0.80,
+    'product': 0.85,
+}
+
+# Taille maximale d'un bloc de matrice (float32) : ~20 Mo par algorithme
+MAX_MATRIX_CELLS = 5_000_000
+
+# Champs comparés à l'identique, par type d'entité
+EXACT_FIELDS = {
+    'supplier': ('email', 'phone'),
+    'client': ('email', 'phone'),
+    'product': ('reference', 'barcode'),
+}
+
+# (nom du poids, scorer rapidfuzz, échelle, pré-traitement) : scorers
+# vectorisés efficacement par cdist
+_SCORERS = (
+    ('levenshtein', fuzz.ratio, 100.0, None),
+    ('jaro_winkler', JaroWinkler.normalized_similarity, 1.0, None),
+    ('token_sort', fuzz.token_sort_ratio, 100.0, utils.default_process),
+)
+
+# token_set_ratio est ~10x plus lent : avec un seuil, il n'est calculé que
+# pour les paires qui peuvent encore l'atteindre
+_TOKEN_SET = ('token_set', fuzz.token_set_ratio, 100.0, utils.default_process)
+
+
+@dataclass
+class DuplicateMatch:
+    """Entité existante correspondant à une ligne du lot"""
+    row: int
+    entity_id: Any
+    name: str
+    score: float
+    matched_on: str
+
+
+@dataclass
+class DedupResult:
+    existing: Dict[int, DuplicateMatch] = field(default_factory=dict)
+    clusters: List[List[int]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._first_of = {}
+
+    def _index_clusters(self):
+        self._first_of = {row: cluster[0] for cluster in self.clusters for row in cluster[1:]}
+
+    def duplicate_of(self, row: int) -> Optional[int]:
+        """Première ligne du lot dont `row` est le doublon (None sinon)"""
+        return self._first_of.get(row)
+
+
+def _phonetic_keys(names: Sequence[str]):
+    if jellyfish is None:
+        return None, None
+    metaphones, soundexes = [], []
+    for name in names:
+        try:
+            metaphones.append(jellyfish.metaphone(name) if name else '')
+            soundexes.append(jellyfish.soundex(name) if name else '')
+        except Exception:
+            metaphones.append('')
+            soundexes.append('')
+    return np.array(metaphones, dtype=object), np.array(soundexes, dtype=object)
+
+
+def similarity_matrix(queries: Sequence[str], choices: Sequence[str],
+                      use_phonetic: bool = False, min_score: float = None,
+                      workers: int = -1) -> np.ndarray:
+    """
+    Score pondéré (0-1) de chaque requête contre chaque choix, avec les poids
+    de `EnhancedEntityMatcher.ALGORITHM_WEIGHTS`. Les textes doivent être
+    déjà normalisés.
+
+    Avec `min_score`, le token set ratio n'est calculé que pour les paires
+    dont le score peut encore atteindre ce seuil : les scores inférieurs au
+    seuil sont alors des minorants, les autres sont exacts.
+    """
+    weights = EnhancedEntityMatcher.ALGORITHM_WEIGHTS
+    scores = np.zeros((len(queries), len(choices)), dtype=np.float32)
+    if not len(queries) or not len(choices):
+        return scores
+
+    for name, scorer, scale, processor in _SCORERS:
+        matrix = process.cdist(
+            queries, choices, scorer=scorer, processor=processor,
+            dtype=np.float32, workers=workers,
+        )
+        scores += matrix * np.float32(weights[name] / scale)
+
+    if use_phonetic:
+        query_meta, query_soundex = _phonetic_keys(queries)
+        choice_meta, choice_soundex = _phonetic_keys(choices)
+        if query_meta is not None:
+            same_meta = (query_meta[:, None] == choice_meta[None, :]) & (query_meta[:, None] != '')
+            same_soundex = (query_soundex[:, None] == choice_soundex[None, :]) & (query_soundex[:, None] != '')
+            phonetic = np.where(same_meta, 1.0, np.where(same_soundex, 0.8, 0.0)).astype(np.float32)
+            scores += phonetic * np.float32(weights['phonetic'])
+
+    name, scorer, scale, processor = _TOKEN_SET
+    weight = np.float32(weights[name] / scale)
+    if min_score is None:
+        scores += process.cdist(
+            queries, choices, scorer=scorer, processor=processor,
+            dtype=np.float32, workers=workers,
+        ) * weight
+    else:
+        reachable = scores + np.float32(weights[name]) >= np.float32(min_score) - 1e-6
+        for i, j in zip(*np.nonzero(reachable)):
+            scores[i, j] += scorer(queries[i], choices[j], processor=processor) * weight
+
+    # Textes vides : aucune similarité
+    empty_queries = np.array([not q for q in queries])
+    empty_choices = np.array([not c for c in choices])
+    scores[empty_queries, :] = 0
+    scores[:, empty_choices] = 0
+    return scores
+
+
+class BulkDeduplicator:
+    """
+    Détecte les doublons d'un lot d'enregistrements entrants, entre eux et
+    contre les entités existantes de l'organisation.
+
+    Args:
+        entity_type: 'supplier', 'client' ou 'product'
+        organization: organisation (None : toutes, à éviter hors admin)
+        threshold: score minimal d'une correspondance floue sur le nom
+    """
+
+    def __init__(self, entity_type: str, organization=None, threshold: float = None):
+        if entity_type not in EXACT_FIELDS:
+            raise ValueError(f"Type d'entité inconnu : {entity_type}")
+        self.entity_type = entity_type
+        self.organization = organization
+        self.threshold = threshold if threshold is not None else DEFAULT_THRESHOLDS[entity_type]
+        self.use_phonetic = entity_type == 'client'
+
+    # ── Normalisation ───────────────────────────────────────────────────────
+
+    def normalize_name(self, name) -> str:
+        if not name:
+            return ''
+        if self.entity_type == 'product':
+            return entity_matcher.normalize_text(str(name))
+        return entity_matcher.normalize_company_name(str(name))
+
+    def normalize_exact(self, field_name: str, value) -> str:
+        if not value:
+            return ''
+        if field_name == 'phone':
+            return entity_matcher.normalize_phone(str(value))
+        return entity_matcher.normalize_text(str(value))
+
+    def is_exact_match(self, record: Dict, other: Dict) -> bool:
+        """Même email / téléphone / référence / code-barres, ou même nom normalisé"""
+        for field_name in EXACT_FIELDS[self.entity_type]:
+            value = self.normalize_exact(field_name, record.get(field_name))
+            if value and value == self.normalize_exact(field_name, other.get(field_name)):
+                return True
+        name = self.normalize_name(record.get('name'))
+        return bool(name) and name == self.normalize_name(other.get('name'))
+
+    # ── Données existantes ──────────────────────────────────────────────────
+
+    def load_existing(self) -> List[Dict]:
+        fields = ('name',) + EXACT_FIELDS[self.entity_type]
+        queryset = _entity_model(self.entity_type).objects.all()
+        if self.organization is not None:
+            queryset = queryset.filter(organization=self.organization)
+        return [
+            {'id': row[0], **dict(zip(fields, row[1:]))}
+            for row in queryset.values_list('pk', *fields).iterator(chunk_size=5000)
+        ]
+
+    # ── Détection ───────────────────────────────────────────────────────────
+
+    def _block_rows(self, columns: int) -> int:
+        return max(1, MAX_MATRIX_CELLS // max(1, columns))
+
+    def run(self, records: Sequence[Optional[Dict]], existing: Optional[List[Dict]] = None) -> DedupResult:
+        """
+        Args:
+            records: enregistrements entrants (dict name/email/phone/
+                reference/barcode), None pour une ligne à ignorer
+            existing: entités existantes (par défaut `load_existing()`)
+        """
+        result = DedupResult()
+        if existing is None:
+            existing = self.load_existing()
+
+        rows = [i for i, record in enumerate(records) if record]
+        names = {i: self.normalize_name(records[i].get('name')) for i in rows}
+        exact_fields = EXACT_FIELDS[self.entity_type]
+
+        # 1. Correspondances exactes contre l'existant
+        existing_names = [self.normalize_name(entity.get('name')) for entity in existing]
+        lookups = {field_name: {} for field_name in exact_fields + ('name',)}
+        for position, entity in enumerate(existing):
+            for field_name in exact_fields:
+                key = self.normalize_exact(field_name, entity.get(field_name))
+                if key:
+                    lookups[field_name].setdefault(key, position)
+            if existing_names[position]:
+                lookups['name'].setdefault(existing_names[position], position)
+
+        for i in rows:
+            for field_name in exact_fields + ('name',):
+                value = names[i] if field_name == 'name' else self.normalize_exact(field_name, records[i].get(field_name))
+                position = lookups[field_name].get(value) if value else None
+                if position is not None:
+                    result.existing[i] = self._match(i, existing[position], 1.0, f'{field_name}_exact')
+                    break
+
+        # 2. Similarité des noms contre l'existant (lignes sans correspondance exacte)
+        pending = [i for i in rows if i not in result.existing and names[i]]
+        if pending and existing:
+            step = self._block_rows(len(existing_names))
+            for start in range(0, len(pending), step):
+                block = pending[start:start + step]
+                scores = similarity_matrix([names[i] for i in block], existing_names,
+                                           self.use_phonetic, min_score=self.threshold)
+                best = scores.argmax(axis=1)
+                for offset, i in enumerate(block):
+                    score = float(scores[offset, best[offset]])
+                    if score >= self.threshold:
+                        result.existing[i] = self._match(i, existing[best[offset]], score, 'name_fuzzy')
+
+        # 3. Doublons à l'intérieur du lot
+        result.clusters = self._clusters(records, rows, names)
+        result._index_clusters()
+        return result
+
+    def _match(self, row, entity, score, matched_on) -> DuplicateMatch:
+        return DuplicateMatch(
+            row=row,
+            entity_id=entity['id'],
+            name=entity.get('name') or '',
+            score=score,
+            matched_on=matched_on,
+        )
+
+    def _clusters(self, records, rows, names) -> List[List[int]]:
+        parent = {i: i for i in rows}
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a, b):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        for field_name in EXACT_FIELDS[self.entity_type] + ('name',):
+            first_row = {}
+            for i in rows:
+                value = names[i] if field_name == 'name' else self.normalize_exact(field_name, records[i].get(field_name))
+                if value:
+                    union(first_row.setdefault(value, i), i)
+
+        named = [i for i in rows if names[i]]
+        choices = [names[i] for i in named]
+        step = self._block_rows(len(choices))
+        for start in range(0, len(named), step):
+            block = named[start:start + step]
+            scores = similarity_matrix([names[i] for i in block], choices,
+                                       self.use_phonetic, min_score=self.threshold)
+            for offset, column in zip(*np.nonzero(scores >= self.threshold)):
+                a, b = block[offset], named[column]
+                if a < b:
+                    union(a, b)
+
+        groups = {}
+        for i in rows:
+            groups.setdefault(find(i), []).append(i)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=lambda g: g[0])
@@ -0,0 +1,365 @@
+"""
+Index de candidats pour le matching flou d'entités (clients, fournisseurs,
+produits), par organisation.
+
+`EnhancedEntityMatcher` calcule plusieurs scores (Levenshtein, Jaro-Winkler,
+tokens, phonétique) pour chaque entité comparée : sur une organisation de
+plusieurs dizaines de milliers de lignes, scorer tout le référentiel à chaque
+vérification de doublon ou recherche IA coûte plusieurs secondes.
+
+L'index conserve en mémoire, pour chaque entité, son nom normalisé et des
+listes inversées :
+
+- trigrammes du nom (fautes de frappe, noms partiels) ;
+- tokens et clés phonétiques des tokens (ordre des mots, homophones) ;
+- valeurs exactes (email, téléphone, référence, code-barres) ;
+- tokens de la description (produits, recherche par mots-clés).
+
+`shortlist()` ne retourne que les entités qui partagent suffisamment de
+ces clés avec la requête ; seules celles-ci sont scorées complètement.
+
+Cycle de vie :
+- construit à la première recherche de l'organisation (une requête
+  `values()`), conservé dans un cache LRU du processus (`MAX_INDEXES`) ;
+- maintenu par les signaux post_save / post_delete (après commit) ;
+- un numéro de version partagé dans le cache Django invalide les index des
+  autres processus (workers) à chaque modification.
+"""
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, Optional, Set
+import logging
+import re
+import threading
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import jellyfish
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    jellyfish = None
+
+# Nombre d'index (organisation, type d'entité) gardés en mémoire
+MAX_INDEXES = 64
+
+# En dessous de cette taille, on score toutes les entités (pas de blocage)
+FULL_SCAN_LIMIT = 300
+
+# Nombre maximum d'entités retenues par similarité de trigrammes
+MAX_CANDIDATES = 200
+
+# Part minimale des trigrammes de la requête présents dans le nom
+MIN_TRIGRAM_CONTAINMENT = 0.3
+
+# Un token présent dans plus d'entités que ce seuil n'est pas discriminant
+# ("sarl", "services"...) : il ne suffit pas à retenir un candidat
+MAX_TOKEN_POSTINGS = 500
+
+# Champs lus pour chaque type d'entité
+ENTITY_FIELDS = {
+    'client': ('name', 'email', 'phone'),
+    'supplier': ('name', 'email', 'phone'),
+    'product': ('name', 'reference', 'barcode', 'description'),
+}
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+
+def _entity_model(entity_type):
+    if entity_type == 'client':
+        from apps.accounts.models import Client
+        return Client
+    if entity_type == 'supplier':
+        from apps.suppliers.models import Supplier
+        return Supplier
+    if entity_type == 'product':
+        from apps.invoicing.models import Product
+        return Product
+    raise ValueError(f"Type d'entité inconnu : {entity_type}")
+
+
+def _matcher():
+    from .entity_matcher import entity_matcher
+    return entity_matcher
+
+
+def _clean(text: str) -> str:
+    """Texte normalisé (minuscules, sans accents) sans ponctuation"""
+    return ' '.join(_NON_WORD.sub(' ', _matcher().normalize_text(text or '')).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrammes d'un texte normalisé, avec bornes de mots"""
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def phonetic_key(token: str) -> str:
+    if jellyfish is None or not token:
+        return ''
+    try:
+        return jellyfish.metaphone(token)
+    except Exception:
+        return ''
+
+
+class CandidateIndex:
+    """Index inversé des entités d'un type pour une organisation."""
+
+    def __init__(self, entity_type: str, version: int = 0):
+        self.entity_type = entity_type
+        self.version = version
+        self.entries: Dict[str, Dict] = {}
+        self.grams = defaultdict(set)
+        self.tokens = defaultdict(set)
+        self.phonetics = defaultdict(set)
+        self.exact = defaultdict(lambda: defaultdict(set))
+        self.keywords = defaultdict(set)
+        self._vocabulary = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ── Construction / maintenance ──────────────────────────────────────────
+
+    def _keys(self, row: Dict) -> Dict:
+        matcher = _matcher()
+        name = _clean(row.get('name'))
+        company = _clean(matcher.normalize_company_name(row.get('name') or ''))
+        words = set(name.split()) | set(company.split())
+        keys = {
+            'name': name,
+            'grams': trigrams(name) | trigrams(company),
+            'tokens': {w for w in words if len(w) >= 2},
+            'phonetics': {p for p in (phonetic_key(w) for w in words if len(w) >= 3) if p},
+            'exact': {},
+            'keywords': set(),
+        }
+        for field in ('email', 'reference', 'barcode'):
+            value = matcher.normalize_text(row.get(field) or '')
+            if value:
+                keys['exact'][field] = value
+        phone = matcher.normalize_phone(row.get('phone') or '')
+        if phone:
+            keys['exact']['phone'] = phone
+        if row.get('description'):
+            keys['keywords'] = set(_clean(row['description']).split())
+        return keys
+
+    def add(self, pk, row: Dict):
+        pk = str(pk)
+        self.remove(pk)
+        keys = self._keys(row)
+        self.entries[pk] = keys
+        for gram in keys['grams']:
+            self.grams[gram].add(pk)
+        for token in keys['tokens'] | keys['keywords']:
+            self.tokens[token].add(pk)
+        for key in keys['phonetics']:
+            self.phonetics[key].add(pk)
+        for field, value in keys['exact'].items():
+            self.exact[field][value].add(pk)
+        self._vocabulary = None
+
+    def remove(self, pk):
+        pk = str(pk)
+        keys = self.entries.pop(pk, None)
+        if keys is None:
+            return
+        for postings, values in (
+            (self.grams, keys['grams']),
+            (self.tokens, keys['tokens'] | keys['keywords']),
+            (self.phonetics, keys['phonetics']),
+        ):
+            for value in values:
+                postings[value].discard(pk)
+                if not postings[value]:
+                    del postings[value]
+        for field, value in keys['exact'].items():
+            self.exact[field][value].discard(pk)
+        self._vocabulary = None
+
+    @classmethod
+    def build(cls, entity_type: str, organization_id, version: int = 0) -> 'CandidateIndex':
+        index = cls(entity_type, version)
+        fields = ENTITY_FIELDS[entity_type]
+        rows = (
+            _entity_model(entity_type).objects
+            .filter(organization_id=organization_id)
+            .values('pk', *fields)
+        )
+        for row in rows.iterator(chunk_size=2000):
+            index.add(row['pk'], row)
+        return index
+
+    # ── Recherche ───────────────────────────────────────────────────────────
+
+    def _prefix_tokens(self, word: str) -> Iterable[str]:
+        """Tokens du vocabulaire commençant par `word` ("ordi" -> "ordinateur")"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.tokens)
+        position = bisect_left(self._vocabulary, word)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(word):
+            yield self._vocabulary[position]
+            position += 1
+
+    def _selective(self, postings: Set[str]) -> Set[str]:
+        return postings if len(postings) <= MAX_TOKEN_POSTINGS else set()
+
+    def shortlist(self, texts: Iterable[str] = (), keywords: Iterable[str] = (),
+                  exact: Optional[Dict[str, str]] = None) -> Optional[Set[str]]:
+        """
+        Identifiants (str) des entités à scorer pour une requête.
+
+        Args:
+            texts: noms recherchés (nom, entreprise...)
+            keywords: textes dont chaque mot peut préfixer un token du nom
+                ou de la description (recherche de produits par mots-clés)
+            exact: valeurs comparées à l'identique (email, phone, reference,
+                barcode)
+
+        Returns:
+            None si l'index est assez petit pour tout scorer, sinon
+            l'ensemble des candidats.
+        """
+        if len(self.entries) <= FULL_SCAN_LIMIT:
+            return None
+
+        matcher = _matcher()
+        candidates = set()
+
+        for field, value in (exact or {}).items():
+            if not value:
+                continue
+            value = matcher.normalize_phone(value) if field == 'phone' else matcher.normalize_text(value)
+            candidates |= self.exact[field].get(value, set())
+
+        for text in texts:
+            clean = _clean(text)
+            if not clean:
+                continue
+            company = _clean(matcher.normalize_company_name(text))
+            words = set(clean.split()) | set(company.split())
+
+            for word in words:
+                if len(word) >= 2:
+                    candidates |= self._selective(self.tokens.get(word, set()))
+                if len(word) >= 3:
+                    candidates |= self._selective(self.phonetics.get(phonetic_key(word), set()))
+
+            query_grams = trigrams(clean) | trigrams(company)
+            counts = Counter()
+            for gram in query_grams:
+                counts.update(self.grams.get(gram, ()))
+            minimum = MIN_TRIGRAM_CONTAINMENT * len(query_grams)
+            ranked = sorted(
+                (
+                    (2 * shared / (len(query_grams) + len(self.entries[pk]['grams'])), pk)
+                    for pk, shared in counts.items() if shared >= minimum
+                ),
+                reverse=True,
+            )
+            candidates.update(pk for _dice, pk in ranked[:MAX_CANDIDATES])
+
+        for text in keywords:
+            for word in _clean(text).split():
+                if len(word) < 3:
+                    continue
+                matched = set()
+                for token in self._prefix_tokens(word):
+                    matched |= self.tokens[token]
+                    if len(matched) > MAX_TOKEN_POSTINGS:
+                        break
+                candidates |= self._selective(matched)
+
+        return candidates
+
+
+# ─── Cache des index ──────────────────────────────────────────────────────────
+
+_indexes: 'OrderedDict[tuple, CandidateIndex]' = OrderedDict()
+_lock = threading.RLock()
+
+
+def _version_key(entity_type, organization_id):
+    return f"entity_index_version:{entity_type}:{organization_id}"
+
+
+def _shared_version(entity_type, organization_id) -> int:
+    try:
+        return cache.get(_version_key(entity_type, organization_id), 0)
+    except Exception:
+        return 0
+
+
+def _bump_version(entity_type, organization_id):
+    """Incrémente la version partagée ; retourne (ancienne, nouvelle)"""
+    key = _version_key(entity_type, organization_id)
+    try:
+        old = cache.get(key, 0)
+        try:
+            return old, cache.incr(key)
+        except ValueError:
+            cache.set(key, old + 1, None)
+            return old, old + 1
+    except Exception:
+        logger.warning("Version de l'index %s indisponible", key)
+        return None, None
+
+
+def get_index(entity_type: str, organization_id) -> CandidateIndex:
+    """Index de l'organisation, construit ou reconstruit si nécessaire."""
+    key = (entity_type, str(organization_id))
+    version = _shared_version(entity_type, organization_id)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and index.version == version:
+            _indexes.move_to_end(key)
+            return index
+
+    index = CandidateIndex.build(entity_type, organization_id, version)
+    with _lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def update_entity(entity_type: str, organization_id, pk, row: Optional[Dict] = None):
+    """
+    Applique une création / modification (`row`) ou une suppression
+    (`row` None) à l'index local, et invalide ceux des autres processus.
+    """
+    if not organization_id:
+        return
+    key = (entity_type, str(organization_id))
+    old, new = _bump_version(entity_type, organization_id)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            return
+        if old is None or index.version != old or new != old + 1:
+            # Index déjà périmé ou modification concurrente : reconstruction
+            del _indexes[key]
+            return
+        if row is None:
+            index.remove(pk)
+        else:
+            index.add(pk, row)
+        index.version = new
+
+
+def invalidate_entity_index(entity_type: str, organization_id=None):
+    """Oublie les index (mises à jour en masse hors signaux)."""
+    if organization_id:
+        _bump_version(entity_type, organization_id)
+    with _lock:
+        for key in [k for k in _indexes if k[0] == entity_type
+                    and (organization_id is None or k[1] == str(organization_id))]:
+            del _indexes[key]
@@ -109,24 +109,22 @@ def generate_revenue_evolution_chart(organization, period: str = 'month', group_
     Returns:
         Dict formaté pour Recharts
     """
-    from apps.invoicing.models import Invoice
+    from apps.analytics.rollups import ensure_daily_metrics, metrics_queryset
 
     start_date, end_date = get_date_range(period)
 
-    invoices_qs = Invoice.objects.filter(
-        created_by__organization=organization
-    )
-
-    if start_date:
-        invoices_qs = invoices_qs.filter(created_at__gte=start_date)
+    # Lecture depuis le rollup journalier (une ligne par jour) plutôt que
+    # depuis toutes les factures de la période
+    ensure_daily_metrics(organization)
+    metrics_qs = metrics_queryset(organization, start=start_date)
 
     # Grouper par période
-    invoices_grouped = group_by_time(invoices_qs, 'created_at', group_by)
+    metrics_grouped = group_by_time(metrics_qs, 'date', group_by)
 
     # Agréger
-    stats = invoices_grouped.values('period').annotate(
-        revenue=Sum('total_amount'),
-        count=Count('id')
+    stats = metrics_grouped.values('period').annotate(
+        revenue=Sum('invoiced_amount'),
+        count=Sum('invoice_count')
     ).order_by('period')
 
     # Formater pour Recharts
@@ -5,6 +5,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from .models import Conversation, Message
 from .services import MistralService
+from .services.conversation_memory import load_history, schedule_summary_update
 from .sanitizer import sanitize_user_input, detect_injection_attempt
 
 User = get_user_model()
@@ -230,12 +231,16 @@ class AIChatConsumer(AsyncWebsocketConsumer):
                     metadata['pending_confirmation'] = result['result']['pending_confirmation']
                     break
 
-        return Message.objects.create(
+        message = Message.objects.create(
             conversation=conversation,
             role='assistant',
             content=ai_response['message'],
             metadata=metadata
         )
+
+        # Conversation longue : les messages anciens rejoignent le résumé persisté
+        schedule_summary_update(conversation)
+        return message
     
     @database_sync_to_async
     def process_with_ai(self, user_message):
@@ -262,10 +267,7 @@ class AIChatConsumer(AsyncWebsocketConsumer):
             'user_id': user_id,
             'organization': organization,
             'is_superuser': is_superuser,
-            'conversation_history': [
-                {'role': msg.role, 'content': msg.content}
-                for msg in conversation.messages.order_by('created_at')[-10:]
-            ],
+            'conversation_history': load_history(conversation),
             'pending_confirmation': pending_confirmation
         }
 
@@ -281,10 +283,7 @@ class AIChatConsumer(AsyncWebsocketConsumer):
         user_context = {
             'user_id': self.user.id,
             'organization': self.user.organization if hasattr(self.user, 'organization') else None,
-            'conversation_history': [
-                {'role': msg.role, 'content': msg.content}
-                for msg in conversation.messages.order_by('created_at')[-10:]
-            ],
+            'conversation_history': load_history(conversation),
         }
 
         full_content = ""
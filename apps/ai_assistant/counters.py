@@ -0,0 +1,110 @@
+"""
+Compteurs atomiques et token bucket partagés (cache Django).
+
+Le throttling par organisation, les budgets de tokens et le circuit breaker
+faisaient tous un `cache.get` + `cache.set` (listes d'horodatages ou totaux
+relus puis réécrits) : sous charge, avec plusieurs workers, des incréments
+étaient perdus et le coût croissait avec la taille des listes.
+
+Deux primitives, O(1) et atomiques :
+  - `increment(key, amount, timeout)` : compteur à fenêtre fixe, basé sur
+    `cache.add` + `cache.incr` (INCRBY sous Redis) ;
+  - `TokenBucket` : seau de jetons ; sous Redis, un script Lua lit, remplit
+    et consomme le seau en une seule opération (horloge du serveur Redis) ;
+    avec les autres backends (locmem en dev/tests), repli protégé par un
+    verrou du processus.
+"""
+import threading
+import time
+from typing import Optional, Tuple
+
+from django.core.cache import cache
+
+_local_lock = threading.Lock()
+
+# KEYS[1] = seau ; ARGV = capacité, jetons/seconde, coût, TTL (s)
+# Retourne {autorisé (0/1), jetons restants (chaîne : Lua tronque les nombres)}
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {allowed, tostring(tokens)}
+"""
+
+
+def increment(key: str, amount: int = 1, timeout: Optional[int] = None) -> int:
+    """Incrémente atomiquement `key` et retourne la nouvelle valeur.
+
+    Le TTL est fixé à la création du compteur (fenêtre fixe) : les
+    incréments suivants ne le prolongent pas.
+    """
+    for _ in range(3):
+        if cache.add(key, amount, timeout):
+            return amount
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            # Clé expirée entre add et incr : nouvel essai
+            continue
+    raise RuntimeError(f"Compteur {key} indisponible")
+
+
+def redis_client():
+    """Client redis-py du cache par défaut, ou None si le backend n'est pas Redis."""
+    from django.core.cache import caches
+    from django.core.cache.backends.redis import RedisCache
+
+    backend = caches['default']
+    if not isinstance(backend, RedisCache):
+        return None
+    return backend._cache.get_client(write=True)
+
+
+class TokenBucket:
+    """Seau de `capacity` jetons, rempli entièrement en `period` secondes."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    def consume(self, key: str, cost: float = 1) -> Tuple[bool, float]:
+        """Consomme `cost` jetons ; retourne (autorisé, attente avant disponibilité en s)."""
+        ttl = int(self.period) + 1
+        client = redis_client()
+        if client is not None:
+            allowed, tokens = client.eval(
+                _TOKEN_BUCKET_LUA, 1, cache.make_and_validate_key(key),
+                self.capacity, self.rate, cost, ttl,
+            )
+            tokens = float(tokens)
+        else:
+            allowed, tokens = self._consume_local(key, cost, ttl)
+        wait = 0.0 if allowed else (cost - tokens) / self.rate
+        return bool(allowed), wait
+
+    def _consume_local(self, key: str, cost: float, ttl: int) -> Tuple[bool, float]:
+        # Atomique pour le cache locmem (propre au processus) ; les backends
+        # partagés entre machines doivent être Redis.
+        with _local_lock:
+            now = time.time()
+            tokens, ts = cache.get(key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - ts) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, now), ttl)
+        return allowed, tokens
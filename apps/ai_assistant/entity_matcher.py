@@ -3,9 +3,12 @@ Système ultra-robuste de recherche d'entités similaires avec matching multi-al
 Tolère les fautes d'orthographe, variations de noms, ordre des mots, etc.
 """
 from typing import List, Tuple, Dict, Any
+import logging
 import re
 import unicodedata
 
+logger = logging.getLogger(__name__)
+
 # Import des bibliothèques de fuzzy matching
 try:
     from fuzzywuzzy import fuzz
@@ -117,6 +120,30 @@ class EnhancedEntityMatcher:
 
         return digits
 
+    def _candidates(self, entity_type: str, organization, exclude_id=None,
+                    texts=(), keywords=(), exact=None):
+        """
+        Entités à scorer. Avec une organisation, seules celles retenues par
+        l'index de candidats (trigrammes, tokens, clés phonétiques, valeurs
+        exactes) sont chargées ; sans organisation, tout le référentiel.
+        """
+        from .candidate_index import _entity_model, get_index
+
+        candidates = _entity_model(entity_type).objects.all()
+        if organization:
+            candidates = candidates.filter(organization=organization)
+            try:
+                index = get_index(entity_type, getattr(organization, 'pk', organization))
+                shortlist = index.shortlist(texts=texts, keywords=keywords, exact=exact)
+            except Exception:
+                logger.exception("Index de candidats indisponible (%s)", entity_type)
+                shortlist = None
+            if shortlist is not None:
+                candidates = candidates.filter(pk__in=shortlist)
+        if exclude_id:
+            candidates = candidates.exclude(id=exclude_id)
+        return candidates
+
     def calculate_multi_algorithm_score(
         self,
         str1: str,
@@ -231,16 +258,14 @@ class EnhancedEntityMatcher:
         Returns:
             Liste de (client, score, match_details) triée par score décroissant
         """
-        from apps.accounts.models import Client
-
         if min_score is None:
             min_score = self.threshold
 
-        candidates = Client.objects.all()
-        if organization is not None:
-            candidates = candidates.filter(organization=organization)
-        if exclude_id:
-            candidates = candidates.exclude(id=exclude_id)
+        candidates = self._candidates(
+            'client', organization, exclude_id,
+            texts=[t for t in (f"{first_name or ''} {last_name or ''}".strip(), company) if t],
+            exact={'email': email, 'phone': phone},
+        )
 
         matches = []
 
@@ -339,16 +364,14 @@ class EnhancedEntityMatcher:
         Recherche avancée de fournisseurs similaires avec matching multi-algorithme.
         `organization` restreint la recherche à l'organisation (multi-tenant).
         """
-        from apps.suppliers.models import Supplier
-
         if min_score is None:
             min_score = self.threshold
 
-        candidates = Supplier.objects.all()
-        if organization is not None:
-            candidates = candidates.filter(organization=organization)
-        if exclude_id:
-            candidates = candidates.exclude(id=exclude_id)
+        candidates = self._candidates(
+            'supplier', organization, exclude_id,
+            texts=[name] if name else [],
+            exact={'email': email, 'phone': phone},
+        )
 
         matches = []
 
@@ -436,16 +459,15 @@ class EnhancedEntityMatcher:
         toutes les entreprises -> faux "100% similaire" sur des produits
         invisibles + fuite inter-tenant.
         """
-        from apps.invoicing.models import Product
-
         if min_score is None:
             min_score = self.threshold
 
-        candidates = Product.objects.all()
-        if organization is not None:
-            candidates = candidates.filter(organization=organization)
-        if exclude_id:
-            candidates = candidates.exclude(id=exclude_id)
+        candidates = self._candidates(
+            'product', organization, exclude_id,
+            texts=[name] if name else [],
+            keywords=[t for t in (name, description) if t],
+            exact={'reference': reference, 'barcode': barcode},
+        )
 
         matches = []
 
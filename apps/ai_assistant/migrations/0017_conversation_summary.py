@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0016_notification_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summarized_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Résumé jusqu'au message du"),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True, default='', verbose_name='Résumé'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary_message_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Messages résumés'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Résumé mis à jour le'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at'], name='ai_assistan_convers_8f1a44_idx'),
+        ),
+    ]
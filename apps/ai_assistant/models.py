@@ -24,6 +24,14 @@ class Conversation(models.Model):
     is_proactive = models.BooleanField(default=False, verbose_name=_("Conversation proactive"))
     proactive_source_id = models.UUIDField(null=True, blank=True, verbose_name=_("ID source proactive"))
 
+    # Résumé glissant des messages anciens (services/conversation_memory.py)
+    summary = models.TextField(blank=True, default='', verbose_name=_("Résumé"))
+    summarized_until = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Résumé jusqu'au message du")
+    )
+    summary_message_count = models.PositiveIntegerField(default=0, verbose_name=_("Messages résumés"))
+    summary_updated_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Résumé mis à jour le"))
+
     class Meta:
         verbose_name = _("Conversation")
         verbose_name_plural = _("Conversations")
@@ -60,6 +68,9 @@ class Message(models.Model):
         verbose_name = _("Message")
         verbose_name_plural = _("Messages")
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.get_role_display()}: {self.content[:50]}..."
@@ -37,18 +37,19 @@ class PixtralService:
         self.api_key = api_key or settings.MISTRAL_API_KEY
         self.max_file_size = 10 * 1024 * 1024  # 10MB
 
-        # Support mistralai v2.0+, v1.0+ and older versions
-        try:
-            from mistralai.client import Mistral
-            self.client = Mistral(api_key=self.api_key)
-        except ImportError:
-            try:
-                from mistralai import Mistral
-                self.client = Mistral(api_key=self.api_key)
-            except ImportError:
-                # Fallback for older versions of mistralai (v0.x)
-                from mistralai.client import MistralClient
-                self.client = MistralClient(api_key=self.api_key)
+        self._client = None
+
+    @property
+    def client(self):
+        """Client partagé du processus (pool HTTP keep-alive), résolu au premier appel."""
+        if self._client is None:
+            from .services.llm.client_manager import get_client_manager
+            self._client = get_client_manager().client(self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
 
     def analyze_document_image(
         self,
@@ -73,30 +74,32 @@ class PixtralService:
             prompt = self._build_prompt(document_type)
 
             # Appeler Pixtral
-            response = self.client.chat.complete(
-                model=self.PIXTRAL_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Tu es un expert en extraction de données de documents. Analyse l'image et retourne uniquement du JSON valide."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": f"data:image/jpeg;base64,{image_base64}"
-                            }
-                        ]
-                    }
-                ],
-                temperature=0.2,  # Très déterministe pour extraction
-                max_tokens=1500
-            )
+            from .services.llm.client_manager import get_client_manager
+            with get_client_manager().guarded(self.PIXTRAL_MODEL):
+                response = self.client.chat.complete(
+                    model=self.PIXTRAL_MODEL,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "Tu es un expert en extraction de données de documents. Analyse l'image et retourne uniquement du JSON valide."
+                        },
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": prompt
+                                },
+                                {
+                                    "type": "image_url",
+                                    "image_url": f"data:image/jpeg;base64,{image_base64}"
+                                }
+                            ]
+                        }
+                    ],
+                    temperature=0.2,  # Très déterministe pour extraction
+                    max_tokens=1500
+                )
 
             # Extraire et parser le JSON
             json_str = response.choices[0].message.content
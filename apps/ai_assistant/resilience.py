@@ -8,6 +8,8 @@ import logging
 import functools
 from django.core.cache import cache
 
+from .counters import increment
+
 logger = logging.getLogger(__name__)
 
 # Exceptions Mistral retriables
@@ -56,20 +58,17 @@ def _check_circuit_breaker():
 
 
 def _record_failure():
-    """Enregistre un echec pour le circuit breaker."""
-    now = time.time()
-    failures = cache.get(_CB_FAILURES_KEY, [])
-
-    # Garder seulement les echecs dans la fenetre
-    failures = [t for t in failures if t > now - _CB_WINDOW]
-    failures.append(now)
-    cache.set(_CB_FAILURES_KEY, failures, _CB_WINDOW)
+    """Enregistre un echec pour le circuit breaker (compteur atomique)."""
+    # Fenetre fixe de _CB_WINDOW secondes a partir du premier echec,
+    # remise a zero par le premier succes
+    failures = increment(_CB_FAILURES_KEY, 1, _CB_WINDOW)
 
-    if len(failures) >= _CB_MAX_FAILURES:
+    if failures >= _CB_MAX_FAILURES:
         # Ouvrir le circuit
+        now = time.time()
         cache.set(_CB_OPEN_UNTIL_KEY, now + _CB_OPEN_DURATION, _CB_OPEN_DURATION + 10)
         logger.critical(
-            f"Circuit breaker OPEN: {len(failures)} failures in {_CB_WINDOW}s. "
+            f"Circuit breaker OPEN: {failures} failures in {_CB_WINDOW}s. "
             f"Blocking for {_CB_OPEN_DURATION}s."
         )
         return True  # Circuit vient de s'ouvrir
@@ -0,0 +1,214 @@
+"""
+Mémoire des conversations IA : résumé glissant persisté + derniers messages.
+
+Sans résumé, chaque tour relisait TOUS les messages de la conversation puis
+n'en gardait que les derniers (les plus anciens étaient remplacés par une
+mention « [Contexte: N messages précédents] ») : coût base de données
+croissant et perte des faits anciens (clients, numéros, montants...).
+
+Ici :
+  - `load_history` lit « résumé + fenêtre récente » par une requête bornée
+    (index conversation / created_at), quelle que soit la longueur de la
+    conversation ;
+  - `schedule_summary_update`, appelé après chaque réponse, déclenche en
+    arrière-plan (tâche Celery, après commit) la mise à jour du résumé quand
+    au moins SUMMARY_BATCH_MESSAGES messages se sont accumulés au-delà des
+    RECENT_MESSAGES derniers ;
+  - `update_summary` intègre ces messages au résumé existant (appel LLM
+    court, repli extractif si le LLM est indisponible) et avance la borne
+    `Conversation.summarized_until`.
+
+Le prompt reste donc de taille constante : résumé (borné à SUMMARY_MAX_CHARS)
++ au plus HISTORY_WINDOW messages.
+"""
+import logging
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Messages récents toujours transmis tels quels au LLM
+RECENT_MESSAGES = int(getattr(settings, 'AI_HISTORY_RECENT_MESSAGES', 8))
+
+# Nombre de messages à accumuler au-delà de la fenêtre récente avant de
+# mettre à jour le résumé (un appel LLM tous les N messages, pas à chaque tour)
+SUMMARY_BATCH_MESSAGES = int(getattr(settings, 'AI_SUMMARY_BATCH_MESSAGES', 6))
+
+# Fenêtre maximale lue à chaque tour (messages non encore résumés compris)
+HISTORY_WINDOW = RECENT_MESSAGES + SUMMARY_BATCH_MESSAGES
+
+# Taille maximale du résumé persisté
+SUMMARY_MAX_CHARS = int(getattr(settings, 'AI_SUMMARY_MAX_CHARS', 2000))
+
+# Verrou évitant de planifier plusieurs fois la même mise à jour
+PENDING_KEY = 'ai_summary_pending:{conversation_id}'
+PENDING_TIMEOUT = 600
+
+SUMMARY_PREFIX = "Résumé de la conversation précédente :"
+
+SUMMARY_PROMPT = (
+    "Tu tiens le résumé d'une conversation entre un utilisateur et l'assistant "
+    "d'un logiciel de gestion (factures, bons de commande, clients, fournisseurs, "
+    "produits, stock). Mets à jour le résumé existant avec les nouveaux échanges. "
+    "Conserve les faits utiles pour la suite : noms des clients, fournisseurs et "
+    "produits, numéros de documents, montants, dates, actions effectuées, "
+    "décisions et questions restées ouvertes. Style télégraphique, en français, "
+    "{max_chars} caractères maximum. Réponds uniquement avec le résumé."
+)
+
+
+def summary_message(summary: str) -> Dict[str, Any]:
+    """Entrée d'historique portant le résumé (rôle 'system', en tête)."""
+    return {'role': 'system', 'content': f"{SUMMARY_PREFIX}\n{summary}", 'metadata': {'summary': True}}
+
+
+def is_summary_message(message: Dict[str, Any]) -> bool:
+    return message.get('role') == 'system' and bool((message.get('metadata') or {}).get('summary'))
+
+
+def _pending_messages(conversation):
+    from apps.ai_assistant.models import Message
+
+    queryset = Message.objects.filter(conversation=conversation)
+    if conversation.summarized_until:
+        queryset = queryset.filter(created_at__gt=conversation.summarized_until)
+    return queryset
+
+
+def load_history(conversation, exclude_latest: bool = True) -> List[Dict[str, Any]]:
+    """Historique à transmettre au LLM : résumé éventuel + messages récents.
+
+    Requête bornée : au plus HISTORY_WINDOW messages postérieurs au résumé,
+    lus du plus récent au plus ancien. `exclude_latest` écarte le dernier
+    message (le message utilisateur du tour en cours, déjà persisté).
+    """
+    limit = HISTORY_WINDOW + (1 if exclude_latest else 0)
+    recent = list(
+        _pending_messages(conversation)
+        .order_by('-created_at')
+        .values('role', 'content', 'metadata')[:limit]
+    )
+    if exclude_latest:
+        recent = recent[1:]
+    recent.reverse()
+    if conversation.summary:
+        return [summary_message(conversation.summary)] + recent
+    return recent
+
+
+def schedule_summary_update(conversation):
+    """Planifie la mise à jour du résumé si assez de messages se sont accumulés."""
+    pending = _pending_messages(conversation)[:HISTORY_WINDOW].count()
+    if pending < HISTORY_WINDOW:
+        return False
+    if not cache.add(PENDING_KEY.format(conversation_id=conversation.pk), 1, PENDING_TIMEOUT):
+        return False
+
+    conversation_id = str(conversation.pk)
+
+    def dispatch():
+        from apps.ai_assistant.tasks import update_conversation_summary
+        try:
+            update_conversation_summary.delay(conversation_id)
+        except Exception:
+            # Broker indisponible : nouvelle tentative au prochain tour
+            cache.delete(PENDING_KEY.format(conversation_id=conversation_id))
+            logger.warning("Mise à jour du résumé de %s non planifiée", conversation_id, exc_info=True)
+
+    transaction.on_commit(dispatch)
+    return True
+
+
+def _format_turns(messages) -> str:
+    lines = []
+    for message in messages:
+        speaker = 'Utilisateur' if message.role == 'user' else 'Assistant'
+        line = f"{speaker} : {(message.content or '').strip()}"
+        actions = [
+            result.get('function') for result in ((message.metadata or {}).get('action_results') or [])
+            if isinstance(result, dict) and result.get('function')
+        ]
+        if actions:
+            line += f" [actions : {', '.join(actions)}]"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _extractive_summary(previous: str, messages) -> str:
+    """Repli sans LLM : début de chaque message, les plus récents prioritaires."""
+    lines = [previous] if previous else []
+    for message in messages:
+        text = ' '.join((message.content or '').split())
+        if len(text) > 160:
+            text = text[:157] + '...'
+        speaker = 'Utilisateur' if message.role == 'user' else 'Assistant'
+        lines.append(f"- {speaker} : {text}")
+    summary = "\n".join(lines)
+    return summary[-SUMMARY_MAX_CHARS:]
+
+
+def _llm_summary(previous: str, messages):
+    """Résumé mis à jour par le LLM ; (résumé, tokens) ou (None, 0)."""
+    from apps.ai_assistant.services.llm.provider import MistralProvider
+
+    try:
+        provider = MistralProvider()
+    except ValueError:
+        return None, 0
+
+    prompt = [
+        {'role': 'system', 'content': SUMMARY_PROMPT.format(max_chars=SUMMARY_MAX_CHARS)},
+        {'role': 'user', 'content': (
+            f"Résumé existant :\n{previous or '(aucun)'}\n\nNouveaux échanges :\n{_format_turns(messages)}"
+        )},
+    ]
+    result = provider.complete(prompt, temperature=0.2, max_tokens=600)
+    content = (result.get('content') or '').strip()
+    if not result.get('success') or result.get('circuit_open') or not content:
+        return None, 0
+    return content[:SUMMARY_MAX_CHARS], result.get('usage', {}).get('total_tokens', 0)
+
+
+def update_summary(conversation_id) -> bool:
+    """Intègre au résumé les messages antérieurs à la fenêtre récente."""
+    from apps.ai_assistant.models import Conversation
+    from apps.ai_assistant.token_monitor import token_monitor
+
+    try:
+        conversation = Conversation.objects.select_related('organization').get(pk=conversation_id)
+        pending = list(_pending_messages(conversation).order_by('created_at'))
+        to_fold = pending[:-RECENT_MESSAGES] if len(pending) > RECENT_MESSAGES else []
+        if not to_fold:
+            return False
+
+        summary, tokens = _llm_summary(conversation.summary, to_fold)
+        if summary is None:
+            summary = _extractive_summary(conversation.summary, to_fold)
+
+        # Mise à jour conditionnelle : une exécution concurrente ayant déjà
+        # avancé la borne l'emporte.
+        updated = Conversation.objects.filter(
+            pk=conversation.pk, summarized_until=conversation.summarized_until,
+        ).update(
+            summary=summary,
+            summarized_until=to_fold[-1].created_at,
+            summary_message_count=conversation.summary_message_count + len(to_fold),
+            summary_updated_at=timezone.now(),
+        )
+
+        if tokens and conversation.organization_id:
+            try:
+                token_monitor.track_usage(
+                    tokens_used=int(tokens),
+                    user_id=conversation.user_id,
+                    organization_id=conversation.organization_id,
+                )
+            except Exception:
+                logger.warning("token_monitor.track_usage a échoué", exc_info=True)
+        return bool(updated)
+    finally:
+        cache.delete(PENDING_KEY.format(conversation_id=conversation_id))
@@ -0,0 +1,253 @@
+"""
+Gestionnaire des clients Mistral, partagé par tout le processus.
+
+Chaque service IA (MistralService, MistralProvider, ContractAIService,
+PixtralService, vues de génération...) construisait son propre client SDK,
+souvent à chaque requête : nouvelle poignée de main TLS, nouveau pool HTTP,
+et aucune limite commune du nombre d'appels simultanés vers l'API.
+
+Ici, un seul point d'accès :
+  - `client()` : client SDK synchrone partagé, adossé à un `httpx.Client`
+    (connexions keep-alive réutilisées entre requêtes et threads) ;
+  - `async_client()` : client SDK asynchrone adossé à un `httpx.AsyncClient`,
+    un par boucle d'événements (un pool asynchrone ne peut pas être partagé
+    entre boucles) ;
+  - `limit(model)` / `alimit(model)` : nombre d'appels simultanés par modèle
+    (settings.AI_MODEL_CONCURRENCY), limite commune aux appels synchrones et
+    asynchrones ;
+  - `guarded(model)` / `aguarded(model)` : circuit breaker
+    (`apps.ai_assistant.resilience`) + limite de concurrence autour d'un appel ;
+    `complete()` / `acomplete()` : `chat.complete` ainsi protégé.
+
+Les clients sont indexés par clé API et `settings.MISTRAL_SERVER_URL`.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Appels simultanés par modèle ('default' pour les modèles non listés)
+DEFAULT_MODEL_CONCURRENCY = {'default': 100}
+
+# Attente maximale d'une place libre avant d'abandonner (secondes)
+DEFAULT_QUEUE_TIMEOUT = 30
+
+# Pool HTTP (connexions keep-alive réutilisées)
+DEFAULT_POOL_SIZE = 100
+DEFAULT_KEEPALIVE = 20
+KEEPALIVE_EXPIRY = 60
+
+# Délais HTTP : connexion courte, lecture longue (réponses streamées)
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 120
+
+
+class LLMUnavailableError(Exception):
+    """Appel LLM refusé (circuit breaker ouvert)."""
+
+
+class LLMConcurrencyLimitError(Exception):
+    """Trop d'appels simultanés pour ce modèle (attente dépassée)."""
+
+
+def _import_sdk():
+    """Classe client du SDK et support des clients HTTP injectés."""
+    try:
+        from mistralai.client import Mistral
+        return Mistral, True
+    except ImportError:
+        pass
+    try:
+        from mistralai import Mistral
+        return Mistral, True
+    except ImportError:
+        # Anciennes versions (v0.x) : pas d'injection de client HTTP
+        from mistralai.client import MistralClient
+        return MistralClient, False
+
+
+def _httpx():
+    """Module httpx utilisé par le SDK (certaines distributions l'embarquent sous le nom httpx2)."""
+    try:
+        import httpx
+    except ImportError:
+        import httpx2 as httpx
+    return httpx
+
+
+def _http_timeout():
+    httpx = _httpx()
+    return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _http_limits():
+    httpx = _httpx()
+    return httpx.Limits(
+        max_connections=int(getattr(settings, 'AI_LLM_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        max_keepalive_connections=int(getattr(settings, 'AI_LLM_KEEPALIVE', DEFAULT_KEEPALIVE)),
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+class LLMClientManager:
+    """Clients Mistral partagés, limites de concurrence et circuit breaker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._http_client = None
+        # boucle -> {(clé, url): client SDK}
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._semaphores: Dict[Tuple[str, int], threading.BoundedSemaphore] = {}
+
+    # ----------------------------------------------------------------- clients
+    @staticmethod
+    def _credentials(api_key: Optional[str]) -> Tuple[str, Optional[str]]:
+        key = api_key or getattr(settings, 'MISTRAL_API_KEY', None) or os.getenv('MISTRAL_API_KEY')
+        if not key:
+            raise ValueError("MISTRAL_API_KEY not configured")
+        return key, getattr(settings, 'MISTRAL_SERVER_URL', None) or None
+
+    def _build(self, key: str, server_url: Optional[str], async_client=None):
+        sdk_class, injectable = _import_sdk()
+        if not injectable:
+            return sdk_class(api_key=key)
+        options = {'server_url': server_url} if server_url else {}
+        if async_client is not None:
+            options['async_client'] = async_client
+        return sdk_class(api_key=key, client=self._shared_http_client(), **options)
+
+    def _shared_http_client(self):
+        httpx = _httpx()
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=_http_limits(), timeout=_http_timeout())
+        return self._http_client
+
+    def client(self, api_key: Optional[str] = None):
+        """Client SDK synchrone partagé (thread-safe, connexions réutilisées)."""
+        credentials = self._credentials(api_key)
+        with self._lock:
+            client = self._clients.get(credentials)
+            if client is None:
+                client = self._clients[credentials] = self._build(*credentials)
+            return client
+
+    def async_client(self, api_key: Optional[str] = None):
+        """Client SDK pour la boucle d'événements courante (pool asynchrone dédié)."""
+        httpx = _httpx()
+        credentials = self._credentials(api_key)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(credentials)
+            if client is None:
+                http_client = httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout())
+                client = clients[credentials] = self._build(*credentials, async_client=http_client)
+            return client
+
+    # ------------------------------------------------------------- concurrence
+    def _semaphore(self, model: str) -> threading.BoundedSemaphore:
+        limits = {**DEFAULT_MODEL_CONCURRENCY, **getattr(settings, 'AI_MODEL_CONCURRENCY', {})}
+        limit = int(limits.get(model, limits['default']))
+        with self._lock:
+            semaphore = self._semaphores.get((model, limit))
+            if semaphore is None:
+                semaphore = self._semaphores[(model, limit)] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    @staticmethod
+    def _queue_timeout() -> float:
+        return float(getattr(settings, 'AI_LLM_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+
+    @contextmanager
+    def limit(self, model: str):
+        """Réserve une place d'appel pour `model` (bloque le thread au besoin)."""
+        semaphore = self._semaphore(model)
+        if not semaphore.acquire(timeout=self._queue_timeout()):
+            raise LLMConcurrencyLimitError(f"Trop d'appels simultanés vers {model}")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    @asynccontextmanager
+    async def alimit(self, model: str):
+        """Variante asynchrone de `limit` : attend sans bloquer la boucle."""
+        semaphore = self._semaphore(model)
+        deadline = time.monotonic() + self._queue_timeout()
+        while not semaphore.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise LLMConcurrencyLimitError(f"Trop d'appels simultanés vers {model}")
+            await asyncio.sleep(0.05)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    # ---------------------------------------------------------------- appels
+    @contextmanager
+    def guarded(self, model: str):
+        """Appel protégé : circuit breaker + limite par modèle.
+
+        Lève LLMUnavailableError si le circuit est ouvert ; les erreurs levées
+        dans le bloc sont propagées et comptées par le circuit breaker.
+        """
+        from apps.ai_assistant.resilience import _check_circuit_breaker, _record_failure, _record_success
+
+        if not _check_circuit_breaker():
+            raise LLMUnavailableError("Circuit breaker ouvert")
+        with self.limit(model):
+            try:
+                yield
+            except Exception:
+                _record_failure()
+                raise
+        _record_success()
+
+    @asynccontextmanager
+    async def aguarded(self, model: str):
+        """Variante asynchrone de `guarded`."""
+        from apps.ai_assistant.resilience import _check_circuit_breaker, _record_failure, _record_success
+
+        if not _check_circuit_breaker():
+            raise LLMUnavailableError("Circuit breaker ouvert")
+        async with self.alimit(model):
+            try:
+                yield
+            except Exception:
+                _record_failure()
+                raise
+        _record_success()
+
+    def complete(self, *, model: str, api_key: Optional[str] = None, **kwargs):
+        """`chat.complete` sur le client partagé, protégé par `guarded`."""
+        client = self.client(api_key)
+        with self.guarded(model):
+            return client.chat.complete(model=model, **kwargs)
+
+    async def acomplete(self, *, model: str, api_key: Optional[str] = None, **kwargs):
+        """Variante asynchrone de `complete` (`chat.complete_async`)."""
+        client = self.async_client(api_key)
+        async with self.aguarded(model):
+            return await client.chat.complete_async(model=model, **kwargs)
+
+
+_manager: Optional[LLMClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_client_manager() -> LLMClientManager:
+    """Instance unique du processus."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = LLMClientManager()
+        return _manager
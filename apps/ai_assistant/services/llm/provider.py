@@ -1,15 +1,19 @@
 """
 Fournisseur LLM bas niveau (Mistral AI).
 
-Encapsule UNIQUEMENT l'appel au modèle : initialisation du client (compatible
-plusieurs versions du SDK mistralai), appel `chat.complete` protégé par le retry +
-circuit breaker existant (apps/ai_assistant/resilience.py), et normalisation de la
-réponse en un dict simple et stable.
+Encapsule UNIQUEMENT l'appel au modèle : client partagé du processus
+(`client_manager.py`, compatible plusieurs versions du SDK mistralai), appel
+`chat.complete` protégé par le retry + circuit breaker existant
+(apps/ai_assistant/resilience.py), et normalisation de la réponse en un dict
+simple et stable.
 
 Cette couche ne connaît NI les outils métier NI l'orchestration : elle reçoit des
 `messages` (+ éventuellement des `tools`) et renvoie le contenu, les tool_calls
 parsés et l'usage. L'Orchestrator s'appuie dessus pour ses deux appels (récupération
 puis synthèse).
+
+Streaming : `stream` (générateur synchrone) et `astream` (générateur asynchrone,
+via `chat.stream_async`, utilisé sous ASGI) émettent les mêmes événements.
 """
 from __future__ import annotations
 
@@ -20,27 +24,13 @@ from typing import Any, Dict, List, Optional
 
 from django.conf import settings
 
+from apps.ai_assistant.services.llm.client_manager import LLMConcurrencyLimitError, get_client_manager
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL = "mistral-large-latest"
 
 
-def _build_client(api_key: str):
-    """Instancie le client Mistral en tolérant les variations de packaging du SDK."""
-    try:
-        from mistralai.client import Mistral
-        return Mistral(api_key=api_key)
-    except ImportError:
-        pass
-    try:
-        from mistralai import Mistral
-        return Mistral(api_key=api_key)
-    except ImportError:
-        # Anciennes versions (v0.x)
-        from mistralai.client import MistralClient
-        return MistralClient(api_key=api_key)
-
-
 class MistralProvider:
     """Appel LLM Mistral normalisé, résilient et sans logique métier."""
 
@@ -48,7 +38,10 @@ class MistralProvider:
         key = api_key or getattr(settings, "MISTRAL_API_KEY", None) or os.getenv("MISTRAL_API_KEY")
         if not key:
             raise ValueError("MISTRAL_API_KEY not configured")
-        self.client = _build_client(key)
+        # Clients partagés par le processus (pool HTTP keep-alive, limites par modèle)
+        self._manager = get_client_manager()
+        self._api_key = key
+        self.client = self._manager.client(key)
         self.model = model or getattr(settings, "MISTRAL_MODEL", DEFAULT_MODEL)
 
     # ------------------------------------------------------------------ public
@@ -86,7 +79,8 @@ class MistralProvider:
             if tools:
                 kwargs["tools"] = tools
                 kwargs["tool_choice"] = tool_choice
-            return self.client.chat.complete(**kwargs)
+            with self._manager.limit(self.model):
+                return self.client.chat.complete(**kwargs)
 
         try:
             response = _call()
@@ -145,81 +139,88 @@ class MistralProvider:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = tool_choice
 
-        content_parts: List[str] = []
-        raw_tool_calls: Dict[int, Dict[str, Any]] = {}
-        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-        finish_reason = None
-
+        acc = _StreamAccumulator()
         try:
-            for event in stream_fn(**kwargs):
-                chunk = getattr(event, "data", event)
-                choices = getattr(chunk, "choices", None)
-                if choices:
-                    delta = choices[0].delta
-                    text = getattr(delta, "content", None)
+            with self._manager.limit(self.model):
+                for event in stream_fn(**kwargs):
+                    text = acc.feed(event)
                     if text:
-                        content_parts.append(text)
                         yield {"type": "delta", "content": text}
-                    for tc in (getattr(delta, "tool_calls", None) or []):
-                        idx = getattr(tc, "index", None)
-                        if idx is None:
-                            idx = len(raw_tool_calls)
-                        slot = raw_tool_calls.setdefault(idx, {"id": None, "name": "", "arguments": ""})
-                        if getattr(tc, "id", None):
-                            slot["id"] = tc.id
-                        fn = getattr(tc, "function", None)
-                        if fn is not None:
-                            if getattr(fn, "name", None):
-                                slot["name"] = fn.name
-                            args = getattr(fn, "arguments", None)
-                            if args:
-                                slot["arguments"] += args if isinstance(args, str) else json.dumps(args)
-                    if choices[0].finish_reason:
-                        finish_reason = choices[0].finish_reason
-                if getattr(chunk, "usage", None):
-                    usage = {
-                        "prompt_tokens": getattr(chunk.usage, "prompt_tokens", 0) or 0,
-                        "completion_tokens": getattr(chunk.usage, "completion_tokens", 0) or 0,
-                        "total_tokens": getattr(chunk.usage, "total_tokens", 0) or 0,
-                    }
             _record_success()
+        except LLMConcurrencyLimitError as exc:
+            logger.warning("Appel LLM refusé : %s", exc)
+            yield acc.error_event(exc)
+            return
         except Exception as exc:  # pragma: no cover - robustesse runtime
             _record_failure()
             logger.error("Erreur LLM Mistral (stream) : %s", exc)
-            yield {
-                "type": "final", "success": False, "content": "".join(content_parts),
-                "tool_calls": None, "finish_reason": None, "usage": usage,
-                "circuit_open": False, "error": str(exc),
-            }
+            yield acc.error_event(exc)
             return
 
-        tool_calls = None
-        if raw_tool_calls:
-            tool_calls = []
-            for idx in sorted(raw_tool_calls):
-                slot = raw_tool_calls[idx]
-                if not slot["name"]:
-                    continue
-                arguments: Dict[str, Any] = {}
-                if slot["arguments"]:
-                    try:
-                        parsed = json.loads(slot["arguments"])
-                        arguments = parsed if isinstance(parsed, dict) else {}
-                    except json.JSONDecodeError as exc:
-                        logger.warning("Arguments tool_call (stream) non parsables : %s", exc)
-                tool_calls.append({
-                    "id": slot["id"],
-                    "function": slot["name"],
-                    "arguments": arguments,
-                    "arguments_json": slot["arguments"] or "{}",
-                })
-            tool_calls = tool_calls or None
+        yield acc.final_event()
 
-        yield {
-            "type": "final", "success": True, "content": "".join(content_parts),
-            "tool_calls": tool_calls, "finish_reason": finish_reason, "usage": usage,
-            "circuit_open": False, "error": None,
-        }
+    async def astream(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: str = "auto",
+        temperature: float = 0.7,
+        max_tokens: int = 2500,
+    ):
+        """Version asynchrone de `stream` (même protocole d'événements).
+
+        Utilise `chat.stream_async` du SDK : l'attente des fragments ne bloque
+        aucun thread, ce qui permet à un worker ASGI de servir de nombreux flux
+        simultanés. Sans support asynchrone du SDK, le flux synchrone est
+        consommé dans un thread.
+        """
+        from asgiref.sync import sync_to_async
+
+        from apps.ai_assistant.resilience import (
+            _check_circuit_breaker, _record_failure, _record_success,
+        )
+
+        stream_async = getattr(self._manager.async_client(self._api_key).chat, "stream_async", None)
+        if stream_async is None:
+            iterator = iter(self.stream(messages, tools=tools, tool_choice=tool_choice,
+                                        temperature=temperature, max_tokens=max_tokens))
+            next_event = sync_to_async(next, thread_sensitive=False)
+            while True:
+                event = await next_event(iterator, None)
+                if event is None:
+                    return
+                yield event
+
+        if not _check_circuit_breaker():
+            yield {"type": "final", **self._empty_result(success=True, circuit_open=True)}
+            return
+
+        kwargs = dict(model=self.model, messages=messages,
+                      temperature=temperature, max_tokens=max_tokens)
+        if tools:
+            kwargs["tools"] = tools
+            kwargs["tool_choice"] = tool_choice
+
+        acc = _StreamAccumulator()
+        try:
+            async with self._manager.alimit(self.model):
+                response = await stream_async(**kwargs)
+                async for event in response:
+                    text = acc.feed(event)
+                    if text:
+                        yield {"type": "delta", "content": text}
+            _record_success()
+        except LLMConcurrencyLimitError as exc:
+            logger.warning("Appel LLM refusé : %s", exc)
+            yield acc.error_event(exc)
+            return
+        except Exception as exc:  # pragma: no cover - robustesse runtime
+            _record_failure()
+            logger.error("Erreur LLM Mistral (stream async) : %s", exc)
+            yield acc.error_event(exc)
+            return
+
+        yield acc.final_event()
 
     # ----------------------------------------------------------------- helpers
     @staticmethod
@@ -277,3 +278,84 @@ class MistralProvider:
             "circuit_open": False,
             "error": None,
         }
+
+
+class _StreamAccumulator:
+    """Reconstitue la réponse complète à partir des fragments streamés
+    (texte, tool_calls fragmentés par index, usage), pour `stream` et `astream`."""
+
+    def __init__(self):
+        self.content_parts: List[str] = []
+        self.raw_tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        self.finish_reason = None
+
+    def feed(self, event) -> Optional[str]:
+        """Intègre un fragment du SDK ; retourne le texte à émettre (ou None)."""
+        text = None
+        chunk = getattr(event, "data", event)
+        choices = getattr(chunk, "choices", None)
+        if choices:
+            delta = choices[0].delta
+            text = getattr(delta, "content", None)
+            if text:
+                self.content_parts.append(text)
+            for tc in (getattr(delta, "tool_calls", None) or []):
+                idx = getattr(tc, "index", None)
+                if idx is None:
+                    idx = len(self.raw_tool_calls)
+                slot = self.raw_tool_calls.setdefault(idx, {"id": None, "name": "", "arguments": ""})
+                if getattr(tc, "id", None):
+                    slot["id"] = tc.id
+                fn = getattr(tc, "function", None)
+                if fn is not None:
+                    if getattr(fn, "name", None):
+                        slot["name"] = fn.name
+                    args = getattr(fn, "arguments", None)
+                    if args:
+                        slot["arguments"] += args if isinstance(args, str) else json.dumps(args)
+            if choices[0].finish_reason:
+                self.finish_reason = choices[0].finish_reason
+        if getattr(chunk, "usage", None):
+            self.usage = {
+                "prompt_tokens": getattr(chunk.usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(chunk.usage, "completion_tokens", 0) or 0,
+                "total_tokens": getattr(chunk.usage, "total_tokens", 0) or 0,
+            }
+        return text or None
+
+    def error_event(self, exc: Exception) -> Dict[str, Any]:
+        return {
+            "type": "final", "success": False, "content": "".join(self.content_parts),
+            "tool_calls": None, "finish_reason": None, "usage": self.usage,
+            "circuit_open": False, "error": str(exc),
+        }
+
+    def final_event(self) -> Dict[str, Any]:
+        tool_calls = None
+        if self.raw_tool_calls:
+            tool_calls = []
+            for idx in sorted(self.raw_tool_calls):
+                slot = self.raw_tool_calls[idx]
+                if not slot["name"]:
+                    continue
+                arguments: Dict[str, Any] = {}
+                if slot["arguments"]:
+                    try:
+                        parsed = json.loads(slot["arguments"])
+                        arguments = parsed if isinstance(parsed, dict) else {}
+                    except json.JSONDecodeError as exc:
+                        logger.warning("Arguments tool_call (stream) non parsables : %s", exc)
+                tool_calls.append({
+                    "id": slot["id"],
+                    "function": slot["name"],
+                    "arguments": arguments,
+                    "arguments_json": slot["arguments"] or "{}",
+                })
+            tool_calls = tool_calls or None
+
+        return {
+            "type": "final", "success": True, "content": "".join(self.content_parts),
+            "tool_calls": tool_calls, "finish_reason": self.finish_reason, "usage": self.usage,
+            "circuit_open": False, "error": None,
+        }
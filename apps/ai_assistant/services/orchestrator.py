@@ -44,21 +44,46 @@ produire la réponse finale (max AGENT_MAX_STEPS itérations). Chaque étape est
     {'type': 'tool_start', 'id', 'name', 'label': str}        # début d'un outil
     {'type': 'tool_result','id', 'name', 'success', 'summary'}# fin d'un outil
     {'type': 'chart',      'chart': {...}}                    # graphique produit
-    {'type': 'final',      'reply', 'tokens', 'steps', ...}   # TOUJOURS en dernier
-                                                              # (consommé par la vue,
+    {'type': 'final',      'reply', 'tokens', 'token_stats',  # TOUJOURS en dernier
+                           'steps', ...}                      # (consommé par la vue,
                                                               # jamais relayé au client)
 
 Les résultats d'outils sont renvoyés au modèle au format natif Mistral
 (message assistant avec tool_calls + messages role='tool'), ce qui permet le
 chaînage : « cherche les stats -> génère le graphique -> commente-le ».
+
+Exécution des outils d'une étape : les appels en lecture seule consécutifs
+(search_*, list_*, get_*, analyze_business... cf. `tool_registry.is_read_only`)
+sont exécutés en parallèle ; chaque outil mutant est exécuté seul, dans l'ordre
+demandé par le modèle. Les événements tool_start / tool_result restent émis
+dans l'ordre des tool_calls.
+
+Chaque appel LLM ne reçoit que les schémas d'outils pertinents pour le message
+(`registry/tool_router.py`, désactivable via settings.AI_TOOL_ROUTING) ;
+l'économie estimée est reportée dans `final['token_stats']`.
+
+`arun_stream` est la variante asynchrone (même protocole, même état via
+`_AgentLoop`) : flux LLM via `provider.astream`, outils attendus sur la boucle
+d'événements. Sous ASGI, ChatStreamView l'utilise pour qu'un même processus
+tienne des centaines de conversations streamées sans un thread par flux.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
+from apps.ai_assistant.services.conversation_memory import HISTORY_WINDOW, is_summary_message
+from apps.ai_assistant.services.registry.tool_router import (
+    ToolRouter,
+    ToolSelection,
+    tools_used_in_history,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -73,6 +98,17 @@ PAGE_HINTS = {
     "/suppliers": "L'utilisateur est sur la page Fournisseurs.",
 }
 
+# Domaine métier de chaque page, pour le routage des outils
+# (cf. services/registry/tool_router.py).
+PAGE_DOMAINS = {
+    "/dashboard": "analytics",
+    "/invoices": "invoice",
+    "/purchase-orders": "purchase_order",
+    "/products": "product",
+    "/clients": "client",
+    "/suppliers": "supplier",
+}
+
 # Descriptions de repli pour la synthèse déterministe (réutilise l'esprit des
 # action_descriptions historiques de MistralService.chat).
 _ACTION_LABELS = {
@@ -106,6 +142,42 @@ def _agent_max_request_tokens() -> int:
     from django.conf import settings
     return int(getattr(settings, "AI_MAX_REQUEST_TOKENS", 40000))
 
+
+def _max_concurrent_tools() -> int:
+    """Nombre maximum d'outils en lecture seule exécutés simultanément.
+
+    Chaque outil parallèle occupe un thread et une connexion base de données
+    le temps de son exécution. Configurable via settings.AI_MAX_CONCURRENT_TOOLS
+    (1 désactive le parallélisme).
+    """
+    from django.conf import settings
+    return max(1, int(getattr(settings, "AI_MAX_CONCURRENT_TOOLS", 4)))
+
+
+def _tool_routing_enabled() -> bool:
+    """Routage des outils (sous-ensemble de schémas par appel LLM).
+
+    Configurable via settings.AI_TOOL_ROUTING (False : tous les schémas à
+    chaque appel).
+    """
+    from django.conf import settings
+    return bool(getattr(settings, "AI_TOOL_ROUTING", True))
+
+
+_tool_pool: Optional[ThreadPoolExecutor] = None
+_tool_pool_lock = threading.Lock()
+
+
+def _tool_executor() -> ThreadPoolExecutor:
+    """Pool de threads (borné, partagé par le processus) des outils parallèles."""
+    global _tool_pool
+    with _tool_pool_lock:
+        if _tool_pool is None:
+            _tool_pool = ThreadPoolExecutor(
+                max_workers=_max_concurrent_tools(), thread_name_prefix="ai-tool"
+            )
+        return _tool_pool
+
 # Addendum au prompt système en mode agent streaming : le modèle annonce ses
 # étapes (narration visible dans la timeline) et enchaîne les outils librement.
 AGENT_PROMPT_ADDENDUM = """
@@ -250,9 +322,11 @@ class Orchestrator:
 
         # 1) Appel 1 — planification / récupération.
         messages = self._build_messages(message, conversation_history, page)
-        first = await _acomplete(
-            self.provider, messages, tools=self.registry.to_mistral_tools(), tool_choice="auto"
+        selection = self._select_tools(
+            ToolRouter(self.registry.to_mistral_tools()), message, page,
+            tools_used_in_history(conversation_history),
         )
+        first = await _acomplete(self.provider, messages, tools=selection.tools, tool_choice="auto")
         total_tokens += first["usage"]["total_tokens"]
 
         if first.get("circuit_open"):
@@ -269,29 +343,30 @@ class Orchestrator:
         # 2) Exécution des tool_calls -> données réelles.
         tool_results = []
         charts = []
-        for tc in tool_calls:
-            name = tc.get("function", "")
-            args = tc.get("arguments", {})
-            result = await self.registry.call(name, args, user_ctx)
-            tool_results.append({"tool_call_id": tc.get("id"), "function": name, "result": result})
+        for group in _execution_groups(tool_calls):
+            results = await self._call_tools(group, user_ctx)
+            for tc, result in zip(group, results):
+                name = tc.get("function", "")
+                args = tc.get("arguments", {})
+                tool_results.append({"tool_call_id": tc.get("id"), "function": name, "result": result})
 
-            # 2b) Confirmation requise -> on s'arrête avant l'appel 2.
-            pending = self._maybe_pending_action(name, args, result)
-            if pending is not None:
-                from apps.ai_assistant.services.confirmation import issue_token
-                token = issue_token(pending)
-                return OrchestratorResult(
-                    reply=pending.summary,
-                    tool_results=tool_results,
-                    pending_action=pending.to_frontend(token),
-                    tokens=total_tokens,
-                    success=True,
-                    used_tool_calls=tool_calls,
-                )
-
-            chart = _extract_chart(result)
-            if chart:
-                charts.extend(chart)
+                # 2b) Confirmation requise -> on s'arrête avant l'appel 2.
+                pending = self._maybe_pending_action(name, args, result)
+                if pending is not None:
+                    from apps.ai_assistant.services.confirmation import issue_token
+                    token = issue_token(pending)
+                    return OrchestratorResult(
+                        reply=pending.summary,
+                        tool_results=tool_results,
+                        pending_action=pending.to_frontend(token),
+                        tokens=total_tokens,
+                        success=True,
+                        used_tool_calls=tool_calls,
+                    )
+
+                chart = _extract_chart(result)
+                if chart:
+                    charts.extend(chart)
 
         # 3) Appel 2 — synthèse couplée aux données réelles.
         reply, synth_tokens = await self._synthesize(messages, first, tool_results)
@@ -320,173 +395,115 @@ class Orchestrator:
         Voir le protocole d'événements dans la docstring du module. L'événement
         'final' est toujours émis en dernier et porte tout ce qui doit être
         persisté (reply, steps, tool_results, charts, pending_action, tokens).
+
+        Chaque appel LLM bloque le thread appelant : sous ASGI, utiliser
+        `arun_stream` (même protocole, aucun thread occupé pendant l'attente).
         """
         from asgiref.sync import async_to_sync
 
-        conversation_history = conversation_history or []
-        total_tokens = 0
-        steps: List[Dict[str, Any]] = []          # trace persistée (timeline)
-        all_tool_results: List[Dict[str, Any]] = []
-        all_charts: List[Dict[str, Any]] = []
-
-        def final(reply, pending_action=None, success=True):
-            return {
-                "type": "final",
-                "reply": reply,
-                "steps": steps,
-                "tool_results": all_tool_results,
-                "charts": all_charts,
-                "pending_action": pending_action,
-                "tokens": total_tokens,
-                "success": success,
-            }
-
         yield {"type": "status", "message": "Analyse de votre demande"}
 
+        loop = _AgentLoop(self, message, user_ctx, conversation_history, page)
+
         # 0) Court-circuit statistiques pures (aucun appel LLM).
         stats_reply = self._try_stats_shortcut_sync(message, user)
         if stats_reply:
-            yield {"type": "text_delta", "content": stats_reply}
-            yield final(stats_reply)
+            yield from loop.shortcut(stats_reply)
             return
 
-        messages = self._build_messages(message, conversation_history, page, agent_mode=True)
-        tools = self.registry.to_mistral_tools()
-        max_request_tokens = _agent_max_request_tokens()
-
+        loop.start()
         for step_index in range(AGENT_MAX_STEPS):
-            # On force la synthèse (plus d'outils) à la dernière itération OU
-            # quand le plafond de tokens de la requête est atteint : la boucle
-            # atterrit proprement avec une réponse finale au lieu de boucler.
-            budget_exhausted = total_tokens >= max_request_tokens
-            is_last = step_index == AGENT_MAX_STEPS - 1 or budget_exhausted
-            if budget_exhausted:
-                yield {"type": "status", "message": "Finalisation de la réponse"}
+            events, step_tools = loop.begin_step(step_index)
+            yield from events
+
             call_text_parts: List[str] = []
             llm_final = None
-
-            for event in self.provider.stream(
-                messages, tools=None if is_last else tools, tool_choice="auto"
-            ):
+            for event in self.provider.stream(loop.messages, tools=step_tools, tool_choice="auto"):
                 if event["type"] == "delta":
                     call_text_parts.append(event["content"])
                     yield {"type": "text_delta", "content": event["content"]}
                 elif event["type"] == "final":
                     llm_final = event
 
-            if llm_final is None:  # défensif : le provider émet toujours 'final'
-                llm_final = {"success": False, "usage": {}, "content": ""}
+            events, groups = loop.end_step(call_text_parts, llm_final)
+            yield from events
+            if groups is None:
+                return
 
-            call_text = "".join(call_text_parts) or (llm_final.get("content") or "")
-            total_tokens += llm_final.get("usage", {}).get("total_tokens", 0)
+            for group in groups:
+                events, labels = loop.tool_starts(group)
+                yield from events
+                results = async_to_sync(self._call_tools)(group, user_ctx)
+                events, done = loop.record_results(group, labels, results)
+                yield from events
+                if done:
+                    return
 
-            if llm_final.get("circuit_open"):
-                from apps.ai_assistant.resilience import FALLBACK_RESPONSE_FR
-                reply = FALLBACK_RESPONSE_FR if not all_tool_results else _deterministic_summary(all_tool_results)
-                yield {"type": "text_delta", "content": reply}
-                yield final(reply)
-                return
+            yield {"type": "status", "message": "Analyse des résultats"}
 
-            if not llm_final.get("success"):
-                # Erreur LLM : on retombe sur le résumé déterministe des données déjà
-                # récupérées plutôt que de tout perdre.
-                reply = call_text or _deterministic_summary(all_tool_results)
-                if not call_text:
-                    yield {"type": "text_delta", "content": reply}
-                yield final(reply, success=bool(all_tool_results))
-                return
+        yield from loop.exhausted()
 
-            tool_calls = llm_final.get("tool_calls")
-
-            # Réponse finale : plus aucun outil demandé. Si le texte est vide mais
-            # que des données ont été récupérées, résumé déterministe plutôt que rien.
-            if not tool_calls:
-                reply = call_text or (
-                    _deterministic_summary(all_tool_results) if all_tool_results
-                    else "Je n'ai pas de réponse à fournir pour le moment."
-                )
-                if not call_text:
-                    yield {"type": "text_delta", "content": reply}
-                yield final(reply)
-                return
+    async def arun_stream(
+        self,
+        message: str,
+        user_ctx: Dict[str, Any],
+        conversation_history: Optional[List[Dict[str, Any]]] = None,
+        page: Optional[str] = None,
+        user=None,
+    ):
+        """Boucle agentique streamée, version ASYNC (générateur asynchrone).
 
-            # Le texte streamé accompagnant des tool_calls est une narration :
-            # le frontend le déplace dans la timeline.
-            if call_text.strip():
-                yield {"type": "thought", "content": call_text.strip()}
-                steps.append({"kind": "thought", "content": call_text.strip()})
-
-            # Message assistant au format natif Mistral (permet le chaînage).
-            import json as _json
-            import uuid as _uuid
-            assistant_tool_calls = []
-            for tc in tool_calls:
-                if not tc.get("id"):
-                    tc["id"] = _uuid.uuid4().hex[:9]
-                assistant_tool_calls.append({
-                    "id": tc["id"],
-                    "type": "function",
-                    "function": {
-                        "name": tc["function"],
-                        "arguments": tc.get("arguments_json") or _json.dumps(tc.get("arguments", {})),
-                    },
-                })
-            messages.append({
-                "role": "assistant",
-                "content": call_text or "",
-                "tool_calls": assistant_tool_calls,
-            })
+        Même protocole et même logique que `run_stream` (état partagé dans
+        `_AgentLoop`), mais le flux LLM est consommé avec `provider.astream`
+        et les outils sont attendus sans `async_to_sync` : sous ASGI, une
+        conversation en cours n'occupe aucun thread pendant l'attente du modèle.
+        """
+        yield {"type": "status", "message": "Analyse de votre demande"}
 
-            # Exécution des outils, un à un, étapes visibles côté client.
-            for tc in tool_calls:
-                name = tc.get("function", "")
-                args = tc.get("arguments", {})
-                label = _tool_label(name, args)
-                yield {"type": "tool_start", "id": tc["id"], "name": name, "label": label}
+        loop = _AgentLoop(self, message, user_ctx, conversation_history, page)
 
-                result = async_to_sync(self.registry.call)(name, args, user_ctx)
-                all_tool_results.append({"tool_call_id": tc["id"], "function": name, "result": result})
+        stats_reply = await self._try_stats_shortcut(message, user)
+        if stats_reply:
+            for event in loop.shortcut(stats_reply):
+                yield event
+            return
 
-                # Confirmation requise -> on suspend la boucle et on rend la main.
-                pending = self._maybe_pending_action(name, args, result)
-                if pending is not None:
-                    from apps.ai_assistant.services.confirmation import issue_token
-                    token = issue_token(pending)
-                    steps.append({
-                        "kind": "tool", "name": name, "label": label,
-                        "success": True, "summary": "Confirmation requise",
-                    })
-                    yield {"type": "tool_result", "id": tc["id"], "name": name,
-                           "success": True, "summary": "Confirmation requise"}
-                    yield final(pending.summary, pending_action=pending.to_frontend(token))
-                    return
+        loop.start()
+        for step_index in range(AGENT_MAX_STEPS):
+            events, step_tools = loop.begin_step(step_index)
+            for event in events:
+                yield event
 
-                summary = _tool_result_summary(result)
-                success = bool(result.get("success"))
-                steps.append({
-                    "kind": "tool", "name": name, "label": label,
-                    "success": success, "summary": summary,
-                })
-                yield {"type": "tool_result", "id": tc["id"], "name": name,
-                       "success": success, "summary": summary}
-
-                for chart in _extract_chart(result):
-                    all_charts.append(chart)
-                    yield {"type": "chart", "chart": chart}
-
-                messages.append({
-                    "role": "tool",
-                    "name": name,
-                    "tool_call_id": tc["id"],
-                    "content": _tool_message_content(result),
-                })
+            call_text_parts: List[str] = []
+            llm_final = None
+            async for event in _astream(self.provider, loop.messages, tools=step_tools, tool_choice="auto"):
+                if event["type"] == "delta":
+                    call_text_parts.append(event["content"])
+                    yield {"type": "text_delta", "content": event["content"]}
+                elif event["type"] == "final":
+                    llm_final = event
+
+            events, groups = loop.end_step(call_text_parts, llm_final)
+            for event in events:
+                yield event
+            if groups is None:
+                return
+
+            for group in groups:
+                events, labels = loop.tool_starts(group)
+                for event in events:
+                    yield event
+                results = await self._call_tools(group, user_ctx)
+                events, done = loop.record_results(group, labels, results)
+                for event in events:
+                    yield event
+                if done:
+                    return
 
             yield {"type": "status", "message": "Analyse des résultats"}
 
-        # AGENT_MAX_STEPS épuisé sans synthèse : repli déterministe.
-        reply = _deterministic_summary(all_tool_results)
-        yield {"type": "text_delta", "content": reply}
-        yield final(reply)
+        for event in loop.exhausted():
+            yield event
 
     # --------------------------------------------------------- confirmation
     async def run_confirmation(
@@ -530,7 +547,11 @@ class Orchestrator:
         if agent_mode:
             system += AGENT_PROMPT_ADDENDUM
         msgs = [{"role": "system", "content": system}]
-        for m in _compress_history(history):
+        for m in _compress_history(history or []):
+            if is_summary_message(m):
+                # Résumé des messages anciens : intégré au prompt système
+                msgs[0]["content"] += "\n\n" + m["content"]
+                continue
             entry = {"role": m.get("role", "user"), "content": m.get("content") or ""}
             msgs.append(entry)
         msgs.append({"role": "user", "content": message})
@@ -562,6 +583,40 @@ class Orchestrator:
             logger.warning("Court-circuit stats indisponible : %s", exc)
             return None
 
+    @staticmethod
+    def _select_tools(router: ToolRouter, message, page, used_tools) -> ToolSelection:
+        if not _tool_routing_enabled():
+            return router.full()
+        return router.select(message, page_domain=_page_domain(page), used_tools=used_tools)
+
+    async def _call_tools(self, calls, user_ctx) -> List[Dict[str, Any]]:
+        """Exécute un groupe de `_execution_groups` ; résultats dans l'ordre des appels.
+
+        Un appel seul est exécuté directement. Un groupe de plusieurs outils en
+        lecture seule est lancé avec `asyncio.gather`, chaque appel dans un
+        thread du pool borné : les handlers passent par
+        `sync_to_async(thread_sensitive=True)` et seraient sinon sérialisés sur
+        un même thread (et une même connexion base de données).
+        """
+        if len(calls) == 1:
+            tc = calls[0]
+            return [await self.registry.call(tc.get("function", ""), tc.get("arguments", {}), user_ctx)]
+
+        from asgiref.sync import sync_to_async
+        call = sync_to_async(self._call_in_thread, thread_sensitive=False, executor=_tool_executor())
+        return list(await asyncio.gather(*(
+            call(tc.get("function", ""), tc.get("arguments", {}), user_ctx) for tc in calls
+        )))
+
+    def _call_in_thread(self, name, args, user_ctx) -> Dict[str, Any]:
+        from asgiref.sync import async_to_sync
+        from django.db import close_old_connections
+        try:
+            return async_to_sync(self.registry.call)(name, args, user_ctx)
+        finally:
+            # Connexion propre au thread du pool : libérée selon CONN_MAX_AGE.
+            close_old_connections()
+
     def _maybe_pending_action(self, name, args, result):
         """Détecte les deux formes de confirmation renvoyées par les handlers."""
         if result.get("success"):
@@ -611,6 +666,226 @@ class Orchestrator:
 
 
 # ----------------------------------------------------------------- module utils
+class _AgentLoop:
+    """État et transitions de la boucle agentique, partagés par `run_stream`
+    (synchrone) et `arun_stream` (asynchrone).
+
+    Les deux boucles ne diffèrent que par la consommation du flux LLM et
+    l'exécution des outils ; chaque méthode ci-dessous retourne les
+    événements à émettre, sans rien exécuter d'elle-même.
+    """
+
+    def __init__(self, orchestrator: "Orchestrator", message, user_ctx, conversation_history, page):
+        self.orchestrator = orchestrator
+        self.message = message
+        self.user_ctx = user_ctx
+        self.history = conversation_history or []
+        self.page = page
+        self.total_tokens = 0
+        self.steps: List[Dict[str, Any]] = []          # trace persistée (timeline)
+        self.tool_results: List[Dict[str, Any]] = []
+        self.charts: List[Dict[str, Any]] = []
+        # Économie due au routage des outils (schémas envoyés vs jeu complet)
+        self.token_stats = {"tool_schema_tokens": 0, "tool_schema_tokens_saved": 0, "routed_steps": 0}
+        self.messages: List[Dict[str, Any]] = []
+
+    def final(self, reply, pending_action=None, success=True) -> Dict[str, Any]:
+        if self.token_stats["tool_schema_tokens_saved"]:
+            logger.info(
+                "Routage des outils : ~%d tokens de schémas économisés (%d étape(s) routée(s))",
+                self.token_stats["tool_schema_tokens_saved"], self.token_stats["routed_steps"],
+            )
+        return {
+            "type": "final",
+            "reply": reply,
+            "steps": self.steps,
+            "tool_results": self.tool_results,
+            "charts": self.charts,
+            "pending_action": pending_action,
+            "tokens": self.total_tokens,
+            "token_stats": {"total": self.total_tokens, **self.token_stats},
+            "success": success,
+        }
+
+    def shortcut(self, reply) -> List[Dict[str, Any]]:
+        return [{"type": "text_delta", "content": reply}, self.final(reply)]
+
+    def start(self):
+        orchestrator = self.orchestrator
+        self.messages = orchestrator._build_messages(self.message, self.history, self.page, agent_mode=True)
+        self.router = ToolRouter(orchestrator.registry.to_mistral_tools())
+        self.used_tools = tools_used_in_history(self.history)
+        self.max_request_tokens = _agent_max_request_tokens()
+
+    def begin_step(self, step_index):
+        """Événements de début d'étape et outils proposés au LLM (None : synthèse)."""
+        events = []
+        # On force la synthèse (plus d'outils) à la dernière itération OU
+        # quand le plafond de tokens de la requête est atteint : la boucle
+        # atterrit proprement avec une réponse finale au lieu de boucler.
+        budget_exhausted = self.total_tokens >= self.max_request_tokens
+        is_last = step_index == AGENT_MAX_STEPS - 1 or budget_exhausted
+        if budget_exhausted:
+            events.append({"type": "status", "message": "Finalisation de la réponse"})
+        if is_last:
+            return events, None
+
+        # Schémas envoyés : sous-ensemble pertinent, recalculé à chaque étape
+        # (les outils déjà appelés élargissent la sélection).
+        selection = self.orchestrator._select_tools(self.router, self.message, self.page, self.used_tools)
+        self.token_stats["tool_schema_tokens"] += selection.sent_tokens
+        self.token_stats["tool_schema_tokens_saved"] += selection.saved_tokens
+        self.token_stats["routed_steps"] += int(selection.routed)
+        return events, selection.tools
+
+    def end_step(self, call_text_parts, llm_final):
+        """Traite la fin d'un appel LLM.
+
+        Retourne (événements, groupes de tool_calls à exécuter) ; groupes None
+        si la boucle est terminée (l'événement 'final' est alors émis).
+        """
+        if llm_final is None:  # défensif : le provider émet toujours 'final'
+            llm_final = {"success": False, "usage": {}, "content": ""}
+
+        call_text = "".join(call_text_parts) or (llm_final.get("content") or "")
+        self.total_tokens += llm_final.get("usage", {}).get("total_tokens", 0)
+
+        if llm_final.get("circuit_open"):
+            from apps.ai_assistant.resilience import FALLBACK_RESPONSE_FR
+            reply = FALLBACK_RESPONSE_FR if not self.tool_results else _deterministic_summary(self.tool_results)
+            return [{"type": "text_delta", "content": reply}, self.final(reply)], None
+
+        if not llm_final.get("success"):
+            # Erreur LLM : on retombe sur le résumé déterministe des données déjà
+            # récupérées plutôt que de tout perdre.
+            reply = call_text or _deterministic_summary(self.tool_results)
+            events = [] if call_text else [{"type": "text_delta", "content": reply}]
+            return events + [self.final(reply, success=bool(self.tool_results))], None
+
+        tool_calls = llm_final.get("tool_calls")
+
+        # Réponse finale : plus aucun outil demandé. Si le texte est vide mais
+        # que des données ont été récupérées, résumé déterministe plutôt que rien.
+        if not tool_calls:
+            reply = call_text or (
+                _deterministic_summary(self.tool_results) if self.tool_results
+                else "Je n'ai pas de réponse à fournir pour le moment."
+            )
+            events = [] if call_text else [{"type": "text_delta", "content": reply}]
+            return events + [self.final(reply)], None
+
+        events = []
+        # Le texte streamé accompagnant des tool_calls est une narration :
+        # le frontend le déplace dans la timeline.
+        if call_text.strip():
+            events.append({"type": "thought", "content": call_text.strip()})
+            self.steps.append({"kind": "thought", "content": call_text.strip()})
+
+        # Message assistant au format natif Mistral (permet le chaînage).
+        import json as _json
+        import uuid as _uuid
+        assistant_tool_calls = []
+        for tc in tool_calls:
+            if not tc.get("id"):
+                tc["id"] = _uuid.uuid4().hex[:9]
+            assistant_tool_calls.append({
+                "id": tc["id"],
+                "type": "function",
+                "function": {
+                    "name": tc["function"],
+                    "arguments": tc.get("arguments_json") or _json.dumps(tc.get("arguments", {})),
+                },
+            })
+        self.messages.append({
+            "role": "assistant",
+            "content": call_text or "",
+            "tool_calls": assistant_tool_calls,
+        })
+
+        # Exécution des outils par groupes (lectures en parallèle, écritures
+        # une à une), étapes visibles côté client dans l'ordre des appels.
+        return events, _execution_groups(tool_calls)
+
+    def tool_starts(self, group):
+        labels = [_tool_label(tc.get("function", ""), tc.get("arguments", {})) for tc in group]
+        events = [
+            {"type": "tool_start", "id": tc["id"], "name": tc.get("function", ""), "label": label}
+            for tc, label in zip(group, labels)
+        ]
+        return events, labels
+
+    def record_results(self, group, labels, results):
+        """Événements des résultats d'un groupe ; (événements, boucle terminée)."""
+        events = []
+        for tc, label, result in zip(group, labels, results):
+            name = tc.get("function", "")
+            args = tc.get("arguments", {})
+            self.tool_results.append({"tool_call_id": tc["id"], "function": name, "result": result})
+            self.used_tools.append(name)
+
+            # Confirmation requise -> on suspend la boucle et on rend la main.
+            pending = self.orchestrator._maybe_pending_action(name, args, result)
+            if pending is not None:
+                from apps.ai_assistant.services.confirmation import issue_token
+                token = issue_token(pending)
+                self.steps.append({
+                    "kind": "tool", "name": name, "label": label,
+                    "success": True, "summary": "Confirmation requise",
+                })
+                events.append({"type": "tool_result", "id": tc["id"], "name": name,
+                               "success": True, "summary": "Confirmation requise"})
+                events.append(self.final(pending.summary, pending_action=pending.to_frontend(token)))
+                return events, True
+
+            summary = _tool_result_summary(result)
+            success = bool(result.get("success"))
+            self.steps.append({
+                "kind": "tool", "name": name, "label": label,
+                "success": success, "summary": summary,
+            })
+            events.append({"type": "tool_result", "id": tc["id"], "name": name,
+                           "success": success, "summary": summary})
+
+            for chart in _extract_chart(result):
+                self.charts.append(chart)
+                events.append({"type": "chart", "chart": chart})
+
+            self.messages.append({
+                "role": "tool",
+                "name": name,
+                "tool_call_id": tc["id"],
+                "content": _tool_message_content(result),
+            })
+        return events, False
+
+    def exhausted(self) -> List[Dict[str, Any]]:
+        # AGENT_MAX_STEPS épuisé sans synthèse : repli déterministe.
+        reply = _deterministic_summary(self.tool_results)
+        return [{"type": "text_delta", "content": reply}, self.final(reply)]
+
+
+def _execution_groups(tool_calls: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Découpe les tool_calls d'une étape en groupes exécutés l'un après l'autre.
+
+    Les appels en lecture seule consécutifs forment un groupe (exécuté en
+    parallèle) ; chaque appel mutant forme un groupe à lui seul, de sorte que
+    les écritures gardent l'ordre demandé et voient les lectures précédentes.
+    """
+    from apps.ai_assistant.services.registry.tool_registry import is_read_only
+
+    parallel = _max_concurrent_tools() > 1
+    groups: List[List[Dict[str, Any]]] = []
+    previous_read_only = False
+    for tc in tool_calls:
+        read_only = parallel and is_read_only(tc.get("function", ""))
+        if read_only and previous_read_only:
+            groups[-1].append(tc)
+        else:
+            groups.append([tc])
+        previous_read_only = read_only
+    return groups
+
+
 def _page_hint(page: Optional[str]) -> str:
     if not page:
         return ""
@@ -620,11 +895,24 @@ def _page_hint(page: Optional[str]) -> str:
     return ""
 
 
-def _compress_history(history: List[Dict[str, Any]], max_recent: int = 8) -> List[Dict[str, Any]]:
-    """Garde les messages récents (réutilise l'esprit de _compress_conversation_history)."""
-    if len(history) <= max_recent:
-        return history
-    return history[-max_recent:]
+def _page_domain(page: Optional[str]) -> Optional[str]:
+    if not page:
+        return None
+    for prefix, domain in PAGE_DOMAINS.items():
+        if page.startswith(prefix):
+            return domain
+    return None
+
+
+def _compress_history(history: List[Dict[str, Any]], max_recent: int = HISTORY_WINDOW) -> List[Dict[str, Any]]:
+    """Garde le résumé persisté éventuel et les messages récents.
+
+    L'historique vient de `conversation_memory.load_history` (déjà borné) ;
+    la coupe protège les appelants qui passent un historique complet.
+    """
+    summary = [m for m in history[:1] if is_summary_message(m)]
+    recent = history[len(summary):]
+    return summary + recent[-max_recent:]
 
 
 def _extract_chart(result: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -726,6 +1014,24 @@ async def _acomplete(provider, messages, tools=None, tool_choice="auto"):
     )
 
 
+async def _astream(provider, messages, tools=None, tool_choice="auto"):
+    """Flux LLM asynchrone : `provider.astream` s'il existe, sinon le flux
+    synchrone consommé événement par événement dans un thread."""
+    if hasattr(provider, "astream"):
+        async for event in provider.astream(messages, tools=tools, tool_choice=tool_choice):
+            yield event
+        return
+
+    from asgiref.sync import sync_to_async
+    iterator = iter(provider.stream(messages, tools=tools, tool_choice=tool_choice))
+    next_event = sync_to_async(next, thread_sensitive=False)
+    while True:
+        event = await next_event(iterator, None)
+        if event is None:
+            return
+        yield event
+
+
 # Instance partagée (légère ; provider/registry construits paresseusement).
 def get_orchestrator() -> Orchestrator:
     return Orchestrator()
@@ -0,0 +1,122 @@
+"""
+Cache des résultats des outils IA analytiques, versionné par organisation.
+
+`get_statistics`, `analyze_business`, `generate_visualization`... recalculent
+des agrégats coûteux (et parfois un appel LLM) à chaque appel, alors que
+l'agent les rappelle souvent dans une même conversation, et que les
+utilisateurs d'une même organisation posent les mêmes questions.
+
+Clé : outil, arguments normalisés, organisation et « data version » de
+l'organisation (`apps.analytics.stats_cache`), incrémentée après commit par
+les signaux d'écriture (factures, BC, paiements, stock, clients,
+fournisseurs, produits). Toute écriture rend les résultats précédents
+inaccessibles : pas de chiffres périmés. La durée de vie
+(`AI_TOOL_CACHE_TIMEOUT`) borne la dérive des périodes glissantes.
+
+Seuls les outils en lecture seule dont toutes les données sont suivies par
+la data version sont mis en cache (`CACHEABLE_TOOLS` du registre) ; les
+recherches (statut d'un rapport, dernière facture...) restent calculées.
+
+Compteurs de hits / misses par organisation et par outil : `get_metrics()`,
+exposés par GET /api/v1/ai/usage/tool-cache/.
+"""
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.analytics.stats_cache import STATS_CACHE_TIMEOUT, make_key
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_TIMEOUT = getattr(settings, 'AI_TOOL_CACHE_TIMEOUT', STATS_CACHE_TIMEOUT)
+
+METRICS_KEY = 'ai_tool_cache:{outcome}:{organization_id}:{name}'
+
+# Conservation des compteurs (30 jours)
+METRICS_TIMEOUT = 30 * 24 * 3600
+
+_MISSING = object()
+
+
+def _organization_id(user_ctx: Dict[str, Any]):
+    organization_id = user_ctx.get('organization_id')
+    if organization_id:
+        return organization_id
+    organization = user_ctx.get('organization')
+    return getattr(organization, 'id', None)
+
+
+def normalize_arguments(arguments: Dict[str, Any]) -> str:
+    """Représentation stable des arguments (ordre des clés, listes, valeurs vides)."""
+    cleaned = {key: value for key, value in (arguments or {}).items() if value not in (None, '', [], {})}
+    return json.dumps(cleaned, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def cache_key(name: str, arguments: Dict[str, Any], organization_id) -> str:
+    return make_key(f'ai_tool:{name}', organization_id, (normalize_arguments(arguments),))
+
+
+def _record(organization_id, name: str, outcome: str):
+    key = METRICS_KEY.format(outcome=outcome, organization_id=organization_id, name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, METRICS_TIMEOUT):
+            cache.incr(key)
+    except Exception:
+        logger.debug("Compteur %s indisponible", key)
+
+
+def lookup(name: str, arguments: Dict[str, Any], user_ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Résultat en cache pour cet appel (None si absent ou hors organisation)."""
+    organization_id = _organization_id(user_ctx)
+    if not organization_id:
+        return None
+    try:
+        result = cache.get(cache_key(name, arguments, organization_id), _MISSING)
+    except Exception:
+        logger.warning("Cache des outils IA indisponible", exc_info=True)
+        return None
+    if result is _MISSING:
+        _record(organization_id, name, 'misses')
+        return None
+    _record(organization_id, name, 'hits')
+    return result
+
+
+def store(name: str, arguments: Dict[str, Any], user_ctx: Dict[str, Any], result: Dict[str, Any]):
+    """Met en cache un résultat réussi (les erreurs sont recalculées)."""
+    organization_id = _organization_id(user_ctx)
+    if not organization_id or not result.get('success'):
+        return
+    try:
+        cache.set(cache_key(name, arguments, organization_id), result, TOOL_CACHE_TIMEOUT)
+    except Exception:
+        # Résultat non sérialisable ou cache indisponible : simple recalcul au prochain appel
+        logger.warning("Résultat de %s non mis en cache", name, exc_info=True)
+
+
+def get_metrics(organization_id) -> Dict[str, Any]:
+    """Hits / misses de l'organisation, au total et par outil."""
+    from .tool_registry import CACHEABLE_TOOLS
+
+    keys = {
+        (name, outcome): METRICS_KEY.format(outcome=outcome, organization_id=organization_id, name=name)
+        for name in sorted(CACHEABLE_TOOLS) for outcome in ('hits', 'misses')
+    }
+    values = cache.get_many(list(keys.values()))
+
+    tools = {}
+    for (name, outcome), key in keys.items():
+        tools.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = values.get(key, 0)
+    hits = sum(t['hits'] for t in tools.values())
+    misses = sum(t['misses'] for t in tools.values())
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'tools': {name: counts for name, counts in tools.items() if counts['hits'] or counts['misses']},
+    }
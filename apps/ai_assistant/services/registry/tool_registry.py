@@ -37,6 +37,8 @@ class ToolSpec:
     category: str = "general"
     needs_confirmation: bool = False
     produces_chart: bool = False
+    read_only: bool = False
+    cacheable: bool = False
     permission: Optional[str] = None
 
     def to_mistral_tool(self) -> Dict[str, Any]:
@@ -60,6 +62,7 @@ class ToolSpec:
                 "category": self.category,
                 "needsConfirmation": self.needs_confirmation,
                 "producesChart": self.produces_chart,
+                "readOnlyHint": self.read_only,
             },
         }
 
@@ -127,6 +130,42 @@ CHART_PRODUCING_ACTIONS = {
 }
 
 
+# Outils sans effet de bord (lecture seule) : l'orchestrateur exécute en
+# parallèle ceux demandés dans une même étape. Tout outil absent de ces
+# listes est considéré comme mutant et reste exécuté seul, dans l'ordre.
+READ_ONLY_PREFIXES = ("search_", "list_", "get_")
+READ_ONLY_ACTIONS = {
+    "analyze_business",
+    "generate_visualization",
+    "predict_cashflow",
+    "verify_price",
+    "three_way_match",
+}
+
+
+# Outils en lecture seule dont le résultat ne dépend que de données suivies
+# par la « data version » de l'organisation : résultats mis en cache
+# (cf. tool_cache.py).
+CACHEABLE_TOOLS = {
+    "get_statistics",
+    "get_stats",
+    "analyze_business",
+    "get_insights",
+    "get_client_stats",
+    "get_invoice_stats",
+    "get_product_stats",
+    "get_stock_stats",
+    "get_supplier_stats",
+    "generate_visualization",
+    "get_stock_alerts",
+}
+
+
+def is_read_only(name: str) -> bool:
+    """Vrai si l'outil `name` ne modifie aucune donnée."""
+    return name.startswith(READ_ONLY_PREFIXES) or name in READ_ONLY_ACTIONS
+
+
 class ToolRegistry:
     """Registre singleton des outils IA (construit paresseusement)."""
 
@@ -188,6 +227,8 @@ class ToolRegistry:
                 category=self._infer_category(name),
                 needs_confirmation=name in CONFIRMATION_REQUIRED_ACTIONS,
                 produces_chart=name in CHART_PRODUCING_ACTIONS,
+                read_only=is_read_only(name),
+                cacheable=is_read_only(name) and name in CACHEABLE_TOOLS,
             )
 
         # Garde-fou : schéma déclaré mais sans handler -> incohérence à corriger.
@@ -310,6 +351,14 @@ class ToolRegistry:
         # Coercition de types (tolérante : ne bloque pas si schéma absent)
         _, cleaned, _ = validate_tool_params(resolved, arguments)
 
+        # Outils analytiques : résultat en cache tant que les données de
+        # l'organisation n'ont pas changé.
+        if spec.cacheable:
+            from apps.ai_assistant.services.registry import tool_cache
+            cached = tool_cache.lookup(resolved, cleaned, user_ctx)
+            if cached is not None:
+                return cached
+
         try:
             result = await spec.handler(cleaned, user_ctx)
         except Exception as exc:  # pragma: no cover - robustesse runtime
@@ -322,6 +371,8 @@ class ToolRegistry:
             logger.error("Le handler %s a retourné un type non-dict : %s", resolved, type(result))
             return {"success": False, "error": "Le handler a retourné un format invalide"}
 
+        if spec.cacheable:
+            tool_cache.store(resolved, cleaned, user_ctx, result)
         return result
 
 
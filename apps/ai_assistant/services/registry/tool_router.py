@@ -0,0 +1,244 @@
+"""
+Routage des outils IA : n'envoyer au LLM que les schémas pertinents.
+
+Chaque appel LLM de l'orchestrateur transporte les schémas des ~50 outils du
+registre (~9K tokens), quelle que soit la question. Le routeur sélectionne,
+pour chaque étape, le sous-ensemble utile à partir de signaux peu coûteux
+(aucun appel LLM, aucun embedding) :
+
+  - domaines métier cités dans le message (factures, clients, stock...),
+    par mots-clés lexicaux ;
+  - intention (création / recherche / analyse), rapprochée des catégories
+    du registre (`ToolRegistry._infer_category`) ;
+  - page consultée (préfixes de `orchestrator.PAGE_HINTS`) ;
+  - outils déjà utilisés dans la conversation ou la requête en cours ;
+  - recouvrement lexical du message avec les descriptions d'outils
+    (pondéré par la rareté des mots).
+
+Si la confiance est faible (aucun domaine ni mot de description reconnu,
+sélection trop petite ou presque complète), le jeu complet est envoyé :
+le routage ne doit jamais priver le modèle de l'outil attendu.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from apps.ai_assistant.services.registry.tool_registry import ToolRegistry
+
+# Domaines métier : fragments du nom des outils et mots-clés (préfixes, sans
+# accents) qui les signalent dans le message de l'utilisateur.
+DOMAINS: Dict[str, Dict[str, tuple]] = {
+    "invoice": {
+        "fragments": ("invoice", "reminder"),
+        "keywords": ("factur", "impaye", "paiement", "payee", "encaiss", "relanc", "creance", "vente"),
+    },
+    "purchase_order": {
+        "fragments": ("purchase_order", "po_", "three_way"),
+        "keywords": ("bon de commande", "bons de commande", "commande", "bc", "achat", "reception",
+                     "livraison"),
+    },
+    "client": {
+        "fragments": ("client",),
+        "keywords": ("client",),
+    },
+    "supplier": {
+        "fragments": ("supplier",),
+        "keywords": ("fournisseur",),
+    },
+    "product": {
+        "fragments": ("product", "stock", "price"),
+        "keywords": ("produit", "article", "stock", "inventaire", "rupture", "catalogue", "prix",
+                     "tarif", "reference", "code-barre"),
+    },
+    "report": {
+        "fragments": ("report",),
+        "keywords": ("rapport", "export", "pdf", "excel", "csv"),
+    },
+    "accounting": {
+        "fragments": ("journal", "account"),
+        "keywords": ("compta", "ecriture", "journal", "compte", "debit", "credit", "bilan", "grand livre"),
+    },
+    "quote": {
+        "fragments": ("quote",),
+        "keywords": ("devis", "proforma", "pro forma"),
+    },
+    "cashflow": {
+        "fragments": ("cashflow",),
+        "keywords": ("tresorerie", "cash", "flux", "prevision", "predi", "liquidit"),
+    },
+    "analytics": {
+        "fragments": ("stats", "statistics", "analyze", "insights", "visualization", "predict"),
+        "keywords": ("statist", "analys", "graph", "visualis", "courbe", "evolution", "tendance",
+                     "tableau de bord", "dashboard", "kpi", "insight", "recommand", "performance",
+                     "activite", "chiffre d'affaires", "tresorerie", "combien", "top", "meilleur"),
+    },
+}
+
+# Intentions -> catégories du registre (`ToolRegistry._infer_category`)
+INTENTS: Dict[str, tuple] = {
+    "crud": ("cree", "creer", "ajout", "nouveau", "nouvel", "enregistr", "modifi", "mets a jour",
+             "mettre a jour", "supprim", "envoi", "envoy", "ajust", "annul"),
+    "search": ("cherch", "trouv", "list", "affich", "montre", "voir", "dernier", "derniere"),
+    "analytics": ("statist", "analys", "graph", "evolution", "tendance", "combien", "total",
+                  "moyen", "top", "meilleur", "previs"),
+}
+
+# Toujours proposés (schémas courts, utiles quel que soit le sujet)
+CORE_TOOLS = {"search_entity", "undo_last_action"}
+
+# Score minimal d'un outil pour être retenu
+MIN_SCORE = 3
+
+# En dessous de ce nombre d'outils retenus (hors outils de base), ou au-delà
+# de cette part du jeu complet, on envoie tout
+MIN_SELECTED = 1
+MAX_SELECTED_RATIO = 0.8
+
+# Somme minimale des poids (idf) des mots partagés avec la description
+LEXICAL_MIN = 3.0
+
+_STOPWORDS = {
+    "avec", "dans", "pour", "sont", "mais", "donc", "cette", "celui", "celle", "quel", "quels",
+    "quelle", "quelles", "tous", "toutes", "tout", "faire", "fais", "peux", "veux", "voudrais",
+    "merci", "bonjour", "aussi", "plus", "moins", "entre", "depuis", "leur", "leurs", "notre",
+    "votre", "utilise", "utiliser", "fonction", "important",
+}
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    """Minuscules, sans accents (« Évolution » -> « evolution »)."""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _stems(text: str) -> Set[str]:
+    """Racines grossières (5 caractères) des mots significatifs."""
+    return {
+        word[:5] for word in _WORD.findall(_normalize(text))
+        if len(word) >= 4 and word not in _STOPWORDS
+    }
+
+
+def _mentions(text: str, keywords: Iterable[str]) -> bool:
+    """Vrai si un mot du texte commence par un des mots-clés (ou contient l'expression)."""
+    for keyword in keywords:
+        if " " in keyword or "-" in keyword or "'" in keyword:
+            if keyword in text:
+                return True
+        elif re.search(rf"\b{re.escape(keyword)}", text):
+            return True
+    return False
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Estimation grossière (~4 caractères par token) de la taille d'un schéma."""
+    return len(json.dumps(payload, ensure_ascii=False)) // 4
+
+
+def tool_domains(name: str) -> Set[str]:
+    return {domain for domain, rule in DOMAINS.items()
+            if any(fragment in name for fragment in rule["fragments"])}
+
+
+def tools_used_in_history(history: Optional[List[Dict[str, Any]]]) -> List[str]:
+    """Noms des outils exécutés dans les messages précédents (metadata)."""
+    names = []
+    for message in history or []:
+        metadata = message.get("metadata") or {}
+        if not isinstance(metadata, dict):
+            continue
+        for result in metadata.get("action_results") or []:
+            if isinstance(result, dict) and result.get("function"):
+                names.append(result["function"])
+    return names
+
+
+@dataclass
+class ToolSelection:
+    """Outils envoyés pour un appel LLM et économie réalisée."""
+    tools: List[Dict[str, Any]]
+    routed: bool
+    sent_tokens: int
+    full_tokens: int
+    domains: List[str] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.full_tokens - self.sent_tokens
+
+
+class ToolRouter:
+    """Sélectionne les outils pertinents parmi un jeu complet au format Mistral."""
+
+    def __init__(self, tools: List[Dict[str, Any]]):
+        self.tools = tools
+        self.full_tokens = estimate_tokens(tools)
+        functions = [t.get("function", {}) for t in tools]
+        self._names = [fn.get("name", "") for fn in functions]
+        self._domains = {name: tool_domains(name) for name in self._names}
+        self._stems = {
+            fn.get("name", ""): _stems(f"{fn.get('description', '')} {fn.get('name', '').replace('_', ' ')}")
+            for fn in functions
+        }
+        document_frequency: Dict[str, int] = {}
+        for stems in self._stems.values():
+            for stem in stems:
+                document_frequency[stem] = document_frequency.get(stem, 0) + 1
+        count = max(1, len(tools))
+        self._idf = {stem: math.log(count / df) for stem, df in document_frequency.items()}
+
+    def full(self) -> ToolSelection:
+        return ToolSelection(self.tools, False, self.full_tokens, self.full_tokens)
+
+    def select(self, message: str, page_domain: Optional[str] = None,
+               used_tools: Iterable[str] = ()) -> ToolSelection:
+        text = _normalize(message)
+        mentioned = {domain for domain, rule in DOMAINS.items() if _mentions(text, rule["keywords"])}
+        intents = {category for category, keywords in INTENTS.items() if _mentions(text, keywords)}
+        used = set(used_tools)
+        used_domains = set().union(*(tool_domains(name) for name in used)) if used else set()
+        message_stems = _stems(message)
+
+        scores = {}
+        lexical_hit = False
+        for name in self._names:
+            domains = self._domains[name]
+            score = 0
+            if domains & mentioned:
+                score += 3
+            if page_domain and page_domain in domains:
+                score += 1
+            if name in used:
+                score += 2
+            elif domains & used_domains:
+                score += 1
+            if ToolRegistry._infer_category(name) in intents:
+                score += 1
+            if sum(self._idf.get(stem, 0) for stem in message_stems & self._stems[name]) >= LEXICAL_MIN:
+                score += 2
+                lexical_hit = True
+            scores[name] = score
+
+        # Confiance faible : le message ne cite aucun domaine ni vocabulaire d'outil
+        if not mentioned and not lexical_hit:
+            return self.full()
+
+        selected = {name for name, score in scores.items() if score >= MIN_SCORE}
+        if len(selected - CORE_TOOLS) < MIN_SELECTED or len(selected) >= MAX_SELECTED_RATIO * len(self._names):
+            return self.full()
+
+        selected |= CORE_TOOLS
+        tools = [t for t, name in zip(self.tools, self._names) if name in selected]
+        return ToolSelection(
+            tools=tools,
+            routed=True,
+            sent_tokens=estimate_tokens(tools),
+            full_tokens=self.full_tokens,
+            domains=sorted(mentioned),
+        )
@@ -429,20 +429,9 @@ class AdvancedAIActions:
             if not api_key:
                 return None
 
-            # Support mistralai v2.0+, v1.0+ and older versions
-            try:
-                from mistralai.client import Mistral
-                client = Mistral(api_key=api_key)
-            except ImportError:
-                try:
-                    from mistralai import Mistral
-                    client = Mistral(api_key=api_key)
-                except ImportError:
-                    # Fallback for older versions of mistralai (v0.x)
-                    from mistralai.client import MistralClient
-                    client = MistralClient(api_key=api_key)
-
-            response = client.chat.complete(
+            from apps.ai_assistant.services.llm.client_manager import get_client_manager
+            response = get_client_manager().complete(
+                api_key=api_key,
                 model="mistral-large-latest",
                 messages=[{
                     "role": "user",
@@ -0,0 +1,48 @@
+"""
+Signaux de l'assistant IA : maintien de l'index de candidats du matching
+d'entités (voir candidate_index.py).
+"""
+from functools import partial
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import Client
+from apps.invoicing.models import Product
+from apps.suppliers.models import Supplier
+
+from .candidate_index import ENTITY_FIELDS, update_entity
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = {Client: 'client', Supplier: 'supplier', Product: 'product'}
+
+
+def _apply_after_commit(entity_type, organization_id, pk, row):
+    try:
+        update_entity(entity_type, organization_id, pk, row)
+    except Exception:
+        logger.exception("Échec mise à jour de l'index de candidats (%s %s)", entity_type, pk)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Product)
+def index_entity_on_save(sender, instance, update_fields=None, **kwargs):
+    entity_type = ENTITY_TYPES[sender]
+    # Sauvegarde partielle sans champ indexé (ex. stock_quantity à chaque
+    # mouvement de stock) : ne pas faire reconstruire l'index des autres processus
+    if update_fields is not None and not set(update_fields) & {*ENTITY_FIELDS[entity_type], 'organization'}:
+        return
+    row = {field: getattr(instance, field, '') or '' for field in ENTITY_FIELDS[entity_type]}
+    transaction.on_commit(partial(_apply_after_commit, entity_type, instance.organization_id, instance.pk, row))
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Product)
+def unindex_entity_on_delete(sender, instance, **kwargs):
+    entity_type = ENTITY_TYPES[sender]
+    transaction.on_commit(partial(_apply_after_commit, entity_type, instance.organization_id, instance.pk, None))
@@ -102,3 +102,25 @@ def cleanup_old_conversations():
     logger.info(
         f'cleanup_old_conversations: {archived} archived, {deleted} messages deleted'
     )
+
+
+@shared_task(name='ai_assistant.update_conversation_summary')
+def update_conversation_summary(conversation_id):
+    """Met à jour le résumé glissant d'une conversation longue."""
+    from .models import Conversation
+    from .services.conversation_memory import update_summary
+
+    try:
+        update_summary(conversation_id)
+    except Conversation.DoesNotExist:
+        logger.info(f'update_conversation_summary: conversation {conversation_id} supprimée')
+
+
+@shared_task(name='ai_assistant.flush_ai_usage_events')
+def flush_ai_usage_events():
+    """Écrit en base les événements d'utilisation IA en attente (par lots)."""
+    from .usage_events import flush
+
+    written = flush()
+    if written:
+        logger.info(f'flush_ai_usage_events: {written} événements écrits')
@@ -8,6 +8,17 @@ from apps.invoicing.models import Invoice, Product
 from apps.ai_assistant.services import ActionExecutor, AsyncSafeUserContext
 
 
+@pytest.fixture(autouse=True)
+def usage_events_buffer(settings):
+    """Journal d'utilisation IA : pas de thread de fond, file vidée entre les tests"""
+    from apps.ai_assistant import usage_events
+
+    settings.AI_USAGE_FLUSH_INTERVAL = 0
+    buffer = usage_events._local_buffer
+    yield buffer
+    buffer.claim(buffer.pending())
+
+
 @pytest.fixture
 def organization(db):
     """Organisation de test"""
@@ -0,0 +1,195 @@
+"""
+Tests de la détection de doublons en masse (bulk_dedup) :
+- scores matriciels alignés sur EnhancedEntityMatcher
+- doublons contre l'existant et à l'intérieur du lot
+- import Excel/CSV et liste des imports IA à valider
+"""
+import random
+import string
+import time
+import pandas as pd
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import Client, Organization, User
+from apps.ai_assistant.bulk_dedup import BulkDeduplicator, similarity_matrix
+from apps.ai_assistant.entity_matcher import EnhancedEntityMatcher
+from apps.data_migration.importers import ExcelCSVImporter
+from apps.data_migration.models import MigrationJob, MigrationLog
+from apps.suppliers.models import Supplier
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Dedup Org")
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="dedup_user",
+        email="dedup@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+class TestSimilarityMatrix:
+
+    def test_matches_single_record_scoring(self):
+        matcher = EnhancedEntityMatcher()
+        queries = ["gerard dupont", "acme", "tech solutions", "societe generale"]
+        choices = ["gerard dupond", "acme corporation", "solutions tech", "generale societe", "zzz"]
+        matrix = similarity_matrix(queries, choices)
+
+        for i, query in enumerate(queries):
+            for j, choice in enumerate(choices):
+                expected = matcher.calculate_multi_algorithm_score(query, choice, use_phonetic=False)
+                assert matrix[i, j] == pytest.approx(expected['weighted_average'], abs=0.01)
+
+    def test_empty_texts_never_match(self):
+        matrix = similarity_matrix(["", "abc"], ["abc", ""])
+        assert matrix[0].max() == 0
+        assert matrix[:, 1].max() == 0
+
+
+@pytest.mark.django_db
+class TestBulkDeduplicator:
+
+    def test_existing_and_batch_duplicates(self, organization):
+        acme = Supplier.objects.create(name="ACME Corporation", email="info@acme.cm", organization=organization)
+        kribi = Supplier.objects.create(name="Kribi Logistique SARL", phone="+237 699 00 11 22", organization=organization)
+        Supplier.objects.create(name="Douala Peche", organization=Organization.objects.create(name="Autre"))
+
+        result = BulkDeduplicator('supplier', organization).run([
+            {'name': "Nouveau Fournisseur", 'email': "INFO@acme.cm"},   # 0 : email existant
+            {'name': "Kribi Logistique"},                               # 1 : nom (suffixe légal ignoré)
+            {'name': "Douala Peche"},                                   # 2 : autre organisation
+            {'name': "Limbe Maritime", 'phone': "677 12 34 56"},        # 3
+            None,                                                       # 4 : ligne ignorée
+            {'name': "Limbe Maritime SARL"},                            # 5 : doublon de 3
+            {'name': "Autre", 'phone': "677123456"},                    # 6 : même téléphone que 3
+        ])
+
+        assert result.existing[0].entity_id == acme.id
+        assert result.existing[0].matched_on == 'email_exact'
+        assert result.existing[1].entity_id == kribi.id
+        assert 2 not in result.existing and 3 not in result.existing
+        assert result.clusters == [[3, 5, 6]]
+        assert result.duplicate_of(5) == 3
+        assert result.duplicate_of(3) is None
+
+    def test_large_batch_is_fast(self, organization):
+        rng = random.Random(42)
+
+        def random_name():
+            return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(2))
+
+        existing = [{'id': i, 'name': random_name(), 'email': '', 'phone': ''} for i in range(3000)]
+        records = [{'name': random_name()} for i in range(3000)]
+        records[100] = {'name': existing[42]['name'].upper() + " SARL"}
+
+        start = time.time()
+        result = BulkDeduplicator('supplier', organization).run(records, existing=existing)
+        assert time.time() - start < 30
+        assert result.existing[100].entity_id == 42
+
+
+@pytest.mark.django_db
+class TestImporterDeduplication:
+
+    def make_job(self, user, **kwargs):
+        return MigrationJob.objects.create(
+            name="Import fournisseurs",
+            source_type='excel',
+            entity_type='suppliers',
+            field_mapping={'Nom': 'name', 'Email': 'email'},
+            created_by=user,
+            **kwargs
+        )
+
+    def test_skips_existing_and_in_file_duplicates(self, user, organization):
+        Supplier.objects.create(name="ACME Corporation", email="info@acme.cm", organization=organization)
+        job = self.make_job(user)
+        df = pd.DataFrame([
+            {'Nom': "ACME Corp", 'Email': "info@acme.cm"},
+            {'Nom': "Kribi Logistique", 'Email': None},
+            {'Nom': "Kribi Logistique SARL", 'Email': None},
+            {'Nom': "Limbe Maritime", 'Email': None},
+        ])
+
+        importer = ExcelCSVImporter(job)
+        importer.import_suppliers(df)
+
+        assert importer.success_count == 2
+        assert importer.skipped_count == 2
+        assert set(Supplier.objects.filter(organization=organization).values_list('name', flat=True)) == {
+            "ACME Corporation", "Kribi Logistique", "Limbe Maritime",
+        }
+        messages = list(MigrationLog.objects.filter(job=job, level='warning').values_list('message', flat=True))
+        assert "Fournisseur existe déjà" in messages
+        assert "Fournisseur en double dans le fichier (ligne 2)" in messages
+
+    def test_update_existing(self, user, organization):
+        acme = Supplier.objects.create(name="ACME Corporation", email="info@acme.cm", organization=organization)
+        job = self.make_job(user, update_existing=True)
+        df = pd.DataFrame([{'Nom': "ACME Corporation SA", 'Email': "info@acme.cm"}])
+
+        ExcelCSVImporter(job).import_suppliers(df)
+
+        acme.refresh_from_db()
+        assert acme.name == "ACME Corporation SA"
+        assert Supplier.objects.filter(organization=organization).count() == 1
+
+    def test_fuzzy_match_is_not_updated(self, user, organization):
+        kribi = Supplier.objects.create(name="Transports Kribi Logistique", email="a@kribi.cm",
+                                        organization=organization)
+        job = self.make_job(user, update_existing=True)
+        df = pd.DataFrame([
+            {'Nom': "Transport Kribi Logistiques", 'Email': "b@kribi.cm"},
+            {'Nom': "Transports Kribi Logistique SARL", 'Email': "a@kribi.cm"},
+        ])
+
+        importer = ExcelCSVImporter(job)
+        importer.import_suppliers(df)
+
+        kribi.refresh_from_db()
+        # Seule la ligne identique (email, nom normalisé) met à jour le fournisseur
+        assert kribi.name == "Transports Kribi Logistique SARL"
+        assert kribi.email == "a@kribi.cm"
+        assert importer.skipped_count == 1
+        warning = MigrationLog.objects.get(job=job, level='warning')
+        assert warning.row_number == 1
+        assert "approximative" in warning.message
+
+
+@pytest.mark.django_db
+class TestImportReviewCounterparties:
+
+    def test_list_annotates_matches(self, user, organization):
+        from apps.ai_assistant.models import ImportReview
+        from apps.ai_assistant.views import ImportReviewListView
+
+        client = Client.objects.create(name="Brasseries du Cameroun", organization=organization)
+        first = ImportReview.objects.create(
+            user=user, organization=organization, entity_type='invoice',
+            extracted_data={'client_name': "Brasseries du Cameroun SA"},
+        )
+        other = ImportReview.objects.create(
+            user=user, organization=organization, entity_type='purchase_order',
+            extracted_data={'supplier_name': "Kribi Logistique"},
+        )
+        again = ImportReview.objects.create(
+            user=user, organization=organization, entity_type='purchase_order',
+            extracted_data={'supplier_name': "Kribi Logistique SARL"},
+        )
+
+        request = APIRequestFactory().get('/api/v1/ai/import-reviews/')
+        force_authenticate(request, user=user)
+        response = ImportReviewListView.as_view()(request)
+
+        reviews = {review['id']: review for review in response.data['reviews']}
+        assert reviews[str(first.id)]['counterparty_match']['id'] == str(client.id)
+        assert reviews[str(other.id)]['counterparty_match'] is None
+        # Liste triée du plus récent au plus ancien : `again` vient en premier
+        assert reviews[str(other.id)]['same_counterparty_as'] == str(again.id)
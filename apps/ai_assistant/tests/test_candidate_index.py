@@ -0,0 +1,165 @@
+"""
+Tests de l'index de candidats du matching d'entités (candidate_index) :
+- mêmes résultats qu'un parcours complet, en scorant une liste réduite
+- maintenance par signaux (création, renommage, suppression)
+- invalidation entre processus (version partagée) et éviction LRU
+"""
+import itertools
+import pytest
+from django.core.cache import cache
+
+from apps.accounts.models import Client, Organization
+from apps.ai_assistant import candidate_index
+from apps.ai_assistant.entity_matcher import EnhancedEntityMatcher
+from apps.invoicing.models import Product
+from apps.suppliers.models import Supplier
+
+FIRST_WORDS = ["Alpha", "Bravo", "Congo", "Douala", "Etoile", "Faro", "Garoua", "Horizon", "Ivoire", "Jade"]
+SECOND_WORDS = ["Transport", "Negoce", "Batiment", "Informatique", "Agro", "Peche", "Energie", "Textile"]
+SUFFIXES = ["SARL", "SA", "Services"]
+
+
+@pytest.fixture(autouse=True)
+def clean_indexes(monkeypatch):
+    # Petit seuil pour tester le blocage sans créer des milliers de lignes
+    monkeypatch.setattr(candidate_index, 'FULL_SCAN_LIMIT', 20)
+    candidate_index._indexes.clear()
+    cache.clear()
+    yield
+    candidate_index._indexes.clear()
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Index Org")
+
+
+@pytest.fixture
+def suppliers(organization):
+    names = [
+        f"{first} {second} {suffix}"
+        for first, second, suffix in itertools.product(FIRST_WORDS, SECOND_WORDS, SUFFIXES)
+    ]
+    Supplier.objects.bulk_create([
+        Supplier(name=name, email=f"contact{i}@example.com", organization=organization)
+        for i, name in enumerate(names)
+    ])
+    # Même nom dans une autre organisation : jamais retourné
+    other = Organization.objects.create(name="Autre Org")
+    Supplier.objects.create(name="Douala Transport SARL", organization=other)
+    return names
+
+
+def full_scan(matcher, organization, **query):
+    """Référence : tout le référentiel scoré, filtré par organisation"""
+    return [
+        (entity.pk, round(score, 6))
+        for entity, score, _ in matcher.find_similar_suppliers(**query)
+        if entity.organization_id == organization.id
+    ]
+
+
+@pytest.mark.django_db
+class TestCandidateIndex:
+
+    @pytest.mark.parametrize('query', [
+        {'name': "Douala Transport"},
+        {'name': "Doula Transprot SARL"},
+        {'name': "Transport Douala"},
+        {'name': "Garoua"},
+        {'name': "Jade Textile Services"},
+        {'name': "Inconnu", 'email': "contact42@example.com"},
+    ])
+    def test_matches_full_scan(self, organization, suppliers, query):
+        matcher = EnhancedEntityMatcher(threshold=0.50)
+        indexed = [
+            (entity.pk, round(score, 6))
+            for entity, score, _ in matcher.find_similar_suppliers(organization=organization, **query)
+        ]
+        reference = full_scan(matcher, organization, **query)
+
+        assert indexed
+        # Scores identiques, même ordre : la liste réduite est un sous-ensemble
+        assert indexed == [match for match in reference if match in indexed]
+        # Seules des correspondances faibles (bruit du score combiné) peuvent
+        # être écartées par le blocage
+        assert all(match in indexed for match in reference if match[1] >= 0.6)
+
+    def test_shortlist_is_small(self, organization, suppliers):
+        index = candidate_index.get_index('supplier', organization.id)
+        assert len(index) == len(suppliers)
+
+        shortlist = index.shortlist(texts=["Douala Transport SARL"])
+        assert 0 < len(shortlist) < len(suppliers) / 2
+        exact = index.shortlist(exact={'email': "CONTACT7@example.com"})
+        assert len(exact) == 1
+
+    def test_product_keywords_use_prefixes(self, organization):
+        Product.objects.bulk_create([
+            Product(name=f"Article {i}", reference=f"REF-{i:04d}", price=1, organization=organization,
+                    description="ordinateur portable" if i == 5 else "fourniture de bureau")
+            for i in range(40)
+        ])
+        matcher = EnhancedEntityMatcher(threshold=0.50)
+        matches = matcher.find_similar_products(name="ordi", organization=organization)
+        assert [p.reference for p, _, _ in matches][:1] == ["REF-0005"]
+
+        matches = matcher.find_similar_products(name="x", reference="ref-0012", organization=organization)
+        assert matches[0][0].reference == "REF-0012"
+
+
+@pytest.mark.django_db
+class TestIndexMaintenance:
+
+    def test_signals_update_loaded_index(self, organization, suppliers, django_capture_on_commit_callbacks):
+        matcher = EnhancedEntityMatcher(threshold=0.80)
+        index = candidate_index.get_index('supplier', organization.id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            created = Supplier.objects.create(name="Kribi Logistique", organization=organization)
+        assert candidate_index.get_index('supplier', organization.id) is index
+        assert matcher.find_similar_suppliers("Kribi Logistique", organization=organization)[0][0] == created
+
+        with django_capture_on_commit_callbacks(execute=True):
+            created.name = "Limbe Maritime"
+            created.save()
+        assert not matcher.find_similar_suppliers("Kribi Logistique", organization=organization)
+        assert matcher.find_similar_suppliers("Limbe Maritime", organization=organization)[0][0] == created
+
+        with django_capture_on_commit_callbacks(execute=True):
+            created.delete()
+        assert str(created.pk) not in index.entries
+        assert candidate_index.get_index('supplier', organization.id) is index
+
+    def test_stock_update_does_not_bump_version(self, organization, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            product = Product.objects.create(name="Ciment", reference="CIM-1", price=10, organization=organization)
+        version = cache.get(candidate_index._version_key('product', organization.id))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product.stock_quantity = 42
+            product.save(update_fields=['stock_quantity'])
+
+        assert cache.get(candidate_index._version_key('product', organization.id)) == version
+
+    def test_other_process_change_triggers_rebuild(self, organization, suppliers):
+        index = candidate_index.get_index('supplier', organization.id)
+        # Un autre worker a modifié un fournisseur : seule la version partagée change
+        candidate_index._bump_version('supplier', organization.id)
+        rebuilt = candidate_index.get_index('supplier', organization.id)
+        assert rebuilt is not index
+        assert len(rebuilt) == len(index)
+
+    def test_lru_eviction(self, organization, monkeypatch):
+        monkeypatch.setattr(candidate_index, 'MAX_INDEXES', 2)
+        Client.objects.create(name="Client A", organization=organization)
+
+        candidate_index.get_index('client', organization.id)
+        candidate_index.get_index('supplier', organization.id)
+        candidate_index.get_index('client', organization.id)
+        candidate_index.get_index('product', organization.id)
+
+        assert list(candidate_index._indexes) == [
+            ('client', str(organization.id)),
+            ('product', str(organization.id)),
+        ]
@@ -5,12 +5,16 @@ Le provider LLM est scripté (aucun appel réseau). On vérifie :
 - l'authentification et la validation d'entrée,
 - le framing SSE (data: {...}\n\n) et la séquence d'événements,
 - l'événement terminal 'done' (contrat unifié identique à ChatView),
-- la persistance des messages + de la trace agent (metadata.agent_steps).
+- la persistance des messages + de la trace agent (metadata.agent_steps),
+- sous ASGI, le flux servi par un générateur asynchrone (arun_stream).
 """
 import json
 import pytest
 from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, override_settings
+
 from apps.ai_assistant.services.orchestrator import Orchestrator
 
 
@@ -193,3 +197,64 @@ class TestChatStreamView:
         events = _read_events(response)
         assert events[-1]['type'] == 'error'
         assert events[-1]['message']
+
+
+def _read_async_events(response):
+    """Variante ASGI : contenu streamé par un itérateur asynchrone."""
+    async def collect():
+        return [chunk async for chunk in response.streaming_content]
+
+    body = b"".join(async_to_sync(collect)()).decode('utf-8')
+    return [json.loads(block[6:]) for block in body.split('\n\n') if block.startswith('data: ')]
+
+
+@pytest.mark.django_db
+class TestChatStreamViewAsgi:
+    """Sous ASGI, le flux est servi par un générateur asynchrone (arun_stream)."""
+
+    def post(self, user, message, **settings_overrides):
+        client = AsyncClient()
+        client.force_login(user)
+
+        async def post():
+            return await client.post(URL, data=json.dumps({'message': message}),
+                                     content_type='application/json')
+
+        with override_settings(**settings_overrides):
+            return async_to_sync(post)()
+
+    def test_async_stream_persists_steps(self, user):
+        from apps.ai_assistant.models import Message
+
+        scripts = [
+            [{"type": "delta", "content": "Je consulte vos factures."},
+             _final("Je consulte vos factures.", tool_calls=[
+                 {"id": "tc1", "function": "search_invoice", "arguments": {}, "arguments_json": "{}"}])],
+            [{"type": "delta", "content": "Vous avez 2 factures en retard."},
+             _final("Vous avez 2 factures en retard.", tokens=7)],
+        ]
+        registry_results = {"search_invoice": {"success": True, "message": "2 factures", "data": {}}}
+
+        with patch_stream_orchestrator(scripts, registry_results), \
+                patch('apps.ai_assistant.views.token_monitor.track_usage') as track:
+            response = self.post(user, 'Mes retards ?')
+            assert response.status_code == 200
+            assert response.is_async
+            events = _read_async_events(response)
+
+        assert [e['type'] for e in events] == [
+            'status', 'text_delta', 'thought', 'tool_start', 'tool_result',
+            'status', 'text_delta', 'done',
+        ]
+        done = events[-1]
+        assert done['reply'] == "Vous avez 2 factures en retard."
+        assert Message.objects.get(id=done['message']['id']).metadata['agent_steps'][1]['name'] == 'search_invoice'
+        assert track.call_args.kwargs['tokens_used'] == 17
+
+    def test_async_streaming_can_be_disabled(self, user):
+        scripts = [[{"type": "delta", "content": "Bonjour."}, _final("Bonjour.")]]
+        with patch_stream_orchestrator(scripts):
+            response = self.post(user, 'Salut', AI_ASYNC_STREAMING=False)
+            assert not response.is_async
+            events = _read_events(response)
+        assert events[-1]['reply'] == "Bonjour."
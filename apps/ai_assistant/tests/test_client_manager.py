@@ -0,0 +1,156 @@
+"""
+Tests du gestionnaire de clients Mistral (services/llm/client_manager.py) :
+- réutilisation du client SDK et du pool HTTP
+- client asynchrone propre à chaque boucle d'événements
+- limite d'appels simultanés par modèle, commune aux appels sync et async
+- circuit breaker intégré aux appels protégés
+"""
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+
+from apps.ai_assistant.services.llm.client_manager import (
+    LLMClientManager,
+    LLMConcurrencyLimitError,
+    LLMUnavailableError,
+)
+
+pytest.importorskip("mistralai")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def manager():
+    return LLMClientManager()
+
+
+class TestClients:
+
+    def test_sync_client_is_shared(self, manager):
+        first = manager.client("key-a")
+
+        assert manager.client("key-a") is first
+        assert manager.client("key-b") is not first
+        # Un seul pool HTTP pour tous les clients synchrones
+        assert manager._http_client is not None
+        assert len(manager._clients) == 2
+
+    def test_missing_key_raises(self, manager, settings, monkeypatch):
+        settings.MISTRAL_API_KEY = ''
+        monkeypatch.delenv('MISTRAL_API_KEY', raising=False)
+
+        with pytest.raises(ValueError):
+            manager.client()
+
+    def test_async_client_per_event_loop(self, manager):
+        async def get_client():
+            return manager.async_client("key-a"), manager.async_client("key-a")
+
+        first, same = asyncio.run(get_client())
+        other, _ = asyncio.run(get_client())
+
+        assert first is same
+        assert other is not first
+
+
+class TestConcurrencyLimit:
+
+    @pytest.fixture(autouse=True)
+    def limits(self, settings):
+        settings.AI_MODEL_CONCURRENCY = {'slow-model': 1}
+        settings.AI_LLM_QUEUE_TIMEOUT = 0.1
+
+    def test_limit_per_model(self, manager):
+        with manager.limit('slow-model'):
+            with pytest.raises(LLMConcurrencyLimitError):
+                with manager.limit('slow-model'):
+                    pass
+            # Les autres modèles gardent la limite par défaut
+            with manager.limit('other-model'):
+                pass
+
+        with manager.limit('slow-model'):
+            pass
+
+    def test_async_limit_shares_sync_slots(self, manager):
+        released = threading.Event()
+        acquired = threading.Event()
+
+        def hold_slot():
+            with manager.limit('slow-model'):
+                acquired.set()
+                released.wait(5)
+
+        worker = threading.Thread(target=hold_slot)
+        worker.start()
+        acquired.wait(5)
+
+        async def try_async():
+            async with manager.alimit('slow-model'):
+                pass
+
+        try:
+            with pytest.raises(LLMConcurrencyLimitError):
+                asyncio.run(try_async())
+        finally:
+            released.set()
+            worker.join(5)
+
+        asyncio.run(try_async())
+
+
+@pytest.mark.django_db
+class TestGuardedCalls:
+
+    def test_complete_uses_shared_client(self, manager):
+        client = MagicMock()
+        client.chat.complete.return_value = "réponse"
+
+        with patch.object(manager, 'client', return_value=client):
+            assert manager.complete(model='m', messages=[]) == "réponse"
+
+        client.chat.complete.assert_called_once_with(model='m', messages=[])
+
+    def test_open_breaker_rejects_call(self, manager):
+        client = MagicMock()
+        with patch('apps.ai_assistant.resilience._check_circuit_breaker', return_value=False), \
+                patch.object(manager, 'client', return_value=client):
+            with pytest.raises(LLMUnavailableError):
+                manager.complete(model='m', messages=[])
+
+        client.chat.complete.assert_not_called()
+
+    def test_failures_and_successes_are_recorded(self, manager):
+        with patch('apps.ai_assistant.resilience._record_failure') as failure, \
+                patch('apps.ai_assistant.resilience._record_success') as success:
+            with pytest.raises(RuntimeError):
+                with manager.guarded('m'):
+                    raise RuntimeError("HTTP 503")
+            failure.assert_called_once()
+            success.assert_not_called()
+
+            with manager.guarded('m'):
+                pass
+            success.assert_called_once()
+
+    def test_acomplete(self, manager):
+        client = MagicMock()
+
+        async def complete_async(**kwargs):
+            return kwargs
+
+        client.chat.complete_async = complete_async
+
+        with patch.object(manager, 'async_client', return_value=client):
+            result = asyncio.run(manager.acomplete(model='m', messages=[]))
+
+        assert result == {'model': 'm', 'messages': []}
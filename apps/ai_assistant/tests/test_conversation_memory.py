@@ -0,0 +1,174 @@
+"""
+Tests de la mémoire des conversations (services/conversation_memory.py) :
+- historique borné « résumé + messages récents » en une requête
+- planification de la mise à jour du résumé (seuil, après commit, sans doublon)
+- mise à jour incrémentale du résumé (LLM et repli extractif)
+- résumé intégré au prompt système de l'orchestrateur
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.ai_assistant.models import Conversation, Message
+from apps.ai_assistant.services import conversation_memory
+from apps.ai_assistant.services.conversation_memory import (
+    HISTORY_WINDOW,
+    RECENT_MESSAGES,
+    load_history,
+    schedule_summary_update,
+    update_summary,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def conversation(user, organization):
+    return Conversation.objects.create(user=user, organization=organization, title="Longue conversation")
+
+
+def add_messages(conversation, count, start=0):
+    base = timezone.now() - timedelta(hours=1)
+    for i in range(start, start + count):
+        message = Message.objects.create(
+            conversation=conversation,
+            role='user' if i % 2 == 0 else 'assistant',
+            content=f"Message {i}",
+            metadata={'action_results': [{'function': 'create_invoice'}]} if i == 1 else None,
+        )
+        Message.objects.filter(pk=message.pk).update(created_at=base + timedelta(seconds=i))
+
+
+class FakeProvider:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def complete(self, messages, **kwargs):
+        FakeProvider.prompt = messages[-1]['content']
+        return {'success': True, 'content': "Facture FAC-001 créée pour Acme.", 'circuit_open': False,
+                'usage': {'total_tokens': 42}}
+
+
+@pytest.mark.django_db
+class TestLoadHistory:
+
+    def test_bounded_window_in_one_query(self, conversation, django_assert_num_queries):
+        add_messages(conversation, 60)
+
+        with django_assert_num_queries(1):
+            history = load_history(conversation)
+
+        assert len(history) == HISTORY_WINDOW
+        # Le dernier message (tour en cours) est exclu
+        assert history[-1]['content'] == "Message 58"
+        assert history[0]['content'] == f"Message {59 - HISTORY_WINDOW}"
+
+    def test_summary_replaces_folded_messages(self, conversation):
+        add_messages(conversation, 10)
+        folded = Message.objects.filter(conversation=conversation).order_by('created_at')[5]
+        conversation.summary = "Acme a demandé un devis."
+        conversation.summarized_until = folded.created_at
+        conversation.save()
+
+        history = load_history(conversation)
+
+        assert history[0]['role'] == 'system'
+        assert "Acme a demandé un devis." in history[0]['content']
+        assert [m['content'] for m in history[1:]] == ["Message 6", "Message 7", "Message 8"]
+
+
+@pytest.mark.django_db
+class TestSummaryUpdate:
+
+    def test_scheduled_after_commit_once(self, conversation, django_capture_on_commit_callbacks):
+        add_messages(conversation, HISTORY_WINDOW - 1)
+        with patch('apps.ai_assistant.tasks.update_conversation_summary.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                assert not schedule_summary_update(conversation)
+
+            add_messages(conversation, 1, start=HISTORY_WINDOW - 1)
+            with django_capture_on_commit_callbacks(execute=True):
+                assert schedule_summary_update(conversation)
+                assert not delay.called
+                # Déjà planifiée : pas de second envoi
+                assert not schedule_summary_update(conversation)
+
+        delay.assert_called_once_with(str(conversation.pk))
+
+    def test_scheduled_by_websocket_consumer(self, conversation, django_capture_on_commit_callbacks):
+        pytest.importorskip("channels")
+        from asgiref.sync import async_to_sync
+        from apps.ai_assistant.consumers import AIChatConsumer
+
+        add_messages(conversation, HISTORY_WINDOW - 1)
+        consumer = AIChatConsumer()
+        consumer.conversation_id = str(conversation.pk)
+        with patch('apps.ai_assistant.tasks.update_conversation_summary.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                async_to_sync(consumer.save_ai_message)({'message': "Réponse"})
+
+        delay.assert_called_once_with(str(conversation.pk))
+
+    def test_incremental_llm_summary(self, conversation):
+        add_messages(conversation, HISTORY_WINDOW)
+
+        with patch('apps.ai_assistant.services.llm.provider.MistralProvider', FakeProvider), \
+                patch('apps.ai_assistant.token_monitor.token_monitor.track_usage') as track:
+            assert update_summary(conversation.pk)
+
+        conversation.refresh_from_db()
+        folded = HISTORY_WINDOW - RECENT_MESSAGES
+        assert conversation.summary == "Facture FAC-001 créée pour Acme."
+        assert conversation.summary_message_count == folded
+        assert conversation.summarized_until == Message.objects.get(content=f"Message {folded - 1}").created_at
+        assert "[actions : create_invoice]" in FakeProvider.prompt
+        assert track.call_args.kwargs['tokens_used'] == 42
+
+        history = load_history(conversation, exclude_latest=False)
+        assert len(history) == RECENT_MESSAGES + 1
+        assert history[1]['content'] == f"Message {folded}"
+
+        # Rien de nouveau à résumer
+        assert not update_summary(conversation.pk)
+
+    def test_extractive_fallback_keeps_previous_summary(self, conversation):
+        conversation.summary = "Client Acme créé."
+        conversation.save()
+        add_messages(conversation, RECENT_MESSAGES + 2)
+
+        with patch.object(conversation_memory, '_llm_summary', return_value=(None, 0)):
+            update_summary(conversation.pk)
+
+        conversation.refresh_from_db()
+        assert conversation.summary.startswith("Client Acme créé.")
+        assert "- Utilisateur : Message 0" in conversation.summary
+        assert "- Assistant : Message 1" in conversation.summary
+        assert "Message 2" not in conversation.summary
+        assert cache.get(conversation_memory.PENDING_KEY.format(conversation_id=conversation.pk)) is None
+
+
+def test_orchestrator_puts_summary_in_system_prompt():
+    from apps.ai_assistant.services.conversation_memory import summary_message
+    from apps.ai_assistant.services.orchestrator import Orchestrator
+
+    orch = Orchestrator(provider=object(), tool_registry=object())
+    orch._system_prompt = lambda page: "SYSTEM"
+    history = [summary_message("Facture FAC-001 créée.")] + [
+        {'role': 'user', 'content': f"Message {i}"} for i in range(30)
+    ]
+
+    messages = orch._build_messages("Et ensuite ?", history, page=None)
+
+    assert messages[0]['role'] == 'system'
+    assert "Facture FAC-001 créée." in messages[0]['content']
+    assert [m['role'] for m in messages[1:]].count('system') == 0
+    assert len(messages) == 1 + HISTORY_WINDOW + 1
+    assert messages[-1] == {'role': 'user', 'content': "Et ensuite ?"}
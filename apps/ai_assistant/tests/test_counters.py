@@ -0,0 +1,116 @@
+"""
+Tests des compteurs atomiques et du token bucket (counters.py) :
+- aucun incrément perdu entre threads concurrents
+- token bucket : consommation, attente, remplissage
+- throttle par organisation et budgets de tokens adossés à ces primitives
+- script Lua utilisé quand le cache est Redis
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+
+from apps.ai_assistant.counters import TokenBucket, increment
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestIncrement:
+
+    def test_creates_then_increments(self):
+        assert increment('counter', 5, 60) == 5
+        assert increment('counter', 2, 60) == 7
+        assert cache.get('counter') == 7
+
+    def test_no_lost_increment_under_concurrency(self):
+        def worker():
+            for _ in range(50):
+                increment('concurrent', 1, 60)
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert cache.get('concurrent') == 20 * 50
+
+
+class TestTokenBucket:
+
+    def test_consume_until_empty(self):
+        bucket = TokenBucket(capacity=3, period=60)
+
+        assert [bucket.consume('bucket')[0] for _ in range(4)] == [True, True, True, False]
+        allowed, wait = bucket.consume('bucket')
+        assert not allowed
+        # 1 jeton toutes les 20 s
+        assert 0 < wait <= 20
+
+    def test_refill_over_time(self):
+        bucket = TokenBucket(capacity=2, period=10)
+
+        with patch('apps.ai_assistant.counters.time.time', return_value=1000.0):
+            assert bucket.consume('refill', cost=2) == (True, 0.0)
+            assert not bucket.consume('refill')[0]
+        with patch('apps.ai_assistant.counters.time.time', return_value=1005.0):
+            assert bucket.consume('refill')[0]
+
+    def test_concurrent_consumers_never_exceed_capacity(self):
+        bucket = TokenBucket(capacity=100, period=3600)
+        results = []
+
+        def worker():
+            results.extend(bucket.consume('shared')[0] for _ in range(20))
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results.count(True) == 100
+
+    def test_redis_backend_uses_lua_script(self):
+        client = MagicMock()
+        client.eval.return_value = [0, '0.5']
+        bucket = TokenBucket(capacity=10, period=10)
+
+        with patch('apps.ai_assistant.counters.redis_client', return_value=client):
+            allowed, wait = bucket.consume('lua')
+
+        assert not allowed
+        assert wait == pytest.approx(0.5)
+        args = client.eval.call_args.args
+        assert args[1:] == (1, cache.make_and_validate_key('lua'), 10, 1.0, 1, 11)
+
+
+class TestConsumers:
+
+    def test_org_throttle(self):
+        from apps.ai_assistant.throttles import AIOrgRateThrottle
+
+        request = MagicMock()
+        request.user.organization.id = 7
+        throttle = AIOrgRateThrottle()
+
+        assert all(throttle.allow_request(request, None) for _ in range(throttle.num_requests))
+        assert not throttle.allow_request(request, None)
+        assert 0 < throttle.wait() <= throttle.duration / throttle.num_requests
+
+    def test_token_usage_counters(self):
+        from apps.ai_assistant.token_monitor import TokenMonitor
+
+        monitor = TokenMonitor()
+        monitor.track_usage(tokens_used=100, user_id=1, organization_id=3)
+        result = monitor.track_usage(tokens_used=50, user_id=1, organization_id=3)
+
+        assert result['hourly_usage'] == 150
+        assert result['daily_usage'] == 150
+        assert monitor.check_budget(organization_id=3)['usage'] == {'hourly': 150, 'daily': 150}
@@ -98,6 +98,35 @@ def test_retrieval_then_synthesis_two_calls():
     assert result.tool_results[0]["function"] == "search_invoice"
 
 
+def test_read_only_tool_calls_run_in_parallel():
+    """Plusieurs lectures demandées ensemble : exécutées en parallèle, résultats ordonnés."""
+    import time
+    from asgiref.sync import sync_to_async
+
+    class BlockingRegistry(FakeRegistry):
+        # Comme les handlers réels : travail bloquant (ORM) via sync_to_async
+        async def call(self, name, arguments, user_ctx):
+            await sync_to_async(time.sleep)(0.2)
+            return {"success": True, "message": name, "data": {}}
+
+    names = ["get_statistics", "search_invoice", "list_clients"]
+    provider = FakeProvider([
+        {"success": True, "content": "", "tool_calls": [
+            {"id": f"t{i}", "function": n, "arguments": {}} for i, n in enumerate(names)],
+         "finish_reason": "tool_calls", "usage": _usage(20), "circuit_open": False, "error": None},
+        {"success": True, "content": "Synthèse.", "tool_calls": None,
+         "finish_reason": "stop", "usage": _usage(15), "circuit_open": False, "error": None},
+    ])
+    orch = _make_orchestrator(provider, BlockingRegistry({n: None for n in names}))
+
+    start = time.monotonic()
+    result = async_to_sync(orch.run)("Point complet", user_ctx={"organization": None})
+
+    assert time.monotonic() - start < 0.5
+    assert [r["function"] for r in result.tool_results] == names
+    assert [r["tool_call_id"] for r in result.tool_results] == ["t0", "t1", "t2"]
+
+
 def test_creation_triggers_confirmation_no_second_call():
     """(c) Handler demande confirmation -> token émis, pas de 2e appel."""
     provider = FakeProvider([
@@ -11,7 +11,15 @@ Scénarios couverts :
   (d) confirmation requise          -> final.pending_action, boucle suspendue
   (e) épuisement AGENT_MAX_STEPS    -> repli déterministe
   (f) circuit breaker dès l'appel 1 -> réponse fallback
+  (g) plafond de tokens par requête -> synthèse forcée
+  (h) outils en lecture seule       -> exécutés en parallèle, événements dans
+                                       l'ordre ; outils mutants sérialisés
+  (i) variante asynchrone (arun_stream) -> mêmes événements, provider.astream
 """
+import asyncio
+import threading
+import time
+
 import pytest
 
 from apps.ai_assistant.services.orchestrator import AGENT_MAX_STEPS, Orchestrator
@@ -252,3 +260,148 @@ def test_per_request_token_cap_forces_synthesis():
     # Un statut de finalisation a été émis quand le plafond a été franchi.
     assert any(e["type"] == "status" and "Finalisation" in e["message"] for e in events)
     assert final["reply"] == "Réponse finale après plafond."
+
+
+class SlowRegistry(FakeRegistry):
+    """Registry dont chaque outil dure `delay` secondes ; trace les exécutions."""
+
+    def __init__(self, names, delay=0.3):
+        super().__init__({n: {"success": True, "message": n, "data": {}} for n in names})
+        self.delay = delay
+        self.log = []
+        self._active = 0
+        self._lock = threading.Lock()
+
+    async def call(self, name, arguments, user_ctx):
+        with self._lock:
+            self._active += 1
+            self.log.append(("start", name, self._active))
+        await asyncio.sleep(self.delay)
+        with self._lock:
+            self._active -= 1
+            self.log.append(("end", name))
+        return await super().call(name, arguments, user_ctx)
+
+
+def _tool_calls(*names):
+    return [{"id": f"tc{i}", "function": n, "arguments": {}} for i, n in enumerate(names)]
+
+
+def test_read_only_tools_run_concurrently_in_order():
+    """(h) Lectures d'une même étape : durée ~ la plus lente, ordre conservé."""
+    names = ("get_statistics", "search_invoice", "list_clients", "get_stock_alerts")
+    provider = FakeStreamProvider([
+        [_final("", tool_calls=_tool_calls(*names))],
+        [_final("Synthèse.", tokens=5)],
+    ])
+    registry = SlowRegistry(names)
+    orch = _make_orchestrator(provider, registry)
+
+    start = time.monotonic()
+    events, final = _run(orch, "Point complet")
+    elapsed = time.monotonic() - start
+
+    assert elapsed < registry.delay * len(names) * 0.75
+    assert max(entry[2] for entry in registry.log if entry[0] == "start") > 1
+
+    tool_events = [(e["type"], e["name"]) for e in events if e["type"] in ("tool_start", "tool_result")]
+    assert tool_events == [("tool_start", n) for n in names] + [("tool_result", n) for n in names]
+    assert [r["function"] for r in final["tool_results"]] == list(names)
+    tool_messages = [m for m in provider.calls[1]["messages"] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["tc0", "tc1", "tc2", "tc3"]
+
+
+def test_mutating_tools_stay_serialized():
+    """(h) Une écriture s'exécute seule, après les lectures qui la précèdent."""
+    names = ("search_client", "get_stock_alerts", "create_invoice", "search_invoice", "send_invoice")
+    provider = FakeStreamProvider([
+        [_final("", tool_calls=_tool_calls(*names))],
+        [_final("Fait.", tokens=5)],
+    ])
+    registry = SlowRegistry(names, delay=0.05)
+    orch = _make_orchestrator(provider, registry)
+
+    events, final = _run(orch, "Facture")
+
+    log = registry.log
+    for mutating in ("create_invoice", "send_invoice"):
+        position = log.index(next(e for e in log if e[:2] == ("start", mutating)))
+        # Rien d'autre en cours pendant l'écriture
+        assert log[position][2] == 1
+        assert log[position + 1] == ("end", mutating)
+    # Les lectures précédentes sont terminées avant l'écriture
+    assert log.index(("end", "get_stock_alerts")) < log.index(next(e for e in log if e[:2] == ("start", "create_invoice")))
+    assert [r["function"] for r in final["tool_results"]] == list(names)
+
+
+def test_concurrency_can_be_disabled():
+    from django.test import override_settings
+
+    names = ("search_invoice", "list_clients")
+    provider = FakeStreamProvider([
+        [_final("", tool_calls=_tool_calls(*names))],
+        [_final("Ok.", tokens=5)],
+    ])
+    registry = SlowRegistry(names, delay=0.01)
+    orch = _make_orchestrator(provider, registry)
+
+    with override_settings(AI_MAX_CONCURRENT_TOOLS=1):
+        _run(orch)
+
+    assert all(entry[2] == 1 for entry in registry.log if entry[0] == "start")
+
+
+def _arun(orch, message="Question", **kw):
+    async def collect():
+        return [event async for event in orch.arun_stream(message, user_ctx={"organization": None}, **kw)]
+
+    return asyncio.run(collect())
+
+
+def _without_ids(events):
+    # Les identifiants d'appels générés (uuid) diffèrent d'une exécution à l'autre.
+    return [{k: v for k, v in e.items() if k != "id"} for e in events]
+
+
+def test_async_stream_matches_sync_stream():
+    """(i) arun_stream émet exactement les événements de run_stream."""
+    def scripts():
+        return [
+            [{"type": "delta", "content": "Je consulte."},
+             _final("Je consulte.", tool_calls=_tool_calls("search_invoice", "generate_visualization"))],
+            [_final("", tool_calls=_tool_calls("create_client"))],
+        ]
+
+    results = {
+        "search_invoice": {"success": True, "message": "2 factures", "data": {}},
+        "generate_visualization": {"success": True, "message": "Graphique généré",
+                                   "data": {"chart_type": "pie", "chart_data": [{"x": 1}]}},
+        "create_client": {"success": False, "needs_confirmation": True,
+                          "entity_type": "client", "message": "Confirmez la création"},
+    }
+
+    sync_events, _ = _run(_make_orchestrator(FakeStreamProvider(scripts()), FakeRegistry(results)))
+    async_events = _arun(_make_orchestrator(FakeStreamProvider(scripts()), FakeRegistry(results)))
+
+    assert _types(async_events) == _types(sync_events)
+    assert _without_ids(async_events[:-1]) == _without_ids(sync_events[:-1])
+    assert async_events[-1]["pending_action"]["action"] == "create_client"
+
+
+def test_async_stream_uses_provider_astream():
+    """(i) Un provider asynchrone est consommé sans passer par un thread."""
+    class AsyncProvider(FakeStreamProvider):
+        def stream(self, *a, **kw):  # pragma: no cover - ne doit pas être appelé
+            raise AssertionError("stream synchrone appelé")
+
+        async def astream(self, messages, tools=None, tool_choice="auto", **kw):
+            for event in self._scripts.pop(0):
+                await asyncio.sleep(0)
+                yield event
+
+    provider = AsyncProvider([[{"type": "delta", "content": "Bonjour."}, _final("Bonjour.", tokens=4)]])
+    events = _arun(_make_orchestrator(provider, FakeRegistry({})))
+
+    assert _types(events) == ["status", "text_delta", "final"]
+    assert events[-1]["reply"] == "Bonjour."
+    assert events[-1]["tokens"] == 4
@@ -115,11 +115,11 @@ class TestQuotaIntegration:
         assert 'check_budget' in source
 
     def test_chat_view_calls_quota_increment(self):
-        """ChatView doit incrementer le quota apres succes."""
-        from apps.ai_assistant.views import ChatView
+        """ChatView doit incrementer le quota apres succes (ecrit par lots, cf. usage_events)."""
+        from apps.ai_assistant import views
         import inspect
-        source = inspect.getsource(ChatView.post)
-        assert 'increment_usage' in source
+        assert '_record_ai_usage' in inspect.getsource(views.ChatView.post)
+        assert 'ai_requests=1' in inspect.getsource(views._record_ai_usage)
 
     def test_chat_view_checks_budget(self):
         """ChatView doit verifier le budget tokens."""
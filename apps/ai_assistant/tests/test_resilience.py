@@ -176,19 +176,18 @@ class TestCircuitBreaker:
 
     def test_record_failure_opens_circuit_at_threshold(self):
         """Apres _CB_MAX_FAILURES echecs, le circuit doit s'ouvrir."""
-        now = time.time()
-        # Simulate failures already at threshold
-        existing_failures = [now] * (_CB_MAX_FAILURES - 1)
+        from django.core.cache import cache
 
-        with patch('apps.ai_assistant.resilience.cache') as mock_cache:
-            mock_cache.get.side_effect = lambda key, default=None: (
-                existing_failures if key == _CB_FAILURES_KEY else default
-            )
-            opened = _record_failure()
-
-        # The circuit should have opened
-        assert opened is True
-        mock_cache.set.assert_called()
+        cache.delete_many([_CB_FAILURES_KEY, _CB_OPEN_UNTIL_KEY])
+        try:
+            opened = [_record_failure() for _ in range(_CB_MAX_FAILURES)]
+
+            # The circuit should have opened on the last failure
+            assert opened == [False] * (_CB_MAX_FAILURES - 1) + [True]
+            assert cache.get(_CB_FAILURES_KEY) == _CB_MAX_FAILURES
+            assert _check_circuit_breaker() is False
+        finally:
+            cache.delete_many([_CB_FAILURES_KEY, _CB_OPEN_UNTIL_KEY])
 
     def test_record_success_resets_failures(self):
         """record_success doit supprimer le compteur d'echecs."""
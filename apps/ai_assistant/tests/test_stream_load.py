@@ -0,0 +1,156 @@
+"""
+Test de charge du streaming IA contre un serveur LLM local (bouchon).
+
+Le bouchon imite l'API Mistral `POST /v1/chat/completions` en SSE : quelques
+fragments de texte espacés de STUB_CHUNK_DELAY secondes, puis l'usage. Le
+vrai MistralProvider (SDK mistralai, settings.MISTRAL_SERVER_URL) s'y connecte.
+
+On compare la capacité en flux simultanés des deux modes :
+  - synchrone (`run_stream`) : chaque flux occupe un thread de worker pendant
+    toute la réponse ; un pool de SYNC_WORKERS threads plafonne le nombre de
+    connexions ouvertes au LLM ;
+  - asynchrone (`arun_stream`, ASGI) : tous les flux progressent sur une seule
+    boucle d'événements, sans thread par flux.
+
+Ajuster STREAMS / SYNC_WORKERS pour des mesures plus lourdes (centaines de flux).
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.test import override_settings
+
+from apps.ai_assistant.services.llm.provider import MistralProvider
+from apps.ai_assistant.tests.test_orchestrator_stream import FakeRegistry, _make_orchestrator
+
+pytest.importorskip("mistralai")
+
+STREAMS = 40
+SYNC_WORKERS = 8
+STUB_WORDS = ["Vos ", "ventes ", "progressent ", "de ", "12 % ", "ce ", "mois."]
+STUB_CHUNK_DELAY = 0.1
+
+
+class StubLLMServer:
+    """Serveur HTTP minimal (asyncio, thread dédié) répondant en SSE au format Mistral."""
+
+    def __init__(self, words=STUB_WORDS, delay=STUB_CHUNK_DELAY):
+        self.words = words
+        self.delay = delay
+        self.open_streams = 0
+        self.peak_streams = 0
+        self.requests = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        server.close()
+
+    @staticmethod
+    def _chunk(delta, finish_reason=None, usage=None):
+        data = {
+            "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            data["usage"] = usage
+        return f"data: {json.dumps(data)}\n\n".encode()
+
+    async def _handle(self, reader, writer):
+        try:
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = re.search(rb"content-length:\s*(\d+)", headers, re.I)
+            await reader.readexactly(int(length.group(1)) if length else 0)
+
+            self.requests += 1
+            self.open_streams += 1
+            self.peak_streams = max(self.peak_streams, self.open_streams)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+            writer.write(self._chunk({"role": "assistant", "content": ""}))
+            for word in self.words:
+                await asyncio.sleep(self.delay)
+                writer.write(self._chunk({"content": word}))
+                await writer.drain()
+            usage = {"prompt_tokens": 20, "completion_tokens": len(self.words), "total_tokens": 20 + len(self.words)}
+            writer.write(self._chunk({"content": ""}, finish_reason="stop", usage=usage))
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+        finally:
+            self.open_streams -= 1
+            writer.close()
+
+
+def _orchestrator():
+    return _make_orchestrator(MistralProvider(api_key="stub-key", model="stub"), FakeRegistry({}))
+
+
+def _reply(events):
+    assert events[-1]["type"] == "final"
+    return events[-1]["reply"]
+
+
+@pytest.fixture
+def stub_llm():
+    with StubLLMServer() as server, override_settings(MISTRAL_SERVER_URL=server.url):
+        yield server
+
+
+def test_sync_streams_are_capped_by_worker_threads(stub_llm):
+    orch = _orchestrator()
+
+    def one_stream(i):
+        return _reply(list(orch.run_stream(f"Question {i}", user_ctx={"organization": None})))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as pool:
+        replies = list(pool.map(one_stream, range(STREAMS)))
+    elapsed = time.perf_counter() - start
+
+    assert replies == ["".join(STUB_WORDS)] * STREAMS
+    assert stub_llm.requests == STREAMS
+    assert stub_llm.peak_streams <= SYNC_WORKERS
+    # Vagues successives de SYNC_WORKERS flux
+    assert elapsed >= (STREAMS / SYNC_WORKERS) * len(STUB_WORDS) * STUB_CHUNK_DELAY
+
+
+def test_async_streams_share_one_event_loop(stub_llm):
+    orch = _orchestrator()
+
+    async def one_stream(i):
+        return _reply([event async for event in orch.arun_stream(f"Question {i}", user_ctx={"organization": None})])
+
+    async def run_all():
+        return await asyncio.gather(*(one_stream(i) for i in range(STREAMS)))
+
+    start = time.perf_counter()
+    replies = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+
+    assert replies == ["".join(STUB_WORDS)] * STREAMS
+    # Tous les flux ouverts en même temps sur une seule boucle d'événements
+    assert stub_llm.peak_streams == STREAMS
+    sync_lower_bound = (STREAMS / SYNC_WORKERS) * len(STUB_WORDS) * STUB_CHUNK_DELAY
+    assert elapsed < sync_lower_bound
@@ -0,0 +1,130 @@
+"""
+Tests du cache des outils analytiques (ToolRegistry.call + tool_cache) :
+- hit pour des arguments équivalents, miss pour une autre organisation
+- invalidation par la data version (écriture après commit)
+- outils non cachables et erreurs jamais mis en cache
+- compteurs hits / misses exposés par l'API
+"""
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client, Organization, User
+from apps.ai_assistant.services.registry.tool_cache import get_metrics
+from apps.ai_assistant.services.registry.tool_registry import (
+    CACHEABLE_TOOLS,
+    ToolRegistry,
+    ToolSpec,
+    is_read_only,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Cache Outils Org")
+
+
+def make_registry(calls, success=True):
+    """Registre avec des handlers comptant leurs appels"""
+    def handler_for(name):
+        async def handler(params, user_ctx):
+            calls.append((name, params))
+            return {"success": success, "data": {"count": len(calls)}}
+        return handler
+
+    registry = ToolRegistry()
+    for name in ("get_statistics", "get_stock_alerts", "search_invoice", "create_client"):
+        registry._specs[name] = ToolSpec(
+            name=name, description=name, parameters={"type": "object", "properties": {}},
+            handler=handler_for(name), read_only=is_read_only(name),
+            cacheable=is_read_only(name) and name in CACHEABLE_TOOLS,
+        )
+    registry._built = True
+    return registry
+
+
+def call(registry, name, arguments, organization):
+    user_ctx = {"organization": organization, "organization_id": organization.id if organization else None}
+    return async_to_sync(registry.call)(name, arguments, user_ctx)
+
+
+@pytest.mark.django_db
+class TestToolCache:
+
+    def test_repeated_call_hits_cache(self, organization):
+        calls = []
+        registry = make_registry(calls)
+
+        first = call(registry, "get_statistics", {"period": "month", "categories": ["revenue", "clients"]}, organization)
+        again = call(registry, "get_statistics", {"categories": ["revenue", "clients"], "period": "month", "group_by": None},
+                     organization)
+        other_period = call(registry, "get_statistics", {"period": "year"}, organization)
+
+        assert again == first
+        assert len(calls) == 2
+        assert other_period["data"]["count"] == 2
+
+        # Autre organisation : jamais le résultat de la première
+        call(registry, "get_statistics", {"period": "month", "categories": ["revenue", "clients"]},
+             Organization.objects.create(name="Autre"))
+        assert len(calls) == 3
+
+    def test_write_invalidates_after_commit(self, organization, django_capture_on_commit_callbacks):
+        calls = []
+        registry = make_registry(calls)
+        call(registry, "get_stock_alerts", {}, organization)
+        call(registry, "get_stock_alerts", {}, organization)
+        assert len(calls) == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Client.objects.create(name="Nouveau client", organization=organization)
+
+        result = call(registry, "get_stock_alerts", {}, organization)
+        assert len(calls) == 2
+        assert result["data"]["count"] == 2
+
+    def test_not_cached(self, organization):
+        calls = []
+        registry = make_registry(calls)
+        for _ in range(2):
+            call(registry, "search_invoice", {"query": "FAC"}, organization)
+            call(registry, "create_client", {"name": "Acme"}, organization)
+            call(registry, "get_statistics", {}, None)
+        assert len(calls) == 6
+
+        failing = make_registry(calls, success=False)
+        call(failing, "get_statistics", {}, organization)
+        call(failing, "get_statistics", {}, organization)
+        assert len(calls) == 8
+
+    def test_metrics(self, organization):
+        registry = make_registry([])
+        call(registry, "get_statistics", {}, organization)
+        call(registry, "get_statistics", {}, organization)
+        call(registry, "get_statistics", {}, organization)
+        call(registry, "get_stock_alerts", {}, organization)
+
+        metrics = get_metrics(organization.id)
+        assert metrics["hits"] == 2
+        assert metrics["misses"] == 2
+        assert metrics["hit_rate"] == 0.5
+        assert metrics["tools"] == {
+            "get_statistics": {"hits": 2, "misses": 1},
+            "get_stock_alerts": {"hits": 0, "misses": 1},
+        }
+
+        user = User.objects.create_user(username="cache_user", email="cache@example.com",
+                                        password="testpass123", organization=organization)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get('/api/v1/ai/usage/tool-cache/')
+        assert response.status_code == 200
+        assert response.json()["hits"] == 2
@@ -0,0 +1,128 @@
+"""
+Tests du routage des outils (ToolRouter) :
+- sous-ensemble pertinent selon le message, la page et les outils déjà utilisés
+- repli sur le jeu complet quand la confiance est faible
+- économie de tokens reportée dans l'événement 'final' de run_stream
+"""
+from django.test import override_settings
+
+from apps.ai_assistant.services.registry.tool_router import (
+    ToolRouter,
+    tools_used_in_history,
+)
+from apps.ai_assistant.tests.test_orchestrator_stream import (
+    FakeRegistry,
+    FakeStreamProvider,
+    _final,
+    _make_orchestrator,
+    _run,
+)
+
+TOOLS = {
+    "create_invoice": "Crée une nouvelle facture pour un client",
+    "search_invoice": "Recherche des factures par numéro, client ou statut.",
+    "send_invoice": "Envoie une facture par email au client avec PDF en pièce jointe",
+    "get_invoice_stats": "Récupère les statistiques détaillées des factures",
+    "create_client": "Crée un nouveau client",
+    "search_client": "Recherche des clients par nom, email ou entreprise",
+    "create_supplier": "Crée un nouveau fournisseur dans le système",
+    "search_supplier": "Recherche des fournisseurs par nom, contact ou email",
+    "create_product": "Crée un nouveau produit (service ou physique)",
+    "search_product": "Recherche des produits par nom, référence ou code-barres",
+    "adjust_stock": "Ajuste le stock d'un produit physique (ajout ou retrait)",
+    "get_stock_alerts": "Récupère les produits avec des alertes de stock (rupture ou stock bas)",
+    "generate_report": "Génère un rapport au format PDF, Excel ou CSV",
+    "create_journal_entry": "Crée une écriture comptable en partie double dans le journal choisi",
+    "generate_visualization": "Génère des graphes (visualisations) à la demande",
+    "get_statistics": "Récupère des statistiques modulaires et flexibles",
+    "search_entity": "Recherche floue robuste d'une entité (client, fournisseur ou produit)",
+    "undo_last_action": "Annule la dernière action effectuée par l'utilisateur",
+}
+
+
+def _tools():
+    return [{"type": "function", "function": {"name": name, "description": description,
+             "parameters": {"type": "object", "properties": {}}}} for name, description in TOOLS.items()]
+
+
+def _names(selection):
+    return {t["function"]["name"] for t in selection.tools}
+
+
+class TestToolRouter:
+
+    def test_domain_mentioned_in_message(self):
+        selection = ToolRouter(_tools()).select("Quelles sont mes factures impayées ?")
+
+        assert selection.routed
+        assert {"search_invoice", "create_invoice", "get_invoice_stats"} <= _names(selection)
+        assert not _names(selection) & {"create_supplier", "adjust_stock", "create_journal_entry"}
+        # Outils de base toujours proposés
+        assert {"search_entity", "undo_last_action"} <= _names(selection)
+        assert 0 < selection.sent_tokens < selection.full_tokens
+        assert selection.saved_tokens == selection.full_tokens - selection.sent_tokens
+
+    def test_several_domains(self):
+        names = _names(ToolRouter(_tools()).select("Crée une facture pour le client Acme"))
+        assert {"create_invoice", "create_client", "search_client"} <= names
+        assert "create_supplier" not in names
+
+    def test_accents_and_plural(self):
+        names = _names(ToolRouter(_tools()).select("ÉCRITURE COMPTABLE au journal des ventes"))
+        assert "create_journal_entry" in names
+
+    def test_low_confidence_falls_back_to_full_set(self):
+        router = ToolRouter(_tools())
+        for message in ("Bonjour !", "Peux-tu m'aider ?", ""):
+            selection = router.select(message)
+            assert not selection.routed
+            assert len(selection.tools) == len(TOOLS)
+            assert selection.saved_tokens == 0
+
+    def test_page_and_previous_tools_widen_selection(self):
+        router = ToolRouter(_tools())
+        names = _names(router.select("Ajoute 5 unités au stock", page_domain="product"))
+        assert {"adjust_stock", "create_product"} <= names
+
+        names = _names(router.select("Envoie-la au client", used_tools=["create_invoice"]))
+        assert {"send_invoice", "search_client"} <= names
+
+    def test_tools_used_in_history(self):
+        history = [
+            {"role": "user", "content": "Crée la facture", "metadata": None},
+            {"role": "assistant", "content": "Facture créée", "metadata": {
+                "action_results": [{"function": "create_invoice", "result": {"success": True}}],
+            }},
+            {"role": "assistant", "content": "Ok"},
+        ]
+        assert tools_used_in_history(history) == ["create_invoice"]
+
+
+class TestOrchestratorRouting:
+
+    def test_final_event_reports_savings(self):
+        provider = FakeStreamProvider([
+            [_final("", tool_calls=[{"id": "tc1", "function": "search_invoice", "arguments": {}}])],
+            [_final("Trois factures impayées.", tokens=5)],
+        ])
+        registry = FakeRegistry({name: {"success": True, "message": "ok", "data": {}} for name in TOOLS})
+        orch = _make_orchestrator(provider, registry)
+
+        events, final = _run(orch, "Mes factures impayées ?")
+
+        sent = {t["function"]["name"] for t in provider.calls[0]["tools"]}
+        assert "search_invoice" in sent and len(sent) < len(TOOLS)
+        stats = final["token_stats"]
+        assert stats["total"] == final["tokens"]
+        assert stats["routed_steps"] == 2
+        assert stats["tool_schema_tokens_saved"] > 0
+
+    def test_routing_can_be_disabled(self):
+        provider = FakeStreamProvider([[_final("Bonjour.", tokens=5)]])
+        orch = _make_orchestrator(provider, FakeRegistry({name: None for name in TOOLS}))
+
+        with override_settings(AI_TOOL_ROUTING=False):
+            _, final = _run(orch, "Mes factures impayées ?")
+
+        assert len(provider.calls[0]["tools"]) == len(TOOLS)
+        assert final["token_stats"]["tool_schema_tokens_saved"] == 0
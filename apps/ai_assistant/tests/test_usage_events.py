@@ -0,0 +1,207 @@
+"""
+Tests du journal d'utilisation IA bufferisé (usage_events.py) :
+- mise en file sans écriture en base dans le chemin de la requête
+- écriture par lots (bulk_create) et quota d'abonnement agrégé par organisation
+- lot rejoué après crash sans doublon, lot en échec conservé
+- nombre de lots borné par flush, lot en échec répété isolé en lettre morte
+- file Redis : lot « en cours » rejoué en priorité, acquittement limité au lot écrit
+"""
+import json
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.ai_assistant import usage_events
+from apps.ai_assistant.models import AIUsageLog, Conversation
+from apps.subscriptions.models import Subscription, SubscriptionPlan
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def subscription(organization):
+    plan = SubscriptionPlan.objects.create(code='pro', name='Pro', description='', has_ai_assistant=True)
+    return Subscription.objects.create(
+        organization=organization, plan=plan,
+        current_period_start=timezone.now(), current_period_end=timezone.now() + timedelta(days=30),
+    )
+
+
+def record(user, **kwargs):
+    return usage_events.record(user_id=user.id, organization_id=user.organization_id, **kwargs)
+
+
+@pytest.mark.django_db
+class TestRecordAndFlush:
+
+    def test_record_does_not_touch_database(self, user, usage_events_buffer, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            record(user, total_tokens=120, ai_requests=1)
+
+        assert usage_events_buffer.pending() == 1
+
+    def test_flush_bulk_creates_logs_and_aggregates_quota(self, user, organization, subscription,
+                                                          django_assert_max_num_queries):
+        conversation = Conversation.objects.create(user=user, organization=organization)
+        for i in range(20):
+            record(user, conversation_id=conversation.pk, prompt_tokens=100_000, completion_tokens=50_000,
+                   total_tokens=150_000, model='mistral-small-latest', ai_requests=1)
+
+        with django_assert_max_num_queries(12):
+            assert usage_events.flush() == 20
+
+        logs = AIUsageLog.objects.filter(organization=organization)
+        assert logs.count() == 20
+        assert set(logs.values_list('conversation_id', flat=True)) == {conversation.pk}
+        assert logs.first().model_used == 'mistral-small-latest'
+        assert logs.first().estimated_cost > 0
+        subscription.refresh_from_db()
+        assert subscription.ai_requests_this_month == 20
+        assert usage_events.flush() == 0
+
+    def test_replayed_batch_is_not_counted_twice(self, user, subscription):
+        event_id = record(user, total_tokens=10, ai_requests=1)
+        event = usage_events._local_buffer.claim(1)[0]
+        usage_events._write([event])
+
+        # Crash après commit, avant acquittement : le lot est rejoué
+        assert usage_events._write([event]) == 0
+
+        assert AIUsageLog.objects.filter(id=event_id).count() == 1
+        subscription.refresh_from_db()
+        assert subscription.ai_requests_this_month == 1
+
+    def test_deleted_conversation_does_not_block_batch(self, user, organization):
+        conversation = Conversation.objects.create(user=user, organization=organization)
+        record(user, conversation_id=conversation.pk, total_tokens=10)
+        conversation.delete()
+
+        assert usage_events.flush() == 1
+        assert AIUsageLog.objects.get(organization=organization).conversation_id is None
+
+    def test_failed_write_keeps_events(self, user, usage_events_buffer):
+        record(user, total_tokens=10)
+        record(user, total_tokens=20)
+
+        with patch.object(usage_events, '_write', side_effect=RuntimeError("DB down")):
+            assert usage_events.flush() == 0
+
+        assert usage_events_buffer.pending() == 2
+        assert usage_events.flush() == 2
+        assert sorted(AIUsageLog.objects.values_list('total_tokens', flat=True)) == [10, 20]
+
+    def test_batches_are_bounded(self, user, settings):
+        with patch.object(usage_events, 'BATCH_SIZE', 3), \
+                patch.object(usage_events, '_write', side_effect=lambda events: len(events)) as write:
+            for _ in range(7):
+                record(user)
+            assert usage_events.flush() == 7
+
+        assert [len(call.args[0]) for call in write.call_args_list] == [3, 3, 1]
+
+    def test_flush_is_bounded(self, user, usage_events_buffer):
+        with patch.object(usage_events, 'BATCH_SIZE', 2), \
+                patch.object(usage_events, '_write', side_effect=lambda events: len(events)):
+            for _ in range(5):
+                record(user)
+            assert usage_events.flush(max_batches=2) == 4
+
+        assert usage_events_buffer.pending() == 1
+
+    def test_repeatedly_failing_batch_goes_to_dead_letter(self, user, usage_events_buffer):
+        good = record(user, total_tokens=10)
+        bad = record(user, total_tokens=20)
+
+        real_write = usage_events._write
+
+        def write(events):
+            if any(event['id'] == bad for event in events):
+                raise RuntimeError("ligne invalide")
+            return real_write(events)
+
+        with patch.object(usage_events, '_write', side_effect=write):
+            for _ in range(usage_events.MAX_ATTEMPTS - 1):
+                assert usage_events.flush() == 0
+            assert usage_events_buffer.pending() == 2
+
+            # Dernier essai : écriture un par un, l'événement fautif est écarté
+            assert usage_events.flush() == 1
+
+        assert usage_events_buffer.pending() == 0
+        assert [event['id'] for event in usage_events_buffer.dead_letters] == [bad]
+        assert [str(pk) for pk in AIUsageLog.objects.values_list('id', flat=True)] == [good]
+
+    def test_lock_of_another_flusher_is_kept(self, user):
+        record(user)
+
+        def steal_lock(events):
+            # Verrou expiré puis repris par un autre flush
+            cache.set(usage_events.FLUSH_LOCK_KEY, 'autre', 60)
+            return len(events)
+
+        with patch.object(usage_events, '_write', side_effect=steal_lock):
+            usage_events.flush()
+
+        assert cache.get(usage_events.FLUSH_LOCK_KEY) == 'autre'
+
+
+@pytest.mark.django_db
+def test_chat_usage_is_queued(user, organization, usage_events_buffer):
+    from apps.ai_assistant.views import _record_ai_usage
+
+    with patch('apps.ai_assistant.views.token_monitor.track_usage') as track:
+        _record_ai_usage(organization, user, 42)
+
+    track.assert_called_once()
+    event = usage_events_buffer.claim(1)[0]
+    assert event['ai_requests'] == 1
+    assert event['total_tokens'] == 42
+    assert not AIUsageLog.objects.exists()
+
+
+def test_redis_buffer_replays_processing_batch_first():
+    client = MagicMock()
+    pending = json.dumps({'id': 'interrompu'})
+    client.lrange.return_value = [pending]
+
+    buffer = usage_events._RedisBuffer(client)
+
+    assert buffer.claim(10) == [{'id': 'interrompu'}]
+    client.eval.assert_not_called()
+
+    client.lrange.return_value = []
+    client.eval.return_value = [json.dumps({'id': 'nouveau'})]
+    assert buffer.claim(10) == [{'id': 'nouveau'}]
+    assert client.eval.call_args.args[1:] == (2, buffer.events_key, buffer.processing_key, 10)
+
+    pipe = client.pipeline.return_value
+    buffer.ack([{'id': 'nouveau'}])
+    # Seuls les éléments du lot écrit sont retirés (pas un autre lot en cours)
+    pipe.lrem.assert_called_once_with(buffer.processing_key, 1, json.dumps({'id': 'nouveau'}))
+    pipe.hdel.assert_called_once_with(buffer.attempts_key, 'nouveau')
+    pipe.execute.assert_called_once()
+    client.delete.assert_not_called()
+
+
+def test_redis_buffer_dead_letter():
+    client = MagicMock()
+    raw = json.dumps({'id': 'fautif'})
+    client.lrange.return_value = [raw]
+    buffer = usage_events._RedisBuffer(client)
+    events = buffer.claim(10)
+
+    pipe = client.pipeline.return_value
+    pipe.execute.return_value = [usage_events.MAX_ATTEMPTS]
+    assert buffer.failed(events) == usage_events.MAX_ATTEMPTS
+
+    buffer.dead_letter(events)
+    pipe.rpush.assert_called_once_with(buffer.dead_letter_key, raw)
+    pipe.lrem.assert_called_once_with(buffer.processing_key, 1, raw)
@@ -3,7 +3,8 @@ Rate limiting pour les endpoints IA.
 Protege contre l'abus et les couts excessifs.
 """
 from rest_framework.throttling import UserRateThrottle, BaseThrottle
-from django.core.cache import cache
+
+from .counters import TokenBucket
 
 
 class AIUserRateThrottle(UserRateThrottle):
@@ -13,13 +14,14 @@ class AIUserRateThrottle(UserRateThrottle):
 
 
 class AIOrgRateThrottle(BaseThrottle):
-    """500 requetes/heure par organisation"""
+    """500 requetes/heure par organisation (token bucket partage entre workers)"""
     rate = '500/hour'
     cache_format = 'ai_org_throttle_%(ident)s'
 
     def __init__(self):
         self.num_requests, self.duration = self.parse_rate(self.rate)
-        self.history = []
+        self.bucket = TokenBucket(self.num_requests, self.duration)
+        self.wait_seconds = None
 
     def parse_rate(self, rate):
         num, period = rate.split('/')
@@ -38,26 +40,11 @@ class AIOrgRateThrottle(BaseThrottle):
         if not key:
             return True
 
-        import time
-        now = time.time()
-        self.history = cache.get(key, [])
-        # Purger les entrees expirees
-        while self.history and self.history[-1] <= now - self.duration:
-            self.history.pop()
-
-        if len(self.history) >= self.num_requests:
-            return False
-
-        self.history.insert(0, now)
-        cache.set(key, self.history, self.duration)
-        return True
+        allowed, self.wait_seconds = self.bucket.consume(key)
+        return allowed
 
     def wait(self):
-        if self.history:
-            import time
-            remaining = self.duration - (time.time() - self.history[-1])
-            return max(0, remaining)
-        return None
+        return self.wait_seconds
 
 
 class AIBurstRateThrottle(UserRateThrottle):
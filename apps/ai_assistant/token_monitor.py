@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 from django.utils import timezone
 from typing import Dict, Optional
 
+from .counters import increment
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,13 +50,9 @@ class TokenMonitor:
         hour_key = f"tokens_hour_{now.strftime('%Y%m%d_%H')}_{organization_id}"
         day_key = f"tokens_day_{now.strftime('%Y%m%d')}_{organization_id}"
 
-        # Incrémenter les compteurs
-        hourly_total = cache.get(hour_key, 0) + tokens_used
-        daily_total = cache.get(day_key, 0) + tokens_used
-
-        # Sauvegarder avec TTL
-        cache.set(hour_key, hourly_total, 3700)  # 1h + buffer
-        cache.set(day_key, daily_total, 86500)  # 24h + buffer
+        # Incrémenter les compteurs (atomique : aucun incrément perdu entre workers)
+        hourly_total = increment(hour_key, tokens_used, 3700)  # 1h + buffer
+        daily_total = increment(day_key, tokens_used, 86500)  # 24h + buffer
 
         # Vérifier les seuils
         self._check_thresholds(
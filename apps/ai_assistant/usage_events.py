@@ -0,0 +1,388 @@
+"""
+Journal d'utilisation IA bufferisé, écrit en base par lots.
+
+Chaque réponse IA écrivait dans le chemin de la requête une ligne
+`AIUsageLog` et mettait à jour le compteur `ai_requests_this_month` de
+l'abonnement (save + vérification du quota) : latence du chat alourdie et
+une écriture par requête, sur la même ligne d'abonnement pour toute
+l'organisation.
+
+Ici, `record()` ne fait que mettre l'événement en file :
+  - cache Redis (production) : liste Redis, partagée par tous les workers
+    et persistante si le processus tombe ;
+  - autres caches (dev, tests) : file en mémoire du processus.
+
+`flush()` vide la file par lots de BATCH_SIZE : `bulk_create` des
+`AIUsageLog` et une mise à jour du compteur d'abonnement par organisation.
+Il est appelé par un thread de fond dans chaque processus (toutes les
+FLUSH_INTERVAL secondes, ou dès que BATCH_SIZE événements attendent), par la
+tâche Celery périodique `ai_assistant.flush_ai_usage_events` et à l'arrêt du
+processus (atexit).
+
+Reprise après crash : sous Redis, un lot est d'abord déplacé atomiquement
+dans une liste « en cours » ; seuls les éléments du lot écrit en sont retirés
+(LREM) après commit, jamais ceux qu'un autre flush a pris entre-temps. Un lot
+interrompu est rejoué au flush suivant. Chaque événement porte l'UUID de sa
+future ligne `AIUsageLog`, les événements déjà écrits sont donc ignorés.
+
+Un flush traite au plus MAX_BATCHES_PER_FLUSH lots et renouvelle son verrou
+après chaque lot : le verrou n'expire pas pendant un flush actif. Un lot en
+échec MAX_ATTEMPTS fois n'est plus rejoué en tête indéfiniment : ses
+événements sont écrits un par un et ceux qui échouent encore partent dans
+une liste « lettre morte » (DEAD_LETTER_KEY), à examiner à la main.
+
+Les budgets de tokens (`token_monitor.track_usage`) restent comptés dans la
+requête : ce sont des compteurs atomiques en cache, lus par `check_budget`
+avant chaque appel.
+"""
+import atexit
+import json
+import logging
+import threading
+import uuid
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+EVENTS_KEY = 'ai_usage_events'
+PROCESSING_KEY = 'ai_usage_events:processing'
+ATTEMPTS_KEY = 'ai_usage_events:attempts'
+DEAD_LETTER_KEY = 'ai_usage_events:dead'
+FLUSH_LOCK_KEY = 'ai_usage_events:flush_lock'
+FLUSH_LOCK_TIMEOUT = 120
+
+# Lots par flush (le verrou est renouvelé après chaque lot)
+MAX_BATCHES_PER_FLUSH = 20
+
+# Échecs d'un lot avant écriture événement par événement / lettre morte
+MAX_ATTEMPTS = 5
+
+# Événements écrits par transaction
+BATCH_SIZE = int(getattr(settings, 'AI_USAGE_BATCH_SIZE', 500))
+
+# Période du thread de fond (secondes) ; 0 le désactive (Celery seul)
+DEFAULT_FLUSH_INTERVAL = 5
+
+# KEYS[1] = file, KEYS[2] = lot en cours ; ARGV[1] = taille du lot
+_CLAIM_LUA = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+
+class _LocalBuffer:
+    """File du processus (caches non Redis)."""
+
+    def __init__(self):
+        self._events = deque()
+        self._attempts = Counter()
+        self.dead_letters = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def push(self, event: Dict[str, Any]):
+        self._events.append(event)
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    def claim(self, size: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._events.popleft() for _ in range(min(size, len(self._events)))]
+
+    def ack(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            for event in events:
+                self._attempts.pop(event['id'], None)
+
+    def release(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            self._events.extendleft(reversed(events))
+
+    def failed(self, events: List[Dict[str, Any]]) -> int:
+        """Compte un échec d'écriture ; retourne le nombre d'échecs du lot."""
+        with self._lock:
+            for event in events:
+                self._attempts[event['id']] += 1
+            return max(self._attempts[event['id']] for event in events)
+
+    def dead_letter(self, events: List[Dict[str, Any]]):
+        with self._lock:
+            for event in events:
+                self._attempts.pop(event['id'], None)
+                self.dead_letters.append(event)
+
+
+class _RedisBuffer:
+    """File Redis partagée ; le lot en cours survit à un crash du processus."""
+
+    def __init__(self, client):
+        self.client = client
+        self.events_key = cache.make_and_validate_key(EVENTS_KEY)
+        self.processing_key = cache.make_and_validate_key(PROCESSING_KEY)
+        self.attempts_key = cache.make_and_validate_key(ATTEMPTS_KEY)
+        self.dead_letter_key = cache.make_and_validate_key(DEAD_LETTER_KEY)
+        # Élément Redis d'origine de chaque événement pris (LREM exact)
+        self._raw: Dict[str, Any] = {}
+
+    def push(self, event: Dict[str, Any]):
+        self.client.rpush(self.events_key, json.dumps(event))
+
+    def pending(self) -> int:
+        return self.client.llen(self.events_key)
+
+    def claim(self, size: int) -> List[Dict[str, Any]]:
+        # Lot interrompu par un crash : rejoué en priorité
+        items = self.client.lrange(self.processing_key, 0, size - 1)
+        if not items:
+            items = self.client.eval(_CLAIM_LUA, 2, self.events_key, self.processing_key, size)
+        events = []
+        for item in items:
+            event = json.loads(item)
+            self._raw[event['id']] = item
+            events.append(event)
+        return events
+
+    def _remove(self, pipe, events: List[Dict[str, Any]]):
+        for event in events:
+            pipe.lrem(self.processing_key, 1, self._raw.pop(event['id']))
+        pipe.hdel(self.attempts_key, *[event['id'] for event in events])
+
+    def ack(self, events: List[Dict[str, Any]]):
+        # Uniquement les éléments de ce lot (MULTI/EXEC)
+        pipe = self.client.pipeline()
+        self._remove(pipe, events)
+        pipe.execute()
+
+    def release(self, events: List[Dict[str, Any]]):
+        # Le lot reste dans la liste « en cours » jusqu'au prochain flush
+        for event in events:
+            self._raw.pop(event['id'], None)
+
+    def failed(self, events: List[Dict[str, Any]]) -> int:
+        pipe = self.client.pipeline()
+        for event in events:
+            pipe.hincrby(self.attempts_key, event['id'], 1)
+        return max(int(count) for count in pipe.execute())
+
+    def dead_letter(self, events: List[Dict[str, Any]]):
+        pipe = self.client.pipeline()
+        for event in events:
+            pipe.rpush(self.dead_letter_key, self._raw[event['id']])
+        self._remove(pipe, events)
+        pipe.execute()
+
+
+_local_buffer = _LocalBuffer()
+
+
+def _buffer():
+    from .counters import redis_client
+
+    client = redis_client()
+    return _RedisBuffer(client) if client is not None else _local_buffer
+
+
+def record(*, user_id, organization_id, total_tokens: int = 0, prompt_tokens: int = 0,
+           completion_tokens: int = 0, model: Optional[str] = None, action_type: str = 'chat',
+           response_time_ms: int = 0, conversation_id=None, ai_requests: int = 0):
+    """Met en file un événement d'utilisation (aucune écriture en base).
+
+    `ai_requests` : nombre de requêtes à imputer au quota mensuel de
+    l'abonnement (`ai_requests_this_month`).
+    """
+    if not user_id or not organization_id:
+        logger.warning("Cannot log AI usage: missing user_id or organization_id")
+        return None
+
+    event = {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'organization_id': str(organization_id),
+        'conversation_id': str(conversation_id) if conversation_id else None,
+        'prompt_tokens': int(prompt_tokens or 0),
+        'completion_tokens': int(completion_tokens or 0),
+        'total_tokens': int(total_tokens or 0),
+        'model': model or '',
+        'action_type': action_type,
+        'response_time_ms': int(response_time_ms or 0),
+        'ai_requests': int(ai_requests or 0),
+    }
+
+    buffer = _buffer()
+    try:
+        buffer.push(event)
+    except Exception:
+        # File indisponible : écriture directe plutôt que perte de l'événement
+        logger.warning("File d'utilisation IA indisponible, écriture directe", exc_info=True)
+        _write([event])
+        return event['id']
+
+    _flusher.ensure_started()
+    if buffer.pending() >= BATCH_SIZE:
+        _flusher.wake()
+    return event['id']
+
+
+def _write(events: List[Dict[str, Any]]) -> int:
+    """Écrit un lot : AIUsageLog + compteurs d'abonnement, en une transaction."""
+    from django.contrib.auth import get_user_model
+
+    from apps.accounts.models import Organization
+    from apps.subscriptions.models import Subscription
+
+    from .models import AIUsageLog, Conversation
+    from .usage_analytics import UsageAnalytics
+
+    def existing(model, values):
+        return {str(pk) for pk in model.objects.filter(pk__in=set(values)).values_list('pk', flat=True)}
+
+    with transaction.atomic():
+        already_written = existing(AIUsageLog, [event['id'] for event in events])
+        users = existing(get_user_model(), [event['user_id'] for event in events])
+        organizations = existing(Organization, [event['organization_id'] for event in events])
+        conversations = existing(Conversation, [event['conversation_id'] for event in events if event['conversation_id']])
+        # Lot rejoué : déjà écrit ; utilisateur ou organisation supprimé entre-temps : ignoré
+        events = [
+            event for event in events
+            if event['id'] not in already_written
+            and str(event['user_id']) in users and event['organization_id'] in organizations
+        ]
+
+        logs = []
+        requests_by_org = Counter()
+        for event in events:
+            model = event['model'] or AIUsageLog._meta.get_field('model_used').default
+            logs.append(AIUsageLog(
+                id=event['id'],
+                user_id=event['user_id'],
+                organization_id=event['organization_id'],
+                conversation_id=event['conversation_id'] if event['conversation_id'] in conversations else None,
+                prompt_tokens=event['prompt_tokens'],
+                completion_tokens=event['completion_tokens'],
+                total_tokens=event['total_tokens'],
+                estimated_cost=UsageAnalytics.calculate_cost(
+                    event['prompt_tokens'], event['completion_tokens'], model,
+                ),
+                action_type=event['action_type'],
+                model_used=model,
+                response_time_ms=event['response_time_ms'],
+            ))
+            if event['ai_requests']:
+                requests_by_org[event['organization_id']] += event['ai_requests']
+
+        # created_at (auto_now_add) : heure d'écriture, au plus FLUSH_INTERVAL
+        # secondes après l'événement
+        AIUsageLog.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+
+        subscriptions = Subscription.objects.select_related('plan', 'organization').filter(
+            organization_id__in=list(requests_by_org),
+        )
+        for subscription in subscriptions:
+            subscription.increment_usage('ai_requests', requests_by_org[str(subscription.organization_id)])
+
+    return len(events)
+
+
+def _write_one_by_one(buffer, events: List[Dict[str, Any]]) -> int:
+    """Lot en échec répété : isole le ou les événements fautifs (lettre morte)."""
+    written = 0
+    for event in events:
+        try:
+            written += _write([event])
+        except Exception:
+            logger.error("Événement d'utilisation IA %s mis en lettre morte", event['id'], exc_info=True)
+            buffer.dead_letter([event])
+        else:
+            buffer.ack([event])
+    return written
+
+
+def flush(max_batches: int = MAX_BATCHES_PER_FLUSH) -> int:
+    """Vide la file en base (au plus `max_batches` lots) ; retourne le nombre d'événements écrits."""
+    token = str(uuid.uuid4())
+    if not cache.add(FLUSH_LOCK_KEY, token, FLUSH_LOCK_TIMEOUT):
+        return 0  # Flush déjà en cours (autre thread ou worker)
+
+    written = 0
+    try:
+        buffer = _buffer()
+        for _ in range(max_batches):
+            events = buffer.claim(BATCH_SIZE)
+            if not events:
+                break
+            try:
+                written += _write(events)
+            except Exception:
+                logger.exception("Écriture de %d événements d'utilisation IA échouée", len(events))
+                if buffer.failed(events) < MAX_ATTEMPTS:
+                    buffer.release(events)
+                    break
+                written += _write_one_by_one(buffer, events)
+            else:
+                buffer.ack(events)
+            # Verrou renouvelé : il n'expire pas pendant un flush actif
+            cache.touch(FLUSH_LOCK_KEY, FLUSH_LOCK_TIMEOUT)
+    finally:
+        if cache.get(FLUSH_LOCK_KEY) == token:
+            cache.delete(FLUSH_LOCK_KEY)
+    return written
+
+
+class _Flusher:
+    """Thread de fond vidant la file périodiquement ; flush final à l'arrêt."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+
+    @staticmethod
+    def interval() -> float:
+        return float(getattr(settings, 'AI_USAGE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))
+
+    def ensure_started(self):
+        with self._lock:
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+            if self.interval() <= 0 or (self._thread and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name='ai-usage-flusher', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        from django.db import close_old_connections
+
+        while True:
+            self._wakeup.wait(self.interval())
+            self._wakeup.clear()
+            try:
+                if flush() >= BATCH_SIZE * MAX_BATCHES_PER_FLUSH:
+                    self._wakeup.set()  # File encore chargée : lots suivants sans attendre
+            except Exception:
+                logger.exception("Flush des événements d'utilisation IA échoué")
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        try:
+            while flush() >= BATCH_SIZE * MAX_BATCHES_PER_FLUSH:
+                pass
+        except Exception:
+            logger.exception("Flush final des événements d'utilisation IA échoué")
+
+
+_flusher = _Flusher()
@@ -83,23 +83,38 @@ def _run_legacy_confirmation(orchestrator, confirmation_data, user_ctx):
     )
 
 
-def _record_ai_usage(org, user, tokens):
-    """Comptabilise les tokens consommés pour le suivi de budget.
+def _record_ai_usage(org, user, tokens, conversation=None):
+    """Comptabilise la requête IA : budget tokens, journal d'utilisation et quota.
 
     Indispensable : `token_monitor.check_budget` (vérifié AVANT chaque requête)
     lit des compteurs que SEUL `track_usage` incrémente. Sans cet appel, la limite
     de budget tokens ne se déclencherait jamais pour le flux orchestrateur.
+    Le journal `AIUsageLog` et le quota `ai_requests` de l'abonnement sont
+    écrits hors requête, par lots (`usage_events`).
     """
-    if not org or not tokens:
+    if not org:
         return
+    if tokens:
+        try:
+            token_monitor.track_usage(
+                tokens_used=int(tokens),
+                user_id=getattr(user, 'id', None),
+                organization_id=org.id,
+            )
+        except Exception:  # le suivi ne doit jamais casser la réponse
+            logger.warning("token_monitor.track_usage a échoué", exc_info=True)
     try:
-        token_monitor.track_usage(
-            tokens_used=int(tokens),
+        from . import usage_events
+        usage_events.record(
             user_id=getattr(user, 'id', None),
             organization_id=org.id,
+            conversation_id=getattr(conversation, 'pk', None),
+            total_tokens=tokens or 0,
+            action_type='chat',
+            ai_requests=1,
         )
-    except Exception:  # le suivi ne doit jamais casser la réponse
-        logger.warning("token_monitor.track_usage a échoué", exc_info=True)
+    except Exception:
+        logger.warning("Journal d'utilisation IA indisponible", exc_info=True)
 
 
 def _persist_ai_message(conversation, *, reply, tool_results=None, charts=None,
@@ -142,7 +157,12 @@ def _persist_ai_message(conversation, *, reply, tool_results=None, charts=None,
     )
 
     conversation.last_message_at = timezone.now()
-    conversation.save()
+    # update_fields : ne pas écraser le résumé mis à jour en arrière-plan
+    conversation.save(update_fields=['last_message_at'])
+
+    # Conversation longue : les messages anciens rejoignent le résumé persisté
+    from .services.conversation_memory import schedule_summary_update
+    schedule_summary_update(conversation)
 
     # chart top-level = miroir du premier graphique (confort front)
     chart = charts[0] if charts else None
@@ -233,11 +253,8 @@ class ChatView(APIView):
                 result = self._run_legacy_confirmation(orchestrator, confirmation_data, user_ctx)
             else:
                 # --- Flux normal : orchestration 2 appels LLM ---
-                history = list(
-                    Message.objects.filter(conversation=conversation)
-                    .order_by('created_at')
-                    .values('role', 'content')
-                )[:-1]
+                from .services.conversation_memory import load_history
+                history = load_history(conversation)
                 result = async_to_sync(orchestrator.run)(
                     message=user_message,
                     user_ctx=user_ctx,
@@ -249,13 +266,7 @@ class ChatView(APIView):
             response_data = self._persist_and_build_response(conversation, result)
 
             # Comptabiliser les tokens consommés (alimente check_budget) + quota IA.
-            _record_ai_usage(org, request.user, result.tokens)
-            if org:
-                try:
-                    from apps.subscriptions.quota_service import QuotaService
-                    QuotaService.increment_usage(org, 'ai_requests')
-                except Exception:
-                    pass
+            _record_ai_usage(org, request.user, result.tokens, conversation)
 
             return Response(response_data, status=status.HTTP_200_OK)
 
@@ -291,6 +302,17 @@ class ChatView(APIView):
         )
 
 
+def _use_async_stream(request):
+    """Vrai si la requête est servie par ASGI et le streaming async activé
+    (settings.AI_ASYNC_STREAMING, activé par défaut)."""
+    from django.conf import settings
+    from django.core.handlers.asgi import ASGIRequest
+
+    if not getattr(settings, 'AI_ASYNC_STREAMING', True):
+        return False
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
 class ChatStreamView(APIView):
     """Chat IA en streaming (SSE) — boucle agentique avec étapes visibles.
 
@@ -305,6 +327,11 @@ class ChatStreamView(APIView):
     affiche la timeline des étapes au fur et à mesure. Les confirmations
     (token + choice) passent aussi par cet endpoint : elles n'émettent qu'un
     événement 'done' (pas d'étapes intermédiaires).
+
+    Sous ASGI, le flux est un générateur asynchrone (`orchestrator.arun_stream`) :
+    aucun thread n'est bloqué pendant l'attente du LLM. Sous WSGI (ou avec
+    settings.AI_ASYNC_STREAMING = False), le générateur synchrone `run_stream`
+    est conservé.
     """
     permission_classes = [IsAuthenticated]
     throttle_classes = [AIUserRateThrottle, AIOrgRateThrottle, AIBurstRateThrottle]
@@ -313,6 +340,7 @@ class ChatStreamView(APIView):
         import json as json_mod
         from django.http import StreamingHttpResponse
         from .services import get_orchestrator, AsyncSafeUserContext
+        from .services.conversation_memory import load_history
 
         serializer = ChatRequestSerializer(data=request.data)
         if not serializer.is_valid():
@@ -364,85 +392,100 @@ class ChatStreamView(APIView):
         def sse(payload):
             return f"data: {json_mod.dumps(payload, ensure_ascii=False, default=str)}\n\n"
 
+        token = confirmation_data.get('token')
+        choice = confirmation_data.get('choice')
+        is_confirmation = bool(token and choice) or bool(confirmation_data.get('force_create'))
+
+        def run_confirmation():
+            """Confirmation : exécution directe -> (payload 'done', tokens)."""
+            if token and choice:
+                result = async_to_sync(orchestrator.run_confirmation)(
+                    token=token, choice=choice, user_ctx=user_ctx,
+                )
+            else:
+                # Compat : ancien format de confirmation (création forcée directe).
+                result = _run_legacy_confirmation(orchestrator, confirmation_data, user_ctx)
+            payload = _persist_ai_message(
+                conversation,
+                reply=result.reply,
+                tool_results=result.tool_results,
+                charts=result.charts,
+                pending_action=result.pending_action,
+                tokens=result.tokens,
+            )
+            return payload, result.tokens
+
+        def persist_final(event):
+            # Terminal : persistance + contrat unifié (jamais relayé brut).
+            return _persist_ai_message(
+                conversation,
+                reply=event['reply'],
+                tool_results=event['tool_results'],
+                charts=event['charts'],
+                pending_action=event['pending_action'],
+                tokens=event['tokens'],
+                agent_steps=event['steps'],
+            )
+
+        def record_usage(tokens_this_request):
+            # Comptabiliser les tokens (alimente check_budget) + quota IA.
+            # Toujours exécuté même si le client coupe la connexion (le
+            # générateur poursuit jusqu'à épuisement côté serveur).
+            _record_ai_usage(org, user, tokens_this_request, conversation)
+
+        stream_kwargs = dict(message=user_message, user_ctx=user_ctx, page=page, user=user)
+
         def event_stream():
-            tokens_this_request = 0
             try:
-                token = confirmation_data.get('token')
-                choice = confirmation_data.get('choice')
-                if token and choice:
-                    # Confirmation : exécution directe, un seul événement 'done'.
+                if is_confirmation:
                     yield sse({'type': 'status', 'message': "Exécution de l'action confirmée"})
-                    result = async_to_sync(orchestrator.run_confirmation)(
-                        token=token, choice=choice, user_ctx=user_ctx,
-                    )
-                    tokens_this_request = result.tokens
-                    payload = _persist_ai_message(
-                        conversation,
-                        reply=result.reply,
-                        tool_results=result.tool_results,
-                        charts=result.charts,
-                        pending_action=result.pending_action,
-                        tokens=result.tokens,
-                    )
+                    payload, tokens_this_request = run_confirmation()
                     yield sse({'type': 'done', **payload})
-                elif confirmation_data.get('force_create'):
-                    # Compat : ancien format de confirmation (création forcée directe).
+                else:
+                    tokens_this_request = 0
+                    for event in orchestrator.run_stream(conversation_history=load_history(conversation), **stream_kwargs):
+                        if event['type'] == 'final':
+                            tokens_this_request = event['tokens']
+                            yield sse({'type': 'done', **persist_final(event)})
+                        else:
+                            yield sse(event)
+                record_usage(tokens_this_request)
+            except Exception as e:
+                logger.error(f"Chat stream error: {e}", exc_info=True)
+                yield sse({'type': 'error',
+                           'message': "Une erreur est survenue. Veuillez reessayer."})
+
+        async def aevent_stream():
+            # Même flux que event_stream, servi par la boucle d'événements ASGI :
+            # l'attente du LLM n'occupe aucun thread, seuls les accès base de
+            # données passent par sync_to_async.
+            from asgiref.sync import sync_to_async
+            try:
+                if is_confirmation:
                     yield sse({'type': 'status', 'message': "Exécution de l'action confirmée"})
-                    result = _run_legacy_confirmation(orchestrator, confirmation_data, user_ctx)
-                    tokens_this_request = result.tokens
-                    payload = _persist_ai_message(
-                        conversation,
-                        reply=result.reply,
-                        tool_results=result.tool_results,
-                        charts=result.charts,
-                        tokens=result.tokens,
-                    )
+                    payload, tokens_this_request = await sync_to_async(run_confirmation)()
                     yield sse({'type': 'done', **payload})
                 else:
-                    history = list(
-                        Message.objects.filter(conversation=conversation)
-                        .order_by('created_at')
-                        .values('role', 'content')
-                    )[:-1]
-                    for event in orchestrator.run_stream(
-                        message=user_message,
-                        user_ctx=user_ctx,
-                        conversation_history=history,
-                        page=page,
-                        user=user,
-                    ):
+                    tokens_this_request = 0
+                    history = await sync_to_async(load_history)(conversation)
+                    async for event in orchestrator.arun_stream(conversation_history=history, **stream_kwargs):
                         if event['type'] == 'final':
-                            # Terminal : persistance + contrat unifié (jamais relayé brut).
                             tokens_this_request = event['tokens']
-                            payload = _persist_ai_message(
-                                conversation,
-                                reply=event['reply'],
-                                tool_results=event['tool_results'],
-                                charts=event['charts'],
-                                pending_action=event['pending_action'],
-                                tokens=event['tokens'],
-                                agent_steps=event['steps'],
-                            )
+                            payload = await sync_to_async(persist_final)(event)
                             yield sse({'type': 'done', **payload})
                         else:
                             yield sse(event)
-
-                # Comptabiliser les tokens (alimente check_budget) + quota IA.
-                # Toujours exécuté même si le client coupe la connexion (le
-                # générateur poursuit jusqu'à épuisement côté serveur).
-                _record_ai_usage(org, user, tokens_this_request)
-                if org:
-                    try:
-                        from apps.subscriptions.quota_service import QuotaService
-                        QuotaService.increment_usage(org, 'ai_requests')
-                    except Exception:
-                        pass
+                await sync_to_async(record_usage)(tokens_this_request)
             except Exception as e:
                 logger.error(f"Chat stream error: {e}", exc_info=True)
                 yield sse({'type': 'error',
                            'message': "Une erreur est survenue. Veuillez reessayer."})
 
-        response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+        # Sous ASGI, un itérateur synchrone serait consommé en entier dans un
+        # thread avant d'être envoyé (pas de streaming réel) : on sert alors le
+        # générateur asynchrone.
+        stream = aevent_stream() if _use_async_stream(request) else event_stream()
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
         response['Cache-Control'] = 'no-cache'
         response['X-Accel-Buffering'] = 'no'  # désactive le buffering Nginx
         return response
@@ -1201,6 +1244,19 @@ class AIUsageViewSet(viewsets.ReadOnlyModelViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'])
+    def tool_cache(self, request):
+        """
+        GET /api/v1/ai/usage/tool-cache/
+
+        Hits / misses du cache des outils analytiques de l'organisation
+        """
+        from .services.registry.tool_cache import get_metrics
+
+        if not request.user.organization_id:
+            return Response({'hits': 0, 'misses': 0, 'hit_rate': None, 'tools': {}})
+        return Response(get_metrics(request.user.organization_id))
+
     @action(detail=False, methods=['get'])
     def my_usage(self, request):
         """
@@ -1621,10 +1677,10 @@ class ImportReviewListView(APIView):
 
         status_filter = request.query_params.get('status', 'pending')
         
-        reviews = ImportReview.objects.filter(
+        reviews = list(ImportReview.objects.filter(
             user=request.user,
             status=status_filter
-        ).order_by('-created_at')
+        ).order_by('-created_at'))
 
         data = [{
             'id': str(review.id),
@@ -1638,12 +1694,75 @@ class ImportReviewListView(APIView):
             'source_document_id': str(review.source_document.id) if review.source_document else None,
         } for review in reviews]
 
+        if status_filter in ('pending', 'modified'):
+            self._annotate_counterparties(reviews, data, request.user)
+
         return Response({
             'reviews': data,
             'count': len(data)
         })
 
 
+    # Type de document -> (type de tiers, préfixe des champs extraits)
+    COUNTERPARTIES = {
+        'invoice': ('client', 'client_'),
+        'purchase_order': ('supplier', 'supplier_'),
+    }
+
+    def _annotate_counterparties(self, reviews, data, user):
+        """
+        Tiers existant probable de chaque document (`counterparty_match`) et
+        premier document du lot portant sur le même tiers
+        (`same_counterparty_as`) : une passe de déduplication par type de
+        tiers au lieu d'un matching par document.
+        """
+        from .bulk_dedup import BulkDeduplicator
+        from .entity_matcher import entity_matcher
+
+        organization = getattr(user, 'organization', None)
+        for item in data:
+            item['counterparty_match'] = None
+            item['same_counterparty_as'] = None
+        if organization is None:
+            return
+
+        for review_type, (entity_type, prefix) in self.COUNTERPARTIES.items():
+            positions = [i for i, review in enumerate(reviews) if review.entity_type == review_type]
+            if not positions:
+                continue
+
+            records = []
+            for i in positions:
+                extracted = reviews[i].modified_data or reviews[i].extracted_data or {}
+                records.append({
+                    'name': extracted.get(f'{prefix}name'),
+                    'email': extracted.get(f'{prefix}email'),
+                    'phone': extracted.get(f'{prefix}phone'),
+                })
+
+            try:
+                result = BulkDeduplicator(
+                    entity_type, organization, threshold=entity_matcher.threshold
+                ).run(records)
+            except Exception as e:
+                logger.warning(f"Bulk dedup failed for import reviews: {e}")
+                continue
+
+            for row, i in enumerate(positions):
+                match = result.existing.get(row)
+                if match:
+                    data[i]['counterparty_match'] = {
+                        'entity_type': entity_type,
+                        'id': str(match.entity_id),
+                        'name': match.name,
+                        'score': round(match.score * 100),
+                        'matched_on': match.matched_on,
+                    }
+                first = result.duplicate_of(row)
+                if first is not None:
+                    data[i]['same_counterparty_as'] = data[positions[first]]['id']
+
+
 class ImportReviewDetailView(APIView):
     """Détails d'un import review"""
     permission_classes = [IsAuthenticated]
@@ -2034,26 +2153,15 @@ class GenerateTextView(APIView):
             return Response({'error': 'prompt is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            import os
-            # Support mistralai v2.0+, v1.0+ and older versions
+            from .services.llm.client_manager import get_client_manager
+
+            client_manager = get_client_manager()
             try:
-                from mistralai.client import Mistral
-            except ImportError:
-                try:
-                    from mistralai import Mistral
-                except ImportError:
-                    from mistralai.client import MistralClient as Mistral
-
-            api_key = os.getenv('MISTRAL_API_KEY')
-            if not api_key:
-                from django.conf import settings
-                api_key = getattr(settings, 'MISTRAL_API_KEY', None)
-
-            if not api_key:
+                client_manager.client()
+            except ValueError:
                 return Response({'error': 'MISTRAL_API_KEY not configured'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            client = Mistral(api_key=api_key)
-            response = client.chat.complete(
+            response = client_manager.complete(
                 model='mistral-large-latest',
                 messages=[{'role': 'user', 'content': prompt}],
                 temperature=0.7,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Analytics, Visit
+from .models import Analytics, DailyOrgMetrics, Visit
 
 
 @admin.register(Analytics)
@@ -22,3 +22,18 @@ class VisitAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(DailyOrgMetrics)
+class DailyOrgMetricsAdmin(admin.ModelAdmin):
+    """Rollup journalier (lecture seule, reconstruit par rebuild_daily_metrics)."""
+    list_display = (
+        'date', 'organization', 'invoice_count', 'revenue', 'paid_amount',
+        'outstanding_amount', 'po_spend', 'units_sold', 'stock_value',
+    )
+    list_filter = ('organization',)
+    date_hierarchy = 'date'
+    readonly_fields = [f.name for f in DailyOrgMetrics._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
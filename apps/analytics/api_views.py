@@ -5,7 +5,7 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
+from django.http import FileResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .dashboard_service import DashboardStatsService
@@ -202,9 +202,8 @@ class DashboardExportView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # Retourner le fichier
-            response = HttpResponse(buffer.getvalue(), content_type=content_type)
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
+            # Envoyé par blocs ; le fichier (temporaire pour le XLSX) est fermé après l'envoi
+            return FileResponse(buffer, as_attachment=True, filename=filename, content_type=content_type)
 
         except Exception as e:
             logger.error(f"Error exporting dashboard: {e}")
@@ -2,19 +2,43 @@
 Service complet pour le dashboard avec statistiques personnalisables et export
 """
 from datetime import datetime, timedelta
-from django.db.models import Sum, Count, Avg, F, Q, Max, Min
+from functools import wraps
+from django.db.models import Sum, Count, F, Q, Max, Min
 from django.utils import timezone
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from .rollups import ensure_daily_metrics, metrics_queryset, sum_metrics
+from .stats_cache import get_or_compute
+from .time_buckets import TimeBucketAggregator, as_local_date
+
 logger = logging.getLogger(__name__)
 
+INVOICE_STATUSES = ['draft', 'sent', 'paid', 'overdue', 'cancelled']
+PO_STATUSES = ['draft', 'pending', 'approved', 'sent', 'received', 'cancelled']
+
+
+def memoized_stat(method):
+    """
+    Mémorise le résultat d'une méthode de statistiques sans argument pour la
+    durée de vie du service (une requête HTTP). Plusieurs widgets d'un même
+    tableau de bord partagent ainsi un seul calcul par agrégat.
+    """
+    @wraps(method)
+    def wrapper(self):
+        memo = self.__dict__.setdefault('_memo', {})
+        if method.__name__ not in memo:
+            memo[method.__name__] = method(self)
+        return memo[method.__name__]
+    return wrapper
+
 
 class DashboardStatsService:
     """Service centralisé pour toutes les statistiques du dashboard"""
 
-    def __init__(self, user, start_date=None, end_date=None, compare_previous=False):
+    def __init__(self, user, start_date=None, end_date=None, compare_previous=False,
+                 trend_granularity='day'):
         """
         Initialize dashboard stats service
 
@@ -23,6 +47,7 @@ class DashboardStatsService:
             start_date: Date de début (None = 30 derniers jours)
             end_date: Date de fin (None = aujourd'hui)
             compare_previous: Si True, compare avec la période précédente
+            trend_granularity: Tranche des tendances ('day', 'week', 'month')
         """
         self.user = user
         self.organization = getattr(user, 'organization', None)
@@ -36,6 +61,7 @@ class DashboardStatsService:
             self.start_date = self.end_date - timedelta(days=30)
 
         self.compare_previous = compare_previous
+        self.trend_granularity = trend_granularity
         self.period_days = (self.end_date - self.start_date).days
 
         # Période de comparaison (même durée avant start_date)
@@ -43,17 +69,85 @@ class DashboardStatsService:
             self.compare_end_date = self.start_date
             self.compare_start_date = self.compare_end_date - timedelta(days=self.period_days)
 
+    def _metrics(self):
+        """Rollup journalier de l'organisation (construit à la première lecture)"""
+        if not getattr(self, '_metrics_ready', False):
+            ensure_daily_metrics(self.organization)
+            self._metrics_ready = True
+        return metrics_queryset(self.organization)
+
+    def _period_metrics(self):
+        """Lignes de rollup de la période affichée (jours locaux inclus)"""
+        return self._metrics().filter(
+            date__gte=as_local_date(self.start_date),
+            date__lte=as_local_date(self.end_date)
+        )
+
+    def _previous_metrics(self):
+        """Lignes de rollup de la période de comparaison"""
+        return self._metrics().filter(
+            date__gte=as_local_date(self.compare_start_date),
+            date__lt=as_local_date(self.compare_end_date)
+        )
+
+    def _status_counts(self, model, statuses: List[str]) -> Tuple[int, Dict[str, int]]:
+        """
+        Total et répartition par statut (toutes périodes) en une requête
+        groupée, au lieu d'un count() par statut.
+        """
+        rows = (
+            model.objects
+            .filter(created_by__organization=self.organization)
+            .values('status')
+            .order_by()
+            .annotate(count=Count('pk'))
+        )
+        counts = {row['status']: row['count'] for row in rows}
+        by_status = {status: counts.get(status, 0) for status in statuses}
+        return sum(counts.values()), by_status
+
     def get_enabled_modules(self) -> List[str]:
-        """Récupère les modules activés pour l'utilisateur"""
-        from apps.core.modules import get_user_accessible_modules
-        return get_user_accessible_modules(self.user)
+        """Récupère les modules activés pour l'utilisateur (ensemble résolu une fois par requête)"""
+        from apps.core.modules import get_user_module_set
+        return sorted(get_user_module_set(self.user))
+
+    def cache_key_parts(self) -> Tuple:
+        """
+        Paramètres de période pour les clés du cache des statistiques.
+
+        Les bornes sont ramenées au jour local (le rollup est journalier) ;
+        la date du jour est incluse car certains indicateurs (retards) en
+        dépendent.
+        """
+        return (
+            as_local_date(self.start_date).isoformat(),
+            as_local_date(self.end_date).isoformat(),
+            timezone.localdate().isoformat(),
+            self.compare_previous,
+            self.trend_granularity,
+        )
 
-    def get_comprehensive_stats(self) -> Dict:
+    def get_comprehensive_stats(self, use_cache: bool = True) -> Dict:
         """
         Retourne toutes les statistiques du dashboard
+
+        Args:
+            use_cache: lire/écrire le cache versionné de l'organisation
         """
         enabled_modules = self.get_enabled_modules()
 
+        if not use_cache or not self.organization:
+            return self._build_comprehensive_stats(enabled_modules)
+
+        return get_or_compute(
+            'dashboard',
+            self.organization.pk,
+            self.cache_key_parts() + (tuple(sorted(enabled_modules)),),
+            lambda: self._build_comprehensive_stats(enabled_modules)
+        )
+
+    def _build_comprehensive_stats(self, enabled_modules: List[str]) -> Dict:
+        """Calcule toutes les statistiques du dashboard (sans cache)"""
         stats = {
             'metadata': {
                 'start_date': self.start_date.isoformat(),
@@ -98,6 +192,7 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_alerts(self) -> List[Dict]:
         """Génère les alertes pour le dashboard"""
         alerts = []
@@ -206,6 +301,7 @@ class DashboardStatsService:
         activity.sort(key=lambda x: x['date'], reverse=True)
         return activity[:10]
 
+    @memoized_stat
     def get_supplier_stats(self) -> Dict:
         """Statistiques détaillées des fournisseurs"""
         from apps.suppliers.models import Supplier
@@ -280,6 +376,7 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_purchase_order_stats(self) -> Dict:
         """Statistiques détaillées des bons de commande"""
         from apps.purchase_orders.models import PurchaseOrder
@@ -288,50 +385,21 @@ class DashboardStatsService:
         if not self.organization:
             return {'total': 0, 'by_status': {}, 'period': {'count': 0, 'total_amount': 0, 'average_amount': 0, 'daily_trend': []}}
 
-        # Stats globales - FILTERED BY ORGANIZATION
-        total = PurchaseOrder.objects.filter(created_by__organization=self.organization).count()
-
-        # Par statut - FILTERED BY ORGANIZATION
-        by_status = {
-            'draft': PurchaseOrder.objects.filter(created_by__organization=self.organization, status='draft').count(),
-            'pending': PurchaseOrder.objects.filter(created_by__organization=self.organization, status='pending').count(),
-            'approved': PurchaseOrder.objects.filter(created_by__organization=self.organization, status='approved').count(),
-            'sent': PurchaseOrder.objects.filter(created_by__organization=self.organization, status='sent').count(),
-            'received': PurchaseOrder.objects.filter(created_by__organization=self.organization, status='received').count(),
-            'cancelled': PurchaseOrder.objects.filter(created_by__organization=self.organization, status='cancelled').count(),
-        }
+        # Stats globales et par statut - FILTERED BY ORGANIZATION
+        total, by_status = self._status_counts(PurchaseOrder, PO_STATUSES)
 
-        # Stats de la période - FILTERED BY ORGANIZATION
-        period_pos = PurchaseOrder.objects.filter(
-            created_by__organization=self.organization,
-            created_at__gte=self.start_date,
-            created_at__lte=self.end_date
-        )
-
-        new_count = period_pos.count()
-        total_amount = period_pos.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        average_amount = period_pos.aggregate(Avg('total_amount'))['total_amount__avg'] or 0
+        # Stats de la période - lues depuis le rollup journalier
+        period_metrics = self._period_metrics()
+        period_totals = sum_metrics(period_metrics, ['po_count', 'po_amount'])
+        new_count = period_totals['po_count']
+        total_amount = period_totals['po_amount']
+        average_amount = (total_amount / new_count) if new_count else 0
 
-        # Tendance par jour
-        daily_trend = []
-        current_date = self.start_date.date()
-        end_date_only = self.end_date.date()
-
-        while current_date <= end_date_only:
-            next_date = current_date + timedelta(days=1)
-            day_count = period_pos.filter(
-                created_at__date=current_date
-            ).count()
-            day_amount = period_pos.filter(
-                created_at__date=current_date
-            ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-
-            daily_trend.append({
-                'date': current_date.isoformat(),
-                'count': day_count,
-                'amount': float(day_amount)
-            })
-            current_date = next_date
+        # Tendance par jour (une seule requête groupée)
+        daily_trend = TimeBucketAggregator(
+            period_metrics, date_field='date', amount_field='po_amount',
+            count_field='po_count', granularity=self.trend_granularity
+        ).trend(self.start_date, self.end_date)
 
         stats = {
             'total': total,
@@ -346,13 +414,9 @@ class DashboardStatsService:
 
         # Comparaison avec période précédente - FILTERED BY ORGANIZATION
         if self.compare_previous:
-            previous_pos = PurchaseOrder.objects.filter(
-                created_by__organization=self.organization,
-                created_at__gte=self.compare_start_date,
-                created_at__lt=self.compare_end_date
-            )
-            previous_count = previous_pos.count()
-            previous_amount = previous_pos.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+            previous_totals = sum_metrics(self._previous_metrics(), ['po_count', 'po_amount'])
+            previous_count = previous_totals['po_count']
+            previous_amount = previous_totals['po_amount']
 
             stats['comparison'] = {
                 'previous_count': previous_count,
@@ -365,6 +429,7 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_invoice_stats(self) -> Dict:
         """Statistiques détaillées des factures"""
         from apps.invoicing.models import Invoice
@@ -373,51 +438,25 @@ class DashboardStatsService:
         if not self.organization:
             return {'total': 0, 'by_status': {}, 'period': {'count': 0, 'total_amount': 0, 'paid_amount': 0, 'pending_amount': 0, 'payment_rate': 0, 'daily_trend': []}}
 
-        # Stats globales - FILTERED BY ORGANIZATION
-        total = Invoice.objects.filter(created_by__organization=self.organization).count()
-
-        # Par statut - FILTERED BY ORGANIZATION
-        by_status = {
-            'draft': Invoice.objects.filter(created_by__organization=self.organization, status='draft').count(),
-            'sent': Invoice.objects.filter(created_by__organization=self.organization, status='sent').count(),
-            'paid': Invoice.objects.filter(created_by__organization=self.organization, status='paid').count(),
-            'overdue': Invoice.objects.filter(created_by__organization=self.organization, status='overdue').count(),
-            'cancelled': Invoice.objects.filter(created_by__organization=self.organization, status='cancelled').count(),
-        }
+        # Stats globales et par statut - FILTERED BY ORGANIZATION
+        total, by_status = self._status_counts(Invoice, INVOICE_STATUSES)
 
-        # Stats de la période - FILTERED BY ORGANIZATION
-        period_invoices = Invoice.objects.filter(
-            created_by__organization=self.organization,
-            created_at__gte=self.start_date,
-            created_at__lte=self.end_date
+        # Stats de la période - lues depuis le rollup journalier
+        period_metrics = self._period_metrics()
+        period_totals = sum_metrics(
+            period_metrics, ['invoice_count', 'invoiced_amount', 'paid_amount', 'outstanding_amount']
         )
-
-        new_count = period_invoices.count()
-        total_amount = period_invoices.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        paid_amount = period_invoices.filter(status='paid').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        pending_amount = period_invoices.filter(status='sent').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-
-        # Tendance quotidienne
-        daily_trend = []
-        current_date = self.start_date.date()
-        end_date_only = self.end_date.date()
-
-        while current_date <= end_date_only:
-            next_date = current_date + timedelta(days=1)
-            day_count = period_invoices.filter(created_at__date=current_date).count()
-            day_amount = period_invoices.filter(created_at__date=current_date).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            day_paid = period_invoices.filter(
-                payments__payment_date=current_date,
-                status='paid'
-            ).distinct().aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-
-            daily_trend.append({
-                'date': current_date.isoformat(),
-                'count': day_count,
-                'amount': float(day_amount),
-                'paid_amount': float(day_paid)
-            })
-            current_date = next_date
+        new_count = period_totals['invoice_count']
+        total_amount = period_totals['invoiced_amount']
+        paid_amount = period_totals['paid_amount']
+        pending_amount = period_totals['outstanding_amount']
+
+        # Tendance quotidienne : count/montant par date de création, montant
+        # payé par date de paiement (collected_amount du rollup)
+        daily_trend = TimeBucketAggregator(
+            period_metrics, date_field='date', amount_field='invoiced_amount',
+            count_field='invoice_count', granularity=self.trend_granularity
+        ).trend(self.start_date, self.end_date, paid_field='collected_amount')
 
         # Taux de paiement
         payment_rate = (paid_amount / total_amount * 100) if total_amount > 0 else 0
@@ -437,14 +476,12 @@ class DashboardStatsService:
 
         # Comparaison avec période précédente - FILTERED BY ORGANIZATION
         if self.compare_previous:
-            previous_invoices = Invoice.objects.filter(
-                created_by__organization=self.organization,
-                created_at__gte=self.compare_start_date,
-                created_at__lt=self.compare_end_date
+            previous_totals = sum_metrics(
+                self._previous_metrics(), ['invoice_count', 'invoiced_amount', 'paid_amount']
             )
-            previous_count = previous_invoices.count()
-            previous_amount = previous_invoices.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            previous_paid = previous_invoices.filter(status='paid').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+            previous_count = previous_totals['invoice_count']
+            previous_amount = previous_totals['invoiced_amount']
+            previous_paid = previous_totals['paid_amount']
 
             stats['comparison'] = {
                 'previous_count': previous_count,
@@ -458,6 +495,7 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_client_stats(self) -> Dict:
         """Statistiques détaillées des clients"""
         from apps.accounts.models import Client
@@ -533,6 +571,7 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_product_stats(self) -> Dict:
         """Statistiques détaillées des produits et stock"""
         from apps.invoicing.models import Product
@@ -609,40 +648,44 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_financial_stats(self) -> Dict:
         """Statistiques financières globales"""
-        from apps.invoicing.models import Invoice
-        from apps.purchase_orders.models import PurchaseOrder
-
         if not self.organization:
             return {'revenue': 0, 'expenses': 0, 'net_profit': 0, 'profit_margin': 0, 'pending_revenue': 0}
 
-        # Revenus (factures payées et envoyées) - comptabilité d'engagement
-        # Note: Si vous préférez seulement 'paid', changez status__in
-        revenue = Invoice.objects.filter(
-            created_by__organization=self.organization,
-            status__in=['paid', 'sent', 'overdue'],
-            created_at__gte=self.start_date,
-            created_at__lte=self.end_date
-        ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        # Une seule requête sur le rollup pour la période courante, l'encours
+        # global et la période de comparaison
+        in_period = Q(date__gte=as_local_date(self.start_date), date__lte=as_local_date(self.end_date))
+        aggregates = {
+            # Revenus (factures payées et envoyées) - comptabilité d'engagement
+            'revenue': Sum('revenue', filter=in_period),
+            # Dépenses (BCs approuvés/reçus)
+            'expenses': Sum('po_spend', filter=in_period),
+            # Revenus en attente (toutes périodes)
+            'pending': Sum('outstanding_amount'),
+        }
+        if self.compare_previous:
+            in_previous = Q(
+                date__gte=as_local_date(self.compare_start_date),
+                date__lt=as_local_date(self.compare_end_date)
+            )
+            aggregates['previous_revenue'] = Sum('paid_amount', filter=in_previous)
+            aggregates['previous_expenses'] = Sum('po_spend', filter=in_previous)
 
-        # Dépenses (BCs approuvés/reçus)
-        expenses = PurchaseOrder.objects.filter(
-            created_by__organization=self.organization,
-            status__in=['approved', 'sent', 'received'],
-            created_at__gte=self.start_date,
-            created_at__lte=self.end_date
-        ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        totals = {
+            name: value or Decimal('0')
+            for name, value in self._metrics().aggregate(**aggregates).items()
+        }
+
+        revenue = totals['revenue']
+        expenses = totals['expenses']
 
         # Profit net
         net_profit = revenue - expenses
         profit_margin = (net_profit / revenue * 100) if revenue > 0 else 0
 
-        # Revenus en attente
-        pending_revenue = Invoice.objects.filter(
-            created_by__organization=self.organization,
-            status='sent'
-        ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        pending_revenue = totals['pending']
 
         stats = {
             'revenue': float(revenue),
@@ -654,20 +697,8 @@ class DashboardStatsService:
 
         # Comparaison avec période précédente
         if self.compare_previous:
-            previous_revenue = Invoice.objects.filter(
-                created_by__organization=self.organization,
-                status='paid',
-                created_at__gte=self.compare_start_date,
-                created_at__lt=self.compare_end_date
-            ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-
-            previous_expenses = PurchaseOrder.objects.filter(
-                created_by__organization=self.organization,
-                status__in=['approved', 'sent', 'received'],
-                created_at__gte=self.compare_start_date,
-                created_at__lt=self.compare_end_date
-            ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-
+            previous_revenue = totals['previous_revenue']
+            previous_expenses = totals['previous_expenses']
             previous_profit = previous_revenue - previous_expenses
 
             stats['comparison'] = {
@@ -683,6 +714,7 @@ class DashboardStatsService:
 
         return stats
 
+    @memoized_stat
     def get_performance_metrics(self) -> Dict:
         """Métriques de performance globales"""
         from apps.invoicing.models import Invoice
@@ -63,121 +63,97 @@ class DashboardExportService:
             logger.error(f"Error generating PDF with WeasyPrint: {e}")
             raise
 
-    def export_to_excel(self) -> BytesIO:
+    def export_to_excel(self):
         """
         Exporte les statistiques en Excel avec plusieurs feuilles
 
         Returns:
-            BytesIO: Buffer contenant le fichier Excel
+            Fichier temporaire (rembobiné) contenant le classeur Excel
         """
         try:
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-            from openpyxl.utils import get_column_letter
+            from openpyxl.styles import Font
+            from apps.core.exports import XLSXWriter, column_widths
 
-            workbook = openpyxl.Workbook()
-
-            # Supprimer la feuille par défaut
-            workbook.remove(workbook.active)
-
-            # Style pour les en-têtes
-            header_fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
+            writer = XLSXWriter()
 
             # Feuille Résumé
-            ws_summary = workbook.create_sheet("Résumé")
-            ws_summary.append(["Tableau de Bord - Résumé"])
-            ws_summary.merge_cells('A1:B1')
-            ws_summary['A1'].font = Font(bold=True, size=16, color="1976D2")
-            ws_summary.append([])
-
-            ws_summary.append(["Période", f"{self.metadata.get('start_date')} - {self.metadata.get('end_date')}"])
-            ws_summary.append(["Nombre de jours", self.metadata.get('period_days', 'N/A')])
-            ws_summary.append(["Généré le", timezone.localtime(timezone.now()).strftime('%d/%m/%Y %H:%M')])
-            ws_summary.append([])
+            summary = [
+                ["Tableau de Bord - Résumé"],
+                [],
+                ["Période", f"{self.metadata.get('start_date')} - {self.metadata.get('end_date')}"],
+                ["Nombre de jours", self.metadata.get('period_days', 'N/A')],
+                ["Généré le", timezone.localtime(timezone.now()).strftime('%d/%m/%Y %H:%M')],
+                [],
+            ]
 
             # Données financières
             if 'financial' in self.stats_data:
-                ws_summary.append(["Résumé Financier"])
-                ws_summary.append(["Indicateur", "Valeur"])
                 financial = self.stats_data['financial']
-                ws_summary.append(["Revenus", financial.get('revenue', 0)])
-                ws_summary.append(["Dépenses", financial.get('expenses', 0)])
-                ws_summary.append(["Profit Net", financial.get('net_profit', 0)])
-                ws_summary.append(["Marge bénéficiaire", f"{financial.get('profit_margin', 0):.2f}%"])
+                summary += [
+                    ["Résumé Financier"],
+                    ["Indicateur", "Valeur"],
+                    ["Revenus", financial.get('revenue', 0)],
+                    ["Dépenses", financial.get('expenses', 0)],
+                    ["Profit Net", financial.get('net_profit', 0)],
+                    ["Marge bénéficiaire", f"{financial.get('profit_margin', 0):.2f}%"],
+                ]
+            sheets = [("Résumé", summary, Font(bold=True, size=16, color="1976D2"))]
 
             # Feuille Factures
             if 'invoices' in self.stats_data:
-                ws_invoices = workbook.create_sheet("Factures")
-                ws_invoices.append(["Statistiques des Factures"])
-                ws_invoices.merge_cells('A1:B1')
-                ws_invoices['A1'].font = Font(bold=True, size=14)
-                ws_invoices.append([])
-
                 invoices = self.stats_data['invoices']
-                ws_invoices.append(["Métrique", "Valeur"])
-                ws_invoices.append(["Total factures", invoices.get('total', 0)])
-
-                by_status = invoices.get('by_status', {})
-                for status, count in by_status.items():
-                    ws_invoices.append([f"Statut: {status}", count])
+                rows = [
+                    ["Statistiques des Factures"],
+                    [],
+                    ["Métrique", "Valeur"],
+                    ["Total factures", invoices.get('total', 0)],
+                ]
+                for status, count in invoices.get('by_status', {}).items():
+                    rows.append([f"Statut: {status}", count])
 
                 if 'period' in invoices:
-                    ws_invoices.append([])
-                    ws_invoices.append(["Période analysée"])
                     period = invoices['period']
-                    ws_invoices.append(["Nouvelles factures", period.get('count', 0)])
-                    ws_invoices.append(["Montant total", period.get('total_amount', 0)])
-                    ws_invoices.append(["Montant payé", period.get('paid_amount', 0)])
-                    ws_invoices.append(["Taux de paiement", f"{period.get('payment_rate', 0):.2f}%"])
+                    rows += [
+                        [],
+                        ["Période analysée"],
+                        ["Nouvelles factures", period.get('count', 0)],
+                        ["Montant total", period.get('total_amount', 0)],
+                        ["Montant payé", period.get('paid_amount', 0)],
+                        ["Taux de paiement", f"{period.get('payment_rate', 0):.2f}%"],
+                    ]
+                sheets.append(("Factures", rows, Font(bold=True, size=14)))
 
             # Feuille Bons de Commande
             if 'purchase_orders' in self.stats_data:
-                ws_pos = workbook.create_sheet("Bons de Commande")
-                ws_pos.append(["Statistiques des Bons de Commande"])
-                ws_pos.merge_cells('A1:B1')
-                ws_pos['A1'].font = Font(bold=True, size=14)
-                ws_pos.append([])
-
                 pos = self.stats_data['purchase_orders']
-                ws_pos.append(["Métrique", "Valeur"])
-                ws_pos.append(["Total BCs", pos.get('total', 0)])
-
-                by_status = pos.get('by_status', {})
-                for status, count in by_status.items():
-                    ws_pos.append([f"Statut: {status}", count])
+                rows = [
+                    ["Statistiques des Bons de Commande"],
+                    [],
+                    ["Métrique", "Valeur"],
+                    ["Total BCs", pos.get('total', 0)],
+                ]
+                for status, count in pos.get('by_status', {}).items():
+                    rows.append([f"Statut: {status}", count])
 
                 if 'period' in pos:
-                    ws_pos.append([])
-                    ws_pos.append(["Période analysée"])
                     period = pos['period']
-                    ws_pos.append(["Nouveaux BCs", period.get('count', 0)])
-                    ws_pos.append(["Montant total", period.get('total_amount', 0)])
-
-            # Auto-ajuster les colonnes
-            for sheet in workbook.worksheets:
-                for column in sheet.columns:
-                    max_length = 0
-                    column_letter = get_column_letter(column[0].column)
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(cell.value)
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    sheet.column_dimensions[column_letter].width = adjusted_width
-
-            buffer = BytesIO()
-            workbook.save(buffer)
-            buffer.seek(0)
-            return buffer
+                    rows += [
+                        [],
+                        ["Période analysée"],
+                        ["Nouveaux BCs", period.get('count', 0)],
+                        ["Montant total", period.get('total_amount', 0)],
+                    ]
+                sheets.append(("Bons de Commande", rows, Font(bold=True, size=14)))
+
+            # Mode write_only : largeurs calculées avant d'écrire les lignes
+            for title, rows, title_font in sheets:
+                worksheet = writer.sheet(title, column_widths(rows[1:]))
+                worksheet.append([writer.cell(worksheet, rows[0][0], font=title_font)])
+                writer.merge(worksheet, 'A1:B1')
+                for row in rows[1:]:
+                    worksheet.append(row)
+
+            return writer.save()
 
         except Exception as e:
             logger.error(f"Error generating Excel: {e}")
@@ -0,0 +1,58 @@
+"""
+Commande Django : rebuild_daily_metrics
+Reconstruit la table de rollup DailyOrgMetrics depuis les factures, paiements,
+bons de commande et mouvements de stock.
+
+Usage:
+    python manage.py rebuild_daily_metrics
+    python manage.py rebuild_daily_metrics --org-id <uuid>
+    python manage.py rebuild_daily_metrics --since 2026-01-01 --until 2026-03-31
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import Organization
+from apps.analytics.rollups import rebuild_daily_metrics
+
+
+def _parse_date(value, option):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"{option} doit être au format YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les métriques journalières (rollup) des dashboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--org-id',
+            type=str,
+            help='UUID de l\'organisation (optionnel — si omis, toutes les organisations)',
+        )
+        parser.add_argument('--since', type=str, help='Premier jour à reconstruire (YYYY-MM-DD)')
+        parser.add_argument('--until', type=str, help='Dernier jour à reconstruire (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        since = _parse_date(options.get('since'), '--since')
+        until = _parse_date(options.get('until'), '--until')
+
+        org_id = options.get('org_id')
+        if org_id:
+            orgs = Organization.objects.filter(pk=org_id)
+            if not orgs.exists():
+                raise CommandError(f'Organisation {org_id} introuvable')
+        else:
+            orgs = Organization.objects.all()
+
+        total = 0
+        for org in orgs.iterator():
+            rows = rebuild_daily_metrics(org, start_date=since, end_date=until)
+            total += rows
+            self.stdout.write(f'  {org.name}: {rows} jour(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Rollup reconstruit : {total} ligne(s).'))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.11 on 2026-10-18 00:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_change_payment_terms_default_to_cash'),
+        ('analytics', '0006_visit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrgMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('invoice_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de factures')),
+                ('invoiced_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Montant facturé')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Factures payées, envoyées ou en retard', max_digits=16, verbose_name="Chiffre d'affaires")),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Montant payé')),
+                ('outstanding_amount', models.DecimalField(decimal_places=2, default=0, help_text='Factures envoyées non payées', max_digits=16, verbose_name='Montant en attente')),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Montant en retard')),
+                ('collected_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Montant encaissé')),
+                ('po_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de BCs')),
+                ('po_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Montant des BCs')),
+                ('po_spend', models.DecimalField(decimal_places=2, default=0, help_text='BCs approuvés, envoyés ou reçus', max_digits=16, verbose_name='Dépenses BCs')),
+                ('po_committed_amount', models.DecimalField(decimal_places=2, default=0, help_text='BCs en attente, approuvés ou envoyés (à payer)', max_digits=16, verbose_name='Engagements BCs')),
+                ('units_sold', models.IntegerField(default=0, verbose_name='Unités vendues')),
+                ('stock_value', models.DecimalField(blank=True, decimal_places=2, help_text='Instantané en fin de journée (non reconstructible a posteriori)', max_digits=16, null=True, verbose_name='Valeur du stock')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='accounts.organization', verbose_name='Organisation')),
+            ],
+            options={
+                'verbose_name': 'Métriques journalières',
+                'verbose_name_plural': 'Métriques journalières',
+                'ordering': ['organization', 'date'],
+                'unique_together': {('organization', 'date')},
+            },
+        ),
+    ]
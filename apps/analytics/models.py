@@ -524,3 +524,68 @@ class Budget(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.organization.name} - {self.amount}"
+
+
+class DailyOrgMetrics(models.Model):
+    """
+    Agrégats journaliers par organisation (table de rollup).
+
+    Alimentée incrémentalement par les signaux (factures, paiements, BCs,
+    mouvements de stock) et reconstruite par la commande
+    `rebuild_daily_metrics`. Les dashboards lisent ces lignes au lieu de
+    ré-agréger tout l'historique brut : le coût d'une requête dépend du
+    nombre de jours affichés, plus du volume de documents.
+    """
+    organization = models.ForeignKey(
+        'accounts.Organization',
+        on_delete=models.CASCADE,
+        related_name='daily_metrics',
+        verbose_name=_("Organisation")
+    )
+    date = models.DateField(verbose_name=_("Date"))
+
+    # Factures (par date de création)
+    invoice_count = models.PositiveIntegerField(default=0, verbose_name=_("Nombre de factures"))
+    invoiced_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant facturé"))
+    revenue = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0, verbose_name=_("Chiffre d'affaires"),
+        help_text=_("Factures payées, envoyées ou en retard")
+    )
+    paid_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant payé"))
+    outstanding_amount = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant en attente"),
+        help_text=_("Factures envoyées non payées")
+    )
+    overdue_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant en retard"))
+    # Factures payées, par date de paiement
+    collected_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant encaissé"))
+
+    # Bons de commande (par date de création)
+    po_count = models.PositiveIntegerField(default=0, verbose_name=_("Nombre de BCs"))
+    po_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant des BCs"))
+    po_spend = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0, verbose_name=_("Dépenses BCs"),
+        help_text=_("BCs approuvés, envoyés ou reçus")
+    )
+    po_committed_amount = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0, verbose_name=_("Engagements BCs"),
+        help_text=_("BCs en attente, approuvés ou envoyés (à payer)")
+    )
+
+    # Stock
+    units_sold = models.IntegerField(default=0, verbose_name=_("Unités vendues"))
+    stock_value = models.DecimalField(
+        max_digits=16, decimal_places=2, null=True, blank=True, verbose_name=_("Valeur du stock"),
+        help_text=_("Instantané en fin de journée (non reconstructible a posteriori)")
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Métriques journalières")
+        verbose_name_plural = _("Métriques journalières")
+        ordering = ['organization', 'date']
+        unique_together = [('organization', 'date')]
+
+    def __str__(self):
+        return f"{self.organization_id} · {self.date}"
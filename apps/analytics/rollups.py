@@ -0,0 +1,309 @@
+"""
+Maintenance de la table de rollup `DailyOrgMetrics`.
+
+- `refresh_daily_metrics` recalcule UNE journée d'une organisation (coût borné
+  par l'activité de cette journée) : appelée par les signaux après commit.
+- `rebuild_daily_metrics` reconstruit tout l'historique d'une organisation en
+  quelques requêtes groupées (commande `rebuild_daily_metrics`).
+- `metrics_queryset` / `ensure_daily_metrics` sont utilisés par les services de
+  lecture (dashboard, widgets, graphiques IA).
+
+Chaque mise à jour du rollup incrémente la version des données de
+l'organisation (`stats_cache`), ce qui invalide les statistiques en cache.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+import logging
+
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum, F
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from apps.core.transactions import on_commit_once
+
+from .stats_cache import schedule_data_version_bump
+
+logger = logging.getLogger(__name__)
+
+REVENUE_STATUSES = ['paid', 'sent', 'overdue']
+PO_SPEND_STATUSES = ['approved', 'sent', 'received']
+PO_COMMITTED_STATUSES = ['pending', 'approved', 'sent']
+
+INVOICE_AGGREGATES = {
+    'invoice_count': Count('pk'),
+    'invoiced_amount': Sum('total_amount'),
+    'revenue': Sum('total_amount', filter=Q(status__in=REVENUE_STATUSES)),
+    'paid_amount': Sum('total_amount', filter=Q(status='paid')),
+    'outstanding_amount': Sum('total_amount', filter=Q(status='sent')),
+    'overdue_amount': Sum('total_amount', filter=Q(status='overdue')),
+}
+
+PO_AGGREGATES = {
+    'po_count': Count('pk'),
+    'po_amount': Sum('total_amount'),
+    'po_spend': Sum('total_amount', filter=Q(status__in=PO_SPEND_STATUSES)),
+    'po_committed_amount': Sum('total_amount', filter=Q(status__in=PO_COMMITTED_STATUSES)),
+}
+
+METRIC_FIELDS = list(INVOICE_AGGREGATES) + ['collected_amount'] + list(PO_AGGREGATES) + ['units_sold']
+
+
+def _day_bounds(day: date):
+    """Bornes [début, fin[ d'une journée dans le fuseau courant."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _clean(values: Dict) -> Dict:
+    """Remplace les None renvoyés par Sum() par des zéros."""
+    return {
+        key: (value if value is not None else (0 if key.endswith('_count') or key == 'units_sold' else Decimal('0')))
+        for key, value in values.items()
+    }
+
+
+def _current_stock_value(organization_id) -> Decimal:
+    from apps.invoicing.models import Product
+
+    return Product.objects.filter(
+        organization_id=organization_id,
+        product_type='physical'
+    ).aggregate(
+        total=Sum(F('stock_quantity') * F('cost_price'))
+    )['total'] or Decimal('0')
+
+
+def compute_day_metrics(organization_id, day: date) -> Dict:
+    """Calcule les métriques d'une journée depuis les tables brutes."""
+    from apps.invoicing.models import Invoice, Payment, StockMovement
+    from apps.purchase_orders.models import PurchaseOrder
+
+    start, end = _day_bounds(day)
+
+    values = Invoice.objects.filter(
+        created_by__organization_id=organization_id,
+        created_at__gte=start,
+        created_at__lt=end
+    ).aggregate(**INVOICE_AGGREGATES)
+
+    # Sous-requête sur les paiements : une facture réglée en plusieurs fois le
+    # même jour n'est comptée qu'une fois.
+    values['collected_amount'] = Invoice.objects.filter(
+        created_by__organization_id=organization_id,
+        status='paid',
+        pk__in=Payment.objects.filter(payment_date=day).values('invoice_id')
+    ).aggregate(total=Sum('total_amount'))['total']
+
+    values.update(PurchaseOrder.objects.filter(
+        created_by__organization_id=organization_id,
+        created_at__gte=start,
+        created_at__lt=end
+    ).aggregate(**PO_AGGREGATES))
+
+    sold = StockMovement.objects.filter(
+        product__organization_id=organization_id,
+        movement_type='sale',
+        created_at__gte=start,
+        created_at__lt=end
+    ).aggregate(total=Sum('quantity'))['total'] or 0
+    # Les sorties de stock sont enregistrées en négatif
+    values['units_sold'] = -sold
+
+    return _clean(values)
+
+
+def refresh_daily_metrics(organization_id, day: date):
+    """Recalcule et enregistre la ligne (organisation, jour)."""
+    from .models import DailyOrgMetrics
+
+    if not organization_id or day is None:
+        return None
+
+    values = compute_day_metrics(organization_id, day)
+    # La valeur du stock est un instantané : on ne peut la connaître que pour
+    # la journée en cours, les jours passés gardent leur dernière valeur.
+    if day == timezone.localdate():
+        values['stock_value'] = _current_stock_value(organization_id)
+
+    metrics, _ = DailyOrgMetrics.objects.update_or_create(
+        organization_id=organization_id,
+        date=day,
+        defaults=values
+    )
+    # Les statistiques en cache lisent ce rollup : invalidation une fois la
+    # ligne à jour (et non au moment de l'écriture d'origine)
+    schedule_data_version_bump(organization_id)
+    return metrics
+
+
+def schedule_metrics_refresh(organization_id, day: Optional[date]):
+    """
+    Programme le recalcul d'une journée après le commit de la transaction
+    courante (immédiatement en autocommit). Les demandes identiques au sein
+    d'une même transaction ne sont exécutées qu'une fois.
+    """
+    if not organization_id or day is None:
+        return
+
+    on_commit_once(('analytics.metrics', str(organization_id), day), _safe_refresh, organization_id, day)
+
+
+def schedule_bulk_refresh(queryset, organization_field: str = 'created_by__organization_id',
+                          date_field: str = 'created_at'):
+    """
+    Équivalent des signaux pour un `queryset.update()` (aucun post_save) :
+    programme le recalcul de chaque journée touchée et l'invalidation des
+    statistiques en cache (dont le cache des outils IA) des organisations
+    concernées, après commit.
+    """
+    from .time_buckets import as_local_date
+
+    organizations = set()
+    pairs = queryset.order_by().values_list(organization_field, date_field).distinct()
+    for organization_id, moment in pairs:
+        if moment is not None:
+            schedule_metrics_refresh(organization_id, as_local_date(moment))
+        organizations.add(organization_id)
+    for organization_id in organizations:
+        schedule_data_version_bump(organization_id)
+
+
+def _safe_refresh(organization_id, day):
+    try:
+        refresh_daily_metrics(organization_id, day)
+    except Exception:
+        logger.exception("Échec du recalcul des métriques journalières (%s, %s)", organization_id, day)
+
+
+def _grouped(queryset, date_field: str, aggregates: Dict) -> Dict[date, Dict]:
+    rows = (
+        queryset
+        .annotate(day=Trunc(date_field, 'day', output_field=DateField()))
+        .values('day')
+        .order_by('day')
+        .annotate(**aggregates)
+    )
+    return {row.pop('day'): row for row in rows}
+
+
+@transaction.atomic
+def rebuild_daily_metrics(organization, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None) -> int:
+    """
+    Reconstruit les métriques journalières d'une organisation en une poignée
+    de requêtes groupées (indépendant du nombre de jours).
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    from apps.invoicing.models import Invoice, Payment, StockMovement
+    from apps.purchase_orders.models import PurchaseOrder
+    from .models import DailyOrgMetrics
+
+    org_id = organization.pk
+
+    def _range(queryset, field):
+        if start_date:
+            queryset = queryset.filter(**{f'{field}__gte': _day_bounds(start_date)[0]})
+        if end_date:
+            queryset = queryset.filter(**{f'{field}__lt': _day_bounds(end_date)[1]})
+        return queryset
+
+    invoices = _range(Invoice.objects.filter(created_by__organization_id=org_id), 'created_at')
+    by_day_invoices = _grouped(invoices, 'created_at', INVOICE_AGGREGATES)
+
+    payments = Payment.objects.filter(
+        invoice__created_by__organization_id=org_id,
+        invoice__status='paid'
+    )
+    if start_date:
+        payments = payments.filter(payment_date__gte=start_date)
+    if end_date:
+        payments = payments.filter(payment_date__lte=end_date)
+    collected = {}
+    for day, _invoice_id, amount in payments.values_list(
+            'payment_date', 'invoice_id', 'invoice__total_amount').distinct():
+        collected[day] = collected.get(day, Decimal('0')) + (amount or 0)
+
+    pos = _range(PurchaseOrder.objects.filter(created_by__organization_id=org_id), 'created_at')
+    by_day_pos = _grouped(pos, 'created_at', PO_AGGREGATES)
+
+    sales = _range(StockMovement.objects.filter(
+        product__organization_id=org_id, movement_type='sale'
+    ), 'created_at')
+    by_day_sales = _grouped(sales, 'created_at', {'sold': Sum('quantity')})
+
+    existing = DailyOrgMetrics.objects.filter(organization_id=org_id)
+    if start_date:
+        existing = existing.filter(date__gte=start_date)
+    if end_date:
+        existing = existing.filter(date__lte=end_date)
+    # Conserver les instantanés de valeur de stock déjà enregistrés
+    stock_values = dict(existing.exclude(stock_value__isnull=True).values_list('date', 'stock_value'))
+    existing.delete()
+
+    today = timezone.localdate()
+    days = set(by_day_invoices) | set(collected) | set(by_day_pos) | set(by_day_sales)
+    if (not start_date or start_date <= today) and (not end_date or end_date >= today):
+        days.add(today)
+        stock_values[today] = _current_stock_value(org_id)
+
+    rows = []
+    for day in sorted(days):
+        values = {}
+        values.update(by_day_invoices.get(day, {}))
+        values['collected_amount'] = collected.get(day)
+        values.update(by_day_pos.get(day, {}))
+        values['units_sold'] = -(by_day_sales.get(day, {}).get('sold') or 0)
+        for field in METRIC_FIELDS:
+            values.setdefault(field, None)
+        rows.append(DailyOrgMetrics(
+            organization_id=org_id,
+            date=day,
+            stock_value=stock_values.get(day),
+            **_clean(values)
+        ))
+
+    DailyOrgMetrics.objects.bulk_create(rows, batch_size=500)
+    schedule_data_version_bump(org_id)
+    return len(rows)
+
+
+def ensure_daily_metrics(organization) -> bool:
+    """
+    Construit le rollup d'une organisation qui n'en a pas encore (première
+    lecture après migration). Retourne True si une reconstruction a eu lieu.
+    """
+    from .models import DailyOrgMetrics
+
+    if not organization or DailyOrgMetrics.objects.filter(organization=organization).exists():
+        return False
+    rebuild_daily_metrics(organization)
+    return True
+
+
+def metrics_queryset(organization, start=None, end=None, end_exclusive: bool = False):
+    """
+    Lignes de rollup d'une organisation sur une période.
+
+    `start` / `end` peuvent être des dates ou des datetimes (convertis en
+    jours locaux). Avec `end_exclusive`, le jour de `end` est exclu.
+    """
+    from .models import DailyOrgMetrics
+    from .time_buckets import as_local_date
+
+    queryset = DailyOrgMetrics.objects.filter(organization=organization)
+    if start is not None:
+        queryset = queryset.filter(date__gte=as_local_date(start))
+    if end is not None:
+        lookup = 'date__lt' if end_exclusive else 'date__lte'
+        queryset = queryset.filter(**{lookup: as_local_date(end)})
+    return queryset
+
+
+def sum_metrics(queryset, fields: Iterable[str]) -> Dict:
+    """Somme de plusieurs colonnes de rollup en un seul aggregate()."""
+    result = queryset.aggregate(**{field: Sum(field) for field in fields})
+    return _clean(result)
@@ -0,0 +1,102 @@
+"""
+Cache des statistiques du dashboard, versionné par organisation.
+
+Chaque organisation possède un compteur « data version » dans le cache
+Django. Les clés des statistiques incluent ce compteur : une écriture sur les
+données suivies (factures, paiements, BC, produits, mouvements de stock...)
+incrémente le compteur via les signaux, ce qui rend d'un coup toutes les
+entrées précédentes inaccessibles (elles expirent ensuite d'elles-mêmes).
+
+- Lecture en cache : 2 accès cache, aucune requête SQL.
+- Le compteur est incrémenté APRÈS le commit : un lecteur concurrent ne peut
+  pas mettre en cache, sous la nouvelle version, un état non encore commité.
+"""
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.transactions import on_commit_once
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie des entrées : borne la dérive des périodes glissantes
+# (« 30 derniers jours » calculés à la seconde près) entre deux écritures.
+STATS_CACHE_TIMEOUT = getattr(settings, 'ANALYTICS_STATS_CACHE_TIMEOUT', 300)
+
+VERSION_KEY = 'analytics:data_version:{organization_id}'
+
+_MISSING = object()
+
+
+def _initial_version() -> int:
+    # Basé sur l'horloge : si le compteur est évincé du cache, il repart
+    # au-dessus de toute valeur déjà utilisée (pas de résurrection d'entrées).
+    return int(time.time() * 1000)
+
+
+def get_data_version(organization_id) -> int:
+    """Version courante des données d'une organisation."""
+    key = VERSION_KEY.format(organization_id=organization_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(organization_id) -> None:
+    """Invalide toutes les statistiques en cache de l'organisation."""
+    if not organization_id:
+        return
+    key = VERSION_KEY.format(organization_id=organization_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Compteur absent (jamais lu ou évincé)
+        cache.add(key, _initial_version(), None)
+
+
+def schedule_data_version_bump(organization_id) -> None:
+    """
+    Incrémente la version après le commit de la transaction courante
+    (immédiatement en autocommit). Une seule incrémentation par organisation
+    et par transaction.
+    """
+    if not organization_id:
+        return
+
+    on_commit_once(('analytics.data_version', str(organization_id)), _safe_bump, organization_id)
+
+
+def _safe_bump(organization_id):
+    try:
+        bump_data_version(organization_id)
+    except Exception:
+        logger.exception("Échec de l'invalidation du cache des statistiques (%s)", organization_id)
+
+
+def make_key(namespace: str, organization_id, parts: Iterable[Any]) -> str:
+    """Clé de cache : espace de noms, organisation, version et paramètres."""
+    digest = hashlib.md5(repr(tuple(parts)).encode('utf-8')).hexdigest()
+    version = get_data_version(organization_id)
+    return f'analytics:{namespace}:{organization_id}:v{version}:{digest}'
+
+
+def get_or_compute(namespace: str, organization_id, parts: Iterable[Any],
+                   compute: Callable[[], Any], timeout: int = None) -> Any:
+    """
+    Retourne la valeur en cache pour (organisation, version, paramètres), ou
+    la calcule et la met en cache.
+    """
+    key = make_key(namespace, organization_id, parts)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    value = compute()
+    cache.set(key, value, STATS_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
@@ -0,0 +1,89 @@
+"""Fixtures communes pour les tests du module analytics"""
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import User, Organization, Client
+
+
+DASHBOARD_MODULES = ['dashboard', 'suppliers', 'purchase-orders', 'invoices', 'products', 'clients']
+
+
+@pytest.fixture(autouse=True)
+def clear_stats_cache():
+    """Cache des statistiques vide au début de chaque test"""
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture
+def organization(db):
+    """Organisation de test avec les modules du dashboard activés"""
+    return Organization.objects.create(
+        name="Analytics Org",
+        enabled_modules=list(DASHBOARD_MODULES),
+    )
+
+
+@pytest.fixture
+def user(db, organization):
+    """Utilisateur de test"""
+    return User.objects.create_user(
+        username="analytics_user",
+        email="analytics@example.com",
+        password="testpass123",
+        organization=organization
+    )
+
+
+@pytest.fixture
+def api_client(user):
+    """Client API authentifié"""
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def sample_activity(db, user, organization):
+    """Quelques factures, paiements et BCs répartis sur l'année écoulée"""
+    from apps.invoicing.models import Invoice, Payment
+    from apps.purchase_orders.models import PurchaseOrder
+    from apps.suppliers.models import Supplier
+
+    client = Client.objects.create(name="Client Trend", organization=organization)
+    supplier = Supplier.objects.create(name="Fournisseur Trend", organization=organization)
+    now = timezone.now()
+    for offset in (1, 5, 40, 200):
+        created = now - timedelta(days=offset)
+        invoice = Invoice.objects.create(
+            title=f"Facture J-{offset}",
+            subtotal=Decimal('100.00'),
+            total_amount=Decimal('100.00'),
+            created_by=user,
+            organization=organization,
+            client=client,
+            status='paid',
+        )
+        Invoice.objects.filter(pk=invoice.pk).update(created_at=created)
+        Payment.objects.create(
+            invoice=invoice,
+            created_by=user,
+            amount=Decimal('100.00'),
+            payment_date=created.date(),
+        )
+
+        po = PurchaseOrder.objects.create(
+            title=f"BC J-{offset}",
+            subtotal=Decimal('50.00'),
+            total_amount=Decimal('50.00'),
+            created_by=user,
+            supplier=supplier,
+            status='approved',
+        )
+        PurchaseOrder.objects.filter(pk=po.pk).update(created_at=created)
+
+    # Les update() ci-dessus contournent les signaux : on reconstruit le rollup
+    from apps.analytics.rollups import rebuild_daily_metrics
+    rebuild_daily_metrics(organization)
@@ -0,0 +1,147 @@
+"""
+Tests du rollup journalier DailyOrgMetrics :
+- reconstruction complète (rebuild_daily_metrics + commande)
+- mise à jour incrémentale par les signaux après commit
+- lecture du dashboard et des graphiques IA depuis le rollup
+"""
+import io
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.analytics.models import DailyOrgMetrics
+from apps.analytics.rollups import rebuild_daily_metrics, refresh_daily_metrics
+
+
+@pytest.mark.django_db
+class TestRebuild:
+
+    def test_rebuild_one_row_per_active_day(self, organization, sample_activity):
+        rows = DailyOrgMetrics.objects.filter(organization=organization)
+        # 4 jours d'activité + la ligne du jour (instantané de stock)
+        assert rows.count() == 5
+        totals = {
+            'invoice_count': sum(r.invoice_count for r in rows),
+            'revenue': sum(r.revenue for r in rows),
+            'collected': sum(r.collected_amount for r in rows),
+            'po_spend': sum(r.po_spend for r in rows),
+        }
+        assert totals == {
+            'invoice_count': 4,
+            'revenue': Decimal('400.00'),
+            'collected': Decimal('400.00'),
+            'po_spend': Decimal('200.00'),
+        }
+
+    def test_rebuild_is_idempotent(self, organization, sample_activity):
+        assert rebuild_daily_metrics(organization) == 5
+        assert DailyOrgMetrics.objects.filter(organization=organization).count() == 5
+
+    def test_management_command(self, organization, sample_activity):
+        DailyOrgMetrics.objects.all().delete()
+        call_command('rebuild_daily_metrics', org_id=str(organization.pk), stdout=io.StringIO())
+        assert DailyOrgMetrics.objects.filter(organization=organization).count() == 5
+
+
+@pytest.mark.django_db
+class TestIncrementalRefresh:
+
+    def test_invoice_save_refreshes_today(self, user, organization, django_capture_on_commit_callbacks):
+        from apps.invoicing.models import Invoice
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Invoice.objects.create(
+                title="Nouvelle facture",
+                subtotal=Decimal('80.00'),
+                total_amount=Decimal('80.00'),
+                created_by=user,
+                organization=organization,
+                status='sent',
+            )
+
+        row = DailyOrgMetrics.objects.get(organization=organization, date=timezone.localdate())
+        assert row.invoice_count == 1
+        assert row.outstanding_amount == Decimal('80.00')
+        assert row.revenue == Decimal('80.00')
+
+    def test_refresh_deduplicated_within_transaction(self, user, organization, django_capture_on_commit_callbacks):
+        from apps.invoicing.models import Invoice
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            invoice = Invoice.objects.create(
+                title="Facture",
+                subtotal=Decimal('10.00'),
+                total_amount=Decimal('10.00'),
+                created_by=user,
+                organization=organization,
+            )
+            invoice.title = "Facture modifiée"
+            invoice.save()
+
+        metrics_callbacks = [cb for cb in callbacks if getattr(cb, 'on_commit_key', ('',))[0] == 'analytics.metrics']
+        assert len(metrics_callbacks) == 1
+
+    def test_bulk_update_refreshes_rollup(self, user, organization, django_capture_on_commit_callbacks):
+        from apps.analytics.rollups import schedule_bulk_refresh
+        from apps.analytics.stats_cache import get_data_version
+        from apps.invoicing.models import Invoice
+
+        # Sans signaux : seule l'action en lot programme des rafraîchissements
+        Invoice.objects.bulk_create([Invoice(
+            invoice_number="FAC-BULK-1",
+            title="Facture brouillon",
+            subtotal=Decimal('50.00'),
+            total_amount=Decimal('50.00'),
+            created_by=user,
+            organization=organization,
+            status='draft',
+        )])
+        version = get_data_version(organization.pk)
+
+        # Action en lot : update() sans post_save
+        invoices = Invoice.objects.filter(created_by__organization=organization)
+        with django_capture_on_commit_callbacks(execute=True):
+            invoices.update(status='sent')
+            schedule_bulk_refresh(invoices)
+
+        row = DailyOrgMetrics.objects.get(organization=organization, date=timezone.localdate())
+        assert row.outstanding_amount == Decimal('50.00')
+        assert get_data_version(organization.pk) > version
+
+    def test_refresh_keeps_past_stock_snapshot(self, organization):
+        past_day = timezone.localdate() - timedelta(days=3)
+        DailyOrgMetrics.objects.create(organization=organization, date=past_day, stock_value=Decimal('42.00'))
+
+        refresh_daily_metrics(organization.pk, past_day)
+
+        assert DailyOrgMetrics.objects.get(organization=organization, date=past_day).stock_value == Decimal('42.00')
+
+
+@pytest.mark.django_db
+class TestReadersUseRollup:
+
+    def test_dashboard_reads_rollup(self, user, organization, sample_activity):
+        from apps.analytics.dashboard_service import DashboardStatsService
+
+        end = timezone.now()
+        service = DashboardStatsService(user, start_date=end - timedelta(days=30), end_date=end)
+        financial = service.get_financial_stats()
+        assert financial['revenue'] == 200.0
+        assert financial['expenses'] == 100.0
+
+        # Le rollup fait foi : une ligne modifiée se retrouve dans les stats
+        DailyOrgMetrics.objects.filter(organization=organization, date=timezone.localdate()).update(
+            revenue=Decimal('1000.00')
+        )
+        # Les stats sont mémorisées par instance : nouvelle requête, nouveau service
+        service = DashboardStatsService(user, start_date=end - timedelta(days=30), end_date=end)
+        assert service.get_financial_stats()['revenue'] == 1200.0
+
+    def test_revenue_chart_reads_rollup(self, organization, sample_activity):
+        from apps.ai_assistant.chart_helpers import generate_revenue_evolution_chart
+
+        chart = generate_revenue_evolution_chart(organization, period='year', group_by='month')
+        assert sum(point['revenue'] for point in chart['chart_data']) == 400.0
+        assert sum(point['count'] for point in chart['chart_data']) == 4
@@ -0,0 +1,176 @@
+"""
+Tests de régression sur le nombre de requêtes SQL du dashboard :
+- le nombre de requêtes ne dépend pas de la longueur de la période
+- chaque endpoint reste épinglé à un nombre fixe de requêtes
+- la tendance groupée reste cohérente avec les données
+"""
+import pytest
+from datetime import datetime, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def _count_queries(api_client, url, params):
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.get(url, params)
+    assert response.status_code == 200, response.content
+    return len(ctx.captured_queries), response
+
+
+def _custom_period(days):
+    start = (timezone.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    return {'period': 'custom', 'start_date': start, 'compare': 'true'}
+
+
+# ---------------------------------------------------------------------------
+# 1. Nombre de requêtes indépendant de la période
+# ---------------------------------------------------------------------------
+
+STATS_URL = '/api/v1/analytics/stats/'
+
+WIDGET_CODES = ['invoices_overview', 'po_overview', 'financial_summary']
+
+
+@pytest.mark.django_db
+class TestDashboardQueryCount:
+
+    def test_stats_query_count_independent_of_period(self, api_client, sample_activity):
+        """7 jours et 365 jours doivent coûter exactement le même nombre de requêtes."""
+        short, _ = _count_queries(api_client, STATS_URL, _custom_period(7))
+        long, _ = _count_queries(api_client, STATS_URL, _custom_period(365))
+        assert short == long
+
+    @pytest.mark.parametrize('widget_code', WIDGET_CODES)
+    def test_widget_query_count_independent_of_period(self, api_client, sample_activity, widget_code):
+        url = f'/api/v1/analytics/widget-data/{widget_code}/'
+        short, _ = _count_queries(api_client, url, _custom_period(7))
+        long, _ = _count_queries(api_client, url, _custom_period(365))
+        assert short == long
+
+    def test_stats_query_count_is_pinned(self, api_client, sample_activity):
+        """Nombre fixe de requêtes pour /stats/ (à ajuster consciemment)."""
+        queries, _ = _count_queries(api_client, STATS_URL, _custom_period(365))
+        assert queries == 44
+
+    @pytest.mark.parametrize('widget_code,expected', [
+        ('invoices_overview', 6),
+        ('po_overview', 6),
+        ('financial_summary', 2),
+    ])
+    def test_widget_query_count_is_pinned(self, api_client, sample_activity, widget_code, expected):
+        url = f'/api/v1/analytics/widget-data/{widget_code}/'
+        queries, _ = _count_queries(api_client, url, _custom_period(365))
+        assert queries == expected
+
+
+# ---------------------------------------------------------------------------
+# 2. Exactitude de la tendance groupée
+# ---------------------------------------------------------------------------
+
+@pytest.mark.django_db
+class TestGroupedTrend:
+
+    def test_daily_trend_covers_every_day(self, user, sample_activity):
+        from apps.analytics.dashboard_service import DashboardStatsService
+
+        end = timezone.now()
+        service = DashboardStatsService(user, start_date=end - timedelta(days=30), end_date=end)
+        trend = service.get_invoice_stats()['period']['daily_trend']
+
+        assert len(trend) == 31
+        assert sum(day['count'] for day in trend) == 2
+        assert sum(day['amount'] for day in trend) == 200.0
+        assert sum(day['paid_amount'] for day in trend) == 200.0
+
+    def test_monthly_granularity(self, user, sample_activity):
+        from apps.analytics.dashboard_service import DashboardStatsService
+
+        end = timezone.now()
+        service = DashboardStatsService(
+            user, start_date=end - timedelta(days=365), end_date=end, trend_granularity='month'
+        )
+        trend = service.get_purchase_order_stats()['period']['daily_trend']
+
+        assert 12 <= len(trend) <= 13
+        assert all(entry['date'].endswith('-01') for entry in trend)
+        assert sum(entry['count'] for entry in trend) == 4
+        assert sum(entry['amount'] for entry in trend) == 200.0
+
+
+# ---------------------------------------------------------------------------
+# 3. Endpoint groupé par layout (agrégats partagés)
+# ---------------------------------------------------------------------------
+
+BATCH_CODES = [
+    'financial_summary', 'cash_flow_summary', 'invoices_overview',
+    'po_overview', 'top_clients', 'top_selling_products',
+]
+
+
+@pytest.fixture
+def layout(user):
+    from apps.analytics.models import DashboardLayout
+
+    return DashboardLayout.objects.create(
+        user=user,
+        name='Batch',
+        layout=[{'i': code, 'x': 0, 'y': index, 'w': 4, 'h': 2} for index, code in enumerate(BATCH_CODES)],
+        global_config={'period': 'last_90_days'},
+    )
+
+
+@pytest.mark.django_db
+class TestLayoutBatchData:
+
+    def _url(self, layout):
+        return f'/api/v1/analytics/layouts/{layout.id}/data/'
+
+    def test_batch_matches_single_widget_payloads(self, api_client, sample_activity, layout):
+        params = _custom_period(365)
+        _, batch = _count_queries(api_client, self._url(layout), params)
+        widgets = batch.json()['widgets']
+
+        assert list(widgets) == BATCH_CODES
+        for code in BATCH_CODES:
+            _, single = _count_queries(api_client, f'/api/v1/analytics/widget-data/{code}/', params)
+            assert widgets[code]['success'] is True
+            assert widgets[code]['data'] == single.json()['data']
+
+    def test_batch_costs_less_than_individual_requests(self, api_client, sample_activity, layout):
+        from django.core.cache import cache
+
+        params = _custom_period(365)
+        batch_queries, _ = _count_queries(api_client, self._url(layout), params)
+        single_queries = 0
+        for code in BATCH_CODES:
+            # Mesure à froid : sans le cache des statistiques
+            cache.clear()
+            single_queries += _count_queries(api_client, f'/api/v1/analytics/widget-data/{code}/', params)[0]
+        assert batch_queries < single_queries
+
+    def test_layout_global_config_is_default_period(self, api_client, sample_activity, layout):
+        response = api_client.get(self._url(layout))
+        metadata = response.json()['metadata']
+        start = datetime.fromisoformat(metadata['start_date'])
+        end = datetime.fromisoformat(metadata['end_date'])
+        assert round((end - start).total_seconds() / 86400) == 90
+
+    def test_unknown_widget_does_not_break_batch(self, api_client, sample_activity, layout):
+        layout.layout = layout.layout + [{'i': 'does_not_exist', 'x': 0, 'y': 9, 'w': 4, 'h': 2}]
+        layout.save()
+
+        widgets = api_client.get(self._url(layout)).json()['widgets']
+        assert widgets['does_not_exist']['success'] is False
+        assert widgets['financial_summary']['success'] is True
+
+    def test_shared_aggregates_are_computed_once(self, user, sample_activity):
+        from apps.analytics.widget_data_service import WidgetDataService
+
+        end = timezone.now()
+        service = WidgetDataService(user, end - timedelta(days=30), end)
+        service.get_widget_data('invoices_overview')
+        with CaptureQueriesContext(connection) as ctx:
+            service.get_widget_data('invoices_overview')
+            service.stats_service.get_invoice_stats()
+        assert len(ctx.captured_queries) == 0
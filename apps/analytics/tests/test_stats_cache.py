@@ -0,0 +1,139 @@
+"""
+Tests du cache versionné des statistiques :
+- une lecture répétée du dashboard ne touche plus la base
+- toute écriture suivie (facture, produit...) invalide le cache après commit
+- le compteur de version survit à son éviction
+"""
+import pytest
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.analytics.stats_cache import (
+    VERSION_KEY,
+    bump_data_version,
+    get_data_version,
+    schedule_data_version_bump,
+)
+
+STATS_URL = '/api/v1/analytics/stats/'
+
+
+def _get(api_client, url, params=None):
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.get(url, params or {})
+    assert response.status_code == 200, response.content
+    return response.json(), ctx.captured_queries
+
+
+def _touches_invoices(queries):
+    return any('invoicing_invoice' in query['sql'] for query in queries)
+
+
+@pytest.mark.django_db
+class TestDataVersion:
+
+    def test_bump_increments(self, organization):
+        version = get_data_version(organization.pk)
+        bump_data_version(organization.pk)
+        assert get_data_version(organization.pk) == version + 1
+
+    def test_bump_after_eviction_does_not_go_back(self, organization):
+        version = get_data_version(organization.pk)
+        cache.delete(VERSION_KEY.format(organization_id=organization.pk))
+        bump_data_version(organization.pk)
+        assert get_data_version(organization.pk) >= version
+
+    def test_bump_waits_for_commit_and_is_deduplicated(self, organization, django_capture_on_commit_callbacks):
+        version = get_data_version(organization.pk)
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            schedule_data_version_bump(organization.pk)
+            schedule_data_version_bump(organization.pk)
+        assert len(callbacks) == 1
+        assert get_data_version(organization.pk) == version
+
+        callbacks[0]()
+        assert get_data_version(organization.pk) == version + 1
+
+
+@pytest.mark.django_db
+class TestDashboardCache:
+
+    def test_repeated_stats_load_skips_business_queries(self, api_client, sample_activity):
+        first, cold = _get(api_client, STATS_URL)
+        second, warm = _get(api_client, STATS_URL)
+
+        assert second == first
+        assert _touches_invoices(cold)
+        assert not _touches_invoices(warm)
+        assert len(warm) < len(cold)
+
+    def test_widget_data_is_cached(self, api_client, sample_activity):
+        url = '/api/v1/analytics/widget-data/invoices_overview/'
+        first, _ = _get(api_client, url)
+        second, warm = _get(api_client, url)
+
+        assert second['data'] == first['data']
+        assert not _touches_invoices(warm)
+
+    def test_organizations_do_not_share_entries(self, api_client, sample_activity, db):
+        from rest_framework.test import APIClient
+        from apps.accounts.models import Organization, User
+        from .conftest import DASHBOARD_MODULES
+
+        other_org = Organization.objects.create(name="Autre org", enabled_modules=list(DASHBOARD_MODULES))
+        other_user = User.objects.create_user(
+            username="other_analytics", email="other@example.com",
+            password="testpass123", organization=other_org,
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(user=other_user)
+
+        mine, _ = _get(api_client, STATS_URL)
+        theirs, _ = _get(other_client, STATS_URL)
+        assert mine['data']['invoices']['total'] == 4
+        assert theirs['data']['invoices']['total'] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCacheInvalidation:
+    """Hors transaction de test : les callbacks on_commit s'exécutent réellement."""
+
+    def test_invoice_write_invalidates_stats(self, api_client, user, organization, sample_activity):
+        from apps.invoicing.models import Invoice
+
+        before, _ = _get(api_client, STATS_URL)
+
+        Invoice.objects.create(
+            title="Facture après cache",
+            subtotal=Decimal('70.00'),
+            total_amount=Decimal('70.00'),
+            created_by=user,
+            organization=organization,
+            status='sent',
+        )
+
+        after, _ = _get(api_client, STATS_URL)
+        assert after['data']['invoices']['total'] == before['data']['invoices']['total'] + 1
+        assert after['data']['invoices']['period']['total_amount'] == (
+            before['data']['invoices']['period']['total_amount'] + 70.0
+        )
+
+    def test_product_write_invalidates_widgets(self, api_client, organization, sample_activity):
+        from apps.invoicing.models import Product
+
+        url = '/api/v1/analytics/widget-data/stock_alerts/'
+        before, _ = _get(api_client, url)
+        assert before['data']['out_of_stock'] == []
+
+        Product.objects.create(
+            name="Produit épuisé",
+            organization=organization,
+            product_type='physical',
+            price=Decimal('10.00'),
+            stock_quantity=0,
+        )
+
+        after, _ = _get(api_client, url)
+        assert [p['name'] for p in after['data']['out_of_stock']] == ["Produit épuisé"]
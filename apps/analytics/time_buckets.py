@@ -0,0 +1,195 @@
+"""
+Moteur d'agrégation par tranches de temps (jour / semaine / mois).
+
+Remplace les boucles « une requête par jour » du dashboard : chaque série
+(count, montant, montant payé) est calculée en une requête groupée
+(`Trunc` + `values().annotate()`), puis complétée en Python avec des zéros
+pour les tranches sans activité. Le nombre de requêtes ne dépend donc plus
+de la longueur de la période.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def as_local_date(value) -> date:
+    """Convertit un datetime (aware ou non) ou une date en date locale."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def bucket_start(value, granularity: str = 'day') -> date:
+    """Retourne le premier jour de la tranche contenant `value`."""
+    day = as_local_date(value)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def iter_buckets(start_date, end_date, granularity: str = 'day') -> List[date]:
+    """Liste ordonnée des débuts de tranche couvrant [start_date, end_date]."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularité inconnue: {granularity}")
+
+    current = bucket_start(start_date, granularity)
+    last = bucket_start(end_date, granularity)
+    buckets = []
+    while current <= last:
+        buckets.append(current)
+        if granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        elif granularity == 'week':
+            current += timedelta(days=7)
+        else:
+            current += timedelta(days=1)
+    return buckets
+
+
+class TimeBucketAggregator:
+    """
+    Agrège count / montant (et éventuellement montant payé) d'un queryset
+    par tranche de temps, en un nombre constant de requêtes.
+
+    Usage:
+        agg = TimeBucketAggregator(period_invoices, granularity='day')
+        trend = agg.trend(start, end, paid_filter=Q(status='paid'),
+                          paid_date_field='payments__payment_date')
+        totals = agg.totals(paid=Q(status='paid'), pending=Q(status='sent'))
+    """
+
+    def __init__(self, queryset, date_field: str = 'created_at',
+                 amount_field: str = 'total_amount', granularity: str = 'day',
+                 count_field: Optional[str] = None):
+        """
+        Args:
+            count_field: colonne à sommer pour le count (queryset déjà
+                pré-agrégé, ex. DailyOrgMetrics.invoice_count). Par défaut
+                on compte les lignes.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularité inconnue: {granularity}")
+        self.queryset = queryset
+        self.date_field = date_field
+        self.amount_field = amount_field
+        self.granularity = granularity
+        self.count_field = count_field
+
+    def _count_expression(self):
+        return Sum(self.count_field) if self.count_field else Count('pk')
+
+    def _bucket_expression(self, field: str):
+        return Trunc(field, self.granularity, output_field=DateField())
+
+    def totals(self, **conditional: Q) -> Dict[str, Decimal]:
+        """
+        Count + somme du montant, plus une somme conditionnelle par filtre
+        nommé, le tout en un seul `aggregate()`.
+
+        Returns:
+            {'count': int, 'amount': Decimal, '<nom>': Decimal, ...}
+        """
+        aggregates = {
+            'count': self._count_expression(),
+            'amount': Sum(self.amount_field),
+        }
+        for name, condition in conditional.items():
+            aggregates[name] = Sum(self.amount_field, filter=condition)
+
+        result = self.queryset.aggregate(**aggregates)
+        return {
+            name: (value or 0) if name == 'count' else (value or Decimal('0'))
+            for name, value in result.items()
+        }
+
+    def trend(self, start_date, end_date, paid_filter: Optional[Q] = None,
+              paid_date_field: Optional[str] = None,
+              paid_field: Optional[str] = None) -> List[Dict]:
+        """
+        Série temporelle complète (une entrée par tranche, zéros inclus).
+
+        Args:
+            start_date / end_date: bornes de la période (date ou datetime)
+            paid_filter: si fourni, ajoute `paid_amount` à chaque tranche
+            paid_date_field: champ de date du paiement (ex.
+                'payments__payment_date'). Si absent, le montant payé est
+                rattaché à la tranche de `date_field` (somme conditionnelle
+                dans la même requête groupée).
+            paid_field: colonne déjà agrégée contenant le montant payé
+                (alternative à paid_filter pour les tables de rollup)
+        """
+        rows = (
+            self.queryset
+            .annotate(bucket=self._bucket_expression(self.date_field))
+            .values('bucket')
+            .order_by('bucket')
+        )
+        aggregates = {'count': self._count_expression(), 'amount': Sum(self.amount_field)}
+        if paid_field:
+            aggregates['paid_amount'] = Sum(paid_field)
+        elif paid_filter is not None and not paid_date_field:
+            aggregates['paid_amount'] = Sum(self.amount_field, filter=paid_filter)
+
+        by_bucket = {}
+        for row in rows.annotate(**aggregates):
+            by_bucket[as_local_date(row['bucket'])] = row
+
+        paid_by_bucket = {}
+        if paid_filter is not None and paid_date_field:
+            paid_by_bucket = self._paid_by_bucket(start_date, end_date, paid_filter, paid_date_field)
+
+        trend = []
+        for bucket in iter_buckets(start_date, end_date, self.granularity):
+            row = by_bucket.get(bucket, {})
+            entry = {
+                'date': bucket.isoformat(),
+                'count': row.get('count') or 0,
+                'amount': float(row.get('amount') or 0),
+            }
+            if paid_field:
+                entry['paid_amount'] = float(row.get('paid_amount') or 0)
+            elif paid_filter is not None:
+                if paid_date_field:
+                    entry['paid_amount'] = float(paid_by_bucket.get(bucket, 0))
+                else:
+                    entry['paid_amount'] = float(row.get('paid_amount') or 0)
+            trend.append(entry)
+        return trend
+
+    def _paid_by_bucket(self, start_date, end_date, paid_filter: Q, paid_date_field: str) -> Dict[date, Decimal]:
+        """
+        Montant payé par tranche de date de paiement.
+
+        Un document réglé en plusieurs paiements dans la même tranche n'est
+        compté qu'une fois : on récupère les couples distincts
+        (tranche, document) avant de sommer.
+        """
+        first_day = as_local_date(start_date)
+        last_day = as_local_date(end_date)
+        pairs = (
+            self.queryset
+            .filter(paid_filter)
+            .filter(**{
+                f'{paid_date_field}__gte': first_day,
+                f'{paid_date_field}__lte': last_day,
+            })
+            .annotate(bucket=self._bucket_expression(paid_date_field))
+            .values_list('bucket', 'pk', self.amount_field)
+            .order_by()
+            .distinct()
+        )
+        totals = {}
+        for bucket, _pk, amount in pairs:
+            key = as_local_date(bucket)
+            totals[key] = totals.get(key, Decimal('0')) + (amount or 0)
+        return totals
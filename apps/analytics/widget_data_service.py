@@ -2,13 +2,18 @@
 Service to provide data for each widget
 Reuses DashboardStatsService and adds widget-specific methods
 """
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List
 from django.db import models
 from .dashboard_service import DashboardStatsService
+from .stats_cache import get_or_compute
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Widgets dépendant de l'utilisateur ou de données non suivies par la
+# version de l'organisation : jamais mis en cache.
+UNCACHED_WIDGETS = {'ai_suggestions'}
+
 
 class WidgetDataService:
     """Service to fetch data for specific widgets"""
@@ -18,8 +23,75 @@ class WidgetDataService:
         self.start_date = start_date
         self.end_date = end_date
         self.stats_service = DashboardStatsService(user, start_date, end_date, compare_previous=True)
+        # Agrégats de la période partagés entre widgets (voir _period_status_amounts)
+        self._status_amounts_cache = {}
+
+    def get_widgets_data(self, widget_codes: Iterable[str], limit: int = 10,
+                         compare: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Calcule les données de plusieurs widgets avec le même service : les
+        agrégats communs (stats factures, BC, financières...) ne sont calculés
+        qu'une fois pour tout le lot.
+
+        Une erreur sur un widget n'interrompt pas les autres.
+
+        Returns:
+            {widget_code: {'success': True, 'data': ...}
+                          | {'success': False, 'error': '...'}}
+        """
+        results = {}
+        for widget_code in widget_codes:
+            if widget_code in results:
+                continue
+            try:
+                results[widget_code] = {
+                    'success': True,
+                    'data': self.get_widget_data(widget_code, limit=limit, compare=compare)
+                }
+            except Exception as e:
+                logger.error(f"Error fetching widget data for {widget_code}: {e}")
+                results[widget_code] = {'success': False, 'error': str(e)}
+        return results
+
+    def _period_status_amounts(self, model) -> List[Dict[str, Any]]:
+        """
+        Count et montant par statut des documents créés sur la période
+        (mémorisé par modèle pour la durée du service).
+        """
+        from django.db.models import Sum, Count
+
+        key = model._meta.label
+        if key not in self._status_amounts_cache:
+            self._status_amounts_cache[key] = list(
+                model.objects.filter(
+                    created_by__organization=self.stats_service.organization,
+                    created_at__gte=self.start_date,
+                    created_at__lte=self.end_date
+                ).values('status').order_by().annotate(
+                    count=Count('id'),
+                    total=Sum('total_amount')
+                )
+            )
+        return self._status_amounts_cache[key]
+
+    def get_widget_data(self, widget_code: str, limit: int = 10, compare: bool = False,
+                        use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Données d'un widget, lues dans le cache versionné de l'organisation
+        quand c'est possible.
+        """
+        organization = self.stats_service.organization
+        if not use_cache or not organization or widget_code in UNCACHED_WIDGETS:
+            return self._compute_widget_data(widget_code, limit, compare)
+
+        return get_or_compute(
+            'widget',
+            organization.pk,
+            (widget_code, limit, compare) + self.stats_service.cache_key_parts(),
+            lambda: self._compute_widget_data(widget_code, limit, compare)
+        )
 
-    def get_widget_data(self, widget_code: str, limit: int = 10, compare: bool = False) -> Dict[str, Any]:
+    def _compute_widget_data(self, widget_code: str, limit: int = 10, compare: bool = False) -> Dict[str, Any]:
         """Route to appropriate widget data method"""
 
         # Map widget codes to methods - 16 widgets essentiels
@@ -191,21 +263,17 @@ class WidgetDataService:
 
     def get_cash_flow_summary(self, **kwargs):
         """Cash flow summary: receivable vs payable"""
-        from apps.invoicing.models import Invoice
-        from apps.purchase_orders.models import PurchaseOrder
         from django.db.models import Sum
 
-        # Montant à recevoir (factures envoyées + en retard)
-        receivable = Invoice.objects.filter(
-            created_by__organization=self.stats_service.organization,
-            status__in=['sent', 'overdue']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-        # Montant à payer (BC approuvés + en attente, non reçus)
-        payable = PurchaseOrder.objects.filter(
-            created_by__organization=self.stats_service.organization,
-            status__in=['pending', 'approved', 'sent']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
+        # Lu depuis le rollup journalier : indépendant du volume d'historique
+        totals = self.stats_service._metrics().aggregate(
+            # Montant à recevoir (factures envoyées + en retard)
+            receivable=Sum('outstanding_amount') + Sum('overdue_amount'),
+            # Montant à payer (BC approuvés + en attente, non reçus)
+            payable=Sum('po_committed_amount'),
+        )
+        receivable = totals['receivable'] or 0
+        payable = totals['payable'] or 0
 
         return {
             'receivable': float(receivable),
@@ -538,19 +606,11 @@ class WidgetDataService:
     def get_invoices_overview(self, **kwargs):
         """Invoices overview with amounts by status"""
         from apps.invoicing.models import Invoice
-        from django.db.models import Sum, Count
 
         stats = self.stats_service.get_invoice_stats()
         
         # Récupérer les montants par statut
-        status_amounts = Invoice.objects.filter(
-            created_by__organization=self.stats_service.organization,
-            created_at__gte=self.start_date,
-            created_at__lte=self.end_date
-        ).values('status').annotate(
-            count=Count('id'),
-            total=Sum('total_amount')
-        )
+        status_amounts = self._period_status_amounts(Invoice)
 
         amounts = {}
         for item in status_amounts:
@@ -642,19 +702,11 @@ class WidgetDataService:
     def get_po_overview(self, **kwargs):
         """Purchase orders overview with amounts by status"""
         from apps.purchase_orders.models import PurchaseOrder
-        from django.db.models import Sum, Count
 
         stats = self.stats_service.get_purchase_order_stats()
         
         # Récupérer les montants par statut
-        status_amounts = PurchaseOrder.objects.filter(
-            created_by__organization=self.stats_service.organization,
-            created_at__gte=self.start_date,
-            created_at__lte=self.end_date
-        ).values('status').annotate(
-            count=Count('id'),
-            total=Sum('total_amount')
-        )
+        status_amounts = self._period_status_amounts(PurchaseOrder)
 
         amounts = {}
         for item in status_amounts:
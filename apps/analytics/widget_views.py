@@ -22,6 +22,39 @@ from .widgets_registry import get_all_widgets, get_widget, get_widgets_by_module
 logger = logging.getLogger(__name__)
 
 
+def calculate_start_date(period: str, params):
+    """Calculate start date based on period"""
+    now = timezone.now()
+
+    if period == 'today':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'yesterday':
+        yesterday = now - timedelta(days=1)
+        return yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'last_7_days':
+        return now - timedelta(days=7)
+    elif period == 'last_30_days':
+        return now - timedelta(days=30)
+    elif period == 'last_90_days':
+        return now - timedelta(days=90)
+    elif period == 'this_month':
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'last_month':
+        first_this_month = now.replace(day=1)
+        last_month = first_this_month - timedelta(days=1)
+        return last_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'this_year':
+        return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'custom':
+        from datetime import datetime
+        start_str = params.get('start_date')
+        if start_str:
+            return datetime.strptime(start_str, '%Y-%m-%d').replace(tzinfo=timezone.get_current_timezone())
+        return now - timedelta(days=30)
+    else:
+        return now - timedelta(days=30)
+
+
 class WidgetListView(APIView):
     """
     List all available widgets from registry
@@ -233,6 +266,72 @@ class DashboardLayoutViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         })
 
+    @action(detail=True, methods=['get'])
+    def data(self, request, pk=None):
+        """
+        Données de tous les widgets d'un layout en une seule réponse.
+
+        Les widgets partagent le même WidgetDataService : les agrégats communs
+        (stats factures, BC, financières...) ne sont calculés qu'une fois.
+
+        Query parameters (par défaut : global_config du layout):
+            - period, start_date, limit, compare
+        """
+        layout = self.get_object()
+        config = layout.global_config or {}
+
+        params = {**config, **request.query_params.dict()}
+        period = params.get('period') or 'last_30_days'
+        try:
+            limit = int(params.get('limit', 10))
+        except (TypeError, ValueError):
+            limit = 10
+        compare = str(params.get('compare', 'false')).lower() == 'true'
+
+        end_date = timezone.now()
+        start_date = calculate_start_date(period, params)
+
+        # Codes des widgets dans l'ordre du layout, sans doublons
+        widget_codes = []
+        for item in layout.layout or []:
+            code = item.get('i') if isinstance(item, dict) else None
+            if code and code not in widget_codes:
+                widget_codes.append(code)
+
+        known_codes = [code for code in widget_codes if get_widget(code)]
+        data_service = WidgetDataService(
+            user=request.user,
+            start_date=start_date,
+            end_date=end_date
+        )
+        results = data_service.get_widgets_data(known_codes, limit=limit, compare=compare)
+
+        widgets = {}
+        for code in widget_codes:
+            widget = get_widget(code)
+            if not widget:
+                widgets[code] = {'success': False, 'error': f'Widget {code} not found'}
+                continue
+            widgets[code] = {
+                'widget': {
+                    'code': widget['code'],
+                    'name': widget['name'],
+                    'type': widget['type']
+                },
+                **results[code]
+            }
+
+        return Response({
+            'success': True,
+            'layout': {'id': str(layout.id), 'name': layout.name},
+            'widgets': widgets,
+            'metadata': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'generated_at': timezone.now().isoformat()
+            }
+        })
+
 
 class WidgetDataView(APIView):
     """
@@ -307,32 +406,4 @@ class WidgetDataView(APIView):
 
     def _calculate_start_date(self, period: str, params):
         """Calculate start date based on period"""
-        now = timezone.now()
-
-        if period == 'today':
-            return now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'yesterday':
-            yesterday = now - timedelta(days=1)
-            return yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'last_7_days':
-            return now - timedelta(days=7)
-        elif period == 'last_30_days':
-            return now - timedelta(days=30)
-        elif period == 'last_90_days':
-            return now - timedelta(days=90)
-        elif period == 'this_month':
-            return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'last_month':
-            first_this_month = now.replace(day=1)
-            last_month = first_this_month - timedelta(days=1)
-            return last_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'this_year':
-            return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'custom':
-            from datetime import datetime
-            start_str = params.get('start_date')
-            if start_str:
-                return datetime.strptime(start_str, '%Y-%m-%d').replace(tzinfo=timezone.get_current_timezone())
-            return now - timedelta(days=30)
-        else:
-            return now - timedelta(days=30)
+        return calculate_start_date(period, params)
@@ -6,6 +6,7 @@ from apps.invoicing.models import Invoice, InvoiceItem, Product, StockMovement,
 from apps.accounts.models import Client
 from apps.core.serializer_mixins import ModuleAwareSerializerMixin
 from django.contrib.auth import get_user_model
+from django.db import models
 
 User = get_user_model()
 
@@ -26,6 +27,32 @@ def _sanitize_decimal_fields(instance, field_names):
             continue
 
 
+def _aggregate_subquery(queryset, group_field, aggregate, output_field):
+    """Agrégat corrélé (Subquery) sur `queryset`, groupé par `group_field`.
+
+    Contrairement à un annotate() direct sur la relation, plusieurs
+    sous-requêtes ne multiplient pas les lignes entre elles (pas de produit
+    cartésien avec d'autres jointures du queryset appelant).
+    """
+    from django.db.models import Subquery
+    from django.db.models.functions import Coalesce
+
+    subquery = Subquery(
+        queryset.order_by().values(group_field).annotate(value=aggregate).values('value')[:1],
+        output_field=output_field,
+    )
+    if isinstance(output_field, models.DateTimeField):
+        return subquery
+    return Coalesce(subquery, 0, output_field=output_field)
+
+
+def _annotated_or(obj, name, compute):
+    """Valeur pré-calculée par `with_statistics()` si présente, sinon calcul à la volée."""
+    if hasattr(obj, name):
+        return getattr(obj, name)
+    return compute()
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer pour les utilisateurs"""
     full_name = serializers.SerializerMethodField()
@@ -304,23 +331,64 @@ class ProductSerializer(ModuleAwareSerializerMixin, serializers.ModelSerializer)
             return f"{obj.warehouse.city}, {obj.warehouse.province}"
         return None
         
+    @staticmethod
+    def with_statistics(queryset):
+        """Pré-calcule les statistiques du serializer (une sous-requête par
+        statistique au lieu de cinq requêtes par produit sérialisé)."""
+        from django.db.models import Count, Max, OuterRef, Sum
+        from apps.contracts.models import ContractItem
+
+        items = InvoiceItem.objects.filter(product=OuterRef('pk'))
+        return queryset.annotate(
+            annotated_total_invoices=_aggregate_subquery(
+                items, 'product', Count('invoice', distinct=True), models.IntegerField()
+            ),
+            annotated_total_sales_amount=_aggregate_subquery(
+                items, 'product', Sum('total_price'), models.DecimalField(max_digits=20, decimal_places=2)
+            ),
+            annotated_unique_clients_count=_aggregate_subquery(
+                items, 'product', Count('invoice__client', distinct=True), models.IntegerField()
+            ),
+            annotated_last_sale_date=_aggregate_subquery(
+                items, 'product', Max('created_at'), models.DateTimeField()
+            ),
+            annotated_active_contracts_count=_aggregate_subquery(
+                ContractItem.objects.filter(product=OuterRef('pk'), contract__status='active'),
+                'product', Count('pk'), models.IntegerField()
+            ),
+        )
+
     def get_total_invoices(self, obj):
-        return obj.invoice_items.values('invoice').distinct().count()
+        return _annotated_or(
+            obj, 'annotated_total_invoices',
+            lambda: obj.invoice_items.values('invoice').distinct().count()
+        )
         
     def get_total_sales_amount(self, obj):
         from django.db.models import Sum
-        total = obj.invoice_items.aggregate(Sum('total_price'))['total_price__sum']
+        total = _annotated_or(
+            obj, 'annotated_total_sales_amount',
+            lambda: obj.invoice_items.aggregate(Sum('total_price'))['total_price__sum']
+        )
         return float(total) if total else 0
         
     def get_unique_clients_count(self, obj):
-        return obj.invoice_items.values('invoice__client').distinct().count()
+        return _annotated_or(
+            obj, 'annotated_unique_clients_count',
+            lambda: obj.invoice_items.exclude(invoice__client__isnull=True).values('invoice__client').distinct().count()
+        )
         
     def get_last_sale_date(self, obj):
-        last_item = obj.invoice_items.order_by('-created_at').first()
-        return last_item.created_at if last_item else None
+        def last_sale():
+            last_item = obj.invoice_items.order_by('-created_at').first()
+            return last_item.created_at if last_item else None
+        return _annotated_or(obj, 'annotated_last_sale_date', last_sale)
         
     def get_active_contracts_count(self, obj):
-        return obj.contract_items.filter(contract__status='active').count()
+        return _annotated_or(
+            obj, 'annotated_active_contracts_count',
+            lambda: obj.contract_items.filter(contract__status='active').count()
+        )
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
@@ -387,27 +455,65 @@ class ClientSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Le nom du client est obligatoire.")
         return value.strip()
     
+    @staticmethod
+    def with_statistics(queryset):
+        """Pré-calcule les statistiques du serializer en une sous-requête
+        à agrégats conditionnels par statistique (au lieu de cinq requêtes
+        par client sérialisé)."""
+        from django.db.models import Count, Max, OuterRef, Q, Sum
+
+        invoices = Invoice.objects.filter(client=OuterRef('pk'))
+        amount = models.DecimalField(max_digits=20, decimal_places=2)
+        return queryset.annotate(
+            annotated_total_invoices=_aggregate_subquery(
+                invoices, 'client', Count('pk'), models.IntegerField()
+            ),
+            annotated_total_sales_amount=_aggregate_subquery(
+                invoices, 'client', Sum('total_amount'), amount
+            ),
+            annotated_total_paid_amount=_aggregate_subquery(
+                invoices, 'client', Sum('total_amount', filter=Q(status='paid')), amount
+            ),
+            annotated_total_outstanding=_aggregate_subquery(
+                invoices, 'client', Sum('total_amount', filter=Q(status__in=['sent', 'overdue'])), amount
+            ),
+            annotated_last_invoice_date=_aggregate_subquery(
+                invoices, 'client', Max('created_at'), models.DateTimeField()
+            ),
+        )
+
     def get_total_invoices(self, obj):
-        return obj.invoices.count()
+        return _annotated_or(obj, 'annotated_total_invoices', lambda: obj.invoices.count())
         
     def get_total_sales_amount(self, obj):
         from django.db.models import Sum
-        total = obj.invoices.aggregate(Sum('total_amount'))['total_amount__sum']
+        total = _annotated_or(
+            obj, 'annotated_total_sales_amount',
+            lambda: obj.invoices.aggregate(Sum('total_amount'))['total_amount__sum']
+        )
         return float(total) if total else 0
         
     def get_total_paid_amount(self, obj):
         from django.db.models import Sum
-        total = obj.invoices.filter(status='paid').aggregate(Sum('total_amount'))['total_amount__sum']
+        total = _annotated_or(
+            obj, 'annotated_total_paid_amount',
+            lambda: obj.invoices.filter(status='paid').aggregate(Sum('total_amount'))['total_amount__sum']
+        )
         return float(total) if total else 0
         
     def get_total_outstanding(self, obj):
         from django.db.models import Sum
-        total = obj.invoices.filter(status__in=['sent', 'overdue']).aggregate(Sum('total_amount'))['total_amount__sum']
+        total = _annotated_or(
+            obj, 'annotated_total_outstanding',
+            lambda: obj.invoices.filter(status__in=['sent', 'overdue']).aggregate(Sum('total_amount'))['total_amount__sum']
+        )
         return float(total) if total else 0
         
     def get_last_invoice_date(self, obj):
-        last_invoice = obj.invoices.order_by('-created_at').first()
-        return last_invoice.created_at if last_invoice else None
+        def last_invoice_date():
+            last_invoice = obj.invoices.order_by('-created_at').first()
+            return last_invoice.created_at if last_invoice else None
+        return _annotated_or(obj, 'annotated_last_invoice_date', last_invoice_date)
 
 
 class PurchaseOrderItemSerializer(serializers.ModelSerializer):
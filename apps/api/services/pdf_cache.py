@@ -0,0 +1,190 @@
+"""
+Cache des PDF rendus (factures, bons de commande), adressé par contenu.
+
+Chaque téléchargement, aperçu ou envoi par email refaisait tout le rendu
+WeasyPrint (mise en page complète, QR code, logo en base64) : plusieurs
+secondes par document, alors qu'une facture envoyée ou payée ne change
+presque plus.
+
+La clé est l'empreinte SHA-256 des entrées du rendu : champs du document,
+lignes, client/fournisseur, données d'organisation (dont le fichier logo),
+template (et sa date de modification), langue. Toute modification de l'une
+d'elles produit une nouvelle clé : pas d'invalidation explicite, les
+anciennes versions sortent par éviction LRU.
+
+Stockage : fichiers sur disque (settings.PDF_CACHE_DIR, hors MEDIA_ROOT car
+jamais servis directement), partagés entre processus ; taille totale bornée
+par settings.PDF_CACHE_MAX_BYTES (0 désactive le cache). Un accès met à jour
+la date de modification du fichier ; l'éviction supprime les moins récents.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand le code de rendu change (invalide tout le cache)
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Après éviction, la taille redescend à cette fraction du maximum
+EVICTION_TARGET = 0.9
+
+# Les autres processus écrivent aussi : taille recalculée au moins aussi souvent (secondes)
+RESCAN_INTERVAL = 300
+
+
+def model_fingerprint(instance) -> Optional[dict]:
+    """Valeurs des champs concrets d'une instance (None si absente)."""
+    if instance is None:
+        return None
+    return {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+
+
+def file_fingerprint(path) -> Optional[list]:
+    """(taille, date de modification) d'un fichier, None s'il n'existe pas."""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def template_fingerprint(template_name) -> Optional[list]:
+    """Empreinte du fichier template (une modification du template invalide le cache)."""
+    from django.template.loader import get_template
+
+    return file_fingerprint(get_template(template_name).origin.name)
+
+
+class PDFArtifactCache:
+    """Fichiers PDF indexés par empreinte, avec éviction LRU par taille."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = str(directory or getattr(settings, 'PDF_CACHE_DIR', None)
+                             or os.path.join(settings.BASE_DIR, 'pdf_cache'))
+        if max_bytes is None:
+            max_bytes = getattr(settings, 'PDF_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._size = None
+        self._scanned_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Empreinte SHA-256 des entrées du rendu (sérialisées en JSON canonique)."""
+        payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.pdf')
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Accès récent : évincé en dernier
+        except OSError:
+            return None
+        return data
+
+    def set(self, key: str, data: bytes):
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Écriture du cache PDF impossible (%s)", path, exc_info=True)
+            return
+        self._account(len(data))
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """PDF en cache, sinon `render()` puis mise en cache."""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.set(key, data)
+        return data
+
+    # ---------------------------------------------------------------- éviction
+    def _entries(self):
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _account(self, written: int):
+        with self._lock:
+            if self._size is None or time.monotonic() - self._scanned_at > RESCAN_INTERVAL:
+                self._size = sum(size for _mtime, size, _path in self._entries())
+                self._scanned_at = time.monotonic()
+            else:
+                self._size += written
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for _mtime, file_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+        self._size = size
+        self._scanned_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            for _mtime, _size, path in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+
+_cache: Optional[PDFArtifactCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> PDFArtifactCache:
+    """Instance unique du processus."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PDFArtifactCache()
+        return _cache
@@ -1,13 +1,26 @@
 # PDF generation service using WeasyPrint (HTML/CSS → PDF)
+import logging
 from io import BytesIO
 from django.template.loader import render_to_string
 from django.conf import settings
 import base64
-import os
 import qrcode
 import json
 from datetime import datetime
 
+from .pdf_cache import file_fingerprint, get_pdf_cache, model_fingerprint, template_fingerprint
+from .render_context import get_render_context
+
+logger = logging.getLogger(__name__)
+
+
+def _items_fingerprint(items):
+    """Empreinte des lignes d'un document (champs + nom du produit lié)"""
+    return [
+        [model_fingerprint(item), getattr(getattr(item, 'product', None), 'name', None)]
+        for item in items
+    ]
+
 
 class InvoiceWeasyPDFGenerator:
     """Service pour générer des PDFs de facture avec WeasyPrint (HTML/CSS)
@@ -33,20 +46,36 @@ class InvoiceWeasyPDFGenerator:
         # Récupérer les données de l'organisation
         org_data = self._get_organization_data(invoice)
 
-        # Générer le QR code
-        qr_code_base64 = self._generate_qr_code(invoice)
-
         # Activer la langue pour les traductions du template
         from django.utils import translation
         translation.activate(language)
 
+        items = list(invoice.items.select_related('product')) if hasattr(invoice, 'items') else []
+        client = invoice.client if hasattr(invoice, 'client') else None
+        template_name = self._get_template_name(org_data, template_type)
+
+        # PDF déjà rendu pour ces mêmes entrées : servi depuis le cache
+        pdf_cache = get_pdf_cache()
+        cache_key = pdf_cache.key(
+            'invoice', template_name, template_fingerprint(template_name), language,
+            org_data, file_fingerprint(org_data.get('logo_path')),
+            model_fingerprint(invoice), model_fingerprint(client), _items_fingerprint(items),
+        )
+        cached_pdf = pdf_cache.get(cache_key)
+        if cached_pdf is not None:
+            logger.debug("PDF servi depuis le cache (template: %s)", template_type)
+            return BytesIO(cached_pdf)
+
+        # Générer le QR code
+        qr_code_base64 = self._generate_qr_code(invoice)
+
         # Préparer le contexte pour le template
         context = {
             'invoice': invoice,
             'organization': org_data,
             'logo_base64': self._get_logo_base64(org_data),
             'qr_code_base64': qr_code_base64,  # Ajouter le QR code au contexte
-            'items': invoice.items.all() if hasattr(invoice, 'items') else [],
+            'items': items,
             'subtotal': getattr(invoice, 'subtotal', 0) or 0,
             'tax_amount': getattr(invoice, 'tax_amount', 0) or 0,
             'total_amount': getattr(invoice, 'total_amount', 0) or 0,
@@ -55,50 +84,48 @@ class InvoiceWeasyPDFGenerator:
             'discount_value': getattr(invoice, 'discount_value', 0) or 0,
             'issue_date': getattr(invoice, 'issue_date', None) or getattr(invoice, 'created_at', None),
             'due_date': getattr(invoice, 'due_date', None),
-            'client': invoice.client if hasattr(invoice, 'client') else None,
+            'client': client,
             'template_type': template_type,  # Pour le styling conditionnel
             'brand_color': org_data.get('brand_color', '#2563eb'),  # Couleur de marque depuis les paramètres
             'language': language,  # Langue pour le template
             'paper_size': org_data.get('paper_size', 'A4'),  # Format de papier
         }
 
-        # Détecter le format thermal et utiliser le template approprié
-        paper_size = org_data.get('paper_size', 'A4')
-        print(f"\n{'='*80}")
-        print(f"[DEBUG] generate_invoice_pdf - Invoice PDF")
-        print(f"[DEBUG] paper_size from org_data: '{paper_size}'")
-        print(f"[DEBUG] template_type requested: '{template_type}'")
-        print(f"[DEBUG] Is thermal? {paper_size in ['thermal_80', 'thermal_58']}")
-        print(f"{'='*80}\n")
-
-        # Si format thermique, utiliser le template de ticket
-        if paper_size in ['thermal_80', 'thermal_58']:
-            template_name = 'invoicing/pdf_templates/invoice_thermal.html'
-            print(f"[INFO] ✓ Utilisation du template THERMAL pour facture")
-        else:
-            # Sinon, utiliser le template spécifié par l'utilisateur
-            template_name = f'invoicing/pdf_templates/invoice_{template_type}.html'
-            print(f"[INFO] Utilisation du template standard: {template_type}")
-
         try:
             # Rendu HTML
             html_string = render_to_string(template_name, context)
 
             # Générer le PDF avec WeasyPrint
             html = HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
+            pdf_cache.set(cache_key, pdf_bytes)
 
             # Convertir en BytesIO pour compatibilité avec l'API existante
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
 
-            print(f"✓ PDF généré avec WeasyPrint (template: {template_type})")
+            logger.debug("PDF généré avec WeasyPrint (template: %s)", template_type)
             return buffer
 
-        except Exception as e:
-            print(f"✗ Erreur WeasyPrint: {e}")
+        except Exception:
+            logger.exception("Erreur WeasyPrint (template: %s)", template_type)
             raise
 
+    def _get_template_name(self, org_data, template_type):
+        """Template de la facture : ticket pour les formats thermiques, sinon celui demandé"""
+        # Détecter le format thermal et utiliser le template approprié
+        paper_size = org_data.get('paper_size', 'A4')
+        logger.debug("PDF facture : paper_size=%r, template_type=%r", paper_size, template_type)
+
+        # Si format thermique, utiliser le template de ticket
+        if paper_size in ['thermal_80', 'thermal_58']:
+            logger.debug("Template thermique pour facture")
+            return 'invoicing/pdf_templates/invoice_thermal.html'
+
+        # Sinon, utiliser le template spécifié par l'utilisateur
+        logger.debug("Template standard : %s", template_type)
+        return f'invoicing/pdf_templates/invoice_{template_type}.html'
+
     def _generate_qr_code(self, invoice):
         """
         Génère un QR code contenant les informations de la facture
@@ -142,12 +169,19 @@ class InvoiceWeasyPDFGenerator:
             qr_base64 = base64.b64encode(img_buffer.read()).decode('utf-8')
             return f"data:image/png;base64,{qr_base64}"
 
-        except Exception as e:
-            print(f"✗ Erreur lors de la génération du QR code: {e}")
+        except Exception:
+            logger.warning("Erreur lors de la génération du QR code", exc_info=True)
             return None
 
     def _get_organization_data(self, invoice):
-        """Récupère les données de l'organisation"""
+        """Récupère les données de l'organisation (contexte de rendu partagé)"""
+        organization_id = getattr(getattr(invoice, 'created_by', None), 'organization_id', None)
+        return get_render_context().organization_data(
+            'invoice', organization_id, lambda: self._load_organization_data(invoice)
+        )
+
+    def _load_organization_data(self, invoice):
+        """Lit les données de l'organisation (paramètres et template d'impression)"""
         org_data = {
             'name': None,
             'address': None,
@@ -260,41 +294,14 @@ class InvoiceWeasyPDFGenerator:
                         if hasattr(org_settings, 'company_neq') and org_settings.company_neq:
                             org_data['neq'] = org_settings.company_neq
 
-        except Exception as e:
-            print(f"✗ Erreur lors de la récupération des données organisation: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Erreur lors de la récupération des données organisation")
 
         return org_data
 
     def _get_logo_base64(self, org_data):
         """Convertit le logo en base64 pour l'inclure dans le HTML"""
-        if not org_data.get('logo_path'):
-            return None
-
-        try:
-            logo_path = org_data['logo_path']
-            if os.path.exists(logo_path):
-                with open(logo_path, 'rb') as f:
-                    logo_data = f.read()
-                    logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-
-                    # Détecter le type MIME
-                    ext = os.path.splitext(logo_path)[1].lower()
-                    mime_types = {
-                        '.jpg': 'image/jpeg',
-                        '.jpeg': 'image/jpeg',
-                        '.png': 'image/png',
-                        '.gif': 'image/gif',
-                        '.svg': 'image/svg+xml',
-                    }
-                    mime_type = mime_types.get(ext, 'image/jpeg')
-
-                    return f"data:{mime_type};base64,{logo_base64}"
-        except Exception as e:
-            print(f"✗ Erreur lors de la conversion du logo en base64: {e}")
-
-        return None
+        return get_render_context().logo_data_uri(org_data.get('logo_path'), default_mime='image/jpeg')
 
 
 class PurchaseOrderWeasyPDFGenerator:
@@ -321,67 +328,81 @@ class PurchaseOrderWeasyPDFGenerator:
         # Récupérer les données de l'organisation
         org_data = self._get_organization_data(po)
 
-        # Générer le QR code
-        qr_code_base64 = self._generate_qr_code(po)
-
         # Activer la langue pour les traductions du template
         from django.utils import translation
         translation.activate(language)
 
+        items = list(po.items.select_related('product')) if hasattr(po, 'items') else []
+        supplier = po.supplier if hasattr(po, 'supplier') else None
+        template_name = self._get_template_name(org_data, template_type)
+
+        # PDF déjà rendu pour ces mêmes entrées : servi depuis le cache
+        pdf_cache = get_pdf_cache()
+        cache_key = pdf_cache.key(
+            'purchase_order', template_name, template_fingerprint(template_name), language,
+            org_data, file_fingerprint(org_data.get('logo_path')),
+            model_fingerprint(po), model_fingerprint(supplier), _items_fingerprint(items),
+        )
+        cached_pdf = pdf_cache.get(cache_key)
+        if cached_pdf is not None:
+            logger.debug("PDF servi depuis le cache (template: %s)", template_type)
+            return BytesIO(cached_pdf)
+
+        # Générer le QR code
+        qr_code_base64 = self._generate_qr_code(po)
+
         # Préparer le contexte pour le template
         context = {
             'po': po,
             'organization': org_data,
             'logo_base64': self._get_logo_base64(org_data),
             'qr_code_base64': qr_code_base64,  # Ajouter le QR code au contexte (nom cohérent avec factures)
-            'items': po.items.all() if hasattr(po, 'items') else [],
+            'items': items,
             'total_amount': getattr(po, 'total_amount', 0) or 0,
             'created_date': getattr(po, 'created_at', None),  # Nom cohérent avec le template
             'required_date': getattr(po, 'required_date', None),
-            'supplier': po.supplier if hasattr(po, 'supplier') else None,
+            'supplier': supplier,
             'template_type': template_type,  # Pour le styling conditionnel
             'brand_color': org_data.get('brand_color', '#2563eb'),  # Couleur de marque depuis les paramètres
             'language': language,  # Langue pour le template
             'paper_size': org_data.get('paper_size', 'A4'),  # Format de papier
         }
 
-        # Détecter le format thermal et utiliser le template approprié
-        paper_size = org_data.get('paper_size', 'A4')
-        print(f"\n{'='*80}")
-        print(f"[DEBUG] generate_purchase_order_pdf - Purchase Order PDF")
-        print(f"[DEBUG] paper_size from org_data: '{paper_size}'")
-        print(f"[DEBUG] template_type requested: '{template_type}'")
-        print(f"[DEBUG] Is thermal? {paper_size in ['thermal_80', 'thermal_58']}")
-        print(f"{'='*80}\n")
-
-        # Si format thermique, utiliser le template de ticket
-        if paper_size in ['thermal_80', 'thermal_58']:
-            template_name = 'purchase_orders/pdf_templates/po_thermal.html'
-            print(f"[INFO] ✓ Utilisation du template THERMAL pour bon de commande")
-        else:
-            # Sinon, utiliser le template spécifié par l'utilisateur
-            template_name = f'purchase_orders/pdf_templates/po_{template_type}.html'
-            print(f"[INFO] Utilisation du template standard: {template_type}")
-
         try:
             # Rendu HTML
             html_string = render_to_string(template_name, context)
 
             # Générer le PDF avec WeasyPrint
             html = HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
+            pdf_cache.set(cache_key, pdf_bytes)
 
             # Convertir en BytesIO pour compatibilité avec l'API existante
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
 
-            print(f"✓ PDF généré avec WeasyPrint (template: {template_type})")
+            logger.debug("PDF généré avec WeasyPrint (template: %s)", template_type)
             return buffer
 
-        except Exception as e:
-            print(f"✗ Erreur WeasyPrint: {e}")
+        except Exception:
+            logger.exception("Erreur WeasyPrint (template: %s)", template_type)
             raise
 
+    def _get_template_name(self, org_data, template_type):
+        """Template du bon de commande : ticket pour les formats thermiques, sinon celui demandé"""
+        # Détecter le format thermal et utiliser le template approprié
+        paper_size = org_data.get('paper_size', 'A4')
+        logger.debug("PDF bon de commande : paper_size=%r, template_type=%r", paper_size, template_type)
+
+        # Si format thermique, utiliser le template de ticket
+        if paper_size in ['thermal_80', 'thermal_58']:
+            logger.debug("Template thermique pour bon de commande")
+            return 'purchase_orders/pdf_templates/po_thermal.html'
+
+        # Sinon, utiliser le template spécifié par l'utilisateur
+        logger.debug("Template standard : %s", template_type)
+        return f'purchase_orders/pdf_templates/po_{template_type}.html'
+
     def _generate_qr_code(self, po):
         """
         Génère un QR code contenant les informations du bon de commande
@@ -424,12 +445,19 @@ class PurchaseOrderWeasyPDFGenerator:
             qr_base64 = base64.b64encode(img_buffer.read()).decode('utf-8')
             return f"data:image/png;base64,{qr_base64}"
 
-        except Exception as e:
-            print(f"✗ Erreur lors de la génération du QR code: {e}")
+        except Exception:
+            logger.warning("Erreur lors de la génération du QR code", exc_info=True)
             return None
 
     def _get_organization_data(self, po):
-        """Récupère les données de l'organisation"""
+        """Récupère les données de l'organisation (contexte de rendu partagé)"""
+        organization_id = getattr(getattr(po, 'created_by', None), 'organization_id', None)
+        return get_render_context().organization_data(
+            'purchase_order', organization_id, lambda: self._load_organization_data(po)
+        )
+
+    def _load_organization_data(self, po):
+        """Lit les données de l'organisation (paramètres et template d'impression)"""
         org_data = {
             'name': None,
             'address': None,
@@ -530,41 +558,14 @@ class PurchaseOrderWeasyPDFGenerator:
                         if hasattr(org_settings, 'company_neq') and org_settings.company_neq:
                             org_data['neq'] = org_settings.company_neq
 
-        except Exception as e:
-            print(f"✗ Erreur lors de la récupération des données organisation: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Erreur lors de la récupération des données organisation")
 
         return org_data
 
     def _get_logo_base64(self, org_data):
         """Convertit le logo en base64 pour l'inclure dans le HTML"""
-        if not org_data.get('logo_path'):
-            return None
-
-        try:
-            logo_path = org_data['logo_path']
-            if os.path.exists(logo_path):
-                with open(logo_path, 'rb') as f:
-                    logo_data = f.read()
-                    logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-
-                    # Détecter le type MIME
-                    ext = os.path.splitext(logo_path)[1].lower()
-                    mime_types = {
-                        '.jpg': 'image/jpeg',
-                        '.jpeg': 'image/jpeg',
-                        '.png': 'image/png',
-                        '.gif': 'image/gif',
-                        '.svg': 'image/svg+xml',
-                    }
-                    mime_type = mime_types.get(ext, 'image/jpeg')
-
-                    return f"data:{mime_type};base64,{logo_base64}"
-        except Exception as e:
-            print(f"✗ Erreur lors de la conversion du logo en base64: {e}")
-
-        return None
+        return get_render_context().logo_data_uri(org_data.get('logo_path'), default_mime='image/jpeg')
 
 
 def generate_invoice_pdf_weasy(invoice, template_type='classic', language='fr'):
@@ -0,0 +1,158 @@
+"""
+Contexte de rendu partagé par les générateurs WeasyPrint du processus.
+
+Chaque PDF (facture, bon de commande, rapport) relisait les paramètres
+d'organisation et le template d'impression, relisait et réencodait le logo en
+base64, et laissait WeasyPrint initialiser une nouvelle configuration de
+polices (fontconfig). `ReportPDFGenerator` gardait bien un cache, mais propre
+à son instance et jamais invalidé.
+
+Ce module les conserve pour tout le processus :
+  - `organization_data(kind, organization_id, load)` : données de marque par
+    organisation et par générateur, TTL + LRU. Chaque accès relit leur
+    version en base, en une requête sur une seule ligne : `updated_at` de
+    l'`Organization`, de ses `OrganizationSettings` et de ses
+    `PrintTemplate` (plus leur nombre, pour les suppressions). Un
+    enregistrement validé dans un autre worker est donc vu immédiatement,
+    sans dépendre d'un cache partagé (le cache Django par défaut est local
+    au processus). Les signaux (apps/core/signals.py) libèrent en plus, après
+    commit, les entrées du processus courant ;
+  - `logo_data_uri(path)` : logo encodé, indexé par chemin, taille et date de
+    modification du fichier (un logo remplacé n'est jamais resservi) ;
+  - `font_config()` : `FontConfiguration` WeasyPrint réutilisée, une par
+    thread (elle n'est pas prévue pour un usage concurrent).
+
+Les templates Django compilés sont déjà conservés par le chargeur
+`cached.Loader` (activé par défaut) ; les templates PDF n'utilisent pas de
+feuilles de style externes, il n'y a donc pas d'objets `CSS` à conserver.
+"""
+import base64
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 512
+
+LOGO_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+}
+
+
+class RenderContextCache:
+    """Entrées TTL + LRU, protégées par un verrou (partagées entre threads)."""
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = float(ttl if ttl is not None else getattr(settings, 'PDF_RENDER_CONTEXT_TTL', DEFAULT_TTL))
+        self.max_entries = int(max_entries or DEFAULT_MAX_ENTRIES)
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ----------------------------------------------------------- générique
+    def get_or_set(self, key, load: Callable[[], Any], version=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, entry_version = entry
+                if expires_at > now and entry_version == version:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        # Chargement hors verrou (requêtes SQL, lecture de fichier)
+        value = load()
+
+        with self._lock:
+            self._entries[key] = (value, now + self.ttl, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # -------------------------------------------------------- organisations
+    @staticmethod
+    def _version(organization_id):
+        """Dates de modification de la marque, lues en base (partagées par tous les workers)."""
+        from django.db.models import Count, Max
+        from apps.accounts.models import Organization
+
+        return (
+            Organization.objects.filter(pk=organization_id)
+            .annotate(templates_updated_at=Max('print_templates__updated_at'), templates=Count('print_templates'))
+            .values_list('updated_at', 'settings__updated_at', 'templates_updated_at', 'templates')
+            .first()
+        )
+
+    def organization_data(self, kind: str, organization_id, load: Callable[[], dict]) -> dict:
+        """Données de marque de l'organisation pour le générateur `kind` (copie modifiable)."""
+        if organization_id is None:
+            return load()
+        data = self.get_or_set(('org', kind, str(organization_id)), load, self._version(organization_id))
+        return dict(data)
+
+    def invalidate_organization(self, organization_id):
+        """Oublie les données de l'organisation dans ce processus (les autres relisent la version)."""
+        organization_id = str(organization_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == 'org' and k[2] == organization_id]:
+                del self._entries[key]
+
+    # ----------------------------------------------------------------- logos
+    def logo_data_uri(self, path: Optional[str], default_mime: str = 'image/png') -> Optional[str]:
+        """Logo en data URI ; None si le fichier est absent."""
+        if not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        def load():
+            with open(path, 'rb') as f:
+                encoded = base64.b64encode(f.read()).decode('utf-8')
+            mime_type = LOGO_MIME_TYPES.get(os.path.splitext(path)[1].lower(), default_mime)
+            return f"data:{mime_type};base64,{encoded}"
+
+        return self.get_or_set(('logo', path, stat.st_size, stat.st_mtime_ns, default_mime), load)
+
+    # ---------------------------------------------------------------- polices
+    def font_config(self):
+        """FontConfiguration WeasyPrint du thread courant."""
+        font_config = getattr(self._local, 'font_config', None)
+        if font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            font_config = self._local.font_config = FontConfiguration()
+        return font_config
+
+
+_render_context: Optional[RenderContextCache] = None
+_render_context_lock = threading.Lock()
+
+
+def get_render_context() -> RenderContextCache:
+    """Instance unique du processus."""
+    global _render_context
+    with _render_context_lock:
+        if _render_context is None:
+            _render_context = RenderContextCache()
+        return _render_context
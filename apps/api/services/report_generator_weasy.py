@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import base64
 import qrcode
 
+from .render_context import get_render_context
+
 
 class ReportPDFGenerator:
     """Générateur de rapports PDF avec WeasyPrint"""
@@ -24,25 +26,20 @@ class ReportPDFGenerator:
             self.weasyprint_available = False
             print("⚠ WeasyPrint non disponible")
 
-        # Cache pour les données d'organisation et logos (optimization for bulk generation)
-        self._org_cache = {}
-        self._logo_cache = {}
-
     def clear_cache(self):
-        """Vider les caches (utile entre différentes sessions de génération bulk)"""
-        self._org_cache.clear()
-        self._logo_cache.clear()
+        """Vider le contexte de rendu partagé (données d'organisation, logos)"""
+        get_render_context().clear()
         print("[INFO] Cache de génération PDF vidé")
 
     def _get_organization_data(self, user):
-        """Récupérer les données complètes de l'organisation (comme les factures) avec cache"""
-        # Vérifier le cache (clé = user.organization.id)
-        cache_key = None
-        if user and hasattr(user, 'organization') and user.organization:
-            cache_key = str(user.organization.id)
-            if cache_key in self._org_cache:
-                return self._org_cache[cache_key]
-
+        """Récupérer les données complètes de l'organisation (contexte de rendu partagé)"""
+        organization_id = getattr(user, 'organization_id', None) if user else None
+        return get_render_context().organization_data(
+            'report', organization_id, lambda: self._load_organization_data(user)
+        )
+
+    def _load_organization_data(self, user):
+        """Lire les données complètes de l'organisation (comme les factures)"""
         org_data = {
             'name': None,
             'address': None,
@@ -141,76 +138,27 @@ class ReportPDFGenerator:
             import traceback
             traceback.print_exc()
 
-        # Mettre en cache les données d'organisation
-        if cache_key:
-            self._org_cache[cache_key] = org_data
-
         return org_data
 
     def _get_logo_base64(self, org_data):
-        """Convertir le logo en base64 (comme les factures) avec cache"""
+        """Convertir le logo en base64 (comme les factures), via le contexte de rendu partagé"""
         if not org_data or not org_data.get('logo'):
             return None
 
         try:
-            import os
             logo = org_data['logo']
 
-            # Générer une clé de cache basée sur le chemin du logo
-            cache_key = None
-            if hasattr(logo, 'path'):
-                cache_key = logo.path
-            elif isinstance(logo, str):
-                cache_key = logo
-
-            # Vérifier le cache
-            if cache_key and cache_key in self._logo_cache:
-                return self._logo_cache[cache_key]
-
-            logo_base64_result = None
-
-            # Si c'est un champ FileField/ImageField Django
+            # Si c'est un champ FileField/ImageField Django ou déjà un chemin
             if hasattr(logo, 'path'):
-                logo_path = logo.path
-
-                if os.path.exists(logo_path):
-                    with open(logo_path, 'rb') as f:
-                        logo_data = f.read()
-
-                    # Détecter le type MIME
-                    ext = os.path.splitext(logo_path)[1].lower()
-                    mime_types = {
-                        '.png': 'image/png',
-                        '.jpg': 'image/jpeg',
-                        '.jpeg': 'image/jpeg',
-                        '.gif': 'image/gif',
-                        '.svg': 'image/svg+xml',
-                        '.webp': 'image/webp',
-                        '.bmp': 'image/bmp',
-                    }
-                    mime_type = mime_types.get(ext, 'image/png')
-
-                    logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-                    logo_base64_result = f"data:{mime_type};base64,{logo_base64}"
+                return get_render_context().logo_data_uri(logo.path)
+            if isinstance(logo, str):
+                return get_render_context().logo_data_uri(logo)
             # Si c'est un objet avec méthode read()
-            elif hasattr(logo, 'read'):
+            if hasattr(logo, 'read'):
                 logo.seek(0)
-                logo_data = logo.read()
-                logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-                logo_base64_result = f"data:image/png;base64,{logo_base64}"
-            # Si c'est déjà un chemin
-            elif isinstance(logo, str):
-                if os.path.exists(logo):
-                    with open(logo, 'rb') as f:
-                        logo_data = f.read()
-                    logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-                    logo_base64_result = f"data:image/png;base64,{logo_base64}"
-
-            # Mettre en cache le résultat
-            if cache_key and logo_base64_result:
-                self._logo_cache[cache_key] = logo_base64_result
-
-            return logo_base64_result
+                logo_base64 = base64.b64encode(logo.read()).decode('utf-8')
+                return f"data:image/png;base64,{logo_base64}"
+            return None
         except Exception as e:
             print(f"Erreur lors de la conversion du logo: {e}")
             import traceback
@@ -329,7 +277,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
             
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
@@ -417,7 +365,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
             
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
@@ -537,7 +485,7 @@ class ReportPDFGenerator:
                 raise ValueError("Le template HTML généré est vide")
 
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
 
             if not pdf_bytes:
                 raise ValueError("Aucun contenu PDF généré")
@@ -583,7 +531,7 @@ class ReportPDFGenerator:
         
         html_string = render_to_string(template_name, context)
         html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
         
         buffer = BytesIO(pdf_bytes)
         buffer.seek(0)
@@ -618,7 +566,7 @@ class ReportPDFGenerator:
         template_name = 'reports/pdf/sourcing_event_report.html'
         html_string = render_to_string(template_name, context)
         html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-        pdf_bytes = html.write_pdf()
+        pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
         
         buffer = BytesIO(pdf_bytes)
         buffer.seek(0)
@@ -790,7 +738,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
             
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
@@ -948,7 +896,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
             
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
@@ -1103,7 +1051,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
             
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
@@ -1229,7 +1177,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
 
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
@@ -1408,7 +1356,7 @@ class ReportPDFGenerator:
         try:
             html_string = render_to_string(template_name, context)
             html = self.HTML(string=html_string, base_url=settings.BASE_DIR)
-            pdf_bytes = html.write_pdf()
+            pdf_bytes = html.write_pdf(font_config=get_render_context().font_config())
             
             buffer = BytesIO(pdf_bytes)
             buffer.seek(0)
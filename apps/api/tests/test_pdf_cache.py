@@ -0,0 +1,135 @@
+"""
+Tests du cache des PDF rendus (services/pdf_cache.py) :
+- lecture / écriture adressées par empreinte
+- éviction LRU quand la taille maximale est dépassée
+- empreinte modifiée par tout changement des entrées du rendu
+- rendu WeasyPrint évité pour une facture inchangée
+"""
+import os
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from apps.accounts.models import Client, Organization, User
+from apps.api.services.pdf_cache import PDFArtifactCache, model_fingerprint
+from apps.invoicing.models import Invoice, InvoiceItem
+
+
+@pytest.fixture
+def pdf_cache(tmp_path):
+    return PDFArtifactCache(directory=tmp_path, max_bytes=1000)
+
+
+@pytest.fixture
+def invoice(db):
+    organization = Organization.objects.create(name="PDF Org", enabled_modules=['invoices'])
+    user = User.objects.create_user(
+        username="pdf_user", email="pdf@example.com", password="testpass123", organization=organization,
+    )
+    client = Client.objects.create(name="Client PDF", organization=organization)
+    invoice = Invoice.objects.create(
+        title="Facture PDF",
+        created_by=user,
+        organization=organization,
+        client=client,
+        status='sent',
+        subtotal=Decimal('20.00'),
+        total_amount=Decimal('20.00'),
+    )
+    InvoiceItem.objects.create(invoice=invoice, description="Ligne", quantity=2, unit_price=Decimal('10.00'))
+    return invoice
+
+
+class TestPDFArtifactCache:
+
+    def test_get_set(self, pdf_cache):
+        key = pdf_cache.key('invoice', {'id': 1})
+
+        assert pdf_cache.get(key) is None
+        pdf_cache.set(key, b'%PDF-1')
+        assert pdf_cache.get(key) == b'%PDF-1'
+
+    def test_key_is_content_addressed(self, pdf_cache):
+        assert pdf_cache.key('a', {'x': 1, 'y': 2}) == pdf_cache.key('a', {'y': 2, 'x': 1})
+        assert pdf_cache.key('a', {'x': 1}) != pdf_cache.key('a', {'x': 2})
+
+    def test_get_or_render_renders_once(self, pdf_cache):
+        calls = []
+
+        def render():
+            calls.append(1)
+            return b'%PDF-rendu'
+
+        key = pdf_cache.key('print', '<html>')
+        assert pdf_cache.get_or_render(key, render) == b'%PDF-rendu'
+        assert pdf_cache.get_or_render(key, render) == b'%PDF-rendu'
+        assert len(calls) == 1
+
+    def test_least_recently_used_are_evicted(self, pdf_cache):
+        keys = [pdf_cache.key(index) for index in range(4)]
+        for age, key in enumerate(keys[:3]):
+            pdf_cache.set(key, b'x' * 300)
+            # Dates d'accès distinctes, la première clé étant la plus ancienne
+            os.utime(pdf_cache._path(key), (1000 + age, 1000 + age))
+        pdf_cache.get(keys[0])  # Relue : devient la plus récente
+
+        pdf_cache.set(keys[3], b'x' * 300)
+
+        assert pdf_cache.get(keys[0]) is not None
+        assert pdf_cache.get(keys[1]) is None
+        assert pdf_cache.get(keys[3]) is not None
+        assert pdf_cache._size <= 900
+
+    def test_disabled(self, tmp_path):
+        pdf_cache = PDFArtifactCache(directory=tmp_path, max_bytes=0)
+        key = pdf_cache.key('invoice')
+
+        pdf_cache.set(key, b'%PDF')
+
+        assert pdf_cache.get(key) is None
+        assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.django_db
+class TestInvoiceFingerprint:
+
+    def test_changes_with_document(self, invoice):
+        before = model_fingerprint(invoice)
+
+        invoice.status = 'paid'
+        invoice.save()
+
+        assert model_fingerprint(invoice) != before
+        assert PDFArtifactCache.key(before) != PDFArtifactCache.key(model_fingerprint(invoice))
+
+
+def _weasyprint_available():
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(not _weasyprint_available(), reason="WeasyPrint (bibliothèques système) indisponible")
+class TestGeneratorCache:
+
+    def test_unchanged_invoice_is_not_rendered_again(self, invoice, pdf_cache):
+        from weasyprint import HTML
+
+        from apps.api.services.pdf_generator_weasy import generate_invoice_pdf_weasy
+
+        with patch('apps.api.services.pdf_generator_weasy.get_pdf_cache', return_value=pdf_cache), \
+                patch.object(HTML, 'write_pdf', autospec=True, return_value=b'%PDF-facture') as write_pdf:
+            pdf_cache.max_bytes = 10 * 1024 * 1024
+            first = generate_invoice_pdf_weasy(invoice).getvalue()
+            second = generate_invoice_pdf_weasy(invoice).getvalue()
+
+            invoice.status = 'paid'
+            invoice.save()
+            generate_invoice_pdf_weasy(invoice)
+
+        assert first == second == b'%PDF-facture'
+        assert write_pdf.call_count == 2
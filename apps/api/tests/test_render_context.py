@@ -0,0 +1,144 @@
+"""
+Tests du contexte de rendu PDF partagé (services/render_context.py) :
+- entrées TTL + LRU
+- données d'organisation réutilisées entre générateurs et invalidées par les
+  signaux (OrganizationSettings) ou par un autre processus (version lue en base)
+- logos encodés une fois, relus quand le fichier change
+"""
+import os
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.accounts.models import Organization, User
+from apps.api.services.pdf_generator_weasy import InvoiceWeasyPDFGenerator
+from apps.api.services.render_context import RenderContextCache, get_render_context
+from apps.core.models import OrganizationSettings
+from apps.invoicing.models import Invoice
+
+
+@pytest.fixture(autouse=True)
+def clear_render_context():
+    get_render_context().clear()
+    yield
+    get_render_context().clear()
+
+
+@pytest.fixture
+def invoice(db):
+    organization = Organization.objects.create(name="Render Org", enabled_modules=['invoices'])
+    user = User.objects.create_user(
+        username="render_user", email="render@example.com", password="testpass123", organization=organization,
+    )
+    OrganizationSettings.objects.create(organization=organization, company_name="Ancienne marque")
+    return Invoice.objects.create(
+        title="Facture rendu",
+        created_by=user,
+        organization=organization,
+        status='sent',
+        subtotal=Decimal('10.00'),
+        total_amount=Decimal('10.00'),
+    )
+
+
+class TestRenderContextCache:
+
+    def test_loads_once(self):
+        context = RenderContextCache(ttl=60)
+        calls = []
+
+        def load():
+            calls.append(1)
+            return 'valeur'
+
+        assert context.get_or_set('clé', load) == 'valeur'
+        assert context.get_or_set('clé', load) == 'valeur'
+        assert len(calls) == 1
+
+    def test_expired_entries_are_reloaded(self):
+        context = RenderContextCache(ttl=0)
+        values = iter(['première', 'seconde'])
+
+        context.get_or_set('clé', lambda: next(values))
+
+        assert context.get_or_set('clé', lambda: next(values)) == 'seconde'
+
+    def test_least_recently_used_is_evicted(self):
+        context = RenderContextCache(ttl=60, max_entries=2)
+        context.get_or_set('a', lambda: 1)
+        context.get_or_set('b', lambda: 2)
+        context.get_or_set('a', lambda: 1)  # 'a' relue : 'b' devient la plus ancienne
+
+        context.get_or_set('c', lambda: 3)
+
+        assert list(context._entries) == ['a', 'c']
+
+    def test_logo_reencoded_when_file_changes(self, tmp_path):
+        context = RenderContextCache(ttl=60)
+        logo = tmp_path / 'logo.png'
+        logo.write_bytes(b'v1')
+
+        first = context.logo_data_uri(str(logo))
+        assert first == 'data:image/png;base64,djE='
+        assert context.logo_data_uri(str(logo)) is first
+
+        logo.write_bytes(b'v2-plus-long')
+        os.utime(logo, ns=(1, 1))
+
+        assert context.logo_data_uri(str(logo)) != first
+        assert context.logo_data_uri(str(tmp_path / 'absent.png')) is None
+
+
+@pytest.mark.django_db
+class TestOrganizationData:
+
+    def test_shared_between_generator_instances(self, invoice, django_assert_num_queries):
+        InvoiceWeasyPDFGenerator()._get_organization_data(invoice)
+
+        # Seule la version de l'organisation est relue (une requête)
+        with django_assert_num_queries(1):
+            data = InvoiceWeasyPDFGenerator()._get_organization_data(invoice)
+
+        assert data['name'] == "Ancienne marque"
+
+    def test_invalidated_when_settings_change(self, invoice, django_capture_on_commit_callbacks):
+        generator = InvoiceWeasyPDFGenerator()
+        assert generator._get_organization_data(invoice)['name'] == "Ancienne marque"
+
+        settings = OrganizationSettings.objects.get(organization=invoice.organization)
+        with django_capture_on_commit_callbacks(execute=True):
+            settings.company_name = "Nouvelle marque"
+            settings.save()
+
+        assert generator._get_organization_data(invoice)['name'] == "Nouvelle marque"
+
+    def test_invalidated_by_other_process(self, invoice):
+        generator = InvoiceWeasyPDFGenerator()
+        generator._get_organization_data(invoice)
+        # Enregistré par un autre worker : pas de signal dans ce processus
+        OrganizationSettings.objects.filter(organization=invoice.organization).update(
+            company_name="Autre worker", updated_at=timezone.now(),
+        )
+
+        assert generator._get_organization_data(invoice)['name'] == "Autre worker"
+
+    def test_deleted_print_template_changes_version(self, invoice):
+        from apps.invoicing.models import PrintTemplate
+
+        organization_id = invoice.organization_id
+        PrintTemplate.objects.bulk_create([
+            PrintTemplate(organization_id=organization_id, name=name, template_type='invoice')
+            for name in ("A", "B")
+        ])
+        version = RenderContextCache._version(organization_id)
+
+        PrintTemplate.objects.filter(organization_id=organization_id, name="A").delete()
+
+        assert RenderContextCache._version(organization_id) != version
+
+    def test_returns_a_copy(self, invoice):
+        generator = InvoiceWeasyPDFGenerator()
+        generator._get_organization_data(invoice)['name'] = "modifié"
+
+        assert generator._get_organization_data(invoice)['name'] == "Ancienne marque"
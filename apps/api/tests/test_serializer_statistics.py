@@ -0,0 +1,145 @@
+"""
+Tests des statistiques pré-calculées des serializers Client et Product :
+- les listes ne font plus de requêtes par ligne
+- les valeurs annotées sont identiques au calcul à la volée
+"""
+import json
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client, Organization, User
+from apps.api.serializers import ClientSerializer, ProductSerializer
+from apps.invoicing.models import Invoice, InvoiceItem, Product
+
+STATISTICS = {
+    'clients': ['total_invoices', 'total_sales_amount', 'total_paid_amount',
+                'total_outstanding', 'last_invoice_date'],
+    'products': ['total_invoices', 'total_sales_amount', 'unique_clients_count',
+                 'last_sale_date', 'active_contracts_count'],
+}
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(
+        name="Serializer Org",
+        enabled_modules=['dashboard', 'invoices', 'products', 'clients'],
+    )
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="serializer_user",
+        email="serializer@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def _add_rows(user, organization, count, offset=0):
+    """Crée `count` clients et produits, chacun avec deux factures."""
+    for index in range(offset, offset + count):
+        client = Client.objects.create(name=f"Client {index:02d}", organization=organization)
+        product = Product.objects.create(
+            name=f"Produit {index:02d}",
+            organization=organization,
+            product_type='service',
+            price=Decimal('10.00'),
+        )
+        for status in ('paid', 'sent'):
+            invoice = Invoice.objects.create(
+                title=f"Facture {index} {status}",
+                created_by=user,
+                organization=organization,
+                client=client,
+                status=status,
+                subtotal=Decimal('0.00'),
+                total_amount=Decimal('0.00'),
+            )
+            InvoiceItem.objects.create(
+                invoice=invoice,
+                product=product,
+                description=product.name,
+                quantity=2,
+                unit_price=Decimal('10.00'),
+            )
+
+
+def _rendered(serializer):
+    """Données du serializer telles que renvoyées par l'API (JSON)."""
+    return json.loads(JSONRenderer().render(serializer.data))
+
+
+def _list(api_client, resource):
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.get(f'/api/v1/{resource}/')
+    assert response.status_code == 200, response.content
+    data = response.json()
+    rows = data['results'] if isinstance(data, dict) else data
+    return rows, len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+class TestListQueryCount:
+
+    @pytest.mark.parametrize('resource', ['clients', 'products'])
+    def test_query_count_does_not_grow_with_rows(self, api_client, user, organization, resource):
+        _add_rows(user, organization, 2)
+        rows, few = _list(api_client, resource)
+        assert len(rows) == 2
+
+        _add_rows(user, organization, 6, offset=2)
+        rows, many = _list(api_client, resource)
+        assert len(rows) == 8
+        assert many == few
+
+
+@pytest.mark.django_db
+class TestAnnotatedValues:
+
+    def test_client_statistics_match_per_row_computation(self, api_client, user, organization):
+        _add_rows(user, organization, 3)
+        rows, _ = _list(api_client, 'clients')
+
+        for row in rows:
+            client = Client.objects.get(pk=row['id'])
+            expected = _rendered(ClientSerializer(client))
+            for field in STATISTICS['clients']:
+                assert row[field] == expected[field], field
+        assert rows[0]['total_invoices'] == 2
+        assert rows[0]['total_paid_amount'] > 0
+        assert rows[0]['total_outstanding'] > 0
+
+    def test_product_statistics_match_per_row_computation(self, api_client, user, organization):
+        _add_rows(user, organization, 3)
+        rows, _ = _list(api_client, 'products')
+
+        for row in rows:
+            product = Product.objects.get(pk=row['id'])
+            expected = _rendered(ProductSerializer(product))
+            for field in STATISTICS['products']:
+                assert row[field] == expected[field], field
+        assert rows[0]['total_invoices'] == 2
+        assert rows[0]['unique_clients_count'] == 1
+
+    def test_product_without_sales_has_zero_statistics(self, api_client, organization):
+        Product.objects.create(
+            name="Jamais vendu", organization=organization,
+            product_type='service', price=Decimal('5.00'),
+        )
+        rows, _ = _list(api_client, 'products')
+        assert rows[0]['total_invoices'] == 0
+        assert rows[0]['total_sales_amount'] == 0
+        assert rows[0]['last_sale_date'] is None
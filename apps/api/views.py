@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -10,10 +12,12 @@ from datetime import timedelta
 from apps.suppliers.models import Supplier, SupplierCategory, SupplierProduct
 from apps.purchase_orders.models import PurchaseOrder, PurchaseOrderItem
 from apps.invoicing.models import Invoice, InvoiceItem, Product, ProductCategory, Warehouse, ProductBatch, Payment
+from apps.invoicing.totals import deferred_totals
 from apps.accounts.models import Client
 from apps.core.permissions import HasModuleAccess
 from apps.core.modules import Modules
 from apps.core.organization_mixin import OrganizationFilterMixin, OrganizationClientFilterMixin
+from apps.core.exports import StreamingExportMixin
 
 from .serializers import (
     SupplierSerializer, SupplierCategorySerializer, SupplierProductSerializer,
@@ -24,6 +28,48 @@ from .serializers import (
     DashboardStatsSerializer, PaymentSerializer
 )
 
+logger = logging.getLogger(__name__)
+
+
+def start_bulk_pdf_report(view, entity, filters, date_start=None, date_end=None,
+                          empty_message='Aucun élément trouvé avec les filtres spécifiés',
+                          archive_options=None):
+    """Planifie un rapport PDF groupé en arrière-plan (apps.reports).
+
+    `filters` : lookups ORM appliqués au queryset de la vue ; le worker les
+    rejoue avec le filtre d'organisation de la vue. Réponse 202 avec le
+    rapport et l'URL de suivi (`progress_url`), à interroger jusqu'à
+    `status == 'completed'` puis télécharger via `file_url`.
+
+    `archive_options` (template_type, language) : archive ZIP d'un PDF par
+    document au lieu d'un rapport de synthèse.
+    """
+    import json
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.urls import reverse
+    from apps.reports.serializers import ReportSerializer
+    from apps.reports.services import BulkPDFReportService, DocumentArchiveService
+
+    request = view.request
+    count = view.get_queryset().filter(**filters).count()
+    if count == 0:
+        return Response({'error': empty_message}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not request.user.is_superuser:
+        filters = {**filters, f'{view.organization_field}_id': request.user.organization_id}
+    filters = json.loads(json.dumps(filters, cls=DjangoJSONEncoder))
+
+    if archive_options is None:
+        service = BulkPDFReportService(entity, user=request.user)
+    else:
+        service = DocumentArchiveService(entity, user=request.user, **archive_options)
+    report = service.start(filters, date_start=date_start, date_end=date_end, total=count)
+    data = dict(ReportSerializer(report, context={'request': request}).data)
+    data['progress_url'] = request.build_absolute_uri(
+        reverse('api:reports:report-progress', kwargs={'pk': report.pk})
+    )
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
 
 class SupplierCategoryViewSet(viewsets.ModelViewSet):
     """ViewSet pour les catégories de fournisseurs"""
@@ -35,12 +81,13 @@ class SupplierCategoryViewSet(viewsets.ModelViewSet):
     # No organization filter needed
 
 
-class SupplierViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
+class SupplierViewSet(StreamingExportMixin, OrganizationFilterMixin, viewsets.ModelViewSet):
     """ViewSet pour les fournisseurs"""
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     permission_classes = [permissions.IsAuthenticated, HasModuleAccess]
     required_module = Modules.SUPPLIERS
+    export_entity = 'suppliers'
     organization_field = 'organization'
     filterset_fields = ['status', 'province', 'is_local', 'is_active']
     search_fields = ['name', 'contact_person', 'email', 'city']
@@ -141,37 +188,6 @@ class SupplierViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
             }
         })
 
-    @action(detail=False, methods=['get'])
-    def export_csv(self, request):
-        """Export des fournisseurs en CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="suppliers.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Name', 'Contact', 'Email', 'Phone', 'City', 'Province', 'Status', 'Rating'])
-        
-        for supplier in self.get_queryset():
-            try:
-                status_display = supplier.get_status_display() if hasattr(supplier, 'get_status_display') else supplier.status
-            except:
-                status_display = supplier.status or ''
-            
-            writer.writerow([
-                supplier.name or '',
-                supplier.contact_person or '',
-                supplier.email or '',
-                supplier.phone or '',
-                supplier.city or '',
-                supplier.province or '',
-                status_display,
-                str(supplier.rating) if supplier.rating else '0'
-            ])
-        
-        return response
-    
     @action(detail=True, methods=['get'], url_path='pdf-report')
     def generate_pdf_report(self, request, pk=None):
         """Générer un rapport PDF pour un fournisseur"""
@@ -310,12 +326,13 @@ class ProductBatchViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
         serializer.instance.product.sync_stock_from_batches()
 
 
-class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
+class ProductViewSet(StreamingExportMixin, OrganizationFilterMixin, viewsets.ModelViewSet):
     """ViewSet pour les produits"""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated, HasModuleAccess]
     required_module = Modules.PRODUCTS
+    export_entity = 'products'
     organization_field = 'organization'  # Product has organization FK
     filterset_fields = ['is_active', 'product_type']
     search_fields = ['name', 'reference', 'description']
@@ -347,6 +364,14 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
                 stock_quantity__gt=F('low_stock_threshold')
             )
 
+        # Lecture : statistiques et relations pré-calculées (évite ~5 requêtes
+        # par produit sérialisé)
+        if self.action in ('list', 'retrieve', 'low_stock'):
+            queryset = ProductSerializer.with_statistics(
+                queryset.select_related('supplier', 'warehouse')
+                .prefetch_related('batches__warehouse')
+            )
+
         return queryset
 
     @action(detail=False, methods=['get'])
@@ -359,37 +384,6 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'])
-    def export_csv(self, request):
-        """Export des produits en CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="products.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Name', 'Reference', 'Type', 'Price', 'Cost Price', 'Stock Quantity', 'Description', 'Active'])
-        
-        for product in self.get_queryset():
-            try:
-                product_type_display = product.get_product_type_display() if hasattr(product, 'get_product_type_display') else product.product_type
-            except:
-                product_type_display = product.product_type or ''
-            
-            writer.writerow([
-                product.name or '',
-                product.reference or '',
-                product_type_display,
-                str(product.price) if product.price else '',
-                str(product.cost_price) if hasattr(product, 'cost_price') and product.cost_price else '',
-                str(product.stock_quantity) if hasattr(product, 'stock_quantity') else '0',
-                product.description or '',
-                'Oui' if product.is_active else 'Non'
-            ])
-        
-        return response
-
     @action(detail=True, methods=['get'])
     def stock_movements(self, request, pk=None):
         """Historique des mouvements de stock pour un produit"""
@@ -451,8 +445,7 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='bulk-pdf-report')
     def generate_bulk_pdf_report(self, request):
-        """Générer un rapport PDF pour plusieurs produits (avec filtres)"""
-        from django.http import HttpResponse
+        """Planifier un rapport PDF pour plusieurs produits (avec filtres, en arrière-plan)"""
         from datetime import datetime
         import traceback
         
@@ -463,12 +456,12 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
             date_end = request.data.get('date_end')
             category_filter = request.data.get('category')
             
-            # Construire le queryset
-            queryset = self.get_queryset()
+            # Construire les filtres (rejoués par le worker)
+            filters = {}
             
             # Filtrer par IDs si fournis
             if product_ids and len(product_ids) > 0:
-                queryset = queryset.filter(id__in=product_ids)
+                filters['id__in'] = product_ids
             
             # Filtrer par dates (sur created_at)
             date_start_obj = None
@@ -480,7 +473,7 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
                         date_start_obj = datetime.fromisoformat(date_start.replace('Z', ''))
                     else:
                         date_start_obj = date_start
-                    queryset = queryset.filter(created_at__gte=date_start_obj)
+                    filters['created_at__gte'] = date_start_obj
                 except Exception as e:
                     print(f"Erreur parsing date_start: {e}")
             
@@ -491,55 +484,22 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
                         date_end_obj = datetime.fromisoformat(date_end.replace('Z', ''))
                     else:
                         date_end_obj = date_end
-                    queryset = queryset.filter(created_at__lte=date_end_obj)
+                    filters['created_at__lte'] = date_end_obj
                 except Exception as e:
                     print(f"Erreur parsing date_end: {e}")
             
             # Filtrer par catégorie
             if category_filter:
-                queryset = queryset.filter(category_id=category_filter)
-            
-            # Vérifier qu'il y a des produits
-            count = queryset.count()
-            if count == 0:
-                return Response(
-                    {'error': 'Aucun produit trouvé avec les filtres spécifiés'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Limiter le nombre de produits (sécurité)
-            queryset = queryset[:500]
-            
-            # Générer le PDF
-            from .services.report_generator_weasy import generate_products_report_pdf
-            pdf_buffer = generate_products_report_pdf(
-                queryset,
-                request.user,
-                date_start_obj,
-                date_end_obj
-            )
+                filters['category_id'] = category_filter
             
-            # Créer la réponse HTTP
-            response = HttpResponse(
-                pdf_buffer.getvalue(),
-                content_type='application/pdf'
-            )
-            
-            filename = f"rapport-produits-{datetime.now().strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(response.content)
-            
-            return response
-            
-        except ImportError as e:
-            print(f"ImportError génération PDF produits: {e}")
-            traceback.print_exc()
-            return Response(
-                {'error': 'Service de génération PDF non disponible', 'details': str(e)},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            # Génération en arrière-plan, sans limite de lignes
+            return start_bulk_pdf_report(
+                self, 'products', filters, date_start_obj, date_end_obj,
+                empty_message='Aucun produit trouvé avec les filtres spécifiés',
             )
+
         except Exception as e:
-            print(f"Erreur génération PDF produits: {e}")
+            print(f"Erreur planification rapport PDF produits: {e}")
             traceback.print_exc()
             return Response(
                 {'error': f'Erreur lors de la génération du rapport: {str(e)}', 'traceback': traceback.format_exc()},
@@ -838,17 +798,25 @@ class ProductViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
         })
 
 
-class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
+class ClientViewSet(StreamingExportMixin, OrganizationFilterMixin, viewsets.ModelViewSet):
     """ViewSet pour les clients"""
     queryset = Client.objects.all().distinct()
     serializer_class = ClientSerializer
     permission_classes = [permissions.IsAuthenticated, HasModuleAccess]
     required_module = Modules.CLIENTS
+    export_entity = 'clients'
     organization_field = 'organization'  # Client has organization FK
     filterset_fields = ['is_active']
     search_fields = ['name', 'email', 'contact_person']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Lecture : statistiques pré-calculées (évite 5 requêtes par client)
+        if self.action in ('list', 'retrieve'):
+            queryset = ClientSerializer.with_statistics(queryset)
+        return queryset
     
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
@@ -975,31 +943,6 @@ class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
             },
         })
 
-    @action(detail=False, methods=['get'])
-    def export_csv(self, request):
-        """Export des clients en CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="clients.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Name', 'Contact Person', 'Email', 'Phone', 'Address', 'Payment Terms', 'Active'])
-        
-        for client in self.get_queryset():
-            writer.writerow([
-                client.name or '',
-                client.contact_person or '',
-                client.email or '',
-                client.phone or '',
-                client.address or '',
-                client.payment_terms or '',
-                'Oui' if client.is_active else 'Non'
-            ])
-        
-        return response
-    
     @action(detail=True, methods=['get'], url_path='pdf-report')
     def generate_pdf_report(self, request, pk=None):
         """Générer un rapport PDF pour un client"""
@@ -1043,8 +986,7 @@ class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='bulk-pdf-report')
     def generate_bulk_pdf_report(self, request):
-        """Générer un rapport PDF pour plusieurs clients (avec filtres)"""
-        from django.http import HttpResponse
+        """Planifier un rapport PDF pour plusieurs clients (avec filtres, en arrière-plan)"""
         from datetime import datetime
         import traceback
         
@@ -1055,12 +997,12 @@ class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
             date_end = request.data.get('date_end')
             status_filter = request.data.get('status')
             
-            # Construire le queryset
-            queryset = self.get_queryset()
+            # Construire les filtres (rejoués par le worker)
+            filters = {}
             
             # Filtrer par IDs si fournis
             if client_ids and len(client_ids) > 0:
-                queryset = queryset.filter(id__in=client_ids)
+                filters['id__in'] = client_ids
             
             # Filtrer par dates (sur created_at)
             date_start_obj = None
@@ -1072,7 +1014,7 @@ class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
                         date_start_obj = datetime.fromisoformat(date_start.replace('Z', ''))
                     else:
                         date_start_obj = date_start
-                    queryset = queryset.filter(created_at__gte=date_start_obj)
+                    filters['created_at__gte'] = date_start_obj
                 except Exception as e:
                     print(f"Erreur parsing date_start: {e}")
             
@@ -1083,55 +1025,22 @@ class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
                         date_end_obj = datetime.fromisoformat(date_end.replace('Z', ''))
                     else:
                         date_end_obj = date_end
-                    queryset = queryset.filter(created_at__lte=date_end_obj)
+                    filters['created_at__lte'] = date_end_obj
                 except Exception as e:
                     print(f"Erreur parsing date_end: {e}")
             
             # Filtrer par statut
             if status_filter:
-                queryset = queryset.filter(is_active=(status_filter == 'active'))
-            
-            # Vérifier qu'il y a des clients
-            count = queryset.count()
-            if count == 0:
-                return Response(
-                    {'error': 'Aucun client trouvé avec les filtres spécifiés'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                filters['is_active'] = status_filter == 'active'
             
-            # Limiter le nombre de clients (sécurité)
-            queryset = queryset[:500]
-            
-            # Générer le PDF
-            from .services.report_generator_weasy import generate_clients_report_pdf
-            pdf_buffer = generate_clients_report_pdf(
-                queryset,
-                request.user,
-                date_start_obj,
-                date_end_obj
-            )
-            
-            # Créer la réponse HTTP
-            response = HttpResponse(
-                pdf_buffer.getvalue(),
-                content_type='application/pdf'
-            )
-            
-            filename = f"rapport-clients-{datetime.now().strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(response.content)
-            
-            return response
-            
-        except ImportError as e:
-            print(f"ImportError génération PDF clients: {e}")
-            traceback.print_exc()
-            return Response(
-                {'error': 'Service de génération PDF non disponible', 'details': str(e)},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            # Génération en arrière-plan, sans limite de lignes
+            return start_bulk_pdf_report(
+                self, 'clients', filters, date_start_obj, date_end_obj,
+                empty_message='Aucun client trouvé avec les filtres spécifiés',
             )
+
         except Exception as e:
-            print(f"Erreur génération PDF clients: {e}")
+            print(f"Erreur planification rapport PDF clients: {e}")
             traceback.print_exc()
             return Response(
                 {'error': f'Erreur lors de la génération du rapport: {str(e)}', 'traceback': traceback.format_exc()},
@@ -1139,12 +1048,13 @@ class ClientViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
             )
 
 
-class PurchaseOrderViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
+class PurchaseOrderViewSet(StreamingExportMixin, OrganizationFilterMixin, viewsets.ModelViewSet):
     """ViewSet pour les bons de commande"""
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
     permission_classes = [permissions.IsAuthenticated, HasModuleAccess]
     required_module = Modules.PURCHASE_ORDERS
+    export_entity = 'purchase_orders'
     organization_field = 'created_by__organization'  # Filter via user's org
     filterset_fields = ['status', 'supplier', 'created_by']
     search_fields = ['po_number', 'title', 'description']
@@ -1173,8 +1083,10 @@ class PurchaseOrderViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
         serializer = PurchaseOrderItemSerializer(data=request.data)
         
         if serializer.is_valid():
-            serializer.save(purchase_order=purchase_order)
-            purchase_order.recalculate_totals()
+            # Un seul recalcul des totaux (save de la ligne + appel explicite)
+            with deferred_totals():
+                serializer.save(purchase_order=purchase_order)
+                purchase_order.recalculate_totals()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -1339,108 +1251,105 @@ class PurchaseOrderViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def _bulk_report_filters(self, request):
+        """Filtres des exports groupés (po_ids, dates, statut, fournisseur) : lookups ORM et dates"""
+        from datetime import datetime
+
+        # Récupérer les paramètres de filtrage
+        po_ids = request.data.get('po_ids', [])
+        date_start = request.data.get('date_start')
+        date_end = request.data.get('date_end')
+        status_filter = request.data.get('status')
+        supplier_id = request.data.get('supplier_id')
+
+        # Construire les filtres (rejoués par le worker)
+        filters = {}
+
+        # Filtrer par IDs si fournis
+        if po_ids and len(po_ids) > 0:
+            filters['id__in'] = po_ids
+
+        # Filtrer par dates
+        date_start_obj = None
+        date_end_obj = None
+        if date_start:
+            try:
+                if isinstance(date_start, str):
+                    date_start = date_start.replace('Z', '+00:00') if 'Z' in date_start else date_start
+                    date_start_obj = datetime.fromisoformat(date_start.replace('Z', ''))
+                else:
+                    date_start_obj = date_start
+                filters['created_at__gte'] = date_start_obj
+            except Exception as e:
+                print(f"Erreur parsing date_start: {e}")
+
+        if date_end:
+            try:
+                if isinstance(date_end, str):
+                    date_end = date_end.replace('Z', '+00:00') if 'Z' in date_end else date_end
+                    date_end_obj = datetime.fromisoformat(date_end.replace('Z', ''))
+                else:
+                    date_end_obj = date_end
+                filters['created_at__lte'] = date_end_obj
+            except Exception as e:
+                print(f"Erreur parsing date_end: {e}")
+
+        # Filtrer par statut
+        if status_filter:
+            filters['status'] = status_filter
+
+        # Filtrer par fournisseur
+        if supplier_id:
+            filters['supplier_id'] = supplier_id
+
+        return filters, date_start_obj, date_end_obj
+
     @action(detail=False, methods=['post'], url_path='bulk-pdf-report')
     def generate_bulk_pdf_report(self, request):
-        """Générer un rapport PDF pour plusieurs bons de commande (avec filtres)"""
-        from django.http import HttpResponse
-        from datetime import datetime
+        """Planifier un rapport PDF pour plusieurs bons de commande (avec filtres, en arrière-plan)"""
         import traceback
-        
+
         try:
-            # Récupérer les paramètres de filtrage
-            po_ids = request.data.get('po_ids', [])
-            date_start = request.data.get('date_start')
-            date_end = request.data.get('date_end')
-            status_filter = request.data.get('status')
-            supplier_id = request.data.get('supplier_id')
-            
-            # Construire le queryset
-            queryset = self.get_queryset()
-            
-            # Filtrer par IDs si fournis
-            if po_ids and len(po_ids) > 0:
-                queryset = queryset.filter(id__in=po_ids)
-            
-            # Filtrer par dates
-            date_start_obj = None
-            date_end_obj = None
-            if date_start:
-                try:
-                    if isinstance(date_start, str):
-                        date_start = date_start.replace('Z', '+00:00') if 'Z' in date_start else date_start
-                        date_start_obj = datetime.fromisoformat(date_start.replace('Z', ''))
-                    else:
-                        date_start_obj = date_start
-                    queryset = queryset.filter(created_at__gte=date_start_obj)
-                except Exception as e:
-                    print(f"Erreur parsing date_start: {e}")
-            
-            if date_end:
-                try:
-                    if isinstance(date_end, str):
-                        date_end = date_end.replace('Z', '+00:00') if 'Z' in date_end else date_end
-                        date_end_obj = datetime.fromisoformat(date_end.replace('Z', ''))
-                    else:
-                        date_end_obj = date_end
-                    queryset = queryset.filter(created_at__lte=date_end_obj)
-                except Exception as e:
-                    print(f"Erreur parsing date_end: {e}")
-            
-            # Filtrer par statut
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
-            
-            # Filtrer par fournisseur
-            if supplier_id:
-                queryset = queryset.filter(supplier_id=supplier_id)
-            
-            # Vérifier qu'il y a des bons de commande
-            count = queryset.count()
-            if count == 0:
-                return Response(
-                    {'error': 'Aucun bon de commande trouvé avec les filtres spécifiés'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Limiter le nombre de bons (sécurité)
-            queryset = queryset[:500]
-            
-            # Générer le PDF
-            from .services.report_generator_weasy import generate_purchase_orders_report_pdf
-            pdf_buffer = generate_purchase_orders_report_pdf(
-                queryset,
-                request.user,
-                date_start_obj,
-                date_end_obj
-            )
-            
-            # Créer la réponse HTTP
-            response = HttpResponse(
-                pdf_buffer.getvalue(),
-                content_type='application/pdf'
-            )
-            
-            filename = f"rapport-bons-commande-{datetime.now().strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(response.content)
-            
-            return response
-            
-        except ImportError as e:
-            print(f"ImportError génération PDF bons de commande: {e}")
-            traceback.print_exc()
-            return Response(
-                {'error': 'Service de génération PDF non disponible', 'details': str(e)},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            filters, date_start_obj, date_end_obj = self._bulk_report_filters(request)
+
+            # Génération en arrière-plan, sans limite de lignes
+            return start_bulk_pdf_report(
+                self, 'purchase_orders', filters, date_start_obj, date_end_obj,
+                empty_message='Aucun bon de commande trouvé avec les filtres spécifiés',
             )
+
         except Exception as e:
-            print(f"Erreur génération PDF bons de commande: {e}")
+            print(f"Erreur planification rapport PDF bons de commande: {e}")
             traceback.print_exc()
             return Response(
                 {'error': f'Erreur lors de la génération du rapport: {str(e)}', 'traceback': traceback.format_exc()},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk-pdf-archive')
+    def generate_bulk_pdf_archive(self, request):
+        """Planifier une archive ZIP d'un PDF par document (mêmes filtres, en arrière-plan)"""
+        try:
+            filters, date_start_obj, date_end_obj = self._bulk_report_filters(request)
+
+            return start_bulk_pdf_report(
+                self, 'purchase_orders', filters, date_start_obj, date_end_obj,
+                empty_message='Aucun bon de commande trouvé avec les filtres spécifiés',
+                archive_options={
+                    'template_type': request.data.get('template_type'),
+                    'language': request.data.get('language', 'fr'),
+                },
+            )
+
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            logger.exception("Erreur planification archive PDF bons de commande")
+            return Response(
+                {'error': "Erreur lors de la génération de l'archive"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 
 class PaymentViewSet(viewsets.ModelViewSet):
     """ViewSet pour les paiements — filtrés par facture via ?invoice=<id>"""
@@ -1463,12 +1372,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
         serializer.save(created_by=self.request.user)
 
 
-class InvoiceViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
+class InvoiceViewSet(StreamingExportMixin, OrganizationFilterMixin, viewsets.ModelViewSet):
     """ViewSet pour les factures"""
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated, HasModuleAccess]
     required_module = Modules.INVOICES
+    export_entity = 'invoices'
     organization_field = 'created_by__organization'  # Filter via user's org
     filterset_fields = ['status', 'client', 'created_by']
     search_fields = ['invoice_number', 'title', 'description']
@@ -1511,8 +1421,10 @@ class InvoiceViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
         
         serializer = InvoiceItemSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(invoice=invoice)
-            invoice.recalculate_totals()
+            # Un seul recalcul des totaux (save de la ligne + signal + appel explicite)
+            with deferred_totals():
+                serializer.save(invoice=invoice)
+                invoice.recalculate_totals()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -1716,147 +1628,137 @@ class InvoiceViewSet(OrganizationFilterMixin, viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['post'], url_path='bulk-pdf-report')
-    def generate_bulk_pdf_report(self, request):
-        """Générer un rapport PDF pour plusieurs factures (avec filtres)"""
-        from django.http import HttpResponse
+    def _bulk_report_filters(self, request):
+        """Filtres des exports groupés (invoice_ids, dates, statut, client) : lookups ORM et dates"""
         from datetime import datetime
-        import traceback
-        
-        try:
-            # Récupérer les paramètres de filtrage
-            invoice_ids = request.data.get('invoice_ids', [])
-            date_start = request.data.get('date_start')
-            date_end = request.data.get('date_end')
-            status_filter = request.data.get('status')
-            client_id = request.data.get('client_id')
-            
-            # Construire le queryset
-            queryset = self.get_queryset()
-            
-            # Filtrer par IDs si fournis
-            if invoice_ids:
-                queryset = queryset.filter(id__in=invoice_ids)
-            
-            # Filtrer par dates
-            date_start_obj = None
-            date_end_obj = None
-            if date_start:
-                try:
-                    # Gérer différents formats de date
-                    # Les dates viennent du frontend au format YYYY-MM-DD (input type="date")
-                    if isinstance(date_start, str):
-                        from datetime import date as date_class
-                        # Si c'est juste une date (YYYY-MM-DD), utiliser date.fromisoformat
-                        if 'T' not in date_start and ' ' not in date_start:
-                            date_start_obj = date_class.fromisoformat(date_start)
-                        else:
-                            # Si c'est un datetime, extraire juste la date
-                            date_start_str = date_start.split('T')[0].split(' ')[0]
-                            date_start_obj = date_class.fromisoformat(date_start_str)
-                    elif isinstance(date_start, datetime):
-                        date_start_obj = date_start.date()
-                    elif hasattr(date_start, 'date'):
-                        date_start_obj = date_start.date()
-                    else:
-                        date_start_obj = date_start
-                    
-                    if date_start_obj:
-                        # Utiliser created_at au lieu de issue_date (qui n'existe pas)
-                        queryset = queryset.filter(created_at__date__gte=date_start_obj)
-                except Exception as e:
-                    print(f"Erreur parsing date_start '{date_start}': {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            if date_end:
-                try:
-                    if isinstance(date_end, str):
-                        from datetime import date as date_class
-                        # Si c'est juste une date (YYYY-MM-DD), utiliser date.fromisoformat
-                        if 'T' not in date_end and ' ' not in date_end:
-                            date_end_obj = date_class.fromisoformat(date_end)
-                        else:
-                            # Si c'est un datetime, extraire juste la date
-                            date_end_str = date_end.split('T')[0].split(' ')[0]
-                            date_end_obj = date_class.fromisoformat(date_end_str)
-                    elif isinstance(date_end, datetime):
-                        date_end_obj = date_end.date()
-                    elif hasattr(date_end, 'date'):
-                        date_end_obj = date_end.date()
+
+        # Récupérer les paramètres de filtrage
+        invoice_ids = request.data.get('invoice_ids', [])
+        date_start = request.data.get('date_start')
+        date_end = request.data.get('date_end')
+        status_filter = request.data.get('status')
+        client_id = request.data.get('client_id')
+
+        # Construire les filtres (rejoués par le worker)
+        filters = {}
+
+        # Filtrer par IDs si fournis
+        if invoice_ids:
+            filters['id__in'] = invoice_ids
+
+        # Filtrer par dates
+        date_start_obj = None
+        date_end_obj = None
+        if date_start:
+            try:
+                # Gérer différents formats de date
+                # Les dates viennent du frontend au format YYYY-MM-DD (input type="date")
+                if isinstance(date_start, str):
+                    from datetime import date as date_class
+                    # Si c'est juste une date (YYYY-MM-DD), utiliser date.fromisoformat
+                    if 'T' not in date_start and ' ' not in date_start:
+                        date_start_obj = date_class.fromisoformat(date_start)
                     else:
-                        date_end_obj = date_end
-                    
-                    if date_end_obj:
-                        # Utiliser created_at au lieu de issue_date (qui n'existe pas)
-                        queryset = queryset.filter(created_at__date__lte=date_end_obj)
-                except Exception as e:
-                    print(f"Erreur parsing date_end '{date_end}': {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # Filtrer par statut
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
-            
-            # Filtrer par client
-            if client_id:
-                queryset = queryset.filter(client_id=client_id)
-            
-            # Précharger les relations pour éviter les problèmes de lazy loading
-            # IMPORTANT: select_related doit être appelé AVANT la limitation [:500]
+                        # Si c'est un datetime, extraire juste la date
+                        date_start_str = date_start.split('T')[0].split(' ')[0]
+                        date_start_obj = date_class.fromisoformat(date_start_str)
+                elif isinstance(date_start, datetime):
+                    date_start_obj = date_start.date()
+                elif hasattr(date_start, 'date'):
+                    date_start_obj = date_start.date()
+                else:
+                    date_start_obj = date_start
+
+                if date_start_obj:
+                    # Utiliser created_at au lieu de issue_date (qui n'existe pas)
+                    filters['created_at__date__gte'] = date_start_obj
+            except Exception as e:
+                print(f"Erreur parsing date_start '{date_start}': {e}")
+                import traceback
+                traceback.print_exc()
+
+        if date_end:
             try:
-                queryset = queryset.select_related('client', 'created_by')
+                if isinstance(date_end, str):
+                    from datetime import date as date_class
+                    # Si c'est juste une date (YYYY-MM-DD), utiliser date.fromisoformat
+                    if 'T' not in date_end and ' ' not in date_end:
+                        date_end_obj = date_class.fromisoformat(date_end)
+                    else:
+                        # Si c'est un datetime, extraire juste la date
+                        date_end_str = date_end.split('T')[0].split(' ')[0]
+                        date_end_obj = date_class.fromisoformat(date_end_str)
+                elif isinstance(date_end, datetime):
+                    date_end_obj = date_end.date()
+                elif hasattr(date_end, 'date'):
+                    date_end_obj = date_end.date()
+                else:
+                    date_end_obj = date_end
+
+                if date_end_obj:
+                    # Utiliser created_at au lieu de issue_date (qui n'existe pas)
+                    filters['created_at__date__lte'] = date_end_obj
             except Exception as e:
-                print(f"Erreur select_related: {e}")
-            
-            # Vérifier qu'il y a des factures
-            count = queryset.count()
-            if count == 0:
-                return Response(
-                    {'error': 'Aucune facture trouvée avec les filtres spécifiés'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Limiter le nombre de factures (sécurité) - après select_related
-            queryset = queryset[:500]
-            
-            # Générer le PDF
-            from .services.report_generator_weasy import generate_invoices_report_pdf
-            pdf_buffer = generate_invoices_report_pdf(
-                queryset, 
-                request.user,
-                date_start_obj,
-                date_end_obj
-            )
-            
-            # Créer la réponse HTTP
-            response = HttpResponse(
-                pdf_buffer.getvalue(),
-                content_type='application/pdf'
-            )
-            
-            filename = f"rapport-factures-{datetime.now().strftime('%Y%m%d')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(response.content)
-            
-            return response
-            
-        except ImportError as e:
-            print(f"ImportError génération PDF factures: {e}")
-            traceback.print_exc()
-            return Response(
-                {'error': 'Service de génération PDF non disponible', 'details': str(e)},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+                print(f"Erreur parsing date_end '{date_end}': {e}")
+                import traceback
+                traceback.print_exc()
+
+        # Filtrer par statut
+        if status_filter:
+            filters['status'] = status_filter
+
+        # Filtrer par client
+        if client_id:
+            filters['client_id'] = client_id
+
+        return filters, date_start_obj, date_end_obj
+
+    @action(detail=False, methods=['post'], url_path='bulk-pdf-report')
+    def generate_bulk_pdf_report(self, request):
+        """Planifier un rapport PDF pour plusieurs factures (avec filtres, en arrière-plan)"""
+        import traceback
+
+        try:
+            filters, date_start_obj, date_end_obj = self._bulk_report_filters(request)
+
+            # Génération en arrière-plan, sans limite de lignes
+            return start_bulk_pdf_report(
+                self, 'invoices', filters, date_start_obj, date_end_obj,
+                empty_message='Aucune facture trouvée avec les filtres spécifiés',
             )
+
         except Exception as e:
-            print(f"Erreur génération PDF factures: {e}")
+            print(f"Erreur planification rapport PDF factures: {e}")
             traceback.print_exc()
             return Response(
                 {'error': f'Erreur lors de la génération du rapport: {str(e)}', 'traceback': traceback.format_exc()},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk-pdf-archive')
+    def generate_bulk_pdf_archive(self, request):
+        """Planifier une archive ZIP d'un PDF par document (mêmes filtres, en arrière-plan)"""
+        try:
+            filters, date_start_obj, date_end_obj = self._bulk_report_filters(request)
+
+            return start_bulk_pdf_report(
+                self, 'invoices', filters, date_start_obj, date_end_obj,
+                empty_message='Aucune facture trouvée avec les filtres spécifiés',
+                archive_options={
+                    'template_type': request.data.get('template_type'),
+                    'language': request.data.get('language', 'fr'),
+                },
+            )
+
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            logger.exception("Erreur planification archive PDF factures")
+            return Response(
+                {'error': "Erreur lors de la génération de l'archive"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 
 class DashboardStatsView(APIView):
     """Vue pour les statistiques du tableau de bord"""
@@ -127,17 +127,9 @@ class ContractAIService:
     """Service pour l'extraction, l'analyse et la génération de contrats avec Mistral AI"""
 
     def __init__(self):
-        # Support mistralai v2.0+, v1.0+ and older versions
-        try:
-            from mistralai.client import Mistral
-            self.client = Mistral(api_key=settings.MISTRAL_API_KEY)
-        except ImportError:
-            try:
-                from mistralai import Mistral
-                self.client = Mistral(api_key=settings.MISTRAL_API_KEY)
-            except ImportError:
-                from mistralai.client import MistralClient
-                self.client = MistralClient(api_key=settings.MISTRAL_API_KEY)
+        # Client partagé du processus (pool HTTP keep-alive, toutes versions du SDK)
+        from apps.ai_assistant.services.llm.client_manager import get_client_manager
+        self.client = get_client_manager().client(settings.MISTRAL_API_KEY)
         self.model = settings.MISTRAL_MODEL
 
     # ===================================================================
@@ -204,15 +196,17 @@ class ContractAIService:
                     "Numérote les sous-clauses si pertinent."
                 )
 
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.35,
-                max_tokens=max_tokens
-            )
+            from apps.ai_assistant.services.llm.client_manager import get_client_manager
+            with get_client_manager().guarded(self.model):
+                response = self.client.chat.complete(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.35,
+                    max_tokens=max_tokens
+                )
 
             content = response.choices[0].message.content.strip()
             # Nettoyer les balises code si présentes
@@ -366,15 +360,17 @@ class ContractAIService:
         try:
             prompt = self._build_extraction_prompt(contract_text, language)
 
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_extraction_system_prompt(language)},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=4000
-            )
+            from apps.ai_assistant.services.llm.client_manager import get_client_manager
+            with get_client_manager().guarded(self.model):
+                response = self.client.chat.complete(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": self._get_extraction_system_prompt(language)},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=4000
+                )
 
             content = response.choices[0].message.content
             return self._parse_json_response(content)
@@ -415,15 +411,17 @@ Respond in JSON:
     "red_flags": ["Red flag 1"]
 }}"""
 
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_extraction_system_prompt(language)},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
+            from apps.ai_assistant.services.llm.client_manager import get_client_manager
+            with get_client_manager().guarded(self.model):
+                response = self.client.chat.complete(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": self._get_extraction_system_prompt(language)},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=1000
+                )
 
             content = response.choices[0].message.content.strip()
             content = self._clean_html_response(content)
@@ -461,15 +459,17 @@ IMPORTANT: Formatte en HTML Sémantique valide (<h1>, <h2>, <strong>, <ul>, <p>,
 Inclus un espace pour les signatures à la fin.
 Ne renvoie QUE le code HTML, sans balises ``` et sans commentaire."""
 
-            response = self.client.chat.complete(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.4,
-                max_tokens=4000
-            )
+            from apps.ai_assistant.services.llm.client_manager import get_client_manager
+            with get_client_manager().guarded(self.model):
+                response = self.client.chat.complete(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.4,
+                    max_tokens=4000
+                )
 
             generated_content = response.choices[0].message.content.strip()
             generated_content = self._clean_html_response(generated_content)
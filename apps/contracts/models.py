@@ -127,24 +127,17 @@ class Contract(models.Model):
     def generate_contract_number(self):
         """Génère un numéro de contrat unique au format CTR202501-0001"""
         from django.utils import timezone
+        from apps.core.sequences import last_number_with_prefix, next_number
+
         now = timezone.localtime(timezone.now())
-        year = now.year
-        month = now.month
-
-        last_contract = Contract.objects.filter(
-            contract_number__startswith=f"CTR{year}{month:02d}"
-        ).order_by('-contract_number').first()
-
-        if last_contract:
-            try:
-                last_number = int(last_contract.contract_number.split('-')[1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
+        period = f"{now.year}{now.month:02d}"
+        prefix = f"CTR{period}"
 
-        return f"CTR{year}{month:02d}-{next_number:04d}"
+        number = next_number(
+            'contract', period,
+            seed=lambda: last_number_with_prefix(Contract.objects.all(), 'contract_number', prefix)
+        )
+        return f"{prefix}-{number:04d}"
 
     @property
     def days_until_expiry(self):
@@ -109,15 +109,7 @@ def contract_ai_generate(request):
         if not description:
             return JsonResponse({'error': 'Description requise'}, status=400)
 
-        # Support mistralai v2.0+, v1.0+ and older versions
-        try:
-            from mistralai.client import Mistral
-        except ImportError:
-            try:
-                from mistralai import Mistral
-            except ImportError:
-                from mistralai.client import MistralClient as Mistral
-        client = Mistral(api_key=settings.MISTRAL_API_KEY)
+        from apps.ai_assistant.services.llm.client_manager import get_client_manager
         model = getattr(settings, 'MISTRAL_MODEL', 'mistral-small-latest')
 
         system_prompt = """Tu es un assistant juridique expert en rédaction de contrats commerciaux pour entrepreneurs québécois/canadiens.
@@ -137,7 +129,8 @@ Réponds TOUJOURS en JSON valide avec exactement ces clés:
   "risks": ["Risque potentiel 1"]
 }"""
 
-        response = client.chat.complete(
+        response = get_client_manager().complete(
+            api_key=settings.MISTRAL_API_KEY,
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
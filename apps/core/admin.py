@@ -1,8 +1,20 @@
 from django.contrib import admin
-from .models import Core
+from .models import Core, DocumentSequence
 
 
 @admin.register(Core)
 class CoreAdmin(admin.ModelAdmin):
     """Administration du core"""
     pass
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    """Séquences de numérotation (modifiées uniquement par l'allocateur)."""
+    list_display = ('doc_type', 'period', 'organization', 'last_value', 'updated_at')
+    list_filter = ('doc_type',)
+    search_fields = ('doc_type', 'period', 'organization__name')
+    readonly_fields = [f.name for f in DocumentSequence._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
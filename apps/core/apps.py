@@ -5,4 +5,7 @@ from django.utils.translation import gettext_lazy as _
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
-    verbose_name = _('Core - Tableau de bord')
\ No newline at end of file
+    verbose_name = _('Core - Tableau de bord')
+
+    def ready(self):
+        import apps.core.signals  # noqa
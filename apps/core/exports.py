@@ -0,0 +1,343 @@
+"""
+Exports CSV / XLSX en flux, à mémoire constante.
+
+Les exports construisaient tout le fichier en mémoire (`HttpResponse` rempli
+ligne à ligne, classeur openpyxl complet) en parcourant des instances de
+modèles entières (un `get_status_display()` par ligne) : mémoire et temps
+proportionnels au nombre de lignes, premier octet envoyé à la fin.
+
+Ici :
+  - colonnes définies une fois par entité (`EXPORTS`), partagées par le CSV
+    et le XLSX ;
+  - lignes lues par `values_list(...).iterator(chunk_size=...)` : des tuples,
+    par lots, sans instances ni cache du queryset ; libellés des choix
+    résolus une fois par export ;
+  - CSV : `StreamingHttpResponse`, l'en-tête part immédiatement, puis un bloc
+    toutes les `CSV_ROWS_PER_CHUNK` lignes ; sous ASGI, un itérateur
+    asynchrone (un itérateur synchrone y serait consommé en entier avant
+    l'envoi) ;
+  - XLSX : classeur openpyxl `write_only` (lignes écrites sur disque au fil de
+    l'eau), enregistré dans un fichier temporaire servi par `FileResponse`.
+
+Usage dans un ViewSet :
+
+    class SupplierViewSet(StreamingExportMixin, OrganizationFilterMixin, viewsets.ModelViewSet):
+        export_entity = 'suppliers'
+
+expose `GET .../export_csv/` et `GET .../export_xlsx/` (filtres de la liste
+appliqués).
+"""
+import csv
+import datetime
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from django.utils import timezone
+from django.utils.functional import Promise
+from rest_framework.decorators import action
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+CHUNK_SIZE = 2000
+CSV_ROWS_PER_CHUNK = 500
+MAX_COLUMN_WIDTH = 50
+
+
+class ExportColumn(NamedTuple):
+    header: str
+    field: str  # Champ ou lookup `values_list` (ex. 'client__name')
+    format: Optional[Callable[[Any], Any]] = None
+    choices: bool = False  # Exporter le libellé du choix plutôt que la valeur
+    width: Optional[int] = None  # Largeur de colonne XLSX
+
+
+def yes_no(value):
+    return 'Oui' if value else 'Non'
+
+
+def or_empty(value):
+    return value or ''
+
+
+def or_zero(value):
+    return value or 0
+
+
+EXPORTS = {
+    'suppliers': {
+        'filename': 'suppliers',
+        'sheet': 'Fournisseurs',
+        'columns': [
+            ExportColumn('Name', 'name', width=30),
+            ExportColumn('Contact', 'contact_person', width=20),
+            ExportColumn('Email', 'email', width=30),
+            ExportColumn('Phone', 'phone', width=15),
+            ExportColumn('City', 'city', width=20),
+            ExportColumn('Province', 'province', width=10),
+            ExportColumn('Status', 'status', choices=True, width=15),
+            ExportColumn('Rating', 'rating', or_zero, width=8),
+        ],
+    },
+    'products': {
+        'filename': 'products',
+        'sheet': 'Produits',
+        'columns': [
+            ExportColumn('Name', 'name', width=30),
+            ExportColumn('Reference', 'reference', width=15),
+            ExportColumn('Type', 'product_type', choices=True, width=15),
+            ExportColumn('Price', 'price', or_empty, width=12),
+            ExportColumn('Cost Price', 'cost_price', or_empty, width=12),
+            ExportColumn('Stock Quantity', 'stock_quantity', or_zero, width=12),
+            ExportColumn('Description', 'description', width=50),
+            ExportColumn('Active', 'is_active', yes_no, width=8),
+        ],
+    },
+    'clients': {
+        'filename': 'clients',
+        'sheet': 'Clients',
+        'columns': [
+            ExportColumn('Name', 'name', width=30),
+            ExportColumn('Contact Person', 'contact_person', width=20),
+            ExportColumn('Email', 'email', width=30),
+            ExportColumn('Phone', 'phone', width=15),
+            ExportColumn('Address', 'address', width=40),
+            ExportColumn('Payment Terms', 'payment_terms', width=15),
+            ExportColumn('Active', 'is_active', yes_no, width=8),
+        ],
+    },
+    'invoices': {
+        'filename': 'invoices',
+        'sheet': 'Factures',
+        'columns': [
+            ExportColumn('Number', 'invoice_number', width=18),
+            ExportColumn('Title', 'title', width=30),
+            ExportColumn('Client', 'client__name', width=30),
+            ExportColumn('Status', 'status', choices=True, width=15),
+            ExportColumn('Created', 'created_at', width=20),
+            ExportColumn('Due Date', 'due_date', width=12),
+            ExportColumn('Subtotal', 'subtotal', width=12),
+            ExportColumn('Taxes', 'tax_amount', width=12),
+            ExportColumn('Total', 'total_amount', width=12),
+        ],
+    },
+    'purchase_orders': {
+        'filename': 'purchase-orders',
+        'sheet': 'Bons de commande',
+        'columns': [
+            ExportColumn('Number', 'po_number', width=18),
+            ExportColumn('Title', 'title', width=30),
+            ExportColumn('Supplier', 'supplier__name', width=30),
+            ExportColumn('Status', 'status', choices=True, width=15),
+            ExportColumn('Priority', 'priority', choices=True, width=10),
+            ExportColumn('Created', 'created_at', width=20),
+            ExportColumn('Required Date', 'required_date', width=12),
+            ExportColumn('Subtotal', 'subtotal', width=12),
+            ExportColumn('Total', 'total_amount', width=12),
+        ],
+    },
+}
+
+
+def cell_value(value):
+    """Valeur écrivable en CSV comme en XLSX (Excel ignore les fuseaux horaires)."""
+    if value is None:
+        return ''
+    if isinstance(value, Promise):  # Libellés de choix traduits (gettext_lazy)
+        return str(value)
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def _is_asgi(request):
+    from django.core.handlers.asgi import ASGIRequest
+
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+class _Echo:
+    """Pseudo-fichier : `csv.writer` renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+class XLSXWriter:
+    """Classeur openpyxl `write_only` : lignes écrites sur disque au fil de l'eau."""
+
+    def __init__(self):
+        from openpyxl import Workbook
+
+        self.workbook = Workbook(write_only=True)
+
+    def sheet(self, title, widths: Iterable[Optional[int]] = ()):
+        """Nouvelle feuille ; les largeurs doivent être fixées avant la première ligne."""
+        from openpyxl.utils import get_column_letter
+
+        worksheet = self.workbook.create_sheet(title[:31])
+        for index, width in enumerate(widths, start=1):
+            if width:
+                worksheet.column_dimensions[get_column_letter(index)].width = min(width, MAX_COLUMN_WIDTH)
+        return worksheet
+
+    @staticmethod
+    def cell(worksheet, value, **style):
+        """Cellule mise en forme (font, fill, alignment...)."""
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(worksheet, value=cell_value(value))
+        for name, attribute in style.items():
+            setattr(cell, name, attribute)
+        return cell
+
+    @staticmethod
+    def merge(worksheet, cell_range):
+        """Fusionne `cell_range` (ex. 'A1:B1') ; pas de `merge_cells()` en write_only."""
+        worksheet.merged_cells.add(cell_range)
+
+    def header(self, worksheet, headers: Iterable[str]):
+        from openpyxl.styles import Font, PatternFill
+
+        font = Font(bold=True, color="FFFFFF")
+        fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
+        worksheet.append([self.cell(worksheet, header, font=font, fill=fill) for header in headers])
+
+    def save(self, file=None):
+        """Enregistre dans `file` (fichier temporaire par défaut), rembobiné."""
+        if file is None:
+            file = tempfile.TemporaryFile()
+        self.workbook.save(file)
+        file.seek(0)
+        return file
+
+
+def column_widths(rows: Iterable[Iterable[Any]]) -> List[int]:
+    """Largeurs ajustées au contenu (petits tableaux déjà en mémoire)."""
+    widths: List[int] = []
+    for row in rows:
+        for index, value in enumerate(row):
+            length = len(str(value)) if value is not None else 0
+            if index >= len(widths):
+                widths.append(0)
+            widths[index] = max(widths[index], min(length + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+class StreamingExport:
+    """Export d'un queryset selon les colonnes de `EXPORTS[entity]`."""
+
+    def __init__(self, entity, queryset, chunk_size=None):
+        spec = EXPORTS[entity]
+        self.entity = entity
+        self.queryset = queryset
+        self.columns: List[ExportColumn] = spec['columns']
+        self.filename = spec['filename']
+        self.sheet_title = spec['sheet']
+        self.chunk_size = chunk_size or CHUNK_SIZE
+
+    @property
+    def headers(self):
+        return [column.header for column in self.columns]
+
+    def _formatters(self):
+        model = self.queryset.model
+        formatters = []
+        for column in self.columns:
+            labels = dict(model._meta.get_field(column.field).flatchoices) if column.choices else None
+
+            def formatter(value, labels=labels, format=column.format):
+                if labels is not None:
+                    value = labels.get(value, value)
+                if format is not None:
+                    value = format(value)
+                return cell_value(value)
+
+            formatters.append(formatter)
+        return formatters
+
+    def rows(self) -> Iterator[list]:
+        """Lignes formatées, lues par lots sans instancier les modèles."""
+        formatters = self._formatters()
+        # pk en tête : un queryset `distinct()` ne fusionne pas deux lignes identiques
+        values = (
+            self.queryset.prefetch_related(None)
+            .values_list('pk', *[column.field for column in self.columns])
+            .iterator(chunk_size=self.chunk_size)
+        )
+        for row in values:
+            yield [formatter(value) for formatter, value in zip(formatters, row[1:])]
+
+    # -------------------------------------------------------------------- CSV
+    def csv_chunks(self) -> Iterator[str]:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.headers)
+        lines = []
+        for row in self.rows():
+            lines.append(writer.writerow(row))
+            if len(lines) >= CSV_ROWS_PER_CHUNK:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    async def acsv_chunks(self):
+        """`csv_chunks` pour ASGI : chaque bloc lu via sync_to_async, envoyé aussitôt."""
+        from asgiref.sync import sync_to_async
+
+        chunks = self.csv_chunks()
+        # thread_sensitive : le générateur (et son curseur) reste sur un même thread
+        next_chunk = sync_to_async(next)
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def csv_response(self, request=None):
+        from django.http import StreamingHttpResponse
+
+        # Sous ASGI, Django consommerait un itérateur synchrone en entier
+        # (`sync_to_async(list)`) avant d'envoyer le premier octet
+        chunks = self.acsv_chunks() if _is_asgi(request) else self.csv_chunks()
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.csv"'
+        return response
+
+    # ------------------------------------------------------------------- XLSX
+    def write_xlsx(self, file=None):
+        writer = XLSXWriter()
+        worksheet = writer.sheet(self.sheet_title, [column.width for column in self.columns])
+        writer.header(worksheet, self.headers)
+        for row in self.rows():
+            worksheet.append(row)
+        return writer.save(file)
+
+    def xlsx_response(self):
+        from django.http import FileResponse
+
+        # FileResponse ferme (et supprime) le fichier temporaire après l'envoi
+        return FileResponse(
+            self.write_xlsx(),
+            as_attachment=True,
+            filename=f'{self.filename}.xlsx',
+            content_type=XLSX_CONTENT_TYPE,
+        )
+
+
+class StreamingExportMixin:
+    """Actions export_csv / export_xlsx d'un ViewSet (filtres de la liste appliqués)."""
+
+    export_entity: Optional[str] = None
+
+    def get_export(self):
+        return StreamingExport(self.export_entity, self.filter_queryset(self.get_queryset()))
+
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        """Export CSV en flux"""
+        return self.get_export().csv_response(request)
+
+    @action(detail=False, methods=['get'])
+    def export_xlsx(self, request):
+        """Export Excel (fichier temporaire, mémoire constante)"""
+        return self.get_export().xlsx_response()
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-18 01:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_change_payment_terms_default_to_cash'),
+        ('core', '0008_alter_organizationsettings_company_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('doc_type', models.CharField(max_length=50, verbose_name='Type de document')),
+                ('period', models.CharField(blank=True, default='', max_length=20, verbose_name='Période')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Dernier numéro attribué')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='accounts.organization', verbose_name='Organisation')),
+            ],
+            options={
+                'verbose_name': 'Séquence de numérotation',
+                'verbose_name_plural': 'Séquences de numérotation',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='documentsequence',
+            constraint=models.UniqueConstraint(condition=models.Q(('organization__isnull', False)), fields=('organization', 'doc_type', 'period'), name='uniq_document_sequence_org'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentsequence',
+            constraint=models.UniqueConstraint(condition=models.Q(('organization__isnull', True)), fields=('doc_type', 'period'), name='uniq_document_sequence_global'),
+        ),
+    ]
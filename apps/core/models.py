@@ -396,3 +396,49 @@ class OrganizationSettings(models.Model):
 
     def __str__(self):
         return f"Paramètres de {self.organization.name}"
+
+
+class DocumentSequence(models.Model):
+    """
+    Compteur de numérotation des documents (factures, BC, contrats...),
+    par organisation, type de document et période.
+
+    Alloué par `apps.core.sequences.next_number` (incrément atomique de la
+    ligne). `organization` vide = séquence globale, pour les numéros uniques
+    sur toute la plateforme.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='document_sequences',
+        verbose_name=_("Organisation")
+    )
+    doc_type = models.CharField(max_length=50, verbose_name=_("Type de document"))
+    period = models.CharField(max_length=20, blank=True, default='', verbose_name=_("Période"))
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name=_("Dernier numéro attribué"))
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Séquence de numérotation")
+        verbose_name_plural = _("Séquences de numérotation")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'doc_type', 'period'],
+                condition=models.Q(organization__isnull=False),
+                name='uniq_document_sequence_org',
+            ),
+            models.UniqueConstraint(
+                fields=['doc_type', 'period'],
+                condition=models.Q(organization__isnull=True),
+                name='uniq_document_sequence_global',
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.organization.name if self.organization_id else _("Global")
+        return f"{self.doc_type} {self.period} ({scope}) : {self.last_value}"
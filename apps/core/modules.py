@@ -394,23 +394,37 @@ def validate_module_dependencies(enabled_modules):
     return len(missing) == 0, missing
 
 
-def get_user_accessible_modules(user):
+# Cache des modules accessibles, porté par l'instance utilisateur (donc de
+# la durée d'une requête : request.user est rechargé à chaque requête).
+# Chaque entrée est marquée d'une génération incrémentée par
+# `invalidate_module_access_cache()` (signaux UserPermissions / Organization),
+# ce qui rend caduques les ensembles déjà résolus dans le processus.
+_MODULE_ACCESS_ATTR = '_accessible_modules_cache'
+_module_access_generation = 0
+
+
+def invalidate_module_access_cache(user=None):
+    """Invalide les ensembles de modules déjà résolus (tous, et ceux de `user`)."""
+    global _module_access_generation
+    _module_access_generation += 1
+    if user is not None:
+        user.__dict__.pop(_MODULE_ACCESS_ATTR, None)
+
+
+def _resolve_user_modules(user):
     """
     Get modules accessible to a user based on:
     1. Organization's enabled modules
     2. User's individual module access (from permissions)
     3. User's role
     """
-    if not user or not user.is_authenticated:
-        return []
-    
     # Superusers get everything
     if user.is_superuser:
         return get_all_controllable_modules() + ADMIN_MODULES
     
     # Start with organization's modules
     if user.organization:
-        org_modules = user.organization.enabled_modules or []
+        org_modules = list(user.organization.enabled_modules or [])
     else:
         org_modules = [Modules.DASHBOARD]
     
@@ -438,12 +452,33 @@ def get_user_accessible_modules(user):
     if Modules.DASHBOARD not in accessible:
         accessible.append(Modules.DASHBOARD)
     
-    return list(set(accessible))
+    return accessible
 
 
-def user_has_module_access(user, module_code):
-    """Check if user has access to a specific module"""
-    accessible_modules = get_user_accessible_modules(user)
-    return module_code in accessible_modules
+def get_user_module_set(user):
+    """
+    Ensemble (frozenset) des modules accessibles, résolu une seule fois par
+    instance utilisateur et réutilisé par les serializers, les permissions
+    et le dashboard.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    cached = user.__dict__.get(_MODULE_ACCESS_ATTR)
+    if cached is not None and cached[0] == _module_access_generation:
+        return cached[1]
 
+    generation = _module_access_generation
+    modules = frozenset(_resolve_user_modules(user))
+    user.__dict__[_MODULE_ACCESS_ATTR] = (generation, modules)
+    return modules
 
+
+def get_user_accessible_modules(user):
+    """Liste des modules accessibles à l'utilisateur (voir get_user_module_set)"""
+    return list(get_user_module_set(user))
+
+
+def user_has_module_access(user, module_code):
+    """Check if user has access to a specific module"""
+    return module_code in get_user_module_set(user)
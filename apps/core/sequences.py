@@ -0,0 +1,117 @@
+"""
+Allocation des numéros de documents (table `DocumentSequence`).
+
+L'ancienne méthode (« plus grand numéro avec ce préfixe + 1 ») faisait un
+LIKE + tri à chaque création et produisait des doublons sous créations
+concurrentes. Ici chaque série (organisation, type, période) possède une
+ligne compteur incrémentée par un UPDATE ... SET last_value = last_value + n :
+la ligne est verrouillée jusqu'à la fin de la transaction, deux allocations
+ne peuvent donc pas obtenir le même numéro.
+
+- `next_number` : un numéro (ou le premier d'un bloc de `count` numéros).
+- `reserve_numbers` / `NumberPool` : réservation par blocs pour les imports.
+- `last_number_with_prefix` : reprise des numéros existants à la création
+  d'une série (compatibilité avec les documents numérotés avant la table).
+"""
+from collections import deque
+from typing import Callable, Iterable, Optional
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+_TRAILING_DIGITS = re.compile(r'(\d+)$')
+
+
+def next_number(doc_type: str, period: str = '', organization=None, count: int = 1,
+                seed: Optional[Callable[[], int]] = None) -> int:
+    """
+    Alloue `count` numéros consécutifs et retourne le premier.
+
+    Args:
+        doc_type: type de document ('invoice', 'purchase_order'...)
+        period: période de la série ('202501', '2025'...), vide si aucune
+        organization: organisation, ou None pour une série globale
+        count: taille du bloc réservé
+        seed: appelé une seule fois, à la création de la série, pour obtenir
+            le dernier numéro déjà utilisé (0 par défaut)
+    """
+    from .models import DocumentSequence
+
+    if count < 1:
+        raise ValueError("count doit être supérieur ou égal à 1")
+
+    rows = DocumentSequence.objects.filter(
+        organization=organization, doc_type=doc_type, period=period
+    )
+    with transaction.atomic():
+        if not _increment(rows, count):
+            _create_sequence(organization, doc_type, period, seed)
+            _increment(rows, count)
+        last_value = rows.values_list('last_value', flat=True).get()
+    return last_value - count + 1
+
+
+def reserve_numbers(doc_type: str, period: str = '', organization=None, count: int = 1,
+                    seed: Optional[Callable[[], int]] = None) -> range:
+    """Réserve un bloc de numéros consécutifs (imports en masse)."""
+    first = next_number(doc_type, period, organization=organization, count=count, seed=seed)
+    return range(first, first + count)
+
+
+def _increment(rows, count: int) -> int:
+    return rows.update(last_value=F('last_value') + count, updated_at=timezone.now())
+
+
+def _create_sequence(organization, doc_type: str, period: str, seed) -> None:
+    from .models import DocumentSequence
+
+    start = seed() if seed else 0
+    try:
+        with transaction.atomic():
+            DocumentSequence.objects.create(
+                organization=organization,
+                doc_type=doc_type,
+                period=period,
+                last_value=start,
+            )
+    except IntegrityError:
+        # Série créée en parallèle : l'incrément qui suit s'appliquera dessus
+        pass
+
+
+def last_number_with_prefix(queryset, field: str, prefix: str) -> int:
+    """
+    Plus grand numéro déjà attribué pour un préfixe (numéro = chiffres
+    finaux après le préfixe, séparateur éventuel ignoré). Utilisé une seule
+    fois par série, pour démarrer après les documents existants.
+    """
+    last = 0
+    for value in queryset.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True):
+        match = _TRAILING_DIGITS.search(value[len(prefix):])
+        if match:
+            last = max(last, int(match.group(1)))
+    return last
+
+
+class NumberPool:
+    """
+    Distribue des numéros réservés par blocs : une allocation en base par
+    bloc au lieu d'une par document. Les numéros non consommés à la fin
+    sont perdus (trous dans la numérotation).
+
+    Usage:
+        pool = NumberPool(lambda count: Invoice.reserve_invoice_numbers(count))
+        invoice.invoice_number = pool.next()
+    """
+
+    def __init__(self, reserve: Callable[[int], Iterable[str]], block_size: int = 50):
+        self.reserve = reserve
+        self.block_size = block_size
+        self._numbers = deque()
+
+    def next(self) -> str:
+        if not self._numbers:
+            self._numbers.extend(self.reserve(self.block_size))
+        return self._numbers.popleft()
@@ -3,7 +3,7 @@ Serializer mixins for module-aware field filtering
 """
 
 from rest_framework import serializers
-from apps.core.modules import user_has_module_access
+from apps.core.modules import get_user_module_set
 
 
 class ModuleAwareSerializerMixin:
@@ -36,10 +36,14 @@ class ModuleAwareSerializerMixin:
         if not user or not user.is_authenticated:
             return
         
-        # Remove fields for disabled modules
+        # Remove fields for disabled modules (ensemble résolu une fois par
+        # requête, partagé par les serializers imbriqués et many=True)
+        if not self.module_dependent_fields:
+            return
+        accessible = get_user_module_set(user)
         fields_to_remove = []
         for module, field_names in self.module_dependent_fields.items():
-            if not user_has_module_access(user, module):
+            if module not in accessible:
                 fields_to_remove.extend(field_names)
         
         # Remove the fields from the serializer
@@ -61,9 +65,10 @@ def get_module_dependent_fields(user, module_field_map):
     if not user or not user.is_authenticated:
         return []
     
+    accessible = get_user_module_set(user)
     fields_to_exclude = []
     for module, fields in module_field_map.items():
-        if not user_has_module_access(user, module):
+        if module not in accessible:
             fields_to_exclude.extend(fields)
     
     return fields_to_exclude
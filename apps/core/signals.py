@@ -0,0 +1,37 @@
+"""
+Signaux du core : invalidation du contexte de rendu PDF partagé
+(apps/api/services/render_context.py) quand la marque d'une organisation change.
+
+Les entrées du processus courant sont libérées après commit ; les autres
+workers voient le changement par la version lue en base à chaque accès.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import Organization
+from apps.api.services.render_context import get_render_context
+from apps.invoicing.models import PrintTemplate
+
+from .models import OrganizationSettings
+
+
+def _invalidate_after_commit(organization_id):
+    transaction.on_commit(partial(get_render_context().invalidate_organization, organization_id))
+
+
+@receiver([post_save, post_delete], sender=OrganizationSettings)
+@receiver([post_save, post_delete], sender=PrintTemplate)
+def invalidate_branding(sender, instance, **kwargs):
+    """Paramètres, logo ou template d'impression modifiés"""
+    if instance.organization_id:
+        _invalidate_after_commit(instance.organization_id)
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_organization(sender, instance, created, **kwargs):
+    """Nom de l'organisation (repli des rapports) modifié"""
+    if not created:
+        _invalidate_after_commit(instance.pk)
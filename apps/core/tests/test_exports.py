@@ -0,0 +1,122 @@
+"""
+Tests des exports CSV / XLSX en flux (apps/core/exports.py) :
+- CSV en StreamingHttpResponse, colonnes et libellés inchangés ; itérateur asynchrone sous ASGI
+- lignes lues en tuples (values_list), limitées à l'organisation et aux filtres de la liste
+- XLSX write_only lisible par openpyxl
+"""
+import io
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Organization, User
+from apps.core.exports import StreamingExport
+from apps.suppliers.models import Supplier
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Export Org", enabled_modules=['suppliers', 'clients'])
+
+
+@pytest.fixture
+def api_client(organization):
+    user = User.objects.create_user(
+        username="export_user", email="export@example.com", password="testpass123", organization=organization,
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def suppliers(organization):
+    other_org = Organization.objects.create(name="Autre Org")
+    Supplier.objects.create(name="Fournisseur externe", email="ext@example.com", organization=other_org)
+    return [
+        Supplier.objects.create(
+            name=f"Fournisseur {index}",
+            email=f"f{index}@example.com",
+            city="Montréal",
+            status='active' if index % 2 else 'pending',
+            rating=4.5 if index else 0,
+            organization=organization,
+        )
+        for index in range(3)
+    ]
+
+
+def _csv(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestCSVExport:
+
+    def test_streams_rows(self, api_client, suppliers):
+        response = api_client.get('/api/v1/suppliers/export_csv/')
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Disposition'] == 'attachment; filename="suppliers.csv"'
+        lines = _csv(response).splitlines()
+        assert lines[0] == 'Name,Contact,Email,Phone,City,Province,Status,Rating'
+        assert len(lines) == 4
+        status_label = dict(Supplier.STATUS_CHOICES)['pending']
+        assert f'Fournisseur 0,,f0@example.com,,Montréal,,{status_label},0' in lines
+        assert not any('Fournisseur externe' in line for line in lines)
+
+    def test_async_stream_under_asgi(self, api_client, suppliers):
+        client = AsyncClient()
+        client.force_login(User.objects.get(username="export_user"))
+
+        async def export():
+            response = await client.get('/api/v1/suppliers/export_csv/')
+            return response, [chunk async for chunk in response.streaming_content]
+
+        response, chunks = async_to_sync(export)()
+
+        assert response.status_code == 200
+        assert response.is_async
+        # En-tête envoyé seul, avant la lecture des lignes
+        assert chunks[0] == b'Name,Contact,Email,Phone,City,Province,Status,Rating\r\n'
+        assert len(b''.join(chunks).decode().splitlines()) == 4
+
+    def test_list_filters_apply(self, api_client, suppliers):
+        response = api_client.get('/api/v1/suppliers/export_csv/', {'status': 'active'})
+
+        assert len(_csv(response).splitlines()) == 2
+
+    def test_reads_tuples_in_chunks(self, suppliers, django_assert_num_queries):
+        export = StreamingExport('suppliers', Supplier.objects.order_by('name'), chunk_size=2)
+
+        with django_assert_num_queries(1):
+            rows = list(export.rows())
+
+        assert [row[0] for row in rows] == ["Fournisseur 0", "Fournisseur 1", "Fournisseur 2", "Fournisseur externe"]
+
+    def test_identical_rows_are_kept(self, organization):
+        for _ in range(2):
+            Supplier.objects.create(name="Doublon", email="d@example.com", organization=organization)
+
+        export = StreamingExport('suppliers', Supplier.objects.filter(name="Doublon").distinct())
+        assert len(list(export.rows())) == 2
+
+
+@pytest.mark.django_db
+class TestXLSXExport:
+
+    def test_workbook(self, api_client, suppliers):
+        from openpyxl import load_workbook
+
+        response = api_client.get('/api/v1/suppliers/export_xlsx/')
+
+        assert response.status_code == 200
+        assert 'suppliers.xlsx' in response['Content-Disposition']
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook['Fournisseurs'].values)
+        assert rows[0][:2] == ('Name', 'Contact')
+        assert len(rows) == 4
+        assert {row[0] for row in rows[1:]} == {supplier.name for supplier in suppliers}
@@ -0,0 +1,121 @@
+"""
+Tests de la résolution des modules accessibles :
+- un seul calcul par instance utilisateur (donc par requête)
+- invalidation sur UserPermissions et Organization.enabled_modules
+- le serializer ModuleAwareSerializerMixin réutilise l'ensemble résolu
+"""
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import Organization, User, UserPermissions
+from apps.core.modules import (
+    get_user_accessible_modules,
+    get_user_module_set,
+    user_has_module_access,
+)
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(
+        name="Modules Org",
+        enabled_modules=['dashboard', 'invoices', 'products', 'suppliers'],
+    )
+
+
+@pytest.fixture
+def user(organization):
+    created = User.objects.create_user(
+        username="modules_user",
+        email="modules@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+    # Instance fraîche, comme request.user en début de requête
+    return User.objects.get(pk=created.pk)
+
+
+@pytest.mark.django_db
+class TestResolvedModuleSet:
+
+    def test_resolved_once_per_user_instance(self, user):
+        with CaptureQueriesContext(connection) as first:
+            assert user_has_module_access(user, 'invoices')
+        with CaptureQueriesContext(connection) as later:
+            for _ in range(10):
+                user_has_module_access(user, 'suppliers')
+                get_user_accessible_modules(user)
+        assert len(first) > 0
+        assert len(later) == 0
+
+    def test_accessible_modules_unchanged(self, user):
+        assert set(get_user_accessible_modules(user)) == {'dashboard', 'invoices', 'products', 'suppliers'}
+        assert not user_has_module_access(user, 'clients')
+
+    def test_user_permissions_change_invalidates(self, user):
+        assert user_has_module_access(user, 'suppliers')
+
+        permissions = UserPermissions.objects.get(user=user)
+        permissions.module_access = ['invoices']
+        permissions.save()
+        user.permissions.refresh_from_db()
+
+        assert get_user_module_set(user) == {'dashboard', 'invoices'}
+
+    def test_organization_modules_change_invalidates(self, user):
+        assert not user_has_module_access(user, 'clients')
+
+        organization = user.organization
+        organization.enabled_modules = organization.enabled_modules + ['clients']
+        organization.save(update_fields=['enabled_modules'])
+
+        assert user_has_module_access(user, 'clients')
+
+    def test_anonymous_user_has_no_modules(self):
+        from django.contrib.auth.models import AnonymousUser
+        assert get_user_module_set(AnonymousUser()) == frozenset()
+
+
+@pytest.mark.django_db
+class TestModuleAwareSerializer:
+
+    def test_many_serializer_resolves_modules_once(self, user, organization):
+        from apps.api.serializers import ProductSerializer
+        from apps.invoicing.models import Product
+
+        for index in range(5):
+            Product.objects.create(
+                name=f"Produit {index}", organization=organization,
+                product_type='service', price=Decimal('1.00'),
+            )
+        products = list(ProductSerializer.with_statistics(Product.objects.filter(organization=organization)))
+
+        request = APIRequestFactory().get('/')
+        request.user = user
+        get_user_module_set(user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = ProductSerializer(products, many=True, context={'request': request}).data
+        assert len(data) == 5
+        assert 'supplier' in data[0]
+        assert not any('accounts_' in query['sql'] for query in ctx.captured_queries)
+
+    def test_fields_hidden_without_module(self, user, organization):
+        from apps.api.serializers import ProductSerializer
+        from apps.invoicing.models import Product
+
+        organization.enabled_modules = ['dashboard', 'products']
+        organization.save()
+        product = Product.objects.create(
+            name="Sans fournisseur", organization=organization,
+            product_type='service', price=Decimal('1.00'),
+        )
+        request = APIRequestFactory().get('/')
+        request.user = user
+
+        data = ProductSerializer(product, context={'request': request}).data
+        assert 'supplier' not in data
+        assert 'supplier_name' not in data
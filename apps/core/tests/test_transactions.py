@@ -0,0 +1,22 @@
+"""
+Tests des callbacks après commit dédupliqués (apps/core/transactions.py) :
+- une exécution par clé et par transaction
+"""
+import pytest
+
+from apps.core.transactions import on_commit_once
+
+
+@pytest.mark.django_db
+class TestOnCommitOnce:
+
+    def test_one_callback_per_key(self, django_capture_on_commit_callbacks):
+        calls = []
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            assert on_commit_once(('test', 1), calls.append, 'a')
+            assert not on_commit_once(('test', 1), calls.append, 'b')
+            assert on_commit_once(('test', 2), calls.append, 'c')
+
+        assert len(callbacks) == 2
+        assert calls == ['a', 'c']
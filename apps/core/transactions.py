@@ -0,0 +1,37 @@
+"""
+Callbacks après commit dédupliqués.
+
+Les signaux programment des recalculs (rollup journalier, soldes mensuels,
+version des statistiques) à chaque enregistrement : une transaction qui
+modifie cent lignes de la même journée ne doit en exécuter qu'un.
+`on_commit_once` n'enregistre le callback que si aucun callback de même clé
+n'attend déjà le commit de la transaction courante.
+
+Django n'expose pas la liste des callbacks en attente : elle est lue dans
+`connection.run_on_commit` (tuples `(savepoints, func, robust)` en 4.2),
+uniquement ici.
+"""
+from functools import partial
+from typing import Any, Callable, Hashable
+
+from django.db import transaction
+
+
+def on_commit_once(key: Hashable, func: Callable[..., Any], *args, **kwargs) -> bool:
+    """
+    Exécute `func(*args, **kwargs)` après le commit de la transaction courante
+    (immédiatement en autocommit), une seule fois par `key` et par transaction.
+
+    Returns:
+        False si un callback de même clé était déjà programmé
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        for _sids, pending, *_rest in connection.run_on_commit:
+            if getattr(pending, 'on_commit_key', None) == key:
+                return False
+
+    callback = partial(func, *args, **kwargs)
+    callback.on_commit_key = key
+    transaction.on_commit(callback)
+    return True
@@ -11,11 +11,27 @@ from apps.suppliers.models import Supplier
 from apps.invoicing.models import Product, Invoice, InvoiceItem
 from apps.accounts.models import Client
 from apps.purchase_orders.models import PurchaseOrder, PurchaseOrderItem
+from apps.core.sequences import NumberPool
 from .models import MigrationJob, MigrationLog
 
 logger = logging.getLogger(__name__)
 
 
+def _json_safe(data: Dict) -> Dict:
+    """
+    Données de ligne journalisables en JSON : cellules vides (NaN) -> None,
+    relations (organisation, fournisseur...) -> identifiant.
+    """
+    safe = {}
+    for key, value in data.items():
+        if hasattr(value, 'pk'):
+            value = str(value.pk)
+        elif isinstance(value, float) and pd.isna(value):
+            value = None
+        safe[key] = value
+    return safe
+
+
 class ExcelCSVImporter:
     """Importeur pour fichiers Excel et CSV"""
 
@@ -135,156 +151,120 @@ class ExcelCSVImporter:
 
     def import_suppliers(self, df: pd.DataFrame):
         """Importe les fournisseurs"""
-        for index, row in df.iterrows():
-            row_number = index + 1
+        self._import_entities(df, 'supplier', Supplier, 'Supplier', "Fournisseur")
 
-            try:
-                mapped_data = self.apply_field_mapping(row)
+    def import_products(self, df: pd.DataFrame):
+        """Importe les produits"""
 
-                # Ajouter l'organisation si disponible
+        def resolve_supplier(mapped_data):
+            # Gère la relation avec le fournisseur (filtrée par organisation)
+            supplier_name = mapped_data.pop('supplier', None)
+            if supplier_name:
+                filter_kwargs = {'name': supplier_name}
                 if self.organization:
-                    mapped_data['organization'] = self.organization
+                    filter_kwargs['organization'] = self.organization
+                supplier = Supplier.objects.filter(**filter_kwargs).first()
+                if supplier:
+                    mapped_data['supplier'] = supplier
 
-                # Vérifie les doublons (filtrer par organisation aussi)
-                if self.job.skip_duplicates:
-                    filter_kwargs = {}
-                    if mapped_data.get('email'):
-                        filter_kwargs['email'] = mapped_data.get('email')
-                    if self.organization:
-                        filter_kwargs['organization'] = self.organization
-                    
-                    existing = Supplier.objects.filter(**filter_kwargs).first()
+        self._import_entities(df, 'product', Product, 'Product', "Produit", prepare=resolve_supplier)
 
-                    if existing:
-                        if self.job.update_existing:
-                            # Met à jour l'existant
-                            for field, value in mapped_data.items():
-                                if hasattr(existing, field) and value:
-                                    setattr(existing, field, value)
-                            existing.save()
-
-                            self._log_success(row_number, row, mapped_data, existing.id, 'Supplier', 'updated')
-                        else:
-                            # Ignore le doublon
-                            self.skipped_count += 1
-                            self._log_skip(row_number, row, "Fournisseur existe déjà")
-                        continue
-
-                # Crée le nouveau fournisseur
-                supplier = Supplier.objects.create(**mapped_data)
-                self.success_count += 1
-                self._log_success(row_number, row, mapped_data, supplier.id, 'Supplier', 'created')
-
-            except Exception as e:
-                self.error_count += 1
-                self._log_error(row_number, row, str(e))
-
-            finally:
-                self.job.processed_rows += 1
-                if self.job.processed_rows % 10 == 0:
-                    self.job.save(update_fields=['processed_rows', 'success_count', 'error_count', 'skipped_count'])
-
-    def import_products(self, df: pd.DataFrame):
-        """Importe les produits"""
+    def import_clients(self, df: pd.DataFrame):
+        """Importe les clients"""
+        self._import_entities(df, 'client', Client, 'Client', "Client")
+
+    def _import_entities(self, df: pd.DataFrame, entity_type: str, model, object_type: str,
+                         label: str, prepare=None):
+        """
+        Import des fournisseurs / clients / produits.
+
+        Les doublons sont détectés en une passe sur tout le fichier
+        (`BulkDeduplicator` : email / téléphone / référence / code-barres
+        identiques ou nom similaire), contre la base et entre les lignes du
+        fichier, au lieu d'une requête par ligne.
+
+        Avec `update_existing`, seule une correspondance exacte met à jour
+        l'entité : un nom seulement proche est journalisé en avertissement et
+        la ligne ignorée, plutôt que d'écraser un autre fournisseur ou client.
+        """
+        rows = []
         for index, row in df.iterrows():
-            row_number = index + 1
-
             try:
                 mapped_data = self.apply_field_mapping(row)
 
                 # Ajouter l'organisation si disponible
                 if self.organization:
                     mapped_data['organization'] = self.organization
-
-                # Gère la relation avec le fournisseur
-                supplier_name = mapped_data.pop('supplier', None)
-                if supplier_name:
-                    # Filtrer le fournisseur par organisation aussi
-                    filter_kwargs = {'name': supplier_name}
-                    if self.organization:
-                        filter_kwargs['organization'] = self.organization
-                    supplier = Supplier.objects.filter(**filter_kwargs).first()
-                    if supplier:
-                        mapped_data['supplier'] = supplier
-
-                # Vérifie les doublons (filtrer par organisation aussi)
-                if self.job.skip_duplicates:
-                    filter_kwargs = {}
-                    if mapped_data.get('sku'):
-                        filter_kwargs['sku'] = mapped_data.get('sku')
-                    if self.organization:
-                        filter_kwargs['organization'] = self.organization
-                    
-                    existing = Product.objects.filter(**filter_kwargs).first()
-
-                    if existing:
-                        if self.job.update_existing:
-                            for field, value in mapped_data.items():
-                                if hasattr(existing, field) and value:
-                                    setattr(existing, field, value)
-                            existing.save()
-
-                            self._log_success(row_number, row, mapped_data, existing.id, 'Product', 'updated')
-                        else:
-                            self.skipped_count += 1
-                            self._log_skip(row_number, row, "Produit existe déjà")
-                        continue
-
-                # Crée le nouveau produit
-                product = Product.objects.create(**mapped_data)
-                self.success_count += 1
-                self._log_success(row_number, row, mapped_data, product.id, 'Product', 'created')
-
+                if prepare:
+                    prepare(mapped_data)
+                rows.append((index, row, mapped_data, None))
             except Exception as e:
-                self.error_count += 1
-                self._log_error(row_number, row, str(e))
+                rows.append((index, row, None, e))
 
-            finally:
-                self.job.processed_rows += 1
-                if self.job.processed_rows % 10 == 0:
-                    self.job.save(update_fields=['processed_rows', 'success_count', 'error_count', 'skipped_count'])
+        duplicates = None
+        if self.job.skip_duplicates:
+            deduplicator, records, duplicates = self._detect_duplicates(
+                entity_type, [mapped_data for _, _, mapped_data, _ in rows]
+            )
 
-    def import_clients(self, df: pd.DataFrame):
-        """Importe les clients"""
-        for index, row in df.iterrows():
+        # Entité créée ou mise à jour pour chaque ligne (doublons internes au fichier)
+        entities = {}
+
+        for position, (index, row, mapped_data, error) in enumerate(rows):
             row_number = index + 1
 
             try:
-                mapped_data = self.apply_field_mapping(row)
-
-                # Ajouter l'organisation si disponible
-                if self.organization:
-                    mapped_data['organization'] = self.organization
-
-                # Vérifie les doublons (filtrer par organisation aussi)
-                if self.job.skip_duplicates:
-                    filter_kwargs = {}
-                    if mapped_data.get('email'):
-                        filter_kwargs['email'] = mapped_data.get('email')
-                    if self.organization:
-                        filter_kwargs['organization'] = self.organization
-                    
-                    existing = Client.objects.filter(**filter_kwargs).first()
+                if error is not None:
+                    raise error
+
+                if duplicates is not None:
+                    first = duplicates.duplicate_of(position)
+                    if first is not None and first in entities:
+                        existing = entities[first]
+                        # Comparée à l'entité retenue pour la première ligne (créée ou existante)
+                        exact = deduplicator.is_exact_match(
+                            records[position], {key: getattr(existing, key, None) for key in records[position]}
+                        )
+                        skip_reason = f"{label} en double dans le fichier (ligne {rows[first][0] + 1})"
+                    else:
+                        match = duplicates.existing.get(position)
+                        existing = model.objects.filter(pk=match.entity_id).first() if match else None
+                        exact = match is not None and match.matched_on != 'name_fuzzy'
+                        skip_reason = f"{label} existe déjà"
 
                     if existing:
-                        if self.job.update_existing:
+                        if self.job.update_existing and not exact:
+                            # Nom seulement proche : ne pas écraser une autre entité
+                            logger.warning(
+                                "Import %s ligne %s : correspondance approximative avec %s, non mise à jour",
+                                self.job.pk, row_number, existing.pk,
+                            )
+                            skip_reason = (
+                                f"{label} proche de « {existing.name} » (correspondance approximative) : "
+                                f"non mis à jour"
+                            )
+
+                        if self.job.update_existing and exact:
                             # Met à jour l'existant
                             for field, value in mapped_data.items():
                                 if hasattr(existing, field) and value:
                                     setattr(existing, field, value)
                             existing.save()
+                            entities[position] = existing
 
-                            self._log_success(row_number, row, mapped_data, existing.id, 'Client', 'updated')
+                            self._log_success(row_number, row, mapped_data, existing.id, object_type, 'updated')
                         else:
                             # Ignore le doublon
+                            entities[position] = existing
                             self.skipped_count += 1
-                            self._log_skip(row_number, row, "Client existe déjà")
+                            self._log_skip(row_number, row, skip_reason)
                         continue
 
-                # Crée le nouveau client
-                client = Client.objects.create(**mapped_data)
+                # Crée la nouvelle entité
+                entity = model.objects.create(**mapped_data)
+                entities[position] = entity
                 self.success_count += 1
-                self._log_success(row_number, row, mapped_data, client.id, 'Client', 'created')
+                self._log_success(row_number, row, mapped_data, entity.id, object_type, 'created')
 
             except Exception as e:
                 self.error_count += 1
@@ -295,8 +275,24 @@ class ExcelCSVImporter:
                 if self.job.processed_rows % 10 == 0:
                     self.job.save(update_fields=['processed_rows', 'success_count', 'error_count', 'skipped_count'])
 
+    def _detect_duplicates(self, entity_type: str, mapped_rows: List[Dict]):
+        """Doublons de tout le fichier, en une passe vectorisée : (détecteur, enregistrements, résultat)"""
+        from apps.ai_assistant.bulk_dedup import BulkDeduplicator
+
+        records = [
+            {
+                key: value for key, value in mapped_data.items()
+                if key in ('name', 'email', 'phone', 'reference', 'barcode') and not pd.isna(value)
+            } if mapped_data is not None else None
+            for mapped_data in mapped_rows
+        ]
+        deduplicator = BulkDeduplicator(entity_type, self.organization)
+        return deduplicator, records, deduplicator.run(records)
+
     def import_purchase_orders(self, df: pd.DataFrame):
         """Importe les bons de commande"""
+        # Numéros réservés par blocs pour les lignes sans numéro
+        po_numbers = NumberPool(PurchaseOrder.reserve_po_numbers)
         for index, row in df.iterrows():
             row_number = index + 1
 
@@ -334,6 +330,8 @@ class ExcelCSVImporter:
                         continue
 
                 # Crée le nouveau bon de commande
+                if not mapped_data.get('po_number'):
+                    mapped_data['po_number'] = po_numbers.next()
                 po = PurchaseOrder.objects.create(**mapped_data)
                 self.success_count += 1
                 self._log_success(row_number, row, mapped_data, po.id, 'PurchaseOrder', 'created')
@@ -349,6 +347,9 @@ class ExcelCSVImporter:
 
     def import_invoices(self, df: pd.DataFrame):
         """Importe les factures"""
+        # Numéros réservés par blocs pour les lignes sans numéro
+        invoice_numbers = NumberPool(Invoice.reserve_invoice_numbers)
+        quote_numbers = NumberPool(lambda count: Invoice.reserve_invoice_numbers(count, quote=True))
         for index, row in df.iterrows():
             row_number = index + 1
 
@@ -389,6 +390,9 @@ class ExcelCSVImporter:
                         continue
 
                 # Crée la nouvelle facture
+                if not mapped_data.get('invoice_number'):
+                    pool = quote_numbers if mapped_data.get('status') == 'quote' else invoice_numbers
+                    mapped_data['invoice_number'] = pool.next()
                 invoice = Invoice.objects.create(**mapped_data)
                 self.success_count += 1
                 self._log_success(row_number, row, mapped_data, invoice.id, 'Invoice', 'created')
@@ -447,8 +451,8 @@ class ExcelCSVImporter:
             level='success',
             message=f"{object_type} {action} avec succès",
             row_number=row_number,
-            source_data=source_data.to_dict(),
-            transformed_data=transformed_data,
+            source_data=_json_safe(source_data.to_dict()),
+            transformed_data=_json_safe(transformed_data),
             created_object_id=str(object_id),
             created_object_type=object_type
         )
@@ -460,7 +464,7 @@ class ExcelCSVImporter:
             level='error',
             message=error_message,
             row_number=row_number,
-            source_data=source_data.to_dict() if hasattr(source_data, 'to_dict') else {}
+            source_data=_json_safe(source_data.to_dict()) if hasattr(source_data, 'to_dict') else {}
         )
 
     def _log_skip(self, row_number: int, source_data: pd.Series, reason: str):
@@ -470,5 +474,5 @@ class ExcelCSVImporter:
             level='warning',
             message=reason,
             row_number=row_number,
-            source_data=source_data.to_dict()
+            source_data=_json_safe(source_data.to_dict())
         )
@@ -74,24 +74,17 @@ class SourcingEvent(models.Model):
     def generate_event_number(self):
         """Génère un numéro d'événement unique au format RFQ202501-0001"""
         from datetime import datetime
-        year = datetime.now().year
-        month = datetime.now().month
-
-        # Trouve le prochain numéro disponible
-        last_event = SourcingEvent.objects.filter(
-            event_number__startswith=f"RFQ{year}{month:02d}"
-        ).order_by('-event_number').first()
-
-        if last_event:
-            try:
-                last_number = int(last_event.event_number.split('-')[1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
+        from apps.core.sequences import last_number_with_prefix, next_number
+
+        now = datetime.now()
+        period = f"{now.year}{now.month:02d}"
+        prefix = f"RFQ{period}"
 
-        return f"RFQ{year}{month:02d}-{next_number:04d}"
+        number = next_number(
+            'sourcing_event', period,
+            seed=lambda: last_number_with_prefix(SourcingEvent.objects.all(), 'event_number', prefix)
+        )
+        return f"{prefix}-{number:04d}"
 
     def publish(self):
         """Publie l'événement et envoie les invitations"""
@@ -564,33 +564,41 @@ class Invoice(models.Model):
 
         self._old_status = self.status
 
+    def _stock_lines(self, sign):
+        """Lignes de stock des articles liés à des produits physiques"""
+        from .stock_service import StockLine
+
+        return [
+            StockLine(product=item.product, quantity=sign * item.quantity, batch=item.batch)
+            for item in self.items.select_related('product', 'batch')
+            if item.product and item.product.product_type == 'physical'
+        ]
+
     def _deduct_stock(self):
         """Déduit le stock pour les articles liés à des produits physiques"""
-        for item in self.items.all():
-            if item.product and item.product.product_type == 'physical':
-                item.product.adjust_stock(
-                    quantity=-item.quantity,
-                    movement_type='sale',
-                    reference_type='invoice',
-                    reference_id=self.id,
-                    notes=f"Facture validée {self.invoice_number}",
-                    user=self.created_by,
-                    batch=item.batch
-                )
+        from .stock_service import apply_stock_movements
+
+        apply_stock_movements(
+            self._stock_lines(-1),
+            movement_type='sale',
+            reference_type='invoice',
+            reference_id=self.id,
+            notes=f"Facture validée {self.invoice_number}",
+            user=self.created_by
+        )
 
     def _restore_stock(self):
         """Restaure le stock pour une facture annulée/brouillon"""
-        for item in self.items.all():
-            if item.product and item.product.product_type == 'physical':
-                item.product.adjust_stock(
-                    quantity=item.quantity,
-                    movement_type='return',
-                    reference_type='invoice',
-                    reference_id=self.id,
-                    notes=f"Facture annulée/révoquée {self.invoice_number}",
-                    user=self.created_by,
-                    batch=item.batch
-                )
+        from .stock_service import apply_stock_movements
+
+        apply_stock_movements(
+            self._stock_lines(1),
+            movement_type='return',
+            reference_type='invoice',
+            reference_id=self.id,
+            notes=f"Facture annulée/révoquée {self.invoice_number}",
+            user=self.created_by
+        )
 
     def clean(self):
         """Validation de la facture"""
@@ -638,8 +646,16 @@ class Invoice(models.Model):
         globale réduit ensuite la base, puis les taxes (fournies par l'appelant,
         calculées sur la base après remise) sont ajoutées.
         """
-        items = self.items.all()
-        self.subtotal = sum(item.total_price for item in items)
+        from decimal import Decimal
+        from .totals import defer_totals, item_subtotals
+
+        if defer_totals(self):
+            return
+        self.store_totals(item_subtotals(Invoice, [self.pk]).get(self.pk, Decimal('0')))
+
+    def store_totals(self, subtotal):
+        """Enregistre le sous-total des lignes et le total qui en découle"""
+        self.subtotal = subtotal
         self.total_amount = self.subtotal - self.discount_amount + self.tax_amount
         self.save(update_fields=['subtotal', 'total_amount'])
 
@@ -659,26 +675,26 @@ class Invoice(models.Model):
 
     def generate_invoice_number(self):
         """Génère un numéro de facture ou devis unique"""
-        from datetime import datetime
-        year = datetime.now().year
-        month = datetime.now().month
-
-        prefix = "DEV" if self.status == 'quote' else "FAC"
+        return self.reserve_invoice_numbers(1, quote=self.status == 'quote')[0]
 
-        last_doc = Invoice.objects.filter(
-            invoice_number__startswith=f"{prefix}{year}{month:02d}"
-        ).order_by('-invoice_number').first()
+    @classmethod
+    def reserve_invoice_numbers(cls, count, quote=False):
+        """
+        Réserve `count` numéros consécutifs (séquence FAC/DEV + AAAAMM),
+        sans scan des numéros existants ni risque de doublon concurrent.
+        """
+        from datetime import datetime
+        from apps.core.sequences import last_number_with_prefix, reserve_numbers
 
-        if last_doc:
-            try:
-                last_number = int(last_doc.invoice_number[-4:])
-                next_number = last_number + 1
-            except ValueError:
-                next_number = 1
-        else:
-            next_number = 1
+        now = datetime.now()
+        period = f"{now.year}{now.month:02d}"
+        prefix = f"{'DEV' if quote else 'FAC'}{period}"
 
-        return f"{prefix}{year}{month:02d}{next_number:04d}"
+        numbers = reserve_numbers(
+            'quote' if quote else 'invoice', period, count=count,
+            seed=lambda: last_number_with_prefix(cls.objects.all(), 'invoice_number', prefix)
+        )
+        return [f"{prefix}{number:04d}" for number in numbers]
 
     def convert_quote_to_draft(self):
         """Convertit un devis accepté en facture brouillon"""
@@ -798,6 +814,8 @@ class Invoice(models.Model):
         Returns:
             Invoice: La facture créée avec tous ses éléments
         """
+        from .totals import deferred_totals
+
         # Créer la facture principale
         invoice = cls.objects.create(
             created_by=created_by,
@@ -808,12 +826,11 @@ class Invoice(models.Model):
             **kwargs
         )
         
-        # Ajouter tous les éléments
-        for item_data in items_data:
-            invoice.add_item(**item_data)
-        
-        # Recalculer les totaux finaux
-        invoice.recalculate_totals()
+        # Ajouter tous les éléments : totaux recalculés une seule fois en sortie
+        with deferred_totals():
+            for item_data in items_data:
+                invoice.add_item(**item_data)
+            invoice.recalculate_totals()
         
         return invoice
 
@@ -861,7 +878,7 @@ class Invoice(models.Model):
                 'notes': item.notes,
             })
         
-        # Créer la facture clonée
+        # Créer la facture clonée (recalcul des totaux groupé)
         return self.__class__.create_with_items(
             created_by=clone_data.pop('created_by'),
             title=clone_data.pop('title'),
@@ -877,11 +894,12 @@ class Invoice(models.Model):
 
     def add_item(self, service_code, description, quantity, unit_price, 
                  detailed_description="", unit_of_measure="unité", 
-                 discount_percent=0, tax_rate=0, notes=""):
+                 discount_percent=0, tax_rate=0, notes="", product_reference=""):
         """Ajoute un nouvel élément à la facture"""
         return InvoiceItem.objects.create(
             invoice=self,
             service_code=service_code,
+            product_reference=product_reference,
             description=description,
             detailed_description=detailed_description,
             quantity=quantity,
@@ -909,18 +927,21 @@ class Invoice(models.Model):
 
     def duplicate_items_from(self, other_invoice):
         """Copie tous les éléments d'une autre facture"""
-        for item in other_invoice.items.all():
-            self.add_item(
-                service_code=item.service_code,
-                description=item.description,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                detailed_description=item.detailed_description,
-                unit_of_measure=item.unit_of_measure,
-                discount_percent=item.discount_percent,
-                tax_rate=item.tax_rate,
-                notes=item.notes
-            )
+        from .totals import deferred_totals
+
+        with deferred_totals():
+            for item in other_invoice.items.all():
+                self.add_item(
+                    service_code=item.service_code,
+                    description=item.description,
+                    quantity=item.quantity,
+                    unit_price=item.unit_price,
+                    detailed_description=item.detailed_description,
+                    unit_of_measure=item.unit_of_measure,
+                    discount_percent=item.discount_percent,
+                    tax_rate=item.tax_rate,
+                    notes=item.notes
+                )
 
     def get_items_count(self):
         """Retourne le nombre d'éléments dans la facture"""
@@ -1032,11 +1053,10 @@ class InvoiceItem(models.Model):
             except Exception:
                 pass
 
+        # Les totaux de la facture sont recalculés par le signal post_save
+        # (recalculate_invoice_totals_on_item_save)
         super().save(*args, **kwargs)
-        # Recalculer les totaux de la facture seulement si elle existe déjà
-        if self.invoice_id:
-            self.invoice.recalculate_totals()
-            
+
         # Ajustement de stock si la facture est DÉJÀ finalisée
         if is_finalized and self.product and self.product.product_type == 'physical':
             # Si le lot a changé
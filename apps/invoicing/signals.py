@@ -1,10 +1,11 @@
 # Signals pour la gestion automatique des factures
 from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Invoice, InvoiceItem, ProductBatch
+from .models import Invoice, InvoiceItem, Product, ProductBatch, StockMovement
 from django.db.models import Sum
 from apps.accounts.models import Client
 from apps.purchase_orders.models import PurchaseOrder
+from apps.suppliers.models import Supplier
 
 
 @receiver(post_save, sender=InvoiceItem)
@@ -121,3 +122,79 @@ def sync_product_stock_on_batch_change(sender, instance, created=False, **kwargs
                     pass
     except Exception:
         pass
+
+
+# ─── Rollup journalier des métriques (apps.analytics.DailyOrgMetrics) ─────────
+
+def _schedule_daily_metrics(organization_id, moment):
+    """Programme le recalcul du jour `moment` pour l'organisation (après commit)"""
+    if not organization_id or not moment:
+        return
+    from apps.analytics.rollups import schedule_metrics_refresh
+    from apps.analytics.time_buckets import as_local_date
+    schedule_metrics_refresh(organization_id, as_local_date(moment))
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+def refresh_daily_metrics_on_invoice(sender, instance, **kwargs):
+    """Met à jour le rollup du jour de création de la facture"""
+    try:
+        org_id = getattr(instance.created_by, 'organization_id', None)
+        _schedule_daily_metrics(org_id, instance.created_at)
+
+        # Passage de/vers 'paid' : les montants encaissés sont rattachés aux
+        # dates de paiement (cf. _cache_invoice_status dans accounting.signals)
+        previous = getattr(instance, '_previous_status', None)
+        if instance.pk and previous != instance.status and 'paid' in (previous, instance.status):
+            for payment_date in instance.payments.values_list('payment_date', flat=True).distinct():
+                _schedule_daily_metrics(org_id, payment_date)
+    except Exception:
+        pass
+
+
+@receiver([post_save, post_delete], sender=PurchaseOrder)
+def refresh_daily_metrics_on_purchase_order(sender, instance, **kwargs):
+    """Met à jour le rollup du jour de création du bon de commande"""
+    try:
+        _schedule_daily_metrics(getattr(instance.created_by, 'organization_id', None), instance.created_at)
+    except Exception:
+        pass
+
+
+@receiver([post_save, post_delete], sender=StockMovement)
+def refresh_daily_metrics_on_stock_movement(sender, instance, **kwargs):
+    """Met à jour les unités vendues et la valeur du stock du jour du mouvement"""
+    try:
+        _schedule_daily_metrics(instance.product.organization_id, instance.created_at)
+    except Exception:
+        pass
+
+
+# ─── Cache des statistiques (apps.analytics.stats_cache) ──────────────────────
+# Factures, BC, paiements et mouvements de stock invalident le cache via le
+# recalcul du rollup ci-dessus (après commit). Les autres données lues par le
+# dashboard invalident directement la version de l'organisation.
+
+def _bump_stats_version(organization_id):
+    from apps.analytics.stats_cache import schedule_data_version_bump
+    schedule_data_version_bump(organization_id)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Client)
+@receiver([post_save, post_delete], sender=Supplier)
+def bump_stats_version_on_organization_data(sender, instance, **kwargs):
+    """Produits, clients, fournisseurs : invalide les statistiques de l'organisation"""
+    try:
+        _bump_stats_version(instance.organization_id)
+    except Exception:
+        pass
+
+
+@receiver([post_save, post_delete], sender=ProductBatch)
+def bump_stats_version_on_batch(sender, instance, **kwargs):
+    """Lots (alertes d'expiration) : invalide les statistiques de l'organisation"""
+    try:
+        _bump_stats_version(instance.product.organization_id)
+    except Exception:
+        pass
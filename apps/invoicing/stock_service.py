@@ -0,0 +1,206 @@
+"""
+Mouvements de stock groupés pour un document (facture, réception de BC...).
+
+`Product.adjust_stock` traite une ligne à la fois : sauvegarde du produit,
+du lot, recalcul depuis les lots, insertion du mouvement et vérification des
+alertes, soit une dizaine de requêtes par ligne. `apply_stock_movements`
+applique toutes les lignes d'un document dans une seule transaction :
+
+1. verrouillage (select_for_update) des produits et lots concernés ;
+2. rejeu des lignes en mémoire, dans l'ordre, avec la même sémantique que
+   `adjust_stock` (une ligne avec lot recalcule le stock depuis les lots
+   actifs) pour obtenir les quantités avant/après de chaque mouvement ;
+3. une requête UPDATE (F() + CASE) pour les lots, une pour les produits ;
+4. bulk_create des mouvements et de leur journal d'activité ;
+5. une seule vérification d'alerte par produit, après commit.
+
+Le nombre de requêtes ne dépend plus du nombre de lignes.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StockLine:
+    """Une ligne de mouvement : quantité signée (négatif = sortie)"""
+    product: 'Product'
+    quantity: int
+    batch: Optional['ProductBatch'] = None
+    notes: str = ''
+
+
+def _delta_update(queryset, field: str, deltas: Dict) -> int:
+    """UPDATE field = field + CASE pk WHEN ... END, en une requête."""
+    if not deltas:
+        return 0
+    return queryset.filter(pk__in=list(deltas)).update(**{
+        field: F(field) + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    })
+
+
+def apply_stock_movements(lines: Iterable[StockLine], movement_type: str,
+                          reference_type: Optional[str] = None, reference_id=None,
+                          notes: str = '', user=None) -> List['StockMovement']:
+    """
+    Applique les lignes de stock d'un document en une transaction.
+
+    Les produits non physiques sont ignorés (comme `adjust_stock`). Les
+    instances `product` / `batch` des lignes sont mises à jour en mémoire.
+
+    Returns:
+        Les mouvements créés, dans l'ordre des lignes
+    """
+    from .models import Product, ProductBatch, StockMovement
+
+    lines = [line for line in lines if line.product is not None]
+    if not lines:
+        return []
+
+    with transaction.atomic():
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update().filter(
+                pk__in={line.product.pk for line in lines},
+                product_type='physical'
+            )
+        }
+        lines = [line for line in lines if line.product.pk in products]
+        if not lines:
+            return []
+
+        # Lots : ceux des lignes + tous les lots actifs des produits concernés
+        # (nécessaires pour recalculer le stock depuis les lots)
+        batch_ids = {line.batch.pk for line in lines if line.batch is not None}
+        batches = {}
+        if batch_ids:
+            batched_products = {line.product.pk for line in lines if line.batch is not None}
+            batches = {
+                batch.pk: batch
+                for batch in ProductBatch.objects.select_for_update().filter(
+                    Q(pk__in=batch_ids) | Q(product_id__in=batched_products, is_active=True)
+                )
+            }
+
+        active_batches = defaultdict(list)
+        for batch in batches.values():
+            if batch.is_active:
+                active_batches[batch.product_id].append(batch.pk)
+
+        stock = {pk: product.stock_quantity for pk, product in products.items()}
+        batch_quantity = {pk: batch.current_quantity for pk, batch in batches.items()}
+
+        movements = []
+        for line in lines:
+            product_id = line.product.pk
+            before = stock[product_id]
+            batch = batches.get(line.batch.pk) if line.batch is not None else None
+
+            if batch is not None:
+                batch_quantity[batch.pk] += line.quantity
+                # Même règle que sync_stock_from_batches : somme des lots actifs
+                stock[product_id] = sum(batch_quantity[pk] for pk in active_batches[product_id])
+            else:
+                stock[product_id] += line.quantity
+
+            movements.append(StockMovement(
+                product=products[product_id],
+                batch=batch,
+                movement_type=movement_type,
+                quantity=line.quantity,
+                quantity_before=before,
+                quantity_after=stock[product_id],
+                reference_type=reference_type,
+                reference_id=reference_id,
+                notes=line.notes or notes,
+                created_by=user,
+            ))
+
+        _delta_update(ProductBatch.objects.all(), 'current_quantity', {
+            pk: quantity - batches[pk].current_quantity
+            for pk, quantity in batch_quantity.items()
+            if quantity != batches[pk].current_quantity
+        })
+        _delta_update(Product.objects.all(), 'stock_quantity', {
+            pk: quantity - products[pk].stock_quantity
+            for pk, quantity in stock.items()
+            if quantity != products[pk].stock_quantity
+        })
+
+        StockMovement.objects.bulk_create(movements)
+
+        # Instances à jour en mémoire (verrouillées et celles de l'appelant)
+        for pk, quantity in batch_quantity.items():
+            batches[pk].current_quantity = quantity
+        for pk, quantity in stock.items():
+            products[pk].stock_quantity = quantity
+        for line in lines:
+            line.product.stock_quantity = stock[line.product.pk]
+            if line.batch is not None and line.batch.pk in batch_quantity:
+                line.batch.current_quantity = batch_quantity[line.batch.pk]
+
+        _after_bulk_movements(movements, products.values())
+
+    return movements
+
+
+def _after_bulk_movements(movements: List['StockMovement'], products):
+    """
+    Effets de bord normalement portés par les signaux post_save, que
+    bulk_create / update() ne déclenchent pas.
+    """
+    from apps.analytics.models import ActivityLog
+    from apps.analytics.rollups import schedule_metrics_refresh
+
+    try:
+        ActivityLog.objects.bulk_create([
+            ActivityLog(
+                user=movement.created_by,
+                organization_id=movement.product.organization_id,
+                action_type='create',
+                entity_type='stock_movement',
+                entity_id=str(movement.id),
+                description=f"Création de Mouvement stock - {movement.product.name}",
+                # Même forme que log_create (signal log_stock_movement)
+                metadata={
+                    'entity_name': f"Mouvement stock - {movement.product.name}",
+                    'metadata': {
+                        'movement_type': movement.movement_type,
+                        'quantity': str(movement.quantity),
+                        'product_id': str(movement.product_id),
+                    },
+                },
+            )
+            for movement in movements
+        ])
+    except Exception:
+        logger.exception("Échec de la journalisation des mouvements de stock")
+
+    today = timezone.localdate()
+    for organization_id in {product.organization_id for product in products}:
+        # Unités vendues / valeur du stock du rollup journalier (et cache des stats)
+        schedule_metrics_refresh(organization_id, today)
+
+    # Une seule évaluation d'alerte par produit, une fois le stock commité
+    for product in products:
+        transaction.on_commit(lambda product=product: _check_alert(product))
+
+
+def _check_alert(product):
+    from .stock_alerts import check_stock_after_movement
+
+    try:
+        check_stock_after_movement(product)
+    except Exception:
+        logger.exception("Échec de la vérification d'alerte de stock (%s)", product.pk)
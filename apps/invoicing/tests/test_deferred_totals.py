@@ -0,0 +1,143 @@
+"""
+Tests du recalcul différé des totaux (deferred_totals) :
+- create_with_items / clone_with_items / duplicate_items_from ne recalculent
+  la facture qu'une fois, avec des totaux identiques
+- sans bloc, chaque ligne recalcule toujours la facture
+- blocs imbriqués et erreur en cours de bloc
+"""
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.accounts.models import Client, Organization, User
+from apps.invoicing.models import Invoice
+from apps.invoicing.totals import deferred_totals
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Totals Org")
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="totals_user",
+        email="totals@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+@pytest.fixture
+def client_account(organization):
+    return Client.objects.create(name="Client Totaux", organization=organization)
+
+
+def items_data(count):
+    return [
+        {
+            'service_code': f"SVC-{i}",
+            'description': f"Ligne {i}",
+            'quantity': 2,
+            'unit_price': Decimal('10.00'),
+            'discount_percent': Decimal('10'),
+        }
+        for i in range(count)
+    ]
+
+
+def total_updates(ctx):
+    """Nombre d'écritures des totaux de facture"""
+    return sum(
+        1 for query in ctx.captured_queries
+        if query['sql'].startswith('UPDATE "invoicing_invoice" SET "subtotal"')
+    )
+
+
+@pytest.mark.django_db
+class TestDeferredTotals:
+
+    def test_create_with_items_recalculates_once(self, user, client_account):
+        with CaptureQueriesContext(connection) as ctx:
+            invoice = Invoice.create_with_items(
+                created_by=user,
+                title="Facture groupée",
+                due_date=timezone.now().date() + timedelta(days=30),
+                items_data=items_data(30),
+                client=client_account,
+            )
+
+        assert total_updates(ctx) == 1
+        assert invoice.subtotal == Decimal('540.00')
+        assert invoice.total_amount == Decimal('540.00')
+        invoice.refresh_from_db()
+        assert invoice.subtotal == Decimal('540.00')
+
+    def test_clone_and_duplicate(self, user, client_account):
+        source = Invoice.create_with_items(
+            created_by=user,
+            title="Source",
+            due_date=timezone.now().date() + timedelta(days=30),
+            items_data=items_data(5),
+            client=client_account,
+        )
+
+        clone = source.clone_with_items()
+        assert clone.items.count() == 5
+        assert clone.total_amount == source.total_amount == Decimal('90.00')
+
+        with CaptureQueriesContext(connection) as ctx:
+            clone.duplicate_items_from(source)
+        assert total_updates(ctx) == 1
+        assert clone.total_amount == Decimal('180.00')
+
+    def test_without_context_each_line_recalculates(self, user, client_account):
+        invoice = Invoice.create_with_items(
+            created_by=user,
+            title="Sans bloc",
+            due_date=timezone.now().date() + timedelta(days=30),
+            items_data=[],
+            client=client_account,
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            invoice.add_item(service_code="A", description="A", quantity=1, unit_price=Decimal('5'))
+            invoice.add_item(service_code="B", description="B", quantity=1, unit_price=Decimal('7'))
+
+        assert total_updates(ctx) == 2
+        invoice.refresh_from_db()
+        assert invoice.total_amount == Decimal('12.00')
+
+    def test_nested_context_flushes_on_outer_exit(self, user, client_account):
+        invoice = Invoice.create_with_items(
+            created_by=user,
+            title="Imbriqué",
+            due_date=timezone.now().date() + timedelta(days=30),
+            items_data=[],
+            client=client_account,
+        )
+        with deferred_totals():
+            with deferred_totals():
+                invoice.add_item(service_code="A", description="A", quantity=3, unit_price=Decimal('5'))
+            assert Invoice.objects.get(pk=invoice.pk).total_amount == Decimal('0')
+
+        assert invoice.total_amount == Decimal('15.00')
+        assert Invoice.objects.get(pk=invoice.pk).total_amount == Decimal('15.00')
+
+    def test_error_inside_context_keeps_totals_consistent(self, user, client_account):
+        invoice = Invoice.create_with_items(
+            created_by=user,
+            title="Erreur",
+            due_date=timezone.now().date() + timedelta(days=30),
+            items_data=[],
+            client=client_account,
+        )
+        with pytest.raises(ValueError):
+            with deferred_totals():
+                invoice.add_item(service_code="A", description="A", quantity=1, unit_price=Decimal('8'))
+                raise ValueError("ligne invalide")
+
+        assert Invoice.objects.get(pk=invoice.pk).total_amount == Decimal('8.00')
@@ -0,0 +1,207 @@
+"""
+Tests des mouvements de stock groupés (apply_stock_movements) :
+- facture validée / annulée : stock, lots et mouvements identiques au
+  traitement ligne par ligne, en un nombre de requêtes constant
+- réception de bon de commande : lots REC-*, réception rejouée idempotente
+- une seule vérification d'alerte par produit, après commit
+"""
+import pytest
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import Client, Organization, User
+from apps.analytics.models import ActivityLog
+from apps.invoicing.models import Invoice, InvoiceItem, Product, ProductBatch, StockMovement
+from apps.invoicing.stock_service import StockLine, apply_stock_movements
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Stock Org")
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="stock_user",
+        email="stock@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+def make_product(organization, index, stock=100, product_type='physical'):
+    return Product.objects.create(
+        organization=organization,
+        name=f"Produit {index}",
+        reference=f"STK-{index}",
+        price=Decimal('10.00'),
+        stock_quantity=stock,
+        product_type=product_type,
+    )
+
+
+def make_invoice(user, organization, lines):
+    """Facture brouillon avec une ligne par (produit, quantité, lot)"""
+    client = Client.objects.create(name="Client Stock", organization=organization)
+    invoice = Invoice.objects.create(
+        title="Facture stock",
+        subtotal=Decimal('0'),
+        total_amount=Decimal('0'),
+        created_by=user,
+        client=client,
+        status='draft',
+    )
+    InvoiceItem.objects.bulk_create([
+        InvoiceItem(
+            invoice=invoice,
+            product=product,
+            batch=batch,
+            description=product.name,
+            quantity=quantity,
+            unit_price=Decimal('10.00'),
+            total_price=Decimal('10.00') * quantity,
+        )
+        for product, quantity, batch in lines
+    ])
+    return invoice
+
+
+@pytest.mark.django_db
+class TestInvoiceStock:
+
+    def test_large_invoice_constant_queries(self, user, organization):
+        products = [make_product(organization, i) for i in range(50)]
+        invoice = make_invoice(user, organization, [
+            (products[i % 50], 1, None) for i in range(200)
+        ])
+
+        with CaptureQueriesContext(connection) as ctx:
+            invoice._deduct_stock()
+
+        # Verrous, 1 UPDATE produits, INSERT groupés (découpés par lots de
+        # variables sous SQLite) : indépendant du nombre de lignes
+        assert len(ctx.captured_queries) <= 15
+        assert StockMovement.objects.filter(reference_id=invoice.id).count() == 200
+        assert set(Product.objects.values_list('stock_quantity', flat=True)) == {96}
+
+    def test_matches_line_by_line_semantics(self, user, organization):
+        plain = make_product(organization, 1, stock=20)
+        batched = make_product(organization, 2, stock=0)
+        lot_a = ProductBatch.objects.create(product=batched, batch_number="A", current_quantity=10)
+        lot_b = ProductBatch.objects.create(product=batched, batch_number="B", current_quantity=5)
+        batched.refresh_from_db()
+        assert batched.stock_quantity == 15
+
+        invoice = make_invoice(user, organization, [
+            (plain, 3, None),
+            (batched, 4, lot_a),
+            (plain, 2, None),
+            (batched, 1, lot_b),
+        ])
+        invoice.status = 'sent'
+        invoice.save()
+
+        plain.refresh_from_db()
+        batched.refresh_from_db()
+        lot_a.refresh_from_db()
+        lot_b.refresh_from_db()
+        assert plain.stock_quantity == 15
+        assert batched.stock_quantity == 10
+        assert (lot_a.current_quantity, lot_b.current_quantity) == (6, 4)
+
+        movements = StockMovement.objects.filter(reference_id=invoice.id)
+        chain = sorted(
+            (m.product_id == plain.pk, m.quantity_before, m.quantity_after, m.movement_type)
+            for m in movements
+        )
+        assert chain == sorted([
+            (True, 20, 17, 'sale'), (True, 17, 15, 'sale'),
+            (False, 15, 11, 'sale'), (False, 11, 10, 'sale'),
+        ])
+        assert all(m.notes == f"Facture validée {invoice.invoice_number}" for m in movements)
+        assert ActivityLog.objects.filter(entity_type='stock_movement').count() == 4
+
+        invoice.status = 'cancelled'
+        invoice.save()
+        plain.refresh_from_db()
+        lot_a.refresh_from_db()
+        assert plain.stock_quantity == 20
+        assert lot_a.current_quantity == 10
+        assert StockMovement.objects.filter(reference_id=invoice.id, movement_type='return').count() == 4
+
+    def test_non_physical_products_ignored(self, user, organization):
+        service = make_product(organization, 1, stock=0, product_type='service')
+        assert apply_stock_movements([StockLine(product=service, quantity=-3)], 'sale') == []
+        assert not StockMovement.objects.exists()
+
+    def test_one_alert_per_product_after_commit(self, user, organization, django_capture_on_commit_callbacks):
+        product = make_product(organization, 1, stock=6)
+        lines = [StockLine(product=product, quantity=-1) for _ in range(5)]
+
+        with mock.patch('apps.invoicing.stock_alerts.check_stock_after_movement') as check:
+            with django_capture_on_commit_callbacks(execute=True):
+                apply_stock_movements(lines, 'sale', user=user)
+
+        assert check.call_count == 1
+        assert check.call_args[0][0].stock_quantity == 1
+        assert product.stock_quantity == 1
+
+
+@pytest.mark.django_db
+class TestPurchaseOrderReception:
+
+    @pytest.fixture
+    def purchase_order(self, user, organization):
+        from apps.purchase_orders.models import PurchaseOrder, PurchaseOrderItem
+        from apps.suppliers.models import Supplier
+
+        supplier = Supplier.objects.create(name="Fournisseur Stock", organization=organization)
+        po = PurchaseOrder.objects.create(
+            title="BC stock",
+            subtotal=Decimal('0'),
+            total_amount=Decimal('0'),
+            created_by=user,
+            supplier=supplier,
+            status='approved',
+        )
+        linked = make_product(organization, 1, stock=0)
+        make_product(organization, 2, stock=0)
+        PurchaseOrderItem.objects.bulk_create([
+            PurchaseOrderItem(purchase_order=po, product=linked, description="Lié",
+                              quantity=7, unit_price=Decimal('1'), total_price=Decimal('7')),
+            PurchaseOrderItem(purchase_order=po, product_reference="STK-2", description="Par référence",
+                              quantity=3, unit_price=Decimal('1'), total_price=Decimal('3')),
+        ])
+        return po
+
+    def test_receive_items(self, purchase_order, user):
+        result = purchase_order.receive_items(user=user)
+
+        assert result['success'] and result['errors'] == []
+        assert sorted((m['product'], m['quantity'], m['new_stock']) for m in result['movements']) == [
+            ("Produit 1", 7, 7), ("Produit 2", 3, 3),
+        ]
+        assert dict(Product.objects.values_list('reference', 'stock_quantity')) == {'STK-1': 7, 'STK-2': 3}
+        batches = ProductBatch.objects.filter(batch_number__startswith=f"REC-{purchase_order.po_number}-")
+        assert sorted(batches.values_list('initial_quantity', 'current_quantity')) == [(3, 3), (7, 7)]
+
+    def test_replayed_reception_does_not_double_stock(self, purchase_order, user):
+        purchase_order.receive_items(user=user)
+        purchase_order.status = 'approved'
+        result = purchase_order.receive_items(user=user)
+
+        assert result['movements'] == []
+        assert dict(Product.objects.values_list('reference', 'stock_quantity')) == {'STK-1': 7, 'STK-2': 3}
+
+    def test_failed_reception_keeps_status(self, purchase_order, user):
+        with mock.patch('apps.invoicing.stock_service.apply_stock_movements', side_effect=ValueError("stock verrouillé")):
+            result = purchase_order.receive_items(user=user)
+
+        assert not result['success']
+        assert len(result['errors']) == 2
+        purchase_order.refresh_from_db()
+        assert purchase_order.status == 'approved'
+        assert not ProductBatch.objects.filter(batch_number__startswith=f"REC-{purchase_order.po_number}-").exists()
@@ -0,0 +1,99 @@
+"""
+Recalcul différé des totaux de documents (factures, bons de commande).
+
+Chaque sauvegarde de ligne déclenche `recalculate_totals()` sur son document
+(relecture de toutes les lignes + écriture du document) : ajouter N lignes
+coûte O(N²). Dans un bloc `deferred_totals()`, les documents sont seulement
+marqués « à recalculer », puis recalculés une seule fois à la sortie du bloc,
+avec une requête d'agrégation par type de document :
+
+    with deferred_totals():
+        for data in items_data:
+            invoice.add_item(**data)
+    # invoice.subtotal / total_amount sont à jour ici
+
+Les blocs imbriqués sont absorbés par le bloc le plus externe.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from django.db.models import Sum
+
+logger = logging.getLogger(__name__)
+
+_pending: ContextVar[Optional[Dict[Tuple[type, object], List]]] = ContextVar(
+    'deferred_totals', default=None
+)
+
+
+def defer_totals(document) -> bool:
+    """
+    Marque le document comme à recalculer si un bloc `deferred_totals()` est
+    actif. Retourne True si le recalcul est différé.
+    """
+    pending = _pending.get()
+    if pending is None or document.pk is None:
+        return False
+
+    instances = pending.setdefault((type(document), document.pk), [])
+    if not any(instance is document for instance in instances):
+        instances.append(document)
+    return True
+
+
+@contextmanager
+def deferred_totals():
+    """Regroupe les recalculs de totaux jusqu'à la sortie du bloc."""
+    if _pending.get() is not None:
+        yield
+        return
+
+    pending = {}
+    token = _pending.set(pending)
+    try:
+        yield
+    except Exception:
+        _pending.reset(token)
+        # Les lignes déjà enregistrées restent en base (hors transaction
+        # annulée) : on garde des totaux cohérents sans masquer l'erreur
+        try:
+            flush_totals(pending)
+        except Exception:
+            logger.exception("Échec du recalcul différé des totaux")
+        raise
+    else:
+        _pending.reset(token)
+        flush_totals(pending)
+
+
+def flush_totals(pending: Dict[Tuple[type, object], List]) -> None:
+    """Recalcule chaque document marqué une seule fois."""
+    by_model: Dict[type, Dict] = {}
+    for (model, pk), instances in pending.items():
+        by_model.setdefault(model, {})[pk] = instances
+
+    for model, documents in by_model.items():
+        subtotals = item_subtotals(model, list(documents))
+        for pk, instances in documents.items():
+            document, *others = instances
+            document.store_totals(subtotals.get(pk, Decimal('0')))
+            for other in others:
+                other.subtotal = document.subtotal
+                other.total_amount = document.total_amount
+
+
+def item_subtotals(model, pks) -> Dict:
+    """Somme des `total_price` des lignes par document, en une requête."""
+    relation = model._meta.get_field('items')
+    fk_name = relation.field.name
+    rows = (
+        relation.related_model.objects
+        .filter(**{f'{fk_name}__in': pks})
+        .values(fk_name)
+        .order_by()
+        .annotate(total=Sum('total_price'))
+    )
+    return {row[fk_name]: row['total'] or Decimal('0') for row in rows}
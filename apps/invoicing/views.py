@@ -7,7 +7,7 @@ from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from django.db.models import Q, Sum
 from django.utils import timezone
-from .models import Product, ProductBatch, ProductCategory, StockMovement, Invoice, InvoiceItem
+from .models import Product, ProductBatch, ProductCategory, StockMovement, Invoice, InvoiceItem, Payment
 from .forms_simple import InvoiceForm, InvoiceItemForm, InvoiceItemFormSet, InvoiceSearchForm
 import json
 
@@ -375,6 +375,18 @@ def invoice_item_delete(request, pk):
     }
     return render(request, 'invoicing/invoice_item_confirm_delete.html', context)
 
+def _refresh_after_bulk_update(invoices):
+    """`update()` ne déclenche pas post_save : rollups et caches de statistiques à rafraîchir"""
+    from apps.analytics.rollups import schedule_bulk_refresh
+
+    schedule_bulk_refresh(invoices)
+    # Montants encaissés rattachés aux dates de paiement
+    schedule_bulk_refresh(
+        Payment.objects.filter(invoice__in=invoices),
+        organization_field='invoice__created_by__organization_id',
+        date_field='payment_date',
+    )
+
 @login_required
 @require_http_methods(["POST"])
 def invoice_bulk_action(request):
@@ -390,12 +402,15 @@ def invoice_bulk_action(request):
     
     if action == 'send':
         invoices.update(status='sent')
+        _refresh_after_bulk_update(invoices)
         messages.success(request, f'{len(invoices)} facture(s) envoyée(s).')
     elif action == 'mark_paid':
         invoices.update(status='paid')
+        _refresh_after_bulk_update(invoices)
         messages.success(request, f'{len(invoices)} facture(s) marquée(s) comme payée(s).')
     elif action == 'cancel':
         invoices.update(status='cancelled')
+        _refresh_after_bulk_update(invoices)
         messages.success(request, f'{len(invoices)} facture(s) annulée(s).')
     elif action == 'delete':
         count = invoices.count()
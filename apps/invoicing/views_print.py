@@ -7,6 +7,8 @@ from django.conf import settings
 import json
 import os
 
+from apps.api.services.pdf_cache import get_pdf_cache
+
 from .models import Invoice, PrintTemplate, PrintConfiguration, PrintHistory
 from ..purchase_orders.models import PurchaseOrder
 
@@ -291,9 +293,13 @@ def download_invoice_pdf(request, invoice_id):
             'org_settings': org_settings
         }, request=request)
 
-        # Convertir en PDF
-        html_doc = HTML(string=html_content, base_url=request.build_absolute_uri())
-        pdf_content = html_doc.write_pdf()
+        # Convertir en PDF (même HTML déjà rendu : servi depuis le cache)
+        base_url = request.build_absolute_uri()
+        pdf_cache = get_pdf_cache()
+        pdf_content = pdf_cache.get_or_render(
+            pdf_cache.key('print', base_url, html_content),
+            lambda: HTML(string=html_content, base_url=base_url).write_pdf(),
+        )
 
         # Retourner la réponse PDF
         response = HttpResponse(pdf_content, content_type='application/pdf')
@@ -332,9 +338,13 @@ def download_purchase_order_pdf(request, po_id):
             'config': PrintConfiguration.objects.filter(is_default=True).first()
         }, request=request)
 
-        # Convertir en PDF
-        html_doc = HTML(string=html_content, base_url=request.build_absolute_uri())
-        pdf_content = html_doc.write_pdf()
+        # Convertir en PDF (même HTML déjà rendu : servi depuis le cache)
+        base_url = request.build_absolute_uri()
+        pdf_cache = get_pdf_cache()
+        pdf_content = pdf_cache.get_or_render(
+            pdf_cache.key('print', base_url, html_content),
+            lambda: HTML(string=html_content, base_url=base_url).write_pdf(),
+        )
 
         # Retourner la réponse PDF
         response = HttpResponse(pdf_content, content_type='application/pdf')
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
@@ -79,8 +79,16 @@ class PurchaseOrder(models.Model):
     
     def recalculate_totals(self):
         """Recalcule les totaux basés sur les items"""
-        items = self.items.all()
-        self.subtotal = sum(item.total_price for item in items)
+        from decimal import Decimal
+        from apps.invoicing.totals import defer_totals, item_subtotals
+
+        if defer_totals(self):
+            return
+        self.store_totals(item_subtotals(PurchaseOrder, [self.pk]).get(self.pk, Decimal('0')))
+
+    def store_totals(self, subtotal):
+        """Enregistre le sous-total des lignes et le total qui en découle"""
+        self.subtotal = subtotal
         self.total_amount = self.subtotal + self.tax_gst_hst + self.tax_qst + self.shipping_cost
         self.save(update_fields=['subtotal', 'total_amount'])
 
@@ -145,25 +153,23 @@ class PurchaseOrder(models.Model):
 
     def generate_po_number(self):
         """Génère un numéro de BC unique"""
+        return self.reserve_po_numbers(1)[0]
+
+    @classmethod
+    def reserve_po_numbers(cls, count):
+        """Réserve `count` numéros de BC consécutifs (séquence BC + AAAAMM)"""
         from datetime import datetime
-        year = datetime.now().year
-        month = datetime.now().month
-
-        # Trouve le prochain numéro disponible
-        last_po = PurchaseOrder.objects.filter(
-            po_number__startswith=f"BC{year}{month:02d}"
-        ).order_by('-po_number').first()
-
-        if last_po:
-            try:
-                last_number = int(last_po.po_number[-4:])
-                next_number = last_number + 1
-            except ValueError:
-                next_number = 1
-        else:
-            next_number = 1
+        from apps.core.sequences import last_number_with_prefix, reserve_numbers
+
+        now = datetime.now()
+        period = f"{now.year}{now.month:02d}"
+        prefix = f"BC{period}"
 
-        return f"BC{year}{month:02d}{next_number:04d}"
+        numbers = reserve_numbers(
+            'purchase_order', period, count=count,
+            seed=lambda: last_number_with_prefix(cls.objects.all(), 'po_number', prefix)
+        )
+        return [f"{prefix}{number:04d}" for number in numbers]
 
     def receive_items(self, user=None):
         """
@@ -175,60 +181,91 @@ class PurchaseOrder(models.Model):
         if self.status == 'received':
             return {'error': 'Ce bon de commande a déjà été reçu'}
 
-        from apps.invoicing.models import Product
+        from apps.invoicing.models import Product, ProductBatch
+        from apps.invoicing.stock_service import StockLine, apply_stock_movements
 
         movements = []
         errors = []
 
-        for item in self.items.all():
-            try:
-                # Utiliser FK product directement ou chercher par référence en fallback
-                product = item.product
-                if not product and item.product_reference:
-                    product = Product.objects.filter(reference=item.product_reference).first()
-
-                if product and product.product_type == 'physical':
-                    from apps.invoicing.models import ProductBatch
-                    # Chercher ou créer un lot pour cette réception
-                    batch_number = f"REC-{self.po_number}-{item.id}"
-                    batch, created = ProductBatch.objects.get_or_create(
-                        product=product,
-                        batch_number=batch_number,
-                        defaults={
-                            'initial_quantity': item.quantity,
-                            'current_quantity': 0,
-                        }
-                    )
-                    # Ajuster le stock via le lot
-                    qty_to_add = item.quantity if created else max(0, item.quantity - (batch.current_quantity))
-                    if qty_to_add > 0:
-                        movement = product.adjust_stock(
-                            quantity=qty_to_add,
-                            movement_type='reception',
-                            reference_type='purchase_order',
-                            reference_id=self.id,
-                            notes=f"Réception BC {self.po_number} - {item.description}",
-                            user=user,
-                            batch=batch,
-                        )
-                        if movement:
-                            movements.append({
-                                'product': product.name,
-                                'quantity': qty_to_add,
-                                'new_stock': product.stock_quantity
-                            })
-            except Exception as e:
-                errors.append({
-                    'item': item.description,
-                    'error': str(e)
-                })
+        items = list(self.items.select_related('product'))
 
-        # Mettre à jour le statut
-        self.status = 'received'
-        self.save(update_fields=['status'])
+        # Produits : FK directe, ou recherche par référence en fallback (une requête)
+        references = {
+            item.product_reference for item in items
+            if not item.product_id and item.product_reference
+        }
+        by_reference = {}
+        if references:
+            for product in Product.objects.filter(reference__in=references):
+                by_reference.setdefault(product.reference, product)
+
+        received = []
+        for item in items:
+            product = item.product or by_reference.get(item.product_reference)
+            if product and product.product_type == 'physical':
+                # Un lot par ligne de réception
+                received.append((item, product, f"REC-{self.po_number}-{item.id}"))
+
+        # Lots de réception : existants (réception rejouée) ou créés en une fois
+        existing = {}
+        if received:
+            for batch in ProductBatch.objects.filter(
+                product_id__in={product.pk for _item, product, _number in received},
+                batch_number__in=[number for _item, _product, number in received]
+            ):
+                existing[(batch.product_id, batch.batch_number)] = batch
+
+        new_batches = []
+        lines = []
+        for item, product, batch_number in received:
+            batch = existing.get((product.pk, batch_number))
+            if batch is None:
+                batch = ProductBatch(
+                    product=product,
+                    batch_number=batch_number,
+                    initial_quantity=item.quantity,
+                    current_quantity=0,
+                )
+                new_batches.append(batch)
+                existing[(product.pk, batch_number)] = batch
+            # Ne compléter que la quantité pas encore reçue sur ce lot
+            qty_to_add = max(0, item.quantity - batch.current_quantity)
+            if qty_to_add > 0:
+                lines.append((item, StockLine(
+                    product=product,
+                    quantity=qty_to_add,
+                    batch=batch,
+                    notes=f"Réception BC {self.po_number} - {item.description}",
+                )))
+
+        previous_status = self.status
+        try:
+            with transaction.atomic():
+                if new_batches:
+                    ProductBatch.objects.bulk_create(new_batches)
+                created = apply_stock_movements(
+                    [line for _item, line in lines],
+                    movement_type='reception',
+                    reference_type='purchase_order',
+                    reference_id=self.id,
+                    user=user,
+                )
+                # Statut dans la même transaction que les mouvements : reçu
+                # seulement si le stock a bien été mis à jour
+                self.status = 'received'
+                self.save(update_fields=['status'])
+            for movement in created:
+                movements.append({
+                    'product': movement.product.name,
+                    'quantity': movement.quantity,
+                    'new_stock': movement.quantity_after
+                })
+        except Exception as e:
+            self.status = previous_status
+            errors.extend({'item': item.description, 'error': str(e)} for item, _line in lines)
 
         return {
-            'success': True,
+            'success': not errors,
             'movements': movements,
             'errors': errors,
             'total_updated': len(movements)
@@ -238,6 +238,9 @@ def purchase_order_item_delete(request, pk):
 @require_http_methods(["POST"])
 def purchase_order_bulk_action(request):
     """Actions en lot sur les bons de commande"""
+    # `update()` ne déclenche pas post_save : rollups et caches de statistiques rafraîchis explicitement
+    from apps.analytics.rollups import schedule_bulk_refresh
+
     action = request.POST.get('action')
     po_ids = request.POST.getlist('po_ids')
     
@@ -249,12 +252,15 @@ def purchase_order_bulk_action(request):
     
     if action == 'approve':
         purchase_orders.update(status='approved', approved_by=request.user)
+        schedule_bulk_refresh(purchase_orders)
         messages.success(request, f'{len(purchase_orders)} bon(s) de commande approuvé(s).')
     elif action == 'send':
         purchase_orders.update(status='sent')
+        schedule_bulk_refresh(purchase_orders)
         messages.success(request, f'{len(purchase_orders)} bon(s) de commande envoyé(s).')
     elif action == 'cancel':
         purchase_orders.update(status='cancelled')
+        schedule_bulk_refresh(purchase_orders)
         messages.success(request, f'{len(purchase_orders)} bon(s) de commande annulé(s).')
     elif action == 'delete':
         count = purchase_orders.count()
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Progression (%)'),
+        ),
+    ]
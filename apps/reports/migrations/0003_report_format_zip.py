@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_progress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='format',
+            field=models.CharField(choices=[('pdf', 'PDF'), ('xlsx', 'Excel (XLSX)'), ('csv', 'CSV'), ('zip', 'ZIP (PDF)')], default='pdf', max_length=10, verbose_name='Format'),
+        ),
+    ]
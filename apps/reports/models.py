@@ -64,6 +64,7 @@ class Report(models.Model):
         ('pdf', 'PDF'),
         ('xlsx', 'Excel (XLSX)'),
         ('csv', 'CSV'),
+        ('zip', 'ZIP (PDF)'),
     ]
 
     STATUS_CHOICES = [
@@ -130,6 +131,10 @@ class Report(models.Model):
         blank=True,
         verbose_name=_("Message d'erreur")
     )
+    progress = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_("Progression (%)")
+    )
 
     # Metadata
     generated_by = models.ForeignKey(
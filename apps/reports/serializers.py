@@ -1,3 +1,4 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Report, ReportTemplate
 
@@ -30,13 +31,13 @@ class ReportSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'template', 'report_type', 'report_type_display',
             'format', 'format_display', 'parameters', 'status', 'status_display',
-            'error_message', 'file_path', 'file_url', 'file_name', 'file_size',
+            'progress', 'error_message', 'file_path', 'file_url', 'file_name', 'file_size',
             'generated_by', 'generated_by_name', 'generated_at', 'completed_at',
             'download_count', 'last_downloaded_at'
         ]
         read_only_fields = [
             'id', 'file_path', 'file_url', 'file_name', 'file_size', 'status',
-            'error_message', 'generated_by', 'generated_by_name', 'generated_at',
+            'progress', 'error_message', 'generated_by', 'generated_by_name', 'generated_at',
             'completed_at', 'download_count', 'last_downloaded_at',
             'report_type_display', 'format_display', 'status_display'
         ]
@@ -45,7 +46,9 @@ class ReportSerializer(serializers.ModelSerializer):
         if obj.file_path:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(f'/api/reports/{obj.id}/download/')
+                return request.build_absolute_uri(
+                    reverse('api:reports:report-download', kwargs={'pk': obj.pk})
+                )
         return None
 
     def get_file_name(self, obj):
@@ -2,8 +2,7 @@
 Services pour la génération de rapports PDF et Excel
 """
 from datetime import datetime
-from io import BytesIO
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg, Q
 from .models import Report, ReportTemplate
@@ -29,10 +28,15 @@ class BaseReportService:
         return report
 
     def mark_report_completed(self, report, file_content, filename):
-        """Marquer un rapport comme terminé"""
-        report.file_path.save(filename, ContentFile(file_content), save=False)
-        report.file_size = len(file_content)
+        """Marquer un rapport comme terminé (contenu en octets ou fichier ouvert)"""
+        if isinstance(file_content, (bytes, bytearray)):
+            file_content = ContentFile(file_content)
+        else:
+            file_content = File(file_content)
+        report.file_path.save(filename, file_content, save=False)
+        report.file_size = file_content.size
         report.status = 'completed'
+        report.progress = 100
         report.completed_at = timezone.now()
         report.save()
         return report
@@ -96,7 +100,11 @@ class SupplierReportService(BaseReportService):
             else:
                 raise ValueError(f"Format non supporté: {format}")
 
-            self.mark_report_completed(report, file_content, filename)
+            try:
+                self.mark_report_completed(report, file_content, filename)
+            finally:
+                if hasattr(file_content, 'close'):
+                    file_content.close()
             return report
 
         except Exception as e:
@@ -142,113 +150,437 @@ class SupplierReportService(BaseReportService):
             return b"PDF generation requires weasyprint. Please install: pip install weasyprint"
 
     def _generate_excel(self, data):
-        """Générer un fichier Excel"""
+        """Générer un fichier Excel (fichier temporaire, classeur write_only)"""
         try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment
-
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Rapport Fournisseur"
-
-            # Header styling
-            header_fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True, size=14)
-
-            # Title
-            ws['A1'] = f"Rapport Fournisseur: {data['supplier'].name}"
-            ws['A1'].font = Font(bold=True, size=16)
-            ws.merge_cells('A1:D1')
-
-            # Informations générales
-            ws['A3'] = "Informations Générales"
-            ws['A3'].font = header_font
-            ws['A3'].fill = header_fill
-            ws.merge_cells('A3:B3')
-
-            info_rows = [
-                ('Fournisseur', data['supplier'].name),
-                ('Email', data['supplier'].email or 'N/A'),
-                ('Téléphone', data['supplier'].phone or 'N/A'),
-                ('Ville', data['supplier'].city or 'N/A'),
-                ('Note', f"{data['supplier'].rating}/5" if data['supplier'].rating else 'N/A'),
-            ]
-
-            row = 4
-            for label, value in info_rows:
-                ws[f'A{row}'] = label
-                ws[f'B{row}'] = value
-                ws[f'A{row}'].font = Font(bold=True)
-                row += 1
-
-            # Statistiques
-            ws[f'A{row+1}'] = "Statistiques"
-            ws[f'A{row+1}'].font = header_font
-            ws[f'A{row+1}'].fill = header_fill
-            ws.merge_cells(f'A{row+1}:B{row+1}')
-
-            stats_row = row + 2
-            stats_rows = [
-                ('Nombre de commandes', data['total_orders']),
-                ('Montant total', f"{data['total_amount']:.2f} $"),
-                ('Valeur moyenne par commande', f"{data['avg_order_value']:.2f} $"),
-            ]
-
-            for label, value in stats_rows:
-                ws[f'A{stats_row}'] = label
-                ws[f'B{stats_row}'] = value
-                ws[f'A{stats_row}'].font = Font(bold=True)
-                stats_row += 1
-
-            # Dernières commandes
-            if data['orders'].exists():
-                orders_row = stats_row + 2
-                ws[f'A{orders_row}'] = "Dernières Commandes"
-                ws[f'A{orders_row}'].font = header_font
-                ws[f'A{orders_row}'].fill = header_fill
-                ws.merge_cells(f'A{orders_row}:D{orders_row}')
-
-                # Headers
-                orders_row += 1
-                headers = ['N° BC', 'Date', 'Statut', 'Montant']
-                for col, header in enumerate(headers, start=1):
-                    cell = ws.cell(row=orders_row, column=col, value=header)
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-
-                # Data
-                orders_row += 1
-                for order in data['orders']:
-                    ws[f'A{orders_row}'] = order.po_number
-                    ws[f'B{orders_row}'] = order.created_at.strftime('%Y-%m-%d')
-                    ws[f'C{orders_row}'] = order.get_status_display()
-                    ws[f'D{orders_row}'] = f"{order.total_amount:.2f} $"
-                    orders_row += 1
-
-            # Auto-size columns
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-
-            # Save to BytesIO
-            buffer = BytesIO()
-            wb.save(buffer)
-            excel_content = buffer.getvalue()
-            buffer.close()
-            return excel_content
-
+            from openpyxl.styles import Font, PatternFill
+            from apps.core.exports import XLSXWriter, column_widths
         except ImportError:
             # Fallback si openpyxl n'est pas installé
             return b"Excel generation requires openpyxl. Please install: pip install openpyxl"
 
+        supplier = data['supplier']
+        info_rows = [
+            ('Fournisseur', supplier.name),
+            ('Email', supplier.email or 'N/A'),
+            ('Téléphone', supplier.phone or 'N/A'),
+            ('Ville', supplier.city or 'N/A'),
+            ('Note', f"{supplier.rating}/5" if supplier.rating else 'N/A'),
+        ]
+        stats_rows = [
+            ('Nombre de commandes', data['total_orders']),
+            ('Montant total', f"{data['total_amount']:.2f} $"),
+            ('Valeur moyenne par commande', f"{data['avg_order_value']:.2f} $"),
+        ]
+        order_rows = [
+            (order.po_number, order.created_at.strftime('%Y-%m-%d'), order.get_status_display(),
+             f"{order.total_amount:.2f} $")
+            for order in data['orders']
+        ]
+        order_headers = ('N° BC', 'Date', 'Statut', 'Montant')
+
+        writer = XLSXWriter()
+        # Mode write_only : largeurs calculées avant d'écrire les lignes
+        ws = writer.sheet("Rapport Fournisseur", column_widths(info_rows + stats_rows + order_rows + [order_headers]))
+
+        header_fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
+        header_font = Font(color="FFFFFF", bold=True, size=14)
+        bold = Font(bold=True)
+        row = 1
+
+        def section(title, last_column):
+            nonlocal row
+            ws.append([writer.cell(ws, title, font=header_font, fill=header_fill)])
+            writer.merge(ws, f'A{row}:{last_column}{row}')
+            row += 1
+
+        def labelled(rows):
+            nonlocal row
+            for label, value in rows:
+                ws.append([writer.cell(ws, label, font=bold), value])
+                row += 1
+
+        # Title
+        ws.append([writer.cell(ws, f"Rapport Fournisseur: {supplier.name}", font=Font(bold=True, size=16))])
+        writer.merge(ws, 'A1:D1')
+        ws.append([])
+        row = 3
+
+        # Informations générales
+        section("Informations Générales", 'B')
+        labelled(info_rows)
+        ws.append([])
+        row += 1
+
+        # Statistiques
+        section("Statistiques", 'B')
+        labelled(stats_rows)
+
+        # Dernières commandes
+        if order_rows:
+            ws.append([])
+            row += 1
+            section("Dernières Commandes", 'D')
+            header_cell_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+            ws.append([writer.cell(ws, header, font=bold, fill=header_cell_fill) for header in order_headers])
+            for order_row in order_rows:
+                ws.append(list(order_row))
+
+        return writer.save()
+
+
+# Rapports PDF groupés (factures, BC, clients, produits) générés en arrière-plan.
+# `filters` : lookups ORM sérialisables en JSON, appliqués tels quels par le worker.
+BULK_PDF_REPORTS = {
+    'invoices': {
+        'report_type': 'invoice',
+        'model': 'invoicing.Invoice',
+        'generator': 'generate_invoices_report_pdf',
+        'select_related': ('client', 'created_by'),
+        'prefetch_related': ('payments',),
+        'ordering': ('-created_at',),
+        'filename': 'rapport-factures',
+    },
+    'purchase_orders': {
+        'report_type': 'purchase_order',
+        'model': 'purchase_orders.PurchaseOrder',
+        'generator': 'generate_purchase_orders_report_pdf',
+        'select_related': ('supplier', 'created_by'),
+        'prefetch_related': (),
+        'ordering': ('-created_at',),
+        'filename': 'rapport-bons-commande',
+    },
+    'clients': {
+        'report_type': 'client_all',
+        'model': 'accounts.Client',
+        'generator': 'generate_clients_report_pdf',
+        'select_related': (),
+        'prefetch_related': ('invoices',),
+        'ordering': ('name',),
+        'filename': 'rapport-clients',
+    },
+    'products': {
+        'report_type': 'product_all',
+        'model': 'invoicing.Product',
+        'generator': 'generate_products_report_pdf',
+        'select_related': ('category', 'supplier'),
+        'prefetch_related': (),
+        'ordering': ('name',),
+        'filename': 'rapport-produits',
+    },
+}
+
+
+class BulkPDFReportService(BaseReportService):
+    """Rapport PDF groupé : enregistrement `Report`, tâche Celery, progression.
+
+    `start()` (requête HTTP) crée le rapport en attente et planifie la tâche ;
+    `run()` (worker) charge les lignes par lots de CHUNK_SIZE en publiant la
+    progression, produit le PDF avec le générateur WeasyPrint existant puis
+    le dépose dans le stockage (`Report.file_path`).
+    """
+
+    CHUNK_SIZE = 500
+
+    format = 'pdf'
+    task_name = 'generate_bulk_pdf_report'
+    # Arguments de la tâche quand elle tourne dans un thread du processus web
+    local_task_kwargs = {}
+
+    # Répartition de la progression : chargement puis rendu
+    LOAD_SHARE = 70
+    RENDER_SHARE = 25
+
+    def __init__(self, entity, user=None):
+        self.entity = entity
+        self.spec = BULK_PDF_REPORTS[entity]
+        super().__init__(self.spec['report_type'], user)
+
+    def queryset(self, filters):
+        from django.apps import apps
+
+        model = apps.get_model(self.spec['model'])
+        queryset = model.objects.filter(**filters).order_by(*self.spec['ordering'])
+        if self.spec['select_related']:
+            queryset = queryset.select_related(*self.spec['select_related'])
+        if self.spec['prefetch_related']:
+            queryset = queryset.prefetch_related(*self.spec['prefetch_related'])
+        return queryset
+
+    def start(self, filters, date_start=None, date_end=None, total=None):
+        """Crée le rapport en attente et planifie sa génération après commit."""
+        from django.db import transaction
+
+        report = Report.objects.create(
+            report_type=self.report_type,
+            format=self.format,
+            parameters={
+                'entity': self.entity,
+                'filters': filters,
+                'date_start': date_start.isoformat() if date_start else None,
+                'date_end': date_end.isoformat() if date_end else None,
+                'total': total,
+                **self.extra_parameters(),
+            },
+            generated_by=self.user,
+            status='pending',
+        )
+        report_id = str(report.pk)
+        transaction.on_commit(lambda: _dispatch_report_task(self.task_name, report_id, self.local_task_kwargs))
+        return report
+
+    def extra_parameters(self):
+        """Paramètres propres au type de rapport, enregistrés avec les filtres."""
+        return {}
+
+    @staticmethod
+    def set_progress(report, progress):
+        progress = int(progress)
+        if progress != report.progress:
+            report.progress = progress
+            Report.objects.filter(pk=report.pk).update(progress=progress)
+
+    @staticmethod
+    def _parse_date(value):
+        if not value:
+            return None
+        parsed = datetime.fromisoformat(value)
+        # Les dates seules (YYYY-MM-DD) restent des dates
+        return parsed.date() if len(value) == 10 else parsed
+
+    def render(self, rows, user, date_start, date_end):
+        """PDF du rapport (générateur WeasyPrint existant), en octets."""
+        from apps.api.services import report_generator_weasy
+
+        generate = getattr(report_generator_weasy, self.spec['generator'])
+        return generate(rows, user, date_start, date_end).getvalue()
+
+    def run(self, report):
+        """Génère le PDF du rapport `report` (appelé par le worker)."""
+        parameters = report.parameters
+        report.status = 'processing'
+        report.progress = 0
+        report.save(update_fields=['status', 'progress'])
+
+        try:
+            queryset = self.queryset(parameters.get('filters') or {})
+            total = queryset.count() or 1
+
+            rows = []
+            for index, row in enumerate(queryset.iterator(chunk_size=self.CHUNK_SIZE), start=1):
+                rows.append(row)
+                if index % self.CHUNK_SIZE == 0:
+                    self.set_progress(report, self.LOAD_SHARE * index / total)
+            self.set_progress(report, self.LOAD_SHARE)
+
+            file_content = self.render(
+                rows,
+                report.generated_by,
+                self._parse_date(parameters.get('date_start')),
+                self._parse_date(parameters.get('date_end')),
+            )
+            self.set_progress(report, self.LOAD_SHARE + self.RENDER_SHARE)
+
+            filename = f"{self.spec['filename']}-{timezone.now().strftime('%Y%m%d')}.pdf"
+            return self.mark_report_completed(report, file_content, filename)
+        except Exception as e:
+            self.mark_report_failed(report, str(e))
+            raise
+
+
+# Archives ZIP : un PDF par document, rendu par le générateur WeasyPrint du document
+ARCHIVE_DOCUMENTS = {
+    'invoices': {
+        'generator': 'apps.api.services.pdf_generator_weasy.generate_invoice_pdf_weasy',
+        'template_type': 'classic',
+        'select_related': ('client', 'created_by__organization'),
+        'number_field': 'invoice_number',
+        'document_name': 'facture',
+        'filename': 'factures',
+    },
+    'purchase_orders': {
+        'generator': 'apps.api.services.pdf_generator_weasy.generate_purchase_order_pdf_weasy',
+        'template_type': 'modern',
+        'select_related': ('supplier', 'created_by__organization'),
+        'number_field': 'po_number',
+        'document_name': 'bon_commande',
+        'filename': 'bons-commande',
+    },
+}
+
+
+def _init_archive_worker():
+    """Initialisation d'un processus du pool (méthode spawn : Django à configurer)."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def render_archive_document(entity, pk, template_type, language):
+    """Rend un document dans un processus du pool.
+
+    Retourne (nom du fichier dans l'archive, PDF en octets ou None, erreur).
+    """
+    from django.apps import apps
+    from django.db import close_old_connections
+    from django.utils.module_loading import import_string
+
+    spec = {**BULK_PDF_REPORTS[entity], **ARCHIVE_DOCUMENTS[entity]}
+    try:
+        model = apps.get_model(spec['model'])
+        document = model.objects.select_related(*spec['select_related']).get(pk=pk)
+        number = getattr(document, spec['number_field'], None) or pk
+        generate = import_string(spec['generator'])
+        pdf = generate(document, template_type or spec['template_type'], language=language).getvalue()
+        return f"{spec['document_name']}_{number}.pdf", pdf, None
+    except Exception as e:
+        return f"{spec['document_name']}_{pk}.pdf", None, str(e)
+    finally:
+        close_old_connections()
+
+
+class DocumentArchiveService(BulkPDFReportService):
+    """Archive ZIP d'un PDF par document (factures ou bons de commande).
+
+    Les documents sont rendus en parallèle par un pool de processus
+    (WeasyPrint est limité par le CPU et le GIL) : PDF_EXPORT_WORKERS
+    processus, un par cœur par défaut, démarrés en `spawn` (pas de fork d'un
+    worker multi-thread ni de connexion SQL héritée). Au plus
+    IN_FLIGHT_PER_WORKER documents par processus sont en cours : les PDF
+    rendus sont écrits au fil de l'eau dans un fichier ZIP temporaire sur
+    disque, la mémoire reste bornée quelle que soit la taille de l'export.
+    Avec un seul processus, rendu séquentiel dans le worker.
+
+    Broker injoignable : la tâche tourne dans un thread du processus web, où
+    le rendu reste séquentiel (`workers=1`) plutôt que de démarrer un pool
+    d'un processus Django par cœur depuis un worker gunicorn / ASGI.
+    """
+
+    format = 'zip'
+    task_name = 'generate_document_archive'
+    local_task_kwargs = {'workers': 1}
+
+    IN_FLIGHT_PER_WORKER = 2
+
+    def __init__(self, entity, user=None, template_type=None, language='fr', workers=None):
+        if entity not in ARCHIVE_DOCUMENTS:
+            raise ValueError(f"Archive non disponible pour {entity}")
+        super().__init__(entity, user)
+        self.archive = ARCHIVE_DOCUMENTS[entity]
+        self.template_type = template_type
+        self.language = language or 'fr'
+        self.max_workers = workers
+
+    def extra_parameters(self):
+        return {'template_type': self.template_type, 'language': self.language}
+
+    def workers(self):
+        import os
+        from django.conf import settings
+
+        if self.max_workers:
+            return self.max_workers
+        return int(getattr(settings, 'PDF_EXPORT_WORKERS', None) or os.cpu_count() or 1)
+
+    def _render_all(self, ids):
+        """Rend les documents ; produit (nom, PDF, erreur) dans l'ordre d'achèvement."""
+        args = (self.template_type, self.language)
+        workers = min(self.workers(), len(ids))
+        if workers <= 1:
+            for pk in ids:
+                yield render_archive_document(self.entity, pk, *args)
+            return
+
+        import multiprocessing
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        from django.conf import settings
+
+        context = multiprocessing.get_context(getattr(settings, 'PDF_EXPORT_START_METHOD', 'spawn'))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_archive_worker) as executor:
+            pending = set()
+            ids = iter(ids)
+            while True:
+                # Fenêtre bornée de documents en cours
+                for pk in ids:
+                    pending.add(executor.submit(render_archive_document, self.entity, pk, *args))
+                    if len(pending) >= workers * self.IN_FLIGHT_PER_WORKER:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def run(self, report):
+        """Génère l'archive ZIP du rapport `report` (appelé par le worker)."""
+        import tempfile
+        import zipfile
+
+        parameters = report.parameters
+        self.template_type = parameters.get('template_type')
+        self.language = parameters.get('language') or 'fr'
+        report.status = 'processing'
+        report.progress = 0
+        report.save(update_fields=['status', 'progress'])
+
+        try:
+            ids = [str(pk) for pk in self.queryset(parameters.get('filters') or {}).values_list('pk', flat=True)]
+            if not ids:
+                raise ValueError("Aucun document à exporter")
+
+            errors = []
+            with tempfile.TemporaryFile() as archive_file:
+                # PDF déjà compressés : stockés tels quels
+                with zipfile.ZipFile(archive_file, 'w', compression=zipfile.ZIP_STORED) as archive:
+                    for index, (name, pdf, error) in enumerate(self._render_all(ids), start=1):
+                        if pdf is None:
+                            errors.append(f"{name} : {error}")
+                        else:
+                            archive.writestr(name, pdf)
+                        self.set_progress(report, 95 * index / len(ids))
+                    if errors:
+                        archive.writestr('ERREURS.txt', '\n'.join(errors))
+
+                if len(errors) == len(ids):
+                    raise RuntimeError(f"Aucun document rendu ({errors[0]})")
+
+                archive_file.seek(0)
+                filename = f"{self.archive['filename']}-{timezone.now().strftime('%Y%m%d')}.zip"
+                return self.mark_report_completed(report, archive_file, filename)
+        except Exception as e:
+            self.mark_report_failed(report, str(e))
+            raise
+
+
+def _dispatch_report_task(task_name, report_id, local_kwargs=None):
+    """Envoie la génération au worker Celery ; thread local si le broker est injoignable.
+
+    `local_kwargs` : arguments ajoutés à la tâche quand elle tourne dans le
+    thread local (processus web).
+    """
+    from . import tasks
+
+    task = getattr(tasks, task_name)
+    try:
+        task.delay(report_id)
+    except Exception:
+        import logging
+        import threading
+        logging.getLogger(__name__).warning(
+            "Broker Celery indisponible, rapport %s généré dans un thread local", report_id, exc_info=True
+        )
+
+        def run():
+            from django.db import close_old_connections
+            try:
+                task(report_id, **(local_kwargs or {}))
+            finally:
+                close_old_connections()
+
+        threading.Thread(target=run, daemon=True).start()
+
 
 # TODO: Créer les autres services de rapports
 class ProductReportService(BaseReportService):
@@ -0,0 +1,55 @@
+"""
+Celery tasks pour la génération des rapports en arrière-plan.
+Enregistré automatiquement via app.autodiscover_tasks().
+"""
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='reports.generate_bulk_pdf_report')
+def generate_bulk_pdf_report(report_id):
+    """Génère le PDF d'un rapport groupé (factures, BC, clients, produits)."""
+    from .models import Report
+    from .services import BulkPDFReportService
+
+    try:
+        report = Report.objects.select_related('generated_by').get(pk=report_id)
+    except Report.DoesNotExist:
+        logger.info(f'generate_bulk_pdf_report: rapport {report_id} supprimé')
+        return
+
+    if report.status not in ('pending', 'processing'):
+        return
+
+    try:
+        service = BulkPDFReportService(report.parameters['entity'], user=report.generated_by)
+        service.run(report)
+    except Exception:
+        logger.exception(f'generate_bulk_pdf_report: échec du rapport {report_id}')
+
+
+@shared_task(name='reports.generate_document_archive')
+def generate_document_archive(report_id, workers=None):
+    """Génère l'archive ZIP d'un PDF par document (factures, BC).
+
+    `workers` : nombre de processus de rendu (PDF_EXPORT_WORKERS par défaut).
+    """
+    from .models import Report
+    from .services import DocumentArchiveService
+
+    try:
+        report = Report.objects.select_related('generated_by').get(pk=report_id)
+    except Report.DoesNotExist:
+        logger.info(f'generate_document_archive: rapport {report_id} supprimé')
+        return
+
+    if report.status not in ('pending', 'processing'):
+        return
+
+    try:
+        service = DocumentArchiveService(report.parameters['entity'], user=report.generated_by, workers=workers)
+        service.run(report)
+    except Exception:
+        logger.exception(f'generate_document_archive: échec du rapport {report_id}')
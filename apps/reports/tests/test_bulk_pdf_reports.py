@@ -0,0 +1,207 @@
+"""
+Tests des rapports PDF groupés générés en arrière-plan :
+- les endpoints bulk-pdf-report créent un `Report` et planifient la tâche (202)
+- le worker charge toutes les lignes par lots (plus de limite à 500),
+  limitées à l'organisation, et publie la progression
+- endpoint de suivi /reports/{id}/progress/
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client, Organization, User
+from apps.invoicing.models import Invoice
+from apps.reports.models import Report
+from apps.reports.services import BulkPDFReportService
+from apps.reports.tasks import generate_bulk_pdf_report
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Reports Org", enabled_modules=['invoices'])
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="reports_user",
+        email="reports@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def _invoices(user, organization, count, status='sent'):
+    client = Client.objects.create(name="Client Rapport", organization=organization)
+    return [
+        Invoice.objects.create(
+            title=f"Facture {index}",
+            subtotal=Decimal('100.00'),
+            total_amount=Decimal('100.00'),
+            created_by=user,
+            organization=organization,
+            client=client,
+            status=status,
+        )
+        for index in range(count)
+    ]
+
+
+def _pending_report(user, organization):
+    return Report.objects.create(
+        report_type='invoice',
+        format='pdf',
+        parameters={
+            'entity': 'invoices',
+            'filters': {'created_by__organization_id': str(organization.pk)},
+            'date_start': None,
+            'date_end': None,
+        },
+        generated_by=user,
+        status='pending',
+    )
+
+
+def _fake_pdf(self, rows, user, date_start, date_end):
+    _fake_pdf.rows = list(rows)
+    return b'%PDF-1.4 rapport'
+
+
+def _render(**kwargs):
+    """Rendu WeasyPrint remplacé (bibliothèques système absentes en test)."""
+    return patch.object(BulkPDFReportService, 'render', autospec=True, **kwargs)
+
+
+@pytest.mark.django_db
+class TestBulkReportEndpoint:
+
+    def test_schedules_background_report(self, api_client, user, organization, django_capture_on_commit_callbacks):
+        _invoices(user, organization, 3)
+
+        with patch('apps.reports.tasks.generate_bulk_pdf_report.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = api_client.post(
+                    '/api/v1/invoices/bulk-pdf-report/',
+                    {'status': 'sent', 'date_start': '2020-01-01'},
+                    format='json',
+                )
+
+        assert response.status_code == 202
+        report = Report.objects.get(pk=response.data['id'])
+        assert report.status == 'pending'
+        assert report.report_type == 'invoice'
+        assert report.parameters['entity'] == 'invoices'
+        assert report.parameters['total'] == 3
+        assert report.parameters['filters'] == {
+            'status': 'sent',
+            'created_at__date__gte': '2020-01-01',
+            'created_by__organization_id': str(organization.pk),
+        }
+        assert response.data['progress_url'].endswith(f'/api/v1/reports/{report.pk}/progress/')
+        delay.assert_called_once_with(str(report.pk))
+
+    def test_no_match_returns_400(self, api_client, user, organization):
+        _invoices(user, organization, 1, status='draft')
+
+        response = api_client.post('/api/v1/invoices/bulk-pdf-report/', {'status': 'paid'}, format='json')
+
+        assert response.status_code == 400
+        assert not Report.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBulkReportGeneration:
+
+    def test_renders_all_rows_in_chunks(self, user, organization, monkeypatch):
+        invoices = _invoices(user, organization, 5)
+        other_org = Organization.objects.create(name="Autre Org")
+        other_user = User.objects.create_user(
+            username="other_user", email="other@example.com", password="x", organization=other_org,
+        )
+        _invoices(other_user, other_org, 2)
+        monkeypatch.setattr(BulkPDFReportService, 'CHUNK_SIZE', 2)
+        report = _pending_report(user, organization)
+
+        progress = []
+        set_progress = BulkPDFReportService.set_progress
+
+        def record_progress(report, value):
+            progress.append(int(value))
+            set_progress(report, value)
+
+        with _render(side_effect=_fake_pdf), \
+                patch.object(BulkPDFReportService, 'set_progress', staticmethod(record_progress)):
+            generate_bulk_pdf_report(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'completed'
+        assert report.progress == 100
+        assert report.file_path.read() == b'%PDF-1.4 rapport'
+        assert {invoice.pk for invoice in _fake_pdf.rows} == {invoice.pk for invoice in invoices}
+        # Progression publiée après chaque lot, croissante
+        assert progress == sorted(progress)
+        assert progress[:2] == [28, 56]
+
+    def test_failure_is_recorded(self, user, organization):
+        _invoices(user, organization, 1)
+        report = _pending_report(user, organization)
+
+        with _render(side_effect=ImportError("WeasyPrint n'est pas disponible")):
+            generate_bulk_pdf_report(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'failed'
+        assert 'WeasyPrint' in report.error_message
+
+    def test_finished_report_is_not_regenerated(self, user, organization):
+        report = _pending_report(user, organization)
+        Report.objects.filter(pk=report.pk).update(status='completed')
+
+        with _render() as render:
+            generate_bulk_pdf_report(str(report.pk))
+
+        render.assert_not_called()
+
+
+@pytest.mark.django_db
+class TestProgressEndpoint:
+
+    def test_progress_and_download_url(self, api_client, user, organization):
+        _invoices(user, organization, 1)
+        report = _pending_report(user, organization)
+
+        response = api_client.get(f'/api/v1/reports/{report.pk}/progress/')
+        assert response.data['status'] == 'pending'
+        assert response.data['file_url'] is None
+
+        with _render(side_effect=_fake_pdf):
+            generate_bulk_pdf_report(str(report.pk))
+
+        response = api_client.get(f'/api/v1/reports/{report.pk}/progress/')
+        assert response.data['status'] == 'completed'
+        assert response.data['progress'] == 100
+        assert response.data['file_url'].endswith(f'/api/v1/reports/{report.pk}/download/')
+
+    def test_other_users_reports_are_hidden(self, user, organization):
+        report = _pending_report(user, organization)
+        other = User.objects.create_user(username="intrus", email="intrus@example.com", password="x")
+        client = APIClient()
+        client.force_authenticate(user=other)
+
+        response = client.get(f'/api/v1/reports/{report.pk}/progress/')
+
+        assert response.status_code == 404
@@ -0,0 +1,239 @@
+"""
+Tests des archives ZIP d'un PDF par document :
+- l'endpoint bulk-pdf-archive crée un `Report` au format zip et planifie la tâche
+- le worker écrit un PDF par document dans l'archive, limité à l'organisation
+- les documents en échec sont listés dans ERREURS.txt ; rapport en échec si aucun n'est rendu
+- rendu par le pool de processus : fenêtre bornée de documents en cours
+"""
+import io
+import time
+import zipfile
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client, Organization, User
+from apps.invoicing.models import Invoice
+from apps.reports.models import Report
+from apps.reports.services import DocumentArchiveService
+from apps.reports.tasks import generate_document_archive
+
+
+@pytest.fixture(autouse=True)
+def archive_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    # Rendu séquentiel : les processus du pool ne voient pas la base de test
+    settings.PDF_EXPORT_WORKERS = 1
+
+
+@pytest.fixture
+def organization(db):
+    return Organization.objects.create(name="Archive Org", enabled_modules=['invoices'])
+
+
+@pytest.fixture
+def user(organization):
+    return User.objects.create_user(
+        username="archive_user",
+        email="archive@example.com",
+        password="testpass123",
+        organization=organization,
+    )
+
+
+def _invoices(user, organization, count):
+    client = Client.objects.create(name="Client Archive", organization=organization)
+    return [
+        Invoice.objects.create(
+            title=f"Facture {index}",
+            subtotal=Decimal('100.00'),
+            total_amount=Decimal('100.00'),
+            created_by=user,
+            organization=organization,
+            client=client,
+            status='sent',
+        )
+        for index in range(count)
+    ]
+
+
+def _pending_archive(user, organization):
+    return Report.objects.create(
+        report_type='invoice',
+        format='zip',
+        parameters={
+            'entity': 'invoices',
+            'filters': {'created_by__organization_id': str(organization.pk)},
+            'template_type': None,
+            'language': 'fr',
+        },
+        generated_by=user,
+        status='pending',
+    )
+
+
+def _fake_invoice_pdf(invoice, template_type='classic', language='fr'):
+    if invoice.title == "Facture cassée":
+        raise ValueError("template introuvable")
+    return io.BytesIO(f'%PDF {invoice.invoice_number} {template_type}'.encode())
+
+
+def _pool_render(entity, pk, template_type, language):
+    """Rendu exécuté dans un processus du pool (fork) : sans base de données."""
+    time.sleep(0.05)
+    return f'facture_{pk}.pdf', f'%PDF {pk}'.encode(), None
+
+
+def _render(**kwargs):
+    """Générateur WeasyPrint remplacé (bibliothèques système absentes en test)."""
+    return patch('apps.api.services.pdf_generator_weasy.generate_invoice_pdf_weasy', **kwargs)
+
+
+def _archive_names(report):
+    with report.file_path.open('rb') as f, zipfile.ZipFile(f) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+@pytest.mark.django_db
+class TestDocumentArchiveEndpoint:
+
+    def test_schedules_archive(self, user, organization, django_capture_on_commit_callbacks):
+        _invoices(user, organization, 2)
+        api_client = APIClient()
+        api_client.force_authenticate(user=user)
+
+        with patch('apps.reports.tasks.generate_document_archive.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = api_client.post(
+                    '/api/v1/invoices/bulk-pdf-archive/',
+                    {'status': 'sent', 'template_type': 'modern'},
+                    format='json',
+                )
+
+        assert response.status_code == 202
+        report = Report.objects.get(pk=response.data['id'])
+        assert report.format == 'zip'
+        assert report.parameters['total'] == 2
+        assert report.parameters['template_type'] == 'modern'
+        delay.assert_called_once_with(str(report.pk))
+
+    def test_errors_do_not_expose_internals(self, user, organization):
+        _invoices(user, organization, 1)
+        api_client = APIClient()
+        api_client.force_authenticate(user=user)
+
+        with patch('apps.reports.services.DocumentArchiveService.start', side_effect=ValueError("Entité inconnue")):
+            response = api_client.post('/api/v1/invoices/bulk-pdf-archive/', {}, format='json')
+        assert response.status_code == 400
+        assert response.data == {'error': "Entité inconnue"}
+
+        with patch('apps.reports.services.DocumentArchiveService.start', side_effect=RuntimeError("secret")):
+            response = api_client.post('/api/v1/invoices/bulk-pdf-archive/', {}, format='json')
+        assert response.status_code == 500
+        assert 'traceback' not in response.data
+        assert 'secret' not in response.data['error']
+
+    def test_local_fallback_renders_serially(self):
+        from apps.reports.services import _dispatch_report_task
+
+        class ImmediateThread:
+            def __init__(self, target, daemon=None):
+                self.target = target
+
+            def start(self):
+                self.target()
+
+        with patch('apps.reports.tasks.generate_document_archive') as task, \
+                patch('threading.Thread', ImmediateThread), \
+                patch('django.db.close_old_connections'):
+            task.delay.side_effect = ConnectionError("broker injoignable")
+            _dispatch_report_task('generate_document_archive', 'rapport-1', DocumentArchiveService.local_task_kwargs)
+
+        # Pas de pool de processus dans le processus web
+        task.assert_called_once_with('rapport-1', workers=1)
+
+    def test_unknown_entity_is_rejected(self, user):
+        with pytest.raises(ValueError):
+            DocumentArchiveService('clients', user=user)
+
+
+@pytest.mark.django_db
+class TestDocumentArchiveGeneration:
+
+    def test_one_pdf_per_document(self, user, organization):
+        invoices = _invoices(user, organization, 3)
+        other_org = Organization.objects.create(name="Autre Org")
+        other_user = User.objects.create_user(
+            username="other_archive", email="other_archive@example.com", password="x", organization=other_org,
+        )
+        _invoices(other_user, other_org, 2)
+        report = _pending_archive(user, organization)
+
+        with _render(side_effect=_fake_invoice_pdf):
+            generate_document_archive(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'completed'
+        assert report.progress == 100
+        assert report.file_path.name.endswith('.zip')
+        files = _archive_names(report)
+        assert set(files) == {f'facture_{invoice.invoice_number}.pdf' for invoice in invoices}
+        assert files[f'facture_{invoices[0].invoice_number}.pdf'].endswith(b' classic')
+
+    def test_failed_documents_are_listed(self, user, organization):
+        invoices = _invoices(user, organization, 2)
+        Invoice.objects.filter(pk=invoices[1].pk).update(title="Facture cassée")
+        report = _pending_archive(user, organization)
+
+        with _render(side_effect=_fake_invoice_pdf):
+            generate_document_archive(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'completed'
+        files = _archive_names(report)
+        assert f'facture_{invoices[0].invoice_number}.pdf' in files
+        assert b'template introuvable' in files['ERREURS.txt']
+
+    def test_fails_when_no_document_is_rendered(self, user, organization):
+        _invoices(user, organization, 1)
+        report = _pending_archive(user, organization)
+
+        with _render(side_effect=ImportError("WeasyPrint n'est pas disponible")):
+            generate_document_archive(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'failed'
+        assert 'WeasyPrint' in report.error_message
+
+    def test_process_pool_bounds_documents_in_flight(self, user, organization, settings):
+        from concurrent.futures import ProcessPoolExecutor
+        from apps.reports.services import DocumentArchiveService
+
+        # fork : les processus héritent du faux rendu défini dans ce module
+        settings.PDF_EXPORT_WORKERS = 2
+        settings.PDF_EXPORT_START_METHOD = 'fork'
+        invoices = _invoices(user, organization, 10)
+        report = _pending_archive(user, organization)
+
+        submit = ProcessPoolExecutor.submit
+        counts = {'submitted': 0, 'completed': 0, 'max_in_flight': 0}
+
+        def counting_submit(executor, *args, **kwargs):
+            future = submit(executor, *args, **kwargs)
+            counts['submitted'] += 1
+            in_flight = counts['submitted'] - counts['completed']
+            counts['max_in_flight'] = max(counts['max_in_flight'], in_flight)
+            future.add_done_callback(lambda _future: counts.__setitem__('completed', counts['completed'] + 1))
+            return future
+
+        with patch('apps.reports.services.render_archive_document', _pool_render), \
+                patch.object(ProcessPoolExecutor, 'submit', counting_submit):
+            generate_document_archive(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'completed'
+        assert set(_archive_names(report)) == {f'facture_{invoice.pk}.pdf' for invoice in invoices}
+        assert counts['submitted'] == 10
+        assert counts['max_in_flight'] <= 2 * DocumentArchiveService.IN_FLIGHT_PER_WORKER
@@ -53,6 +53,19 @@ class ReportViewSet(viewsets.ModelViewSet):
             filename=report.file_path.name.split('/')[-1]
         )
 
+    @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        """Avancement d'un rapport généré en arrière-plan (à interroger périodiquement)"""
+        report = self.get_object()
+        serializer = self.get_serializer(report)
+        return Response({
+            'id': str(report.id),
+            'status': report.status,
+            'progress': report.progress,
+            'error_message': report.error_message,
+            'file_url': serializer.data['file_url'] if report.status == 'completed' else None,
+        })
+
     @action(detail=False, methods=['post'])
     def generate_supplier(self, request):
         """Générer un rapport fournisseur"""
@@ -452,14 +452,14 @@ class Subscription(models.Model):
         can_proceed = used < limit
         return can_proceed, used, limit
 
-    def increment_usage(self, quota_type):
+    def increment_usage(self, quota_type, amount=1):
         """Incrémente le compteur d'utilisation et alerte si proche de la limite"""
         if quota_type == 'invoices':
-            self.invoices_this_month += 1
+            self.invoices_this_month += amount
         elif quota_type == 'purchase_orders':
-            self.purchase_orders_this_month += 1
+            self.purchase_orders_this_month += amount
         elif quota_type == 'ai_requests':
-            self.ai_requests_this_month += 1
+            self.ai_requests_this_month += amount
 
         self.save(update_fields=[f'{quota_type}_this_month', 'updated_at'])
 
@@ -147,6 +147,7 @@ export const suppliersAPI = {
   toggleStatus: (id) => api.post(`/suppliers/${id}/toggle_status/`),
   getStatistics: (id) => api.get(`/suppliers/${id}/statistics/`),
   exportCSV: () => api.get('/suppliers/export_csv/', { responseType: 'blob' }),
+  exportXLSX: () => api.get('/suppliers/export_xlsx/', { responseType: 'blob' }),
   quickCreate: (data) => api.post('/quick-create/supplier/', data),
 };
 
@@ -196,6 +197,7 @@ export const productsAPI = {
   reportLoss: (id, data) => api.post(`/products/${id}/report_loss/`, data),
   getStatistics: (id) => api.get(`/products/${id}/statistics/`),
   exportCSV: () => api.get('/products/export_csv/', { responseType: 'blob' }),
+  exportXLSX: () => api.get('/products/export_xlsx/', { responseType: 'blob' }),
   quickCreate: (data) => api.post('/quick-create/product/', data),
 };
 
@@ -235,6 +237,7 @@ export const clientsAPI = {
   delete: (id) => api.delete(`/clients/${id}/`),
   getStatistics: (id) => api.get(`/clients/${id}/statistics/`),
   exportCSV: () => api.get('/clients/export_csv/', { responseType: 'blob' }),
+  exportXLSX: () => api.get('/clients/export_xlsx/', { responseType: 'blob' }),
   quickCreate: (data) => api.post('/quick-create/client/', data),
 };
 
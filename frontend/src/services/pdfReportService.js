@@ -40,6 +40,12 @@ export const openPDFInNewTab = async (blob, filename = 'document.pdf') => {
   }
 };
 
+// Intervalle de suivi des rapports groupés générés en arrière-plan (ms)
+const BULK_REPORT_POLL_INTERVAL = 1500;
+// Attente maximale d'un rapport groupé (ms) : au-delà, le worker est
+// considéré perdu (rapport bloqué en attente / en cours)
+const BULK_REPORT_MAX_WAIT = 10 * 60 * 1000;
+
 /**
  * Service pour générer et télécharger les rapports PDF
  * Utilise le même pattern que pdfService.js pour cohérence
@@ -207,9 +213,67 @@ class PDFReportService {
     }
   }
 
+  /**
+   * Attendre la fin d'un rapport groupé généré en arrière-plan puis le télécharger
+   * @param {Object} report - Rapport renvoyé par l'API (202) avec progress_url
+   * @param {Function} [onProgress] - Appelé avec le pourcentage d'avancement
+   * @returns {Promise<Blob>} Rejetée si le rapport échoue, disparaît ou dépasse BULK_REPORT_MAX_WAIT
+   */
+  async waitForBulkReport(report, onProgress) {
+    const deadline = Date.now() + BULK_REPORT_MAX_WAIT;
+    let state = report;
+    while (state.status !== 'completed') {
+      if (state.status === 'failed') {
+        throw new Error(state.error_message || 'La génération du rapport a échoué');
+      }
+      if (Date.now() >= deadline) {
+        throw new Error('La génération du rapport prend trop de temps, veuillez réessayer plus tard');
+      }
+      if (onProgress) onProgress(state.progress || 0);
+      await new Promise((resolve) => setTimeout(resolve, BULK_REPORT_POLL_INTERVAL));
+      try {
+        const response = await api.get(`/reports/${report.id}/progress/`);
+        state = response.data;
+      } catch (error) {
+        if (error.response?.status === 404) {
+          throw new Error('Rapport introuvable (supprimé ou expiré)');
+        }
+        throw error;
+      }
+    }
+    if (onProgress) onProgress(100);
+
+    const response = await api.get(`/reports/${report.id}/download/`, {
+      responseType: 'blob',
+    });
+    const type = report.format === 'zip' ? 'application/zip' : 'application/pdf';
+    return new Blob([response.data], { type });
+  }
+
+  /**
+   * Télécharger une archive ZIP d'un PDF par document (rendue en arrière-plan)
+   * @param {string} entity - 'invoices' ou 'purchase-orders'
+   * @param {Object} payload - Filtres de l'API bulk-pdf-report, plus template_type et language
+   * @param {Function} [onProgress] - Appelé avec le pourcentage d'avancement
+   * @returns {Promise<Blob>}
+   */
+  async downloadDocumentsArchive(entity, payload = {}, onProgress) {
+    const response = await api.post(`/${entity}/bulk-pdf-archive/`, payload);
+    const blob = await this.waitForBulkReport(response.data, onProgress);
+    const url = window.URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = `${entity}-${new Date().getTime()}.zip`;
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+    window.URL.revokeObjectURL(url);
+    return blob;
+  }
+
   /**
    * Télécharger un rapport PDF groupé pour plusieurs factures
-   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, status, client_id)
+   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, status, client_id, onProgress)
    * @returns {Promise<Blob>}
    */
   async generateInvoicesBulkReport(filters = {}) {
@@ -237,12 +301,8 @@ class PDFReportService {
         payload.client_id = filters.clientId;
       }
 
-      const response = await api.post('/invoices/bulk-pdf-report/', payload, {
-        responseType: 'blob',
-      });
-
-      const blob = new Blob([response.data], { type: 'application/pdf' });
-      return blob;
+      const response = await api.post('/invoices/bulk-pdf-report/', payload);
+      return await this.waitForBulkReport(response.data, filters.onProgress);
     } catch (error) {
       console.error('Erreur lors de la génération du rapport de factures:', error);
       throw error;
@@ -264,7 +324,7 @@ class PDFReportService {
 
   /**
    * Télécharger un rapport PDF groupé pour plusieurs bons de commande
-   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, status, supplier_id)
+   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, status, supplier_id, onProgress)
    * @returns {Promise<Blob>}
    */
   async generatePurchaseOrdersBulkReport(filters = {}) {
@@ -292,12 +352,8 @@ class PDFReportService {
         payload.supplier_id = filters.supplierId;
       }
 
-      const response = await api.post('/purchase-orders/bulk-pdf-report/', payload, {
-        responseType: 'blob',
-      });
-
-      const blob = new Blob([response.data], { type: 'application/pdf' });
-      return blob;
+      const response = await api.post('/purchase-orders/bulk-pdf-report/', payload);
+      return await this.waitForBulkReport(response.data, filters.onProgress);
     } catch (error) {
       console.error('Erreur lors de la génération du rapport de bons de commande:', error);
       throw error;
@@ -319,7 +375,7 @@ class PDFReportService {
 
   /**
    * Générer un rapport PDF groupé pour plusieurs clients
-   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, status)
+   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, status, onProgress)
    * @returns {Promise<Blob>}
    */
   async generateClientsBulkReport(filters = {}) {
@@ -342,12 +398,8 @@ class PDFReportService {
         payload.status = filters.status;
       }
 
-      const response = await api.post('/clients/bulk-pdf-report/', payload, {
-        responseType: 'blob',
-      });
-
-      const blob = new Blob([response.data], { type: 'application/pdf' });
-      return blob;
+      const response = await api.post('/clients/bulk-pdf-report/', payload);
+      return await this.waitForBulkReport(response.data, filters.onProgress);
     } catch (error) {
       console.error('Erreur lors de la génération du rapport de clients:', error);
       throw error;
@@ -356,7 +408,7 @@ class PDFReportService {
 
   /**
    * Générer un rapport PDF groupé pour plusieurs produits
-   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, category)
+   * @param {Object} filters - Filtres (itemIds, dateStart, dateEnd, category, onProgress)
    * @returns {Promise<Blob>}
    */
   async generateProductsBulkReport(filters = {}) {
@@ -379,12 +431,8 @@ class PDFReportService {
         payload.category = filters.category;
       }
 
-      const response = await api.post('/products/bulk-pdf-report/', payload, {
-        responseType: 'blob',
-      });
-
-      const blob = new Blob([response.data], { type: 'application/pdf' });
-      return blob;
+      const response = await api.post('/products/bulk-pdf-report/', payload);
+      return await this.waitForBulkReport(response.data, filters.onProgress);
     } catch (error) {
       console.error('Erreur lors de la génération du rapport de produits:', error);
       throw error;
@@ -177,6 +177,21 @@ export const duplicateLayout = async (layoutId) => {
   }
 };
 
+/**
+ * Get data for every widget of a layout in one request
+ * @param {string} layoutId - The layout ID
+ * @param {object} params - Query parameters (period, start_date, limit, compare)
+ */
+export const getLayoutWidgetsData = async (layoutId, params = {}) => {
+  try {
+    const response = await api.get(`/analytics/layouts/${layoutId}/data/`, { params });
+    return response.data;
+  } catch (error) {
+    console.error(`Error fetching widgets data for layout ${layoutId}:`, error);
+    throw error;
+  }
+};
+
 // ========== DASHBOARD STATS (existing) ==========
 
 /**
@@ -211,5 +226,6 @@ export default {
   deleteLayout,
   setDefaultLayout,
   duplicateLayout,
+  getLayoutWidgetsData,
   getDashboardStats
 };
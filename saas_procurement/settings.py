@@ -203,6 +203,12 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'ai_assistant.cleanup_notification_logs',
         'schedule': crontab(hour=4, minute=0, day_of_week='sunday'),
     },
+    # Journal d'utilisation IA : écriture par lots des événements en file
+    # (filet de sécurité du thread de fond des workers web)
+    'flush-ai-usage-events': {
+        'task': 'ai_assistant.flush_ai_usage_events',
+        'schedule': 30.0,
+    },
 }
 
 # Password validation
@@ -250,6 +256,13 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache des PDF rendus (factures, BC) : hors MEDIA_ROOT, jamais servi directement
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', str(BASE_DIR / 'pdf_cache'))
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_MB', '512')) * 1024 * 1024  # 0 = désactivé
+
+# Archives ZIP de PDF : processus de rendu par worker (vide = un par cœur)
+PDF_EXPORT_WORKERS = int(os.getenv('PDF_EXPORT_WORKERS', '0')) or None
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 